@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mesure du temps de démarrage de la CLI et de l'interface graphique.
+
+Chaque scénario est exécuté dans un interpréteur neuf, plusieurs fois, et
+comparé au coût de l'import de torch et Bark (ce que payaient ces chemins
+avant le chargement différé des dépendances lourdes). Le script échoue si un
+scénario importe une dépendance lourde ou dépasse la fraction autorisée de
+ce coût de référence.
+
+Usage :
+    python benchmarks/bench_import.py [--repeat 5] [--max-ratio 0.25]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import logging
+from typing import Dict, List, Optional
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dépendances qui ne doivent pas être importées au démarrage
+HEAVY_MODULES = ("torch", "bark", "scipy", "librosa")
+
+# Chaque scénario affiche en dernière ligne la liste des modules lourds importés
+_REPORT = f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+
+SCENARIOS = {
+    "reference (import torch, bark)": "import bark, torch",
+    "bark_cli.py --help": (
+        "import runpy\n"
+        "sys.argv = ['bark_cli.py', '--help']\n"
+        "try:\n"
+        "    runpy.run_module('src.bark_cli', run_name='__main__')\n"
+        "except SystemExit:\n"
+        "    pass"
+    ),
+    "BarkGUI()": (
+        "from src.gui import BarkGUI\n"
+        "app = BarkGUI()\n"
+        "app.update()\n"
+        "app.destroy()"
+    ),
+}
+
+
+def run_scenario(code: str) -> Optional[Dict[str, object]]:
+    """
+    Exécute un scénario dans un nouvel interpréteur.
+
+    Returns:
+        La durée (en secondes) et les modules lourds importés, ou None si le
+        scénario ne peut pas s'exécuter ici (pas d'affichage pour la GUI, etc.).
+    """
+    script = f"import sys, json\n{code}\n{_REPORT}"
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        logger.warning(f"Scénario ignoré : {result.stderr.strip().splitlines()[-1:]}")
+        return None
+    heavy = json.loads(result.stdout.strip().splitlines()[-1])
+    return {"seconds": elapsed, "heavy_modules": heavy}
+
+
+def benchmark(repeat: int = 5) -> Dict[str, Dict[str, object]]:
+    """Mesure chaque scénario (médiane de repeat exécutions)."""
+    results = {}
+    for name, code in SCENARIOS.items():
+        runs: List[Dict[str, object]] = []
+        for _ in range(repeat):
+            run = run_scenario(code)
+            if run is None:
+                break
+            runs.append(run)
+        if not runs:
+            results[name] = None
+            continue
+        results[name] = {
+            "median_s": statistics.median(r["seconds"] for r in runs),
+            "heavy_modules": runs[-1]["heavy_modules"],
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps de démarrage de la CLI et de la GUI")
+    parser.add_argument("--repeat", type=int, default=5, help="Nombre d'exécutions par scénario")
+    parser.add_argument("--max-ratio", type=float, default=0.25, help="Fraction maximale du temps de référence")
+    parser.add_argument("--json", action="store_true", help="Afficher les résultats en JSON")
+    args = parser.parse_args()
+
+    results = benchmark(args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+    reference = results.pop("reference (import torch, bark)")
+    failed = False
+    print(f"{'scénario':<24} {'médiane':>9} {'ratio':>7}  modules lourds")
+    if reference is not None:
+        print(f"{'référence torch + bark':<24} {reference['median_s']:>8.3f}s {'':>7}")
+    for name, r in results.items():
+        if r is None:
+            print(f"{name:<24} {'ignoré':>9}")
+            continue
+        ratio = r["median_s"] / reference["median_s"] if reference else None
+        ratio_str = f"{ratio:.2f}" if ratio is not None else "-"
+        print(f"{name:<24} {r['median_s']:>8.3f}s {ratio_str:>7}  {', '.join(r['heavy_modules']) or '-'}")
+        if r["heavy_modules"] or (ratio is not None and ratio > args.max_ratio):
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Débit des étapes autorégressives (sémantique et coarse) selon le cache clés/valeurs.
+
+Pour chaque étape et chaque longueur générée, mesure les tokens par seconde
+des trois modes de src.kv_cache :
+    static   cache préalloué (mode utilisé par StandaloneBark)
+    dynamic  cache de Bark, concaténé à chaque pas
+    off      sans cache, tout le préfixe est recalculé à chaque pas
+
+Sans cache, le coût d'un pas croît avec la longueur de la séquence et le
+débit chute avec elle ; avec cache, il reste à peu près constant. Le gain
+du cache préalloué sur la concaténation croît avec la taille du cache.
+
+Par défaut, les modèles sont des GPT de Bark aux poids aléatoires, aux
+vocabulaires réels et à la taille choisie (--layers, --width, --heads) ;
+--model-dir utilise les checkpoints réels. Les mêmes graines donnent les
+mêmes tokens dans les trois modes : seul le temps de calcul change.
+
+Usage :
+    python benchmarks/bench_kv_cache.py [--lengths 128,256,512,768] [--modes static,off]
+    python benchmarks/bench_kv_cache.py --layers 12 --width 768 --heads 12 --json kv.json
+    python benchmarks/bench_kv_cache.py --model-dir models --model-size small
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import logging
+from typing import Any, Dict, List
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from src.kv_cache import KV_CACHE_MODES
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+STAGES = ("text", "coarse")
+
+# Longueur maximale d'une séquence sémantique générée par Bark
+MAX_SEMANTIC_STEPS = 768
+
+BENCH_TEXT = "The quick brown fox jumps over the lazy dog."
+
+
+def random_models(layers: int, width: int, heads: int, seed: int = 0) -> Dict[str, Any]:
+    """GPT sémantique et coarse de Bark aux poids aléatoires (vocabulaires réels)."""
+    import torch
+    from bark.model import GPT, GPTConfig
+    from stub_backend import STUB_CONFIGS, _CharTokenizer
+
+    models: Dict[str, Any] = {}
+    for stage in STAGES:
+        config = dict(STUB_CONFIGS[stage], n_layer=layers, n_head=heads, n_embd=width)
+        torch.manual_seed(seed)
+        model = GPT(GPTConfig(**config)).eval()
+        models[stage] = {"model": model, "tokenizer": _CharTokenizer()} if stage == "text" else model
+    return models
+
+
+def real_models(model_dir: str, model_size: str) -> Dict[str, Any]:
+    """Modèles réels de model_dir, chargés par le registre."""
+    from src.model_registry import get_registry
+    from src.model_sizes import parse_model_size
+
+    loaded = get_registry().get(model_dir, "cpu", "fp32", parse_model_size(model_size))
+    return {stage: loaded.models[stage] for stage in STAGES}
+
+
+def run_stage(models: Dict[str, Any], stage: str, length: int, mode: str) -> int:
+    """Génère environ length tokens avec une étape ; retourne le nombre de tokens générés."""
+    import torch
+    from bark import generation as g
+    from src.batched_generation import generate_coarse_batch, generate_text_semantic_batch
+
+    torch.manual_seed(0)
+    if stage == "text":
+        # Sans seuil de fin de séquence : la génération s'arrête à la durée demandée
+        tokens = generate_text_semantic_batch(
+            models, [BENCH_TEXT], min_eos_p=None, max_gen_duration_s=(length - 0.5) / g.SEMANTIC_RATE_HZ, kv_cache=mode
+        )[0]
+        return len(tokens)
+    ratio = g.COARSE_RATE_HZ / g.SEMANTIC_RATE_HZ * g.N_COARSE_CODEBOOKS
+    semantic = np.random.RandomState(0).randint(0, g.SEMANTIC_VOCAB_SIZE, int(np.ceil(length / ratio)) + 1)
+    return generate_coarse_batch(models, [semantic], kv_cache=mode)[0].size
+
+
+def run_benchmarks(
+    models: Dict[str, Any],
+    stages: List[str],
+    lengths: List[int],
+    modes: List[str],
+    repeat: int = 2,
+) -> List[Dict[str, Any]]:
+    """
+    Mesure le débit de chaque étape, longueur et mode de cache.
+
+    Returns:
+        Une mesure par combinaison : tokens générés, durée médiane, tokens par
+        seconde et accélération par rapport au mode off (si mesuré).
+    """
+    rows = []
+    for stage in stages:
+        # Échauffement (allocation, premiers appels des noyaux)
+        run_stage(models, stage, 16, modes[0])
+        for length in lengths:
+            if stage == "text" and length > MAX_SEMANTIC_STEPS:
+                logger.warning(f"Longueur {length} ignorée pour l'étape texte (maximum {MAX_SEMANTIC_STEPS})")
+                continue
+            by_mode = {}
+            for mode in modes:
+                durations = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    n_tokens = run_stage(models, stage, length, mode)
+                    durations.append(time.perf_counter() - start)
+                duration = float(np.median(durations))
+                by_mode[mode] = row = {
+                    "stage": stage,
+                    "length": length,
+                    "mode": mode,
+                    "tokens": n_tokens,
+                    "median_s": duration,
+                    "tokens_per_s": n_tokens / duration,
+                }
+                rows.append(row)
+                logger.info(f"{stage} {length} {mode}: {row['tokens_per_s']:.1f} tokens/s")
+            if "off" in by_mode:
+                for row in by_mode.values():
+                    row["speedup_vs_off"] = row["tokens_per_s"] / by_mode["off"]["tokens_per_s"]
+    return rows
+
+
+def print_results(rows: List[Dict[str, Any]]):
+    print(f"{'étape':<8} {'longueur':>8} {'mode':<8} {'tokens':>7} {'durée':>10} {'tokens/s':>10} {'vs off':>7}")
+    for row in rows:
+        speedup = f"{row['speedup_vs_off']:.2f}x" if "speedup_vs_off" in row else "-"
+        print(
+            f"{row['stage']:<8} {row['length']:>8} {row['mode']:<8} {row['tokens']:>7} "
+            f"{row['median_s'] * 1000:>8.0f}ms {row['tokens_per_s']:>10.1f} {speedup:>7}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit des étapes sémantique et coarse avec et sans cache clés/valeurs")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Étapes mesurées, séparées par des virgules")
+    parser.add_argument("--lengths", default="128,256,512,768", help="Nombres de tokens générés, séparés par des virgules")
+    parser.add_argument("--modes", default=",".join(KV_CACHE_MODES), help="Modes de cache, séparés par des virgules")
+    parser.add_argument("--repeat", type=int, default=2, help="Mesures par combinaison (médiane)")
+    parser.add_argument("--layers", type=int, default=6, help="Couches des modèles aléatoires")
+    parser.add_argument("--width", type=int, default=384, help="Dimension des modèles aléatoires")
+    parser.add_argument("--heads", type=int, default=6, help="Têtes d'attention des modèles aléatoires")
+    parser.add_argument("--model-dir", help="Répertoire des checkpoints réels (à la place des modèles aléatoires)")
+    parser.add_argument("--model-size", default="large", help="Taille des modèles réels (voir --model-size de la CLI)")
+    parser.add_argument("--threads", type=int, help="Threads torch (fixer pour des mesures comparables)")
+    parser.add_argument("--json", help="Enregistrer les mesures dans un fichier JSON")
+    args = parser.parse_args()
+
+    stages = [s for s in args.stages.split(",") if s]
+    modes = [m for m in args.modes.split(",") if m]
+    if set(stages) - set(STAGES):
+        parser.error(f"Étape(s) inconnue(s): {', '.join(sorted(set(stages) - set(STAGES)))}")
+    if set(modes) - set(KV_CACHE_MODES):
+        parser.error(f"Mode(s) inconnu(s): {', '.join(sorted(set(modes) - set(KV_CACHE_MODES)))}")
+    lengths = [int(n) for n in args.lengths.split(",") if n]
+
+    import torch
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    if args.model_dir:
+        models = real_models(args.model_dir, args.model_size)
+        model_config = {"model_dir": args.model_dir, "model_size": args.model_size}
+    else:
+        models = random_models(args.layers, args.width, args.heads)
+        model_config = {"layers": args.layers, "width": args.width, "heads": args.heads}
+
+    rows = run_benchmarks(models, stages, lengths, modes, args.repeat)
+    print_results(rows)
+    if args.json:
+        report = {
+            "environment": {
+                "python": platform.python_version(),
+                "torch": torch.__version__,
+                "machine": platform.machine(),
+                "cpu_count": os.cpu_count(),
+                "torch_threads": torch.get_num_threads(),
+            },
+            "models": model_config,
+            "results": rows,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Mesures enregistrées dans: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
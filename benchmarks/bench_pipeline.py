@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark du pipeline de clonage vocal, hors ligne.
+
+Scénarios mesurés :
+    load_audio       lecture, rééchantillonnage et normalisation d'un clip de référence
+    extract_speaker  extraction d'une identité vocale (codec, tokens sémantiques, écriture)
+    speaker_load     lecture d'un prompt vocal depuis le disque (sans cache)
+    synthesize       génération complète avec graine (texte, coarse, fine, codec)
+    write_wav        écriture d'un signal généré en WAV
+
+Par défaut, les modèles sont ceux du backend factice (benchmarks/stub_backend.py :
+architecture réelle, poids minuscules et déterministes), sans réseau ni GPU ;
+--backend real utilise les checkpoints de --model-dir. Pour chaque scénario
+sont rapportés les percentiles de latence, le débit, la mémoire résidente
+maximale et, pour la synthèse, le facteur temps réel et la durée par étape.
+--generation-backend choisit l'exécution des modèles (src.backends), pour
+comparer reference, compiled et onnx sur les mêmes scénarios.
+
+Avec --baseline, les résultats sont comparés à une référence enregistrée
+(--save-baseline) : le script échoue si une mesure se dégrade au-delà de la
+tolérance. Les durées dépendent de la machine : la référence doit provenir
+de la même machine (ou d'une machine équivalente de CI).
+
+Usage :
+    python benchmarks/bench_pipeline.py [--repeat 5] [--json results.json]
+    python benchmarks/bench_pipeline.py --save-baseline benchmarks/baseline_stub.json
+    python benchmarks/bench_pipeline.py --baseline benchmarks/baseline_stub.json [--tolerance 0.25]
+    python benchmarks/bench_pipeline.py --backend real --model-dir models --speaker-audio ref.wav
+    python benchmarks/bench_pipeline.py --generation-backend onnx --scenarios synthesize
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from src.backends import BACKENDS
+from src.profiling import profile_request
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SCENARIOS = ("load_audio", "extract_speaker", "speaker_load", "synthesize", "write_wav")
+
+# Texte de la synthèse et transcription du clip de référence
+BENCH_TEXT = "The quick brown fox jumps over the lazy dog."
+BENCH_TRANSCRIPT = "Hello, this is a reference recording for the benchmark."
+
+# Durée et fréquence du clip de référence synthétique
+REFERENCE_SECONDS = 10.0
+REFERENCE_SR = 44_100
+
+# Mesures comparées à la référence : (nom, sens), "lower" si une valeur plus faible est meilleure
+COMPARED_METRICS = (
+    ("p50_s", "lower"),
+    ("p90_s", "lower"),
+    ("throughput", "higher"),
+    ("real_time_factor", "lower"),
+    ("peak_rss_bytes", "lower"),
+)
+
+
+def make_reference_clip(path: str, seconds: float = REFERENCE_SECONDS, sr: int = REFERENCE_SR):
+    """Écrit un clip de référence déterministe (voyelles synthétiques modulées, 16 bits)."""
+    from scipy.io.wavfile import write as write_wav
+
+    t = np.arange(int(seconds * sr)) / sr
+    pitch = 120 + 20 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sr
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+    # Syllabes d'environ 200 ms
+    envelope = 0.5 * (1 - np.cos(2 * np.pi * 2.5 * t)) ** 2
+    noise = np.random.RandomState(0).randn(len(t)) * 0.01
+    audio = 0.3 * voice * envelope / np.max(np.abs(voice)) + noise
+    write_wav(path, sr, (np.clip(audio, -1, 1) * 32767).astype(np.int16))
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(np.asarray(values, dtype=np.float64), q))
+
+
+def run_scenario(
+    run: Callable[[int], Optional[float]],
+    repeat: int,
+    warmup: int = 1,
+    unit: str = "runs",
+) -> Dict[str, Any]:
+    """
+    Exécute un scénario et résume ses mesures.
+
+    Args:
+        run: Fonction exécutant une itération (indice en argument) ; elle
+            retourne la quantité traitée (secondes d'audio, etc.) ou None
+            pour compter une unité par itération.
+        repeat: Nombre d'itérations mesurées.
+        warmup: Nombre d'itérations d'échauffement (non mesurées).
+        unit: Unité du débit.
+
+    Returns:
+        Percentiles de latence, débit, mémoire maximale et profil cumulé des étapes.
+    """
+    for i in range(warmup):
+        run(-1 - i)
+
+    latencies: List[float] = []
+    processed = 0.0
+    with profile_request("benchmark") as profile:
+        for i in range(repeat):
+            start = time.perf_counter()
+            amount = run(i)
+            latencies.append(time.perf_counter() - start)
+            processed += 1.0 if amount is None else amount
+
+    total = sum(latencies)
+    result = {
+        "runs": repeat,
+        "mean_s": total / repeat,
+        "p50_s": percentile(latencies, 50),
+        "p90_s": percentile(latencies, 90),
+        "p99_s": percentile(latencies, 99),
+        "throughput": processed / total if total > 0 else None,
+        "throughput_unit": f"{unit}/s",
+        "peak_rss_bytes": profile.peak_rss_bytes,
+    }
+    if profile.stages:
+        result["stages"] = {name: record.to_dict() for name, record in profile.stages.items()}
+    if profile.audio_s:
+        result["audio_s"] = round(profile.audio_s, 3)
+        result["real_time_factor"] = total / profile.audio_s
+    return result
+
+
+def run_benchmarks(
+    model_dir: str,
+    speaker_audio: str,
+    scenarios: Tuple[str, ...] = SCENARIOS,
+    repeat: int = 5,
+    synth_repeat: int = 3,
+    generation_backend: str = "reference",
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Mesure les scénarios demandés avec les modèles de model_dir.
+
+    Args:
+        model_dir: Répertoire des modèles (les voix extraites y sont écrites).
+        speaker_audio: Clip de référence.
+        scenarios: Scénarios à exécuter.
+        repeat: Itérations des scénarios rapides.
+        synth_repeat: Itérations de la synthèse.
+        generation_backend: Backend de génération de StandaloneBark (voir src.backends).
+
+    Returns:
+        Les mesures de chaque scénario.
+    """
+    from src.audio_loader import load_audio
+    from src.speaker_prompt import CODEC_SAMPLE_RATE, load_speaker_prompt
+    from src.standalone_bark import StandaloneBark
+
+    bark = StandaloneBark(model_dir=model_dir, backend=generation_backend)
+    results: Dict[str, Dict[str, Any]] = {}
+    speaker_id = "bench_speaker"
+
+    def step(name: str, run: Callable[[int], Optional[float]], iterations: int, unit: str = "runs"):
+        if name not in scenarios:
+            return
+        logger.info(f"Scénario {name} ({iterations} itération(s))")
+        results[name] = run_scenario(run, iterations, unit=unit)
+
+    def load(i: int) -> float:
+        audio, sr = load_audio(speaker_audio, sr=CODEC_SAMPLE_RATE)
+        return len(audio) / sr
+
+    step("load_audio", load, repeat, unit="audio_s")
+
+    # La voix de référence sert aux scénarios suivants
+    bark.extract_speaker(speaker_audio, speaker_id=speaker_id, transcript=BENCH_TRANSCRIPT)
+
+    def extract(i: int):
+        bark.extract_speaker(speaker_audio, speaker_id=f"{speaker_id}_{i % 2}", transcript=BENCH_TRANSCRIPT)
+
+    step("extract_speaker", extract, repeat)
+
+    prompt_path = bark._speaker_prompt_path(speaker_id)
+
+    def load_prompt(i: int):
+        load_speaker_prompt(prompt_path)
+
+    step("speaker_load", load_prompt, repeat * 20)
+
+    generated: Dict[str, np.ndarray] = {}
+
+    def synthesize(i: int):
+        # Graine fixe : chaque itération produit exactement la même génération
+        generated["audio"] = bark.synthesize(BENCH_TEXT, speaker_id=speaker_id, seed=1234)
+
+    step("synthesize", synthesize, synth_repeat)
+
+    if "write_wav" in scenarios:
+        from src.audio_output import write_audio
+
+        bark._load_models()
+        sr = bark.bark_sr
+        # Sans synthèse, un signal de 15 s de même fréquence
+        audio = generated.get("audio")
+        if audio is None:
+            audio = np.random.RandomState(0).uniform(-0.5, 0.5, 15 * sr).astype(np.float32)
+        with tempfile.TemporaryDirectory() as tmp:
+            def write(i: int) -> float:
+                write_audio(os.path.join(tmp, "bench.wav"), audio, sr)
+                return len(audio) / sr
+
+            step("write_wav", write, repeat * 4, unit="audio_s")
+
+    # Les voix du benchmark ne restent pas dans la bibliothèque
+    for bench_id in (speaker_id, f"{speaker_id}_0", f"{speaker_id}_1"):
+        bark.delete_speaker(bench_id)
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+    memory_tolerance: float,
+    min_delta_s: float = 0.002,
+) -> List[Dict[str, Any]]:
+    """
+    Compare des mesures à une référence.
+
+    Args:
+        results: Mesures courantes, par scénario.
+        baseline: Mesures de référence, par scénario.
+        tolerance: Dégradation relative tolérée des durées et débits (0.25 = 25 %).
+        memory_tolerance: Dégradation relative tolérée de la mémoire.
+        min_delta_s: Écart de latence moyenne en deçà duquel les durées et
+            débits ne sont pas comparés (bruit des scénarios très courts).
+
+    Returns:
+        Une ligne par mesure comparée : scénario, mesure, valeurs, écart relatif
+        (positif si la mesure se dégrade) et dépassement de la tolérance.
+    """
+    rows = []
+    for scenario, current in results.items():
+        reference = baseline.get(scenario)
+        if reference is None:
+            continue
+        for metric, direction in COMPARED_METRICS:
+            value, base = current.get(metric), reference.get(metric)
+            if value is None or not base:
+                continue
+            change = (value - base) / base if direction == "lower" else (base - value) / value
+            if metric == "peak_rss_bytes":
+                regression = change > memory_tolerance
+            else:
+                regression = change > tolerance and current["mean_s"] - reference["mean_s"] > min_delta_s
+            rows.append({
+                "scenario": scenario,
+                "metric": metric,
+                "baseline": base,
+                "current": value,
+                "change": change,
+                "regression": regression,
+            })
+    return rows
+
+
+def _format_value(metric: str, value: float) -> str:
+    if metric == "peak_rss_bytes":
+        return f"{value / 2**20:.0f} Mo"
+    if metric.endswith("_s"):
+        return f"{value * 1000:.1f} ms"
+    return f"{value:.3f}"
+
+
+def print_results(results: Dict[str, Dict[str, Any]]):
+    print(f"{'scénario':<16} {'p50':>10} {'p90':>10} {'p99':>10} {'débit':>18} {'RTF':>6} {'mémoire':>9}")
+    for name, r in results.items():
+        rtf = f"{r['real_time_factor']:.2f}" if "real_time_factor" in r else "-"
+        print(
+            f"{name:<16} {r['p50_s'] * 1000:>8.1f}ms {r['p90_s'] * 1000:>8.1f}ms {r['p99_s'] * 1000:>8.1f}ms "
+            f"{r['throughput']:>8.2f} {r['throughput_unit']:<9} {rtf:>6} {r['peak_rss_bytes'] / 2**20:>6.0f} Mo"
+        )
+
+
+def print_comparison(rows: List[Dict[str, Any]]):
+    print(f"\n{'scénario':<16} {'mesure':<18} {'référence':>12} {'actuel':>12} {'écart':>8}")
+    for row in rows:
+        flag = "  RÉGRESSION" if row["regression"] else ""
+        print(
+            f"{row['scenario']:<16} {row['metric']:<18} {_format_value(row['metric'], row['baseline']):>12} "
+            f"{_format_value(row['metric'], row['current']):>12} {row['change'] * 100:>+7.1f}%{flag}"
+        )
+
+
+def environment(backend: str, generation_backend: str = "reference") -> Dict[str, Any]:
+    """Description de la machine et des versions, enregistrée avec les mesures."""
+    import torch
+
+    return {
+        "backend": backend,
+        "generation_backend": generation_backend,
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor() or None,
+        "cpu_count": os.cpu_count(),
+        "torch_threads": torch.get_num_threads(),
+        "cuda": torch.cuda.is_available(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hors ligne du pipeline de clonage vocal")
+    parser.add_argument("--backend", choices=["stub", "real"], default="stub",
+                        help="Modèles factices minuscules (par défaut) ou checkpoints réels de --model-dir")
+    parser.add_argument("--generation-backend", choices=BACKENDS, default="reference",
+                        help="Exécution des modèles par StandaloneBark (reference, compiled ou onnx)")
+    parser.add_argument("--model-dir", help="Répertoire des modèles réels (--backend real)")
+    parser.add_argument("--speaker-audio", help="Clip de référence (un clip synthétique de 10 s par défaut)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Scénarios à exécuter, séparés par des virgules")
+    parser.add_argument("--repeat", type=int, default=5, help="Itérations des scénarios rapides")
+    parser.add_argument("--synth-repeat", type=int, default=3, help="Itérations de la synthèse")
+    parser.add_argument("--threads", type=int, help="Threads torch (fixer pour des mesures comparables)")
+    parser.add_argument("--json", help="Enregistrer les mesures dans un fichier JSON")
+    parser.add_argument("--baseline", help="Référence à laquelle comparer les mesures")
+    parser.add_argument("--save-baseline", help="Enregistrer les mesures comme nouvelle référence")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Dégradation tolérée des durées et débits")
+    parser.add_argument("--memory-tolerance", type=float, default=0.2, help="Dégradation tolérée de la mémoire")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0,
+                        help="Écart de latence moyenne ignoré, quelle que soit la tolérance (ms)")
+    args = parser.parse_args()
+
+    scenarios = tuple(s for s in args.scenarios.split(",") if s)
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Scénario(s) inconnu(s): {', '.join(sorted(unknown))}")
+    if args.backend == "real" and not args.model_dir:
+        parser.error("--backend real nécessite --model-dir")
+
+    import torch
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    work_dir = tempfile.mkdtemp(prefix="bark_bench_")
+    try:
+        speaker_audio = args.speaker_audio
+        if speaker_audio is None:
+            speaker_audio = os.path.join(work_dir, "reference.wav")
+            make_reference_clip(speaker_audio)
+
+        if args.backend == "stub":
+            from stub_backend import stub_backend
+            backend = stub_backend(os.path.join(work_dir, "models"))
+        else:
+            backend = contextlib.nullcontext(args.model_dir)
+        with backend as model_dir:
+            results = run_benchmarks(model_dir, speaker_audio, scenarios, args.repeat, args.synth_repeat,
+                                     args.generation_backend)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {"environment": environment(args.backend, args.generation_backend), "scenarios": results}
+    print_results(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Mesures enregistrées dans: {args.json}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Référence enregistrée dans: {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("environment", {}).get("backend") != args.backend:
+            logger.warning("La référence a été mesurée avec un autre backend")
+        if baseline.get("environment", {}).get("generation_backend", "reference") != args.generation_backend:
+            logger.warning("La référence a été mesurée avec un autre backend de génération")
+        rows = compare(results, baseline["scenarios"], args.tolerance, args.memory_tolerance, args.min_delta_ms / 1000)
+        print_comparison(rows)
+        regressions = [row for row in rows if row["regression"]]
+        if regressions:
+            logger.error(f"{len(regressions)} mesure(s) dégradée(s) au-delà de la tolérance")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backend factice des benchmarks : modèles Bark minuscules, initialisés
+aléatoirement mais déterministes, sans téléchargement.
+
+Les modèles ont l'architecture réelle de Bark (GPT texte et coarse, FineGPT,
+EnCodec 24 kHz) et les mêmes vocabulaires ; seules la profondeur et la
+largeur sont réduites. Le chargement, l'échantillonnage pas à pas, le
+décodage EnCodec et tout le code du projet s'exécutent donc normalement :
+les durées mesurées reflètent le coût du pipeline hors calcul des poids.
+
+Le tokenizer BERT (téléchargé par Bark) est remplacé par un tokenizer par
+caractère, et EnCodec est instancié sans ses poids pré-entraînés.
+"""
+
+import os
+import logging
+import contextlib
+from typing import Any, Dict, Iterator
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Graine des poids des modèles factices (les checkpoints sont identiques d'une exécution à l'autre)
+STUB_SEED = 0
+
+# Architecture réelle, dimensions réduites
+STUB_CONFIGS: Dict[str, Dict[str, Any]] = {
+    "text": dict(input_vocab_size=129_600, output_vocab_size=10_048, n_layer=2, n_head=2, n_embd=32, block_size=1024),
+    "coarse": dict(input_vocab_size=12_096, output_vocab_size=12_096, n_layer=2, n_head=2, n_embd=32, block_size=1024),
+    "fine": dict(input_vocab_size=1_056, output_vocab_size=1_056, n_layer=2, n_head=2, n_embd=32, block_size=1024,
+                 n_codes_total=8, n_codes_given=1),
+}
+
+
+class _CharTokenizer:
+    """Tokenizer déterministe par caractère (remplace bert-base-multilingual-cased)."""
+
+    def encode(self, text: str, add_special_tokens: bool = False):
+        return [ord(c) % 1000 for c in text]
+
+    def decode(self, ids) -> str:
+        return ""
+
+
+class _StubBertTokenizer:
+    @staticmethod
+    def from_pretrained(*args, **kwargs) -> _CharTokenizer:
+        return _CharTokenizer()
+
+
+def make_stub_checkpoints(model_dir: str, seed: int = STUB_SEED) -> Dict[str, str]:
+    """
+    Écrit les checkpoints factices (texte, coarse, fine) dans un répertoire
+    de modèles, sous les noms attendus par Bark.
+
+    Returns:
+        Le chemin de chaque checkpoint, par étape.
+    """
+    import torch
+    from bark import generation
+    from bark.model import GPT, GPTConfig
+    from bark.model_fine import FineGPT, FineGPTConfig
+
+    from src.model_sizes import remote_model_key
+
+    os.makedirs(model_dir, exist_ok=True)
+    paths = {}
+    for stage, config in STUB_CONFIGS.items():
+        file_name = generation.REMOTE_MODEL_PATHS[remote_model_key(stage, "large")]["file_name"]
+        path = paths[stage] = os.path.join(model_dir, file_name)
+        if os.path.exists(path):
+            continue
+        torch.manual_seed(seed)
+        if stage == "fine":
+            model = FineGPT(FineGPTConfig(**config))
+        else:
+            model = GPT(GPTConfig(**config))
+        torch.save({"model_args": config, "model": model.state_dict(), "best_val_loss": torch.tensor(1.0)}, path)
+        logger.info(f"Checkpoint factice écrit: {path}")
+    return paths
+
+
+@contextlib.contextmanager
+def stub_backend(model_dir: str, seed: int = STUB_SEED) -> Iterator[str]:
+    """
+    Active le backend factice : checkpoints minuscules dans model_dir,
+    tokenizer par caractère et EnCodec sans poids pré-entraînés.
+
+    Les remplacements sont annulés à la sortie du contexte.
+
+    Yields:
+        Le répertoire des modèles.
+    """
+    import unittest.mock
+
+    import torch
+    from bark import generation
+
+    make_stub_checkpoints(model_dir, seed)
+    original_codec = generation.EncodecModel.encodec_model_24khz
+
+    class _StubEncodecModel:
+        @staticmethod
+        def encodec_model_24khz(pretrained: bool = True, repository=None):
+            # Poids aléatoires mais identiques à chaque chargement
+            torch.manual_seed(seed)
+            return original_codec(pretrained=False)
+
+    with unittest.mock.patch.object(generation, "BertTokenizer", _StubBertTokenizer), \
+            unittest.mock.patch.object(generation, "EncodecModel", _StubEncodecModel):
+        yield model_dir
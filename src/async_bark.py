@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Interface asyncio de StandaloneBark.
+
+Les générations s'exécutent dans un pool de threads dédié, sans bloquer la
+boucle d'événements. Chaque génération reçoit un GenerationControl (voir
+src.generation_control) qui permet :
+    - l'annulation : annuler la tâche asyncio (task.cancel(), fin d'un
+      asyncio.wait_for, client déconnecté...) interrompt la génération au
+      début de l'étape suivante ou au pas de décodage suivant ; une
+      génération encore en file d'attente ne démarre pas ;
+    - un délai par requête (timeout_s, attente dans la file comprise),
+      dépassé : asyncio.TimeoutError ;
+    - le suivi de la progression : ProgressEvent par étape et par pas de
+      décodage, via un rappel (on_progress) ou GenerationTask.events().
+
+Usage :
+    bark = AsyncStandaloneBark(model_dir="models")
+    audio = await bark.synthesize("Bonjour", speaker_id="alice", timeout_s=30)
+
+    task = bark.submit("synthesize", "Bonjour", speaker_id="alice")
+    async for event in task.events():
+        print(event.stage, event.event, event.step, event.total)
+    audio = await task
+"""
+
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from src.generation_control import (
+    PROGRESS_INTERVAL_S,
+    GenerationControl,
+    GenerationTimeout,
+    ProgressEvent,
+    generation_control,
+)
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Méthodes de StandaloneBark exécutables par submit
+ASYNC_METHODS = (
+    "synthesize",
+    "synthesize_bytes",
+    "clone_voice",
+    "clone_voice_batch",
+    "generate_voice_with_emotion",
+    "extract_speaker",
+)
+
+
+class GenerationTask:
+    """Génération soumise à AsyncStandaloneBark : résultat, progression et annulation."""
+
+    def __init__(self, task: "asyncio.Task", control: GenerationControl, events: "asyncio.Queue"):
+        self._task = task
+        self.control = control
+        self._events = events
+        task.add_done_callback(lambda _: events.put_nowait(None))
+
+    def __await__(self):
+        return self._task.__await__()
+
+    def done(self) -> bool:
+        return self._task.done()
+
+    def cancel(self) -> bool:
+        """Annule la génération (interrompue à son prochain point de contrôle)."""
+        self.control.cancel()
+        return self._task.cancel()
+
+    async def events(self) -> AsyncIterator[ProgressEvent]:
+        """Événements de progression, jusqu'à la fin de la génération."""
+        while True:
+            event = await self._events.get()
+            if event is None:
+                return
+            yield event
+
+
+class AsyncStandaloneBark:
+    """Exécute les générations de StandaloneBark depuis asyncio, avec annulation, délai et progression."""
+
+    def __init__(
+        self,
+        bark: Any = None,
+        max_concurrency: int = 1,
+        timeout_s: Optional[float] = None,
+        progress_interval_s: float = PROGRESS_INTERVAL_S,
+        **bark_kwargs,
+    ):
+        """
+        Args:
+            bark: Instance de StandaloneBark (créée avec bark_kwargs si None).
+            max_concurrency: Nombre de générations exécutées simultanément
+                (threads du pool) ; les suivantes attendent leur tour.
+            timeout_s: Délai par défaut d'une génération (aucun si None).
+            progress_interval_s: Intervalle minimal entre deux événements
+                d'avancement d'une boucle de décodage.
+            **bark_kwargs: Paramètres de StandaloneBark.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency doit être au moins 1")
+        if bark is None:
+            from src.standalone_bark import StandaloneBark
+            bark = StandaloneBark(**bark_kwargs)
+        self.bark = bark
+        self.timeout_s = timeout_s
+        self.progress_interval_s = progress_interval_s
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="bark-async")
+
+    def submit(
+        self,
+        method: str,
+        *args,
+        timeout_s: Optional[float] = None,
+        on_progress: Optional[Callable[[ProgressEvent], None]] = None,
+        **kwargs,
+    ) -> GenerationTask:
+        """
+        Soumet une génération (à appeler depuis la boucle d'événements).
+
+        Args:
+            method: Méthode de StandaloneBark (voir ASYNC_METHODS).
+            *args: Arguments de la méthode.
+            timeout_s: Délai de la génération (celui de l'instance si None).
+            on_progress: Appelée dans la boucle d'événements à chaque ProgressEvent.
+            **kwargs: Arguments nommés de la méthode.
+
+        Returns:
+            La tâche de la génération, à attendre avec await.
+
+        Raises:
+            ValueError: Si la méthode n'est pas exécutable de façon asynchrone.
+        """
+        if method not in ASYNC_METHODS:
+            raise ValueError(f"Méthode inconnue: {method} (valeurs possibles: {', '.join(ASYNC_METHODS)})")
+        timeout_s = self.timeout_s if timeout_s is None else timeout_s
+        loop = asyncio.get_running_loop()
+        events: "asyncio.Queue[Optional[ProgressEvent]]" = asyncio.Queue()
+
+        def publish(event: ProgressEvent):
+            events.put_nowait(event)
+            if on_progress is not None:
+                on_progress(event)
+
+        control = GenerationControl(
+            on_progress=lambda event: loop.call_soon_threadsafe(publish, event),
+            timeout_s=timeout_s,
+            progress_interval_s=self.progress_interval_s,
+        )
+        future = loop.run_in_executor(
+            self._executor, self._run, control, getattr(self.bark, method), args, kwargs
+        )
+        task = loop.create_task(self._wait(future, control, timeout_s))
+        return GenerationTask(task, control, events)
+
+    @staticmethod
+    def _run(control: GenerationControl, method: Callable, args: Tuple, kwargs: Dict[str, Any]) -> Any:
+        """Exécute une méthode dans un thread du pool, sous le contrôle de la génération."""
+        with generation_control(control):
+            # Annulée ou hors délai pendant l'attente dans la file : ne pas démarrer
+            control.check()
+            return method(*args, **kwargs)
+
+    @staticmethod
+    async def _wait(future: "asyncio.Future", control: GenerationControl, timeout_s: Optional[float]) -> Any:
+        """Attend le résultat d'une génération ; l'annulation et le délai sont transmis au thread."""
+        try:
+            return await asyncio.wait_for(future, timeout_s)
+        except asyncio.TimeoutError:
+            control.cancel("délai dépassé")
+            logger.warning(f"Génération interrompue: délai de {timeout_s} s dépassé")
+            raise
+        except GenerationTimeout:
+            logger.warning(f"Génération interrompue: délai de {timeout_s} s dépassé")
+            raise asyncio.TimeoutError() from None
+        except asyncio.CancelledError:
+            control.cancel()
+            logger.info("Génération annulée")
+            raise
+
+    async def _call(self, method: str, args: Tuple, kwargs: Dict[str, Any]) -> Any:
+        return await self.submit(method, *args, **kwargs)
+
+    async def synthesize(self, *args, **kwargs) -> np.ndarray:
+        """StandaloneBark.synthesize, avec timeout_s et on_progress (voir submit)."""
+        return await self._call("synthesize", args, kwargs)
+
+    async def synthesize_bytes(self, *args, **kwargs) -> bytes:
+        """StandaloneBark.synthesize_bytes, avec timeout_s et on_progress (voir submit)."""
+        return await self._call("synthesize_bytes", args, kwargs)
+
+    async def clone_voice(self, *args, **kwargs):
+        """StandaloneBark.clone_voice, avec timeout_s et on_progress (voir submit)."""
+        return await self._call("clone_voice", args, kwargs)
+
+    async def clone_voice_batch(self, *args, **kwargs):
+        """StandaloneBark.clone_voice_batch, avec timeout_s et on_progress (voir submit)."""
+        return await self._call("clone_voice_batch", args, kwargs)
+
+    async def generate_voice_with_emotion(self, *args, **kwargs):
+        """StandaloneBark.generate_voice_with_emotion, avec timeout_s et on_progress (voir submit)."""
+        return await self._call("generate_voice_with_emotion", args, kwargs)
+
+    async def extract_speaker(self, *args, **kwargs) -> str:
+        """StandaloneBark.extract_speaker, avec timeout_s et on_progress (voir submit)."""
+        return await self._call("extract_speaker", args, kwargs)
+
+    async def clone_voice_stream(
+        self,
+        *args,
+        timeout_s: Optional[float] = None,
+        on_progress: Optional[Callable[[ProgressEvent], None]] = None,
+        **kwargs,
+    ) -> AsyncIterator[Any]:
+        """
+        StandaloneBark.clone_voice_stream : chaque morceau est produit dès
+        qu'il est généré. timeout_s borne la durée totale du flux ; quitter
+        la boucle async for avant la fin interrompt la génération.
+        """
+        timeout_s = self.timeout_s if timeout_s is None else timeout_s
+        loop = asyncio.get_running_loop()
+        control = GenerationControl(
+            on_progress=None if on_progress is None else lambda event: loop.call_soon_threadsafe(on_progress, event),
+            timeout_s=timeout_s,
+            progress_interval_s=self.progress_interval_s,
+        )
+        generator = self.bark.clone_voice_stream(*args, **kwargs)
+        finished = object()
+        try:
+            while True:
+                remaining = None if control.deadline is None else max(0.0, control.deadline - time.monotonic())
+                future = loop.run_in_executor(self._executor, self._run, control, next, (generator, finished), {})
+                chunk = await self._wait(future, control, remaining)
+                if chunk is finished:
+                    return
+                yield chunk
+        finally:
+            control.cancel()
+            # Ferme le générateur (et le fichier WAV) une fois le morceau en cours interrompu
+            await loop.run_in_executor(self._executor, _close_generator, generator)
+
+    def close(self):
+        """Arrête le pool de threads (les générations en cours se terminent)."""
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self) -> "AsyncStandaloneBark":
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+def _close_generator(generator):
+    try:
+        generator.close()
+    except ValueError:
+        # Générateur encore en cours d'exécution dans un autre thread : il
+        # s'interrompt à son prochain point de contrôle
+        pass
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Chargement des enregistrements de référence par blocs.
+
+Le fichier est lu bloc par bloc (WAV, FLAC, OGG et MP3 via soundfile, WAV
+projeté en mémoire via scipy à défaut), chaque bloc est converti en mono puis
+rééchantillonné par un filtre polyphasé à état, directement à la fréquence
+cible. Le résultat est identique à scipy.signal.resample_poly appliqué au
+signal complet, mais la mémoire utilisée ne dépend que du signal de sortie.
+Les statistiques de normalisation (crête ou sonie) sont calculées au fil des
+blocs.
+"""
+
+import os
+import math
+import logging
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Nombre de trames lues par bloc
+DEFAULT_BLOCK_FRAMES = 65536
+
+NORMALIZATION_MODES = ("peak", "loudness", "none")
+
+# Sonie cible par défaut (LUFS) et seuil en dessous duquel le signal est considéré silencieux
+DEFAULT_TARGET_LUFS = -23.0
+SILENCE_PEAK = 1e-6
+
+
+def _soundfile_blocks(file_path: str, block_frames: int) -> Tuple[int, Iterator[np.ndarray]]:
+    import soundfile as sf
+
+    f = sf.SoundFile(file_path)
+
+    def blocks():
+        with f:
+            for block in f.blocks(blocksize=block_frames, dtype="float32", always_2d=True):
+                yield block
+
+    return f.samplerate, blocks()
+
+
+def _wav_blocks(file_path: str, block_frames: int) -> Tuple[int, Iterator[np.ndarray]]:
+    from scipy.io import wavfile
+
+    try:
+        sr, data = wavfile.read(file_path, mmap=True)
+    except ValueError:
+        # Formats non projetables en mémoire (PCM 24 bits)
+        sr, data = wavfile.read(file_path)
+
+    # Mise à l'échelle des entiers PCM vers [-1, 1]
+    if data.dtype == np.uint8:
+        scale, shift = 1 / 128.0, -128.0
+    elif np.issubdtype(data.dtype, np.integer):
+        scale, shift = 1 / float(-np.iinfo(data.dtype).min), 0.0
+    else:
+        scale, shift = 1.0, 0.0
+
+    def blocks():
+        for start in range(0, len(data), block_frames):
+            block = np.asarray(data[start:start + block_frames], dtype=np.float32)
+            if block.ndim == 1:
+                block = block[:, None]
+            if shift:
+                block += shift
+            if scale != 1.0:
+                block *= scale
+            yield block
+
+    return sr, blocks()
+
+
+def open_audio_blocks(file_path: str, block_frames: int = DEFAULT_BLOCK_FRAMES) -> Tuple[int, Iterator[np.ndarray]]:
+    """
+    Ouvre un fichier audio pour une lecture par blocs.
+
+    Args:
+        file_path: Chemin du fichier (WAV, FLAC, OGG, MP3...).
+        block_frames: Nombre de trames par bloc.
+
+    Returns:
+        La fréquence d'échantillonnage et un itérateur de blocs float32 de
+        forme (trames, canaux).
+
+    Raises:
+        RuntimeError: Si aucun lecteur ne prend en charge ce fichier.
+    """
+    try:
+        return _soundfile_blocks(file_path, block_frames)
+    except ImportError:
+        logger.warning("soundfile non installé, lecture limitée aux fichiers WAV")
+    except RuntimeError as e:
+        logger.warning(f"soundfile ne peut pas lire {file_path}: {e}")
+
+    if file_path.lower().endswith((".wav", ".wave")):
+        return _wav_blocks(file_path, block_frames)
+
+    try:
+        import librosa
+    except ImportError:
+        raise RuntimeError(f"Format audio non pris en charge: {file_path} (installez soundfile ou librosa)")
+
+    # Dernier recours (audioread) : décodage du fichier complet
+    logger.warning(f"Décodage complet de {file_path} (lecture par blocs indisponible pour ce format)")
+    audio, sr = librosa.load(file_path, sr=None, mono=False)
+    audio = np.atleast_2d(audio).T.astype(np.float32, copy=False)
+    return sr, iter([audio[start:start + block_frames] for start in range(0, len(audio), block_frames)])
+
+
+class StreamingResampler:
+    """
+    Rééchantillonneur polyphasé à état, appliqué bloc par bloc.
+
+    Utilise le même filtre que scipy.signal.resample_poly (fenêtre de Kaiser,
+    beta 5) : la concaténation des sorties est identique au rééchantillonnage
+    du signal complet. Seuls les derniers échantillons d'entrée nécessaires au
+    filtre sont conservés entre deux blocs.
+    """
+
+    def __init__(self, orig_sr: int, target_sr: int):
+        """
+        Args:
+            orig_sr: Fréquence d'entrée.
+            target_sr: Fréquence de sortie.
+        """
+        from scipy.signal import firwin
+
+        g = math.gcd(int(orig_sr), int(target_sr))
+        self.up = int(target_sr) // g
+        self.down = int(orig_sr) // g
+
+        # Filtre et alignement de scipy.signal.resample_poly
+        max_rate = max(self.up, self.down)
+        self.half_len = 10 * max_rate
+        h = firwin(2 * self.half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0)) * self.up
+        n_pre_pad = self.down - self.half_len % self.down
+        self._pre_remove = (self.half_len + n_pre_pad) // self.down
+        self._h = np.concatenate([np.zeros(n_pre_pad), h]).astype(np.float64)
+
+        self._buffer = np.zeros(0, dtype=np.float64)
+        self._offset = 0  # indice global du premier échantillon du tampon (multiple de down)
+        self._next_out = 0  # indice global du prochain échantillon de sortie
+        self._n_in = 0
+
+    def _produce(self, end: int) -> np.ndarray:
+        """Calcule les échantillons de sortie [next_out, end) à partir du tampon."""
+        from scipy.signal import upfirdn
+
+        if end <= self._next_out:
+            return np.zeros(0, dtype=np.float32)
+        shift = self._offset * self.up // self.down - self._pre_remove
+        z = upfirdn(self._h, self._buffer, self.up, self.down)
+        out = z[self._next_out - shift:end - shift].astype(np.float32)
+        self._next_out = end
+
+        # Oubli des échantillons qui ne servent plus aux sorties suivantes
+        needed = max(0, -(-(self._next_out * self.down - self.half_len) // self.up))
+        limit = (self._next_out + self._pre_remove) * self.down // self.up
+        new_offset = min(needed, limit) // self.down * self.down
+        if new_offset > self._offset:
+            self._buffer = self._buffer[new_offset - self._offset:]
+            self._offset = new_offset
+        return out
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """
+        Rééchantillonne un bloc mono.
+
+        Returns:
+            Les échantillons de sortie entièrement déterminés par l'entrée reçue.
+        """
+        if self.up == self.down:
+            self._n_in += len(block)
+            return np.asarray(block, dtype=np.float32)
+        self._buffer = np.concatenate([self._buffer, np.asarray(block, dtype=np.float64)])
+        self._n_in += len(block)
+        ready = (self._n_in * self.up - 1 - self.half_len) // self.down + 1
+        return self._produce(ready)
+
+    def flush(self) -> np.ndarray:
+        """Termine le signal (complété par des zéros) et retourne les dernières sorties."""
+        if self.up == self.down:
+            return np.zeros(0, dtype=np.float32)
+        total = -(-self._n_in * self.up // self.down)
+        tail = -(-len(self._h) // self.up) + self.down
+        self._buffer = np.concatenate([self._buffer, np.zeros(tail)])
+        return self._produce(total)
+
+
+def _k_weighting(sr: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Filtres de pondération K (ITU-R BS.1770) pour une fréquence d'échantillonnage."""
+    stages = []
+    # Plateau haut (+4 dB) puis passe-haut, biquads RBJ approchant les filtres de BS.1770
+    for kind, gain_db, q, fc in (("shelf", 4.0, 1 / math.sqrt(2), 1500.0), ("highpass", 0.0, 0.5, 38.0)):
+        w0 = 2 * math.pi * fc / sr
+        alpha = math.sin(w0) / (2 * q)
+        cos_w0 = math.cos(w0)
+        if kind == "shelf":
+            a = 10 ** (gain_db / 40)
+            sq = 2 * math.sqrt(a) * alpha
+            b = [a * ((a + 1) + (a - 1) * cos_w0 + sq), -2 * a * ((a - 1) + (a + 1) * cos_w0),
+                 a * ((a + 1) + (a - 1) * cos_w0 - sq)]
+            den = [(a + 1) - (a - 1) * cos_w0 + sq, 2 * ((a - 1) - (a + 1) * cos_w0),
+                   (a + 1) - (a - 1) * cos_w0 - sq]
+        else:
+            b = [(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2]
+            den = [1 + alpha, -2 * cos_w0, 1 - alpha]
+        stages.append((np.array(b) / den[0], np.array(den) / den[0]))
+    return stages
+
+
+class LoudnessMeter:
+    """
+    Mesure incrémentale de la sonie intégrée (LUFS, BS.1770 avec fenêtrage).
+
+    L'énergie pondérée K est accumulée par tranches de 100 ms ; les blocs de
+    400 ms (recouvrement de 75 %) sont reconstitués à la fin pour appliquer
+    les seuils absolu (-70 LUFS) et relatif (-10 LU).
+    """
+
+    def __init__(self, sr: int):
+        from scipy.signal import lfilter_zi
+
+        self.sr = sr
+        self._filters = _k_weighting(sr)
+        self._zi = [lfilter_zi(b, a) * 0.0 for b, a in self._filters]
+        self._step = max(1, int(round(0.1 * sr)))
+        self._partial = 0.0
+        self._partial_n = 0
+        self._energies: List[float] = []
+
+    def process(self, block: np.ndarray):
+        """Ajoute un bloc mono à la mesure."""
+        from scipy.signal import lfilter
+
+        x = np.asarray(block, dtype=np.float64)
+        for i, (b, a) in enumerate(self._filters):
+            x, self._zi[i] = lfilter(b, a, x, zi=self._zi[i])
+        pos = 0
+        while pos < len(x):
+            take = min(self._step - self._partial_n, len(x) - pos)
+            self._partial += float(np.sum(x[pos:pos + take] ** 2))
+            self._partial_n += take
+            pos += take
+            if self._partial_n == self._step:
+                self._energies.append(self._partial)
+                self._partial, self._partial_n = 0.0, 0
+
+    def integrated(self) -> Optional[float]:
+        """Sonie intégrée en LUFS (None si le signal est trop court ou silencieux)."""
+        energies = np.array(self._energies)
+        if len(energies) < 4:
+            if self._partial_n == 0 and not len(energies):
+                return None
+            # Signal de moins de 400 ms : moyenne non fenêtrée
+            total = float(energies.sum()) + self._partial
+            count = len(energies) * self._step + self._partial_n
+            mean = total / count
+            return -0.691 + 10 * math.log10(mean) if mean > 0 else None
+
+        blocks = np.convolve(energies, np.ones(4), mode="valid") / (4 * self._step)
+        with np.errstate(divide="ignore"):
+            loudness = -0.691 + 10 * np.log10(blocks)
+        gated = blocks[loudness > -70.0]
+        if not len(gated):
+            return None
+        relative = -0.691 + 10 * math.log10(gated.mean()) - 10.0
+        gated = blocks[(loudness > -70.0) & (loudness > relative)]
+        return -0.691 + 10 * math.log10(gated.mean())
+
+
+def load_audio(
+    file_path: str,
+    sr: Optional[int] = None,
+    normalize: str = "peak",
+    target_lufs: float = DEFAULT_TARGET_LUFS,
+    block_frames: int = DEFAULT_BLOCK_FRAMES,
+) -> Tuple[np.ndarray, int]:
+    """
+    Charge un fichier audio en mono, rééchantillonné et normalisé.
+
+    Args:
+        file_path: Chemin du fichier audio.
+        sr: Fréquence de sortie (fréquence du fichier si None).
+        normalize: "peak" (crête à 1), "loudness" (sonie cible, crête limitée à 1) ou "none".
+        target_lufs: Sonie visée par la normalisation "loudness".
+        block_frames: Nombre de trames lues par bloc.
+
+    Returns:
+        Le signal float32 et sa fréquence d'échantillonnage.
+
+    Raises:
+        FileNotFoundError: Si le fichier n'existe pas.
+        ValueError: Si le mode de normalisation est inconnu.
+    """
+    if normalize not in NORMALIZATION_MODES:
+        raise ValueError(
+            f"Normalisation inconnue: {normalize} (valeurs possibles: {', '.join(NORMALIZATION_MODES)})"
+        )
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Fichier audio non trouvé: {file_path}")
+
+    file_sr, blocks = open_audio_blocks(file_path, block_frames)
+    out_sr = sr or file_sr
+    resampler = StreamingResampler(file_sr, out_sr) if out_sr != file_sr else None
+    meter = LoudnessMeter(out_sr) if normalize == "loudness" else None
+
+    chunks: List[np.ndarray] = []
+    peak = 0.0
+
+    def emit(samples: np.ndarray):
+        nonlocal peak
+        if not len(samples):
+            return
+        peak = max(peak, float(np.max(np.abs(samples))))
+        if meter is not None:
+            meter.process(samples)
+        chunks.append(samples)
+
+    for block in blocks:
+        mono = block.mean(axis=1, dtype=np.float32) if block.shape[1] > 1 else block[:, 0]
+        emit(resampler.process(mono) if resampler is not None else np.array(mono, dtype=np.float32))
+    if resampler is not None:
+        emit(resampler.flush())
+
+    audio = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+
+    if normalize != "none":
+        if peak < SILENCE_PEAK:
+            logger.warning(f"Signal silencieux dans {file_path}, normalisation ignorée")
+        else:
+            gain = 1.0 / peak
+            if meter is not None:
+                loudness = meter.integrated()
+                if loudness is not None:
+                    gain = min(gain, 10 ** ((target_lufs - loudness) / 20))
+            audio *= np.float32(gain)
+
+    return audio, out_sr
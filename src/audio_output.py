@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Encodage de l'audio généré : formats compressés, sortie en mémoire ou vers
+un flux, et encodage en arrière-plan.
+
+Formats disponibles :
+    wav    WAV float32 (format historique, 4 octets par échantillon)
+    wav16  WAV PCM 16 bits
+    flac   FLAC 16 bits (sans perte, environ deux fois plus petit que wav16)
+    ogg    Ogg Vorbis
+    opus   Ogg Opus (8, 12, 16, 24 ou 48 kHz)
+
+Le signal peut être rééchantillonné et normalisé en sonie (LUFS) avant
+l'encodage. Les formats compressés nécessitent soundfile ; sans lui, seuls
+les formats WAV sont disponibles (via scipy).
+"""
+
+import io
+import os
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Dict, NamedTuple, Optional, Union
+
+import numpy as np
+
+from src.audio_loader import SILENCE_PEAK, LoudnessMeter, StreamingResampler
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class AudioFormat(NamedTuple):
+    """Paramètres d'encodage d'un format de sortie."""
+    container: str  # format soundfile
+    subtype: str  # sous-type soundfile
+    extension: str
+    mime_type: str
+
+
+OUTPUT_FORMATS: Dict[str, AudioFormat] = {
+    "wav": AudioFormat("WAV", "FLOAT", ".wav", "audio/wav"),
+    "wav16": AudioFormat("WAV", "PCM_16", ".wav", "audio/wav"),
+    "flac": AudioFormat("FLAC", "PCM_16", ".flac", "audio/flac"),
+    "ogg": AudioFormat("OGG", "VORBIS", ".ogg", "audio/ogg"),
+    "opus": AudioFormat("OGG", "OPUS", ".opus", "audio/ogg; codecs=opus"),
+}
+
+DEFAULT_FORMAT = "wav"
+
+# Fréquences acceptées par l'encodeur Opus
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+# Format déduit de l'extension du fichier de sortie
+_EXTENSION_FORMATS = {".wav": "wav", ".flac": "flac", ".ogg": "ogg", ".opus": "opus"}
+
+Sink = Union[str, BinaryIO]
+
+
+class OutputOptions(NamedTuple):
+    """Options de sortie : format (déduit de l'extension si None), fréquence et sonie cible."""
+    format: Optional[str] = None
+    sample_rate: Optional[int] = None
+    target_lufs: Optional[float] = None
+
+
+def check_format(format: str) -> AudioFormat:
+    """
+    Retourne les paramètres d'un format de sortie.
+
+    Raises:
+        ValueError: Si le format est inconnu.
+    """
+    try:
+        return OUTPUT_FORMATS[format]
+    except KeyError:
+        raise ValueError(
+            f"Format de sortie inconnu: {format} (valeurs possibles: {', '.join(OUTPUT_FORMATS)})"
+        ) from None
+
+
+def check_options(options: OutputOptions):
+    """
+    Vérifie des options de sortie avant toute génération.
+
+    Raises:
+        ValueError: Si le format est inconnu ou la fréquence incompatible avec Opus.
+    """
+    if options.format is not None:
+        check_format(options.format)
+    if options.format == "opus" and options.sample_rate and options.sample_rate not in OPUS_SAMPLE_RATES:
+        raise ValueError(
+            f"Opus n'accepte pas {options.sample_rate} Hz "
+            f"(fréquences possibles: {', '.join(map(str, OPUS_SAMPLE_RATES))})"
+        )
+
+
+def resolve_format(format: Optional[str], sink: Optional[Sink] = None) -> str:
+    """Format explicite, sinon déduit de l'extension du chemin de sortie, sinon WAV float32."""
+    if format is not None:
+        check_format(format)
+        return format
+    if isinstance(sink, (str, os.PathLike)):
+        return _EXTENSION_FORMATS.get(os.path.splitext(str(sink))[1].lower(), DEFAULT_FORMAT)
+    return DEFAULT_FORMAT
+
+
+def prepare_audio(
+    audio: np.ndarray,
+    sr: int,
+    sample_rate: Optional[int] = None,
+    target_lufs: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Rééchantillonne et normalise un signal avant encodage.
+
+    Args:
+        audio: Signal mono.
+        sr: Fréquence du signal.
+        sample_rate: Fréquence de sortie (inchangée si None).
+        target_lufs: Sonie visée (pas de normalisation si None) ; le gain est
+            limité pour que la crête ne dépasse pas 1.
+
+    Returns:
+        Le signal float32 à la fréquence de sortie.
+    """
+    audio = np.asarray(audio, dtype=np.float32).ravel()
+    if sample_rate and sample_rate != sr:
+        resampler = StreamingResampler(sr, sample_rate)
+        audio = np.concatenate([resampler.process(audio), resampler.flush()])
+        sr = sample_rate
+
+    if target_lufs is not None and len(audio):
+        peak = float(np.max(np.abs(audio)))
+        meter = LoudnessMeter(sr)
+        meter.process(audio)
+        loudness = meter.integrated()
+        if peak < SILENCE_PEAK or loudness is None:
+            logger.warning("Signal silencieux, normalisation de la sonie ignorée")
+        else:
+            gain = min(1.0 / peak, 10 ** ((target_lufs - loudness) / 20))
+            audio = audio * np.float32(gain)
+    return audio
+
+
+def _encode(target: Union[str, BinaryIO], audio: np.ndarray, sr: int, format: str):
+    """Encode un signal préparé vers un chemin ou un flux positionnable."""
+    spec = check_format(format)
+    if format == "opus" and sr not in OPUS_SAMPLE_RATES:
+        raise ValueError(
+            f"Opus n'accepte pas {sr} Hz (fréquences possibles: {', '.join(map(str, OPUS_SAMPLE_RATES))})"
+        )
+    try:
+        import soundfile as sf
+    except ImportError:
+        if spec.container != "WAV":
+            raise RuntimeError(f"Le format {format} nécessite soundfile (pip install soundfile)")
+        from scipy.io.wavfile import write as write_wav
+
+        if spec.subtype == "PCM_16":
+            audio = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+        write_wav(target, sr, audio)
+        return
+    sf.write(target, audio, sr, format=spec.container, subtype=spec.subtype)
+
+
+def encode_audio(
+    audio: np.ndarray,
+    sr: int,
+    format: str = DEFAULT_FORMAT,
+    sample_rate: Optional[int] = None,
+    target_lufs: Optional[float] = None,
+) -> bytes:
+    """
+    Encode un signal en mémoire.
+
+    Args:
+        audio: Signal mono.
+        sr: Fréquence du signal.
+        format: Format de sortie (voir OUTPUT_FORMATS).
+        sample_rate: Fréquence de sortie (inchangée si None).
+        target_lufs: Sonie visée (pas de normalisation si None).
+
+    Returns:
+        Le fichier encodé.
+    """
+    check_format(format)
+    audio = prepare_audio(audio, sr, sample_rate, target_lufs)
+    buffer = io.BytesIO()
+    _encode(buffer, audio, sample_rate or sr, format)
+    return buffer.getvalue()
+
+
+def write_audio(
+    sink: Sink,
+    audio: np.ndarray,
+    sr: int,
+    format: Optional[str] = None,
+    sample_rate: Optional[int] = None,
+    target_lufs: Optional[float] = None,
+):
+    """
+    Encode un signal vers un fichier ou un flux.
+
+    Args:
+        sink: Chemin du fichier, ou objet binaire muni d'une méthode write
+            (fichier ouvert, socket, réponse HTTP ; il n'a pas besoin d'être
+            positionnable).
+        audio: Signal mono.
+        sr: Fréquence du signal.
+        format: Format de sortie (déduit de l'extension du chemin si None).
+        sample_rate: Fréquence de sortie (inchangée si None).
+        target_lufs: Sonie visée (pas de normalisation si None).
+    """
+    format = resolve_format(format, sink)
+    if isinstance(sink, (str, os.PathLike)):
+        _encode(str(sink), prepare_audio(audio, sr, sample_rate, target_lufs), sample_rate or sr, format)
+    else:
+        # L'en-tête WAV/FLAC est complété après coup : encodage en mémoire, puis écriture
+        sink.write(encode_audio(audio, sr, format, sample_rate, target_lufs))
+
+
+class OutputEncoder:
+    """
+    Encode les signaux générés dans un thread dédié.
+
+    L'encodage (compression, rééchantillonnage, écriture) d'une sortie se
+    déroule pendant la génération de la suivante. Le nombre de signaux en
+    attente est borné pour limiter la mémoire : submit bloque au-delà.
+    """
+
+    def __init__(self, options: Optional[OutputOptions] = None, max_pending: int = 4):
+        """
+        Args:
+            options: Options de sortie appliquées à chaque signal.
+            max_pending: Nombre maximal de signaux en attente d'encodage.
+        """
+        self.options = options or OutputOptions()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bark-encoder")
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+
+    def submit(self, sink: Sink, audio: np.ndarray, sr: int) -> Future:
+        """
+        Planifie l'encodage d'un signal vers un fichier ou un flux.
+
+        Returns:
+            Un Future dont le résultat est sink (ou l'exception de l'encodage).
+        """
+        self._slots.acquire()
+
+        def run():
+            try:
+                write_audio(sink, audio, sr, **self.options._asdict())
+                return sink
+            finally:
+                self._slots.release()
+
+        try:
+            return self._executor.submit(run)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def close(self, wait: bool = True):
+        """Attend la fin des encodages planifiés et arrête le thread."""
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backends d'exécution des étapes de génération de Bark.
+
+Un backend réalise les quatre étapes du pipeline à partir des modèles d'une
+entrée du registre (voir model_registry) :
+
+    text_to_semantic    texte -> tokens sémantiques
+    semantic_to_coarse  tokens sémantiques -> codes coarse (2 livres de codes)
+    coarse_to_fine      codes coarse -> codes fine (8 livres de codes)
+    decode              codes fine -> signal (décodeur EnCodec)
+
+Backends disponibles :
+    reference  étapes de bark.generation, résultat identique à Bark (texte et
+               coarse avec un cache clés/valeurs préalloué, voir src.kv_cache)
+    compiled   modules compilés avec torch.compile (compilation au premier appel)
+    onnx       modèle fine et décodeur EnCodec exécutés par ONNX Runtime (CPU) ;
+               les étapes autorégressives texte et coarse restent sur torch
+
+Les backends compiled et onnx exécutent les étapes de src.batched_generation
+avec des modules remplacés ; les mêmes modules servent aux générations par
+lots (voir GenerationBackend.batch_models). Leurs échantillonnages ne
+reproduisent pas exactement ceux de Bark : la configuration des caches de
+sortie inclut le nom du backend.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+import warnings
+from collections.abc import Mapping
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("reference", "compiled", "onnx")
+
+# Sous-répertoire de model_dir où sont conservés les modèles exportés en ONNX
+ONNX_DIR = "onnx"
+
+# Les signaux sont décodés par tranches de longueur fixe (5 s à 75 trames/s) :
+# le décodeur EnCodec 24 kHz est causal, le remplissage à droite ne modifie
+# donc pas le début du signal
+CODEC_BUCKET_FRAMES = 375
+
+# Protège la création des modules de remplacement, partagés par les instances d'un backend
+_REPLACE_LOCK = threading.Lock()
+
+
+class GenerationBackend:
+    """
+    Interface d'un backend de génération.
+
+    Les méthodes reçoivent la vue des modèles d'une entrée du registre
+    (LoadedModels.models) ; l'appelant active les étapes utilisées
+    (LoadedModels.activate) avant l'appel.
+    """
+
+    name = "base"
+
+    def text_to_semantic(
+        self,
+        models: Mapping,
+        text: str,
+        history_prompt: Optional[Dict[str, np.ndarray]] = None,
+        temp: float = 0.7,
+        silent: bool = True,
+        min_eos_p: float = 0.2,
+        max_duration_s: Optional[float] = None,
+    ) -> np.ndarray:
+        """
+        Tokens sémantiques d'un texte ; la génération s'arrête dès que la
+        probabilité de fin de séquence atteint min_eos_p, ou après max_duration_s.
+        """
+        raise NotImplementedError
+
+    def semantic_to_coarse(
+        self,
+        models: Mapping,
+        semantic_tokens: np.ndarray,
+        history_prompt: Optional[Dict[str, np.ndarray]] = None,
+        temp: float = 0.7,
+        silent: bool = True,
+    ) -> np.ndarray:
+        """Codes coarse (2, T) d'une séquence sémantique."""
+        raise NotImplementedError
+
+    def coarse_to_fine(
+        self,
+        models: Mapping,
+        coarse_tokens: np.ndarray,
+        history_prompt: Optional[Dict[str, np.ndarray]] = None,
+        temp: float = 0.5,
+    ) -> np.ndarray:
+        """Codes fine (8, T) d'une séquence coarse."""
+        raise NotImplementedError
+
+    def decode(self, models: Mapping, fine_tokens: np.ndarray) -> np.ndarray:
+        """Signal à 24 kHz décodé des codes fine."""
+        raise NotImplementedError
+
+    def batch_models(self, models: Mapping) -> Mapping:
+        """Modèles à utiliser par les étapes par lots de src.batched_generation."""
+        return models
+
+
+class ReferenceBackend(GenerationBackend):
+    """
+    Étapes de Bark. Les étapes autorégressives (texte et coarse) suivent
+    bark.generation pas à pas avec un cache clés/valeurs préalloué (voir
+    src.kv_cache) ; fine et décodage sont ceux de bark.generation (modèles
+    installés par LoadedModels.activate).
+    """
+
+    name = "reference"
+
+    def text_to_semantic(self, models, text, history_prompt=None, temp=0.7, silent=True, min_eos_p=0.2, max_duration_s=None):
+        from src.batched_generation import generate_text_semantic_batch
+
+        return generate_text_semantic_batch(
+            self.batch_models(models), [text], history_prompt=history_prompt, temp=temp,
+            min_eos_p=min_eos_p, max_gen_duration_s=max_duration_s
+        )[0]
+
+    def semantic_to_coarse(self, models, semantic_tokens, history_prompt=None, temp=0.7, silent=True):
+        from src.batched_generation import generate_coarse_batch
+
+        if len(semantic_tokens) == 0:
+            return np.zeros((2, 0), dtype=np.int64)
+        return generate_coarse_batch(self.batch_models(models), [semantic_tokens], history_prompt=history_prompt, temp=temp)[0]
+
+    def coarse_to_fine(self, models, coarse_tokens, history_prompt=None, temp=0.5):
+        from bark.generation import generate_fine
+
+        return generate_fine(coarse_tokens, history_prompt=history_prompt, temp=temp)
+
+    def decode(self, models, fine_tokens):
+        from bark.generation import codec_decode
+
+        return codec_decode(fine_tokens)
+
+
+class _ModelView(Mapping):
+    """Vue des modèles d'une entrée dont certaines étapes sont remplacées."""
+
+    def __init__(self, models: Mapping, replace):
+        self._models = models
+        self._replace = replace
+
+    def __getitem__(self, stage: str) -> Any:
+        return self._replace(stage, self._models[stage])
+
+    def __iter__(self):
+        return iter(self._models)
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+
+class _CodecView:
+    """Modèle EnCodec dont le décodeur est remplacé (seuls quantizer et decoder servent au décodage)."""
+
+    def __init__(self, codec: Any, decoder: Any):
+        self.quantizer = codec.quantizer
+        self.decoder = decoder
+        self._codec = codec
+
+    def parameters(self):
+        return self._codec.parameters()
+
+
+class _BatchedBackend(ReferenceBackend):
+    """
+    Étapes de src.batched_generation (lot d'un élément) sur des modules
+    remplacés par _replace_module.
+    """
+
+    def _replace_module(self, stage: str, module: Any) -> Any:
+        """Module de remplacement d'une étape (le module d'origine par défaut)."""
+        return module
+
+    def _replace(self, stage: str, model: Any) -> Any:
+        # Le modèle texte est un dictionnaire {"model", "tokenizer"}
+        module = model["model"] if isinstance(model, dict) else model
+        # Le remplacement est attaché au module d'origine : il est libéré avec
+        # lui quand le registre décharge l'étape
+        attribute = f"_bark_{self.name}_module"
+        with _REPLACE_LOCK:
+            replaced = module.__dict__.get(attribute)
+            if replaced is None:
+                replaced = module.__dict__[attribute] = self._replace_module(stage, module)
+        if isinstance(model, dict):
+            return {**model, "model": replaced}
+        return replaced
+
+    def batch_models(self, models: Mapping) -> Mapping:
+        return _ModelView(models, self._replace)
+
+    def coarse_to_fine(self, models, coarse_tokens, history_prompt=None, temp=0.5):
+        from src.batched_generation import generate_fine_batch
+
+        return generate_fine_batch(self.batch_models(models), [coarse_tokens], history_prompt=history_prompt, temp=temp)[0]
+
+    def decode(self, models, fine_tokens):
+        from src.batched_generation import codec_decode_batch
+
+        if fine_tokens.shape[1] == 0:
+            return np.zeros(0, dtype=np.float32)
+        return codec_decode_batch(self.batch_models(models), [fine_tokens])[0]
+
+
+class _CompiledModule:
+    """
+    Module compilé avec torch.compile ; en cas d'échec de la compilation (pas
+    de compilateur C++, opération non supportée), le module d'origine est
+    utilisé pour la suite.
+    """
+
+    def __init__(self, stage: str, module: Any):
+        import torch
+
+        self.stage = stage
+        self.module = module
+        self._compiled = torch.compile(module, dynamic=True)
+        self._failed = False
+
+    def __call__(self, *args, **kwargs):
+        if not self._failed:
+            try:
+                return self._compiled(*args, **kwargs)
+            except Exception as e:
+                logger.warning(f"Compilation du modèle {self.stage} impossible, exécution sans compilation: {e}")
+                self._failed = True
+        return self.module(*args, **kwargs)
+
+    def parameters(self):
+        return self.module.parameters()
+
+
+class CompiledBackend(_BatchedBackend):
+    """Transformeurs et décodeur EnCodec compilés avec torch.compile."""
+
+    name = "compiled"
+
+    def _replace_module(self, stage, module):
+        logger.info(f"Compilation du modèle {stage} (au premier appel)")
+        if stage == "codec":
+            return _CodecView(module, _CompiledModule("codec", module.decoder))
+        return _CompiledModule(stage, module)
+
+
+def _module_fingerprint(module: Any) -> str:
+    """Empreinte des poids d'un module (noms, formes et contenu complet de chaque tenseur)."""
+    digest = hashlib.sha256()
+    for name, value in module.state_dict().items():
+        digest.update(name.encode("utf-8"))
+        _update_fingerprint(digest, value)
+    return digest.hexdigest()[:16]
+
+
+def _update_fingerprint(digest: Any, value: Any):
+    """Ajoute une valeur d'un state_dict à l'empreinte (tenseurs, y compris quantifiés, et tuples)."""
+    import torch
+
+    if isinstance(value, (tuple, list)):
+        for item in value:
+            _update_fingerprint(digest, item)
+    elif isinstance(value, torch.Tensor):
+        tensor = value.detach().cpu()
+        digest.update(f"{tuple(tensor.shape)}:{tensor.dtype}".encode("utf-8"))
+        if tensor.is_quantized:
+            # Poids int8 : valeurs entières et paramètres de quantification
+            if tensor.qscheme() in (torch.per_tensor_affine, torch.per_tensor_symmetric):
+                digest.update(f"{tensor.q_scale()}:{tensor.q_zero_point()}".encode("utf-8"))
+            else:
+                _update_fingerprint(digest, (tensor.q_per_channel_scales(), tensor.q_per_channel_zero_points()))
+            tensor = tensor.int_repr()
+        # Octets bruts : fonctionne aussi pour bfloat16, que numpy ne connaît pas
+        digest.update(tensor.contiguous().reshape(-1).view(torch.uint8).numpy().tobytes())
+    else:
+        digest.update(repr(value).encode("utf-8"))
+
+
+def _import_onnxruntime():
+    try:
+        import onnxruntime
+    except ImportError:
+        raise RuntimeError("Le backend onnx nécessite onnxruntime et onnx (pip install onnxruntime onnx)") from None
+    return onnxruntime
+
+
+class _OnnxExporter:
+    """Exporte des modules en ONNX (une fois, dans model_dir/onnx/) et ouvre leurs sessions."""
+
+    def __init__(self, export_dir: str):
+        self.export_dir = export_dir
+        self._lock = threading.Lock()
+
+    def session(self, name: str, module: Any, example: Any, input_name: str, output_name: str, dynamic_axes: Dict):
+        """
+        Session ONNX Runtime d'un module, exporté s'il ne l'est pas déjà.
+
+        Args:
+            name: Nom du fichier exporté (sans extension) ; il doit changer
+                avec les poids et la forme des entrées.
+            module: Module torch à exporter (un seul tenseur en entrée et en sortie).
+            example: Entrée d'exemple de l'export.
+            input_name: Nom de l'entrée.
+            output_name: Nom de la sortie.
+            dynamic_axes: Dimensions variables des entrées et sorties.
+        """
+        import torch
+
+        ort = _import_onnxruntime()
+        path = os.path.join(self.export_dir, f"{name}.onnx")
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(self.export_dir, exist_ok=True)
+                logger.info(f"Export ONNX: {path}")
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                try:
+                    # Les TracerWarning des assertions de forme de Bark et d'EnCodec sont attendues
+                    with torch.inference_mode(False), torch.no_grad(), warnings.catch_warnings():
+                        warnings.simplefilter("ignore")
+                        torch.onnx.export(
+                            module,
+                            (example,),
+                            tmp_path,
+                            input_names=[input_name],
+                            output_names=[output_name],
+                            dynamic_axes=dynamic_axes,
+                            opset_version=17,
+                            dynamo=False,
+                        )
+                    os.replace(tmp_path, path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+        options = ort.SessionOptions()
+        # Même nombre de threads que torch (voir worker_pool)
+        options.intra_op_num_threads = torch.get_num_threads()
+        return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+
+def _fine_step(model: Any, pred_idx: int) -> Any:
+    """Module prédisant un livre de codes du modèle fine (pred_idx fixé pour l'export)."""
+    import torch
+
+    class FineStep(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, idx):
+            return self.model(pred_idx, idx)
+
+    return FineStep()
+
+
+class _OnnxFineModel:
+    """Modèle fine exécuté par ONNX Runtime : une session par livre de codes prédit."""
+
+    def __init__(self, module: Any, exporter: _OnnxExporter):
+        self.module = module
+        self._exporter = exporter
+        self._fingerprint = _module_fingerprint(module)
+        self._sessions: Dict[int, Any] = {}
+
+    def __call__(self, pred_idx: int, idx):
+        import torch
+
+        session = self._sessions.get(pred_idx)
+        if session is None:
+            session = self._sessions[pred_idx] = self._exporter.session(
+                f"fine_{self._fingerprint}_{pred_idx}",
+                _fine_step(self.module, pred_idx),
+                torch.zeros((1, idx.shape[1], idx.shape[2]), dtype=torch.int64),
+                "idx",
+                "logits",
+                {"idx": {0: "batch"}, "logits": {0: "batch"}},
+            )
+        logits = session.run(None, {"idx": idx.cpu().numpy().astype(np.int64)})[0]
+        return torch.from_numpy(logits)
+
+    def parameters(self):
+        return self.module.parameters()
+
+
+class _OnnxCodecDecoder:
+    """Décodeur EnCodec exécuté par ONNX Runtime, par tranches de CODEC_BUCKET_FRAMES trames."""
+
+    def __init__(self, decoder: Any, exporter: _OnnxExporter):
+        self.decoder = decoder
+        self._exporter = exporter
+        self._fingerprint = _module_fingerprint(decoder)
+        self._sessions: Dict[int, Any] = {}
+
+    def __call__(self, emb):
+        import torch
+
+        n_frames = emb.shape[-1]
+        bucket = max(1, int(np.ceil(n_frames / CODEC_BUCKET_FRAMES))) * CODEC_BUCKET_FRAMES
+        session = self._sessions.get(bucket)
+        if session is None:
+            session = self._sessions[bucket] = self._exporter.session(
+                f"codec_{self._fingerprint}_{bucket}",
+                self.decoder,
+                torch.zeros((1, emb.shape[1], bucket), dtype=torch.float32),
+                "emb",
+                "audio",
+                {"emb": {0: "batch"}, "audio": {0: "batch"}},
+            )
+        padded = np.zeros((emb.shape[0], emb.shape[1], bucket), dtype=np.float32)
+        padded[:, :, :n_frames] = emb.detach().cpu().numpy()
+        audio = session.run(None, {"emb": padded})[0]
+        hop_length = audio.shape[-1] // bucket
+        return torch.from_numpy(audio[..., :n_frames * hop_length])
+
+
+class OnnxBackend(_BatchedBackend):
+    """Modèle fine et décodeur EnCodec exécutés par ONNX Runtime sur CPU."""
+
+    name = "onnx"
+
+    def __init__(self, model_dir: str):
+        """
+        Args:
+            model_dir: Répertoire des modèles (les exports sont conservés dans model_dir/onnx/).
+        """
+        _import_onnxruntime()
+        self._exporter = _OnnxExporter(os.path.join(model_dir, ONNX_DIR))
+
+    def _replace_module(self, stage, module):
+        if stage == "fine":
+            return _OnnxFineModel(module, self._exporter)
+        if stage == "codec":
+            return _CodecView(module, _OnnxCodecDecoder(module.decoder, self._exporter))
+        return module
+
+
+def create_backend(backend: Union[str, GenerationBackend], model_dir: str) -> GenerationBackend:
+    """
+    Retourne un backend de génération.
+
+    Args:
+        backend: Nom du backend (voir BACKENDS) ou instance de GenerationBackend.
+        model_dir: Répertoire des modèles.
+
+    Raises:
+        ValueError: Si le backend est inconnu.
+        RuntimeError: Si une dépendance du backend est absente.
+    """
+    if isinstance(backend, GenerationBackend):
+        return backend
+    if backend == "reference":
+        return ReferenceBackend()
+    if backend == "compiled":
+        return CompiledBackend()
+    if backend == "onnx":
+        return OnnxBackend(model_dir)
+    raise ValueError(f"Backend inconnu: {backend} (valeurs possibles: {', '.join(BACKENDS)})")
@@ -4,6 +4,7 @@
 import os
 import sys
 import argparse
+import contextlib
 import logging
 import json
 from pathlib import Path
@@ -17,15 +18,108 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 # Importer notre module StandaloneBark
 from src.standalone_bark import StandaloneBark
+from src.model_registry import OFFLOAD_MODES, SUPPORTED_PRECISIONS
+from src.speaker_store import SPEAKER_STORES
+from src.audio_output import OUTPUT_FORMATS, resolve_format
+from src.backends import BACKENDS
+from src.generation_limits import DEFAULT_MIN_EOS_P
+
+def _bark_options(args) -> dict:
+    """Options de StandaloneBark communes aux sous-commandes."""
+    return {
+        "model_dir": args.model_dir,
+        "precision": args.precision,
+        "backend": args.backend,
+        "model_size": args.model_size,
+        "max_real_time_factor": args.max_rtf,
+        "semantic_cache_dir": getattr(args, "semantic_cache_dir", None),
+        "output_cache_dir": getattr(args, "output_cache_dir", None),
+        "output_cache_max_bytes": int(args.output_cache_max_mb * 2**20) if getattr(args, "output_cache_max_mb", None) else None,
+        "idle_offload_s": getattr(args, "idle_offload_s", None),
+        "offload_mode": getattr(args, "offload_mode", "unload"),
+        "speaker_store": args.speaker_store,
+        "output_format": getattr(args, "format", None),
+        "output_sample_rate": getattr(args, "sample_rate", None),
+        "output_lufs": getattr(args, "target_lufs", None),
+        "max_duration_s": getattr(args, "max_duration", None),
+        "min_eos_p": getattr(args, "min_eos_p", DEFAULT_MIN_EOS_P),
+        "trim_silence": not getattr(args, "no_trim_silence", False),
+    }
+
+def _add_model_options(parser):
+    """Ajoute les options de précision, de taille des modèles et de stockage des voix à une sous-commande."""
+    parser.add_argument("--precision", choices=SUPPORTED_PRECISIONS, default="fp32", help="Précision d'inférence (bf16 et int8 accélèrent le CPU)")
+    parser.add_argument("--backend", choices=BACKENDS, default="reference",
+                        help="Exécution des modèles: reference (Bark), compiled (torch.compile) ou onnx (ONNX Runtime, CPU)")
+    parser.add_argument("--model-size", default="large", help="Taille des modèles: large, small, auto, ou par étape (text=large,coarse=small,fine=small)")
+    parser.add_argument("--max-rtf", type=float, help="Budget de latence de --model-size auto (secondes de calcul par seconde d'audio)")
+    parser.add_argument("--speaker-store", choices=SPEAKER_STORES, default="files", help="Stockage des voix: un fichier npz par voix, ou magasin compact (packed)")
+
+def _add_output_options(parser):
+    """Ajoute les options d'encodage des fichiers générés à une sous-commande."""
+    parser.add_argument("--format", choices=list(OUTPUT_FORMATS),
+                        help="Format de sortie: wav (float32), wav16, flac, ogg ou opus (déduit de l'extension par défaut)")
+    parser.add_argument("--sample-rate", type=int, help="Fréquence d'échantillonnage de sortie (24000 Hz par défaut)")
+    parser.add_argument("--target-lufs", type=float, help="Normaliser la sonie des fichiers générés (LUFS, ex. -16)")
+
+def _add_seed_options(parser):
+    """Ajoute les options de génération reproductible et du cache de sortie à une sous-commande."""
+    parser.add_argument("--seed", type=int, help="Graine aléatoire (génération reproductible et mise en cache)")
+    parser.add_argument("--output-cache-dir", help="Répertoire du cache de l'audio généré avec graine (optionnel)")
+    parser.add_argument("--output-cache-max-mb", type=float, help="Taille maximale du cache de l'audio généré (Mo)")
+
+def _add_limit_options(parser):
+    """Ajoute les bornes de durée des générations à une sous-commande."""
+    parser.add_argument("--max-duration", type=float, help="Durée maximale générée par texte, en secondes (environ 15 s par défaut)")
+    parser.add_argument("--min-eos-p", type=float, default=DEFAULT_MIN_EOS_P,
+                        help="Probabilité de fin de séquence qui arrête la génération (plus bas : arrêt plus précoce)")
+    parser.add_argument("--no-trim-silence", action="store_true", help="Conserver le silence final des générations")
+
+def _add_profile_options(parser):
+    """Ajoute les options de mesure des performances à une sous-commande."""
+    parser.add_argument("--profile", action="store_true",
+                        help="Afficher la durée de chaque étape, le débit en tokens, le facteur temps réel et la mémoire")
+    parser.add_argument("--profile-json", help="Enregistrer les mesures de la commande dans un fichier JSON")
+    parser.add_argument("--profile-trace", help="Enregistrer une trace du profileur de torch (JSON Chrome/Perfetto)")
+
+@contextlib.contextmanager
+def _profiling(args, bark):
+    """Mesure la commande si --profile, --profile-json ou --profile-trace est demandé."""
+    if not (args.profile or args.profile_json or args.profile_trace):
+        yield
+        return
+    if not isinstance(bark, StandaloneBark):
+        # Les générations ont lieu dans les processus du pool
+        logger.warning("Mesures indisponibles avec --workers > 1 : options de profilage ignorées")
+        yield
+        return
+    
+    from src.profiling import torch_trace
+    
+    trace = torch_trace(args.profile_trace) if args.profile_trace else contextlib.nullcontext()
+    with trace, bark.profile(args.command) as profile:
+        yield
+    if args.profile:
+        print(profile.format())
+    if args.profile_json:
+        with open(args.profile_json, 'w', encoding='utf-8') as f:
+            json.dump(profile.to_dict(), f, indent=2)
+        logger.info(f"Mesures enregistrées dans: {args.profile_json}")
+
+def _output_extension(args) -> str:
+    """Extension des fichiers générés par les commandes multilingual et batch."""
+    return OUTPUT_FORMATS[resolve_format(args.format)].extension
 
 def extract_command(args):
     """Commande pour extraire l'identité vocale d'un fichier audio."""
     try:
-        bark = StandaloneBark(model_dir=args.model_dir)
-        speaker_id = bark.extract_speaker(
-            audio_file=args.audio,
-            speaker_id=args.speaker_id
-        )
+        bark = StandaloneBark(**_bark_options(args))
+        with _profiling(args, bark):
+            speaker_id = bark.extract_speaker(
+                audio_file=args.audio,
+                speaker_id=args.speaker_id,
+                transcript=args.transcript
+            )
         logger.info(f"Identité vocale extraite avec succès: {speaker_id}")
     except Exception as e:
         logger.error(f"Erreur lors de l'extraction: {e}")
@@ -34,15 +128,37 @@ def extract_command(args):
 def generate_command(args):
     """Commande pour générer de l'audio à partir d'un texte."""
     try:
-        bark = StandaloneBark(model_dir=args.model_dir)
-        output_file = bark.clone_voice(
-            text=args.text,
-            speaker_id=args.speaker_id,
-            audio_file=args.audio,
-            output_file=args.output,
-            language=args.language,
-            temperature=args.temperature
-        )
+        bark = StandaloneBark(**_bark_options(args))
+        
+        if args.stream:
+            # Générer phrase par phrase et écrire chaque morceau dès qu'il est prêt
+            output_file = args.output or os.path.join(os.getcwd(), "generated_stream.wav")
+            if args.format not in (None, "wav") or args.sample_rate or args.target_lufs is not None:
+                logger.warning("--stream écrit un WAV float32 au fil de l'eau : options de sortie ignorées")
+            with _profiling(args, bark):
+                for chunk in bark.clone_voice_stream(
+                    text=args.text,
+                    speaker_id=args.speaker_id,
+                    audio_file=args.audio,
+                    output_file=output_file,
+                    language=args.language,
+                    temperature=args.temperature,
+                    seed=args.seed
+                ):
+                    logger.info(f"Morceau {chunk.index + 1} ajouté à {output_file}")
+            logger.info(f"Audio généré avec succès: {output_file}")
+            return
+        
+        with _profiling(args, bark):
+            output_file = bark.clone_voice(
+                text=args.text,
+                speaker_id=args.speaker_id,
+                audio_file=args.audio,
+                output_file=args.output,
+                language=args.language,
+                temperature=args.temperature,
+                seed=args.seed
+            )
         logger.info(f"Audio généré avec succès: {output_file}")
     except Exception as e:
         logger.error(f"Erreur lors de la génération: {e}")
@@ -51,21 +167,49 @@ def generate_command(args):
 def emotion_command(args):
     """Commande pour générer de l'audio avec une émotion spécifiée."""
     try:
-        bark = StandaloneBark(model_dir=args.model_dir)
-        output_file = bark.generate_voice_with_emotion(
-            text=args.text,
-            speaker_id=args.speaker_id,
-            audio_file=args.audio,
-            output_file=args.output,
-            language=args.language,
-            emotion=args.emotion,
-            temperature=args.temperature
-        )
+        bark = StandaloneBark(**_bark_options(args))
+        with _profiling(args, bark):
+            output_file = bark.generate_voice_with_emotion(
+                text=args.text,
+                speaker_id=args.speaker_id,
+                audio_file=args.audio,
+                output_file=args.output,
+                language=args.language,
+                emotion=args.emotion,
+                temperature=args.temperature,
+                seed=args.seed
+            )
         logger.info(f"Audio généré avec succès: {output_file}")
     except Exception as e:
         logger.error(f"Erreur lors de la génération avec émotion: {e}")
         sys.exit(1)
 
+def _batch_backend(args):
+    """
+    Retourne le moteur des générations par lots : un pool de processus si
+    --workers > 1, sinon une instance de StandaloneBark (à utiliser avec with).
+    """
+    if args.workers > 1:
+        from src.worker_pool import BarkWorkerPool
+        return BarkWorkerPool(
+            workers=args.workers,
+            model_dir=args.model_dir,
+            threads_per_worker=args.threads_per_worker,
+            semantic_cache_dir=args.semantic_cache_dir,
+            precision=args.precision,
+            backend=args.backend,
+            model_size=args.model_size,
+            max_real_time_factor=args.max_rtf,
+            speaker_store=args.speaker_store,
+            output_format=args.format,
+            output_sample_rate=args.sample_rate,
+            output_lufs=args.target_lufs,
+            max_duration_s=args.max_duration,
+            min_eos_p=args.min_eos_p,
+            trim_silence=not args.no_trim_silence
+        )
+    return contextlib.nullcontext(StandaloneBark(**_bark_options(args)))
+
 def multilingual_command(args):
     """Commande pour générer de l'audio dans plusieurs langues."""
     try:
@@ -73,34 +217,242 @@ def multilingual_command(args):
         with open(args.texts_file, 'r', encoding='utf-8') as f:
             texts = json.load(f)
         
-        bark = StandaloneBark(model_dir=args.model_dir)
-        
         # Créer le répertoire de sortie s'il n'existe pas
         output_dir = args.output_dir or os.path.join(os.getcwd(), "generated_audio")
         os.makedirs(output_dir, exist_ok=True)
         
-        # Générer l'audio pour chaque langue
-        for lang, text in texts.items():
-            output_file = os.path.join(output_dir, f"generated_{lang}.wav")
-            logger.info(f"Génération audio pour la langue: {lang}")
-            
-            bark.clone_voice(
-                text=text,
+        # Générer l'audio de toutes les langues par lots
+        languages = list(texts)
+        output_files = [os.path.join(output_dir, f"generated_{lang}{_output_extension(args)}") for lang in languages]
+        logger.info(f"Génération audio pour les langues: {', '.join(languages)}")
+        
+        with _batch_backend(args) as bark, _profiling(args, bark):
+            bark.clone_voice_batch(
+                texts=[texts[lang] for lang in languages],
                 speaker_id=args.speaker_id,
                 audio_file=args.audio,
-                output_file=output_file,
-                language=lang,
+                output_files=output_files,
                 temperature=args.temperature
             )
             
-            logger.info(f"Audio généré pour {lang}: {output_file}")
-            
         logger.info(f"Génération multilingue terminée. Fichiers sauvegardés dans: {output_dir}")
         
     except Exception as e:
         logger.error(f"Erreur lors de la génération multilingue: {e}")
         sys.exit(1)
 
+def batch_command(args):
+    """Commande pour générer de l'audio pour de nombreux textes par lots."""
+    try:
+        # Charger le fichier JSON contenant les textes (liste ou dictionnaire nom -> texte)
+        with open(args.texts_file, 'r', encoding='utf-8') as f:
+            texts = json.load(f)
+        if isinstance(texts, dict):
+            names, texts = list(texts), list(texts.values())
+        else:
+            names = [f"{i:04d}" for i in range(len(texts))]
+        
+        # Créer le répertoire de sortie s'il n'existe pas
+        output_dir = args.output_dir or os.path.join(os.getcwd(), "generated_audio")
+        os.makedirs(output_dir, exist_ok=True)
+        
+        with _batch_backend(args) as bark, _profiling(args, bark):
+            output_files = bark.clone_voice_batch(
+                texts=texts,
+                speaker_id=args.speaker_id,
+                audio_file=args.audio,
+                output_files=[os.path.join(output_dir, f"generated_{name}{_output_extension(args)}") for name in names],
+                temperature=args.temperature,
+                batch_size=args.batch_size
+            )
+        
+        logger.info(f"{len(output_files)} fichier(s) générés dans: {output_dir}")
+        
+    except Exception as e:
+        logger.error(f"Erreur lors de la génération par lots: {e}")
+        sys.exit(1)
+
+def gc_command(args):
+    """Commande pour supprimer les prompts vocaux temporaires inutilisés."""
+    try:
+        from src.speaker_library import collect_garbage, collect_store_garbage
+        
+        bark = StandaloneBark(model_dir=args.model_dir, speaker_store=args.speaker_store)
+        limits = dict(
+            max_age_s=args.max_age_hours * 3600 if args.max_age_hours is not None else None,
+            max_total_bytes=int(args.max_total_mb * 2**20) if args.max_total_mb is not None else None,
+            dry_run=args.dry_run
+        )
+        if bark.speaker_store is not None:
+            removed = collect_store_garbage(bark.speaker_store, **limits)
+        else:
+            removed = collect_garbage(bark.speaker_embeddings_dir, **limits)
+        for path in removed:
+            logger.info(f"{'À supprimer' if args.dry_run else 'Supprimé'}: {path}")
+    except Exception as e:
+        logger.error(f"Erreur lors du nettoyage des prompts: {e}")
+        sys.exit(1)
+
+def store_command(args):
+    """Commande pour gérer le magasin compact des voix (import, export, compactage)."""
+    try:
+        from src.speaker_store import PACKED_SUBDIR, PackedSpeakerStore
+        
+        bark = StandaloneBark(model_dir=args.model_dir)
+        store = PackedSpeakerStore(os.path.join(bark.speaker_embeddings_dir, PACKED_SUBDIR))
+        
+        if args.action == "import":
+            source = args.dir or bark.speaker_embeddings_dir
+            imported = store.import_directory(source, overwrite=args.overwrite)
+            logger.info(f"{len(imported)} voix importée(s) dans le magasin compact")
+        elif args.action == "export":
+            output_dir = args.dir or bark.speaker_embeddings_dir
+            speaker_ids = args.speaker_ids.split(",") if args.speaker_ids else None
+            written = store.export_directory(output_dir, speaker_ids)
+            logger.info(f"{len(written)} voix exportée(s) dans: {output_dir}")
+        elif args.action == "compact":
+            result = store.compact()
+            logger.info(
+                f"Magasin compacté: {result['bytes_before'] / 2**20:.1f} Mo -> {result['bytes_after'] / 2**20:.1f} Mo"
+            )
+        print(json.dumps(store.stats(), indent=2))
+    except Exception as e:
+        logger.error(f"Erreur lors de la gestion du magasin de voix: {e}")
+        sys.exit(1)
+
+def extract_bulk_command(args):
+    """Commande pour extraire en parallèle les voix d'un répertoire de clips ou d'un manifeste."""
+    try:
+        from src.bulk_extract import extract_bulk, load_items
+        
+        bark = StandaloneBark(**_bark_options(args))
+        items = load_items(args.source)
+        if args.executor == "process":
+            from src.worker_pool import BarkWorkerPool
+            backend = BarkWorkerPool(
+                workers=args.workers,
+                model_dir=args.model_dir,
+                precision=args.precision,
+                backend=args.backend,
+                model_size=args.model_size,
+                max_real_time_factor=args.max_rtf,
+                speaker_store=args.speaker_store
+            )
+        else:
+            backend = contextlib.nullcontext()
+        with backend as pool:
+            summary = extract_bulk(
+                bark,
+                items,
+                workers=args.workers,
+                pool=pool,
+                id_from=args.id_from,
+                summary_path=args.summary,
+                overwrite=args.overwrite
+            )
+        print(json.dumps(summary, indent=2))
+        if summary["failed"]:
+            sys.exit(1)
+    except Exception as e:
+        logger.error(f"Erreur lors de l'extraction en masse: {e}")
+        sys.exit(1)
+
+def list_command(args):
+    """Commande pour lister les voix de la bibliothèque."""
+    try:
+        bark = StandaloneBark(model_dir=args.model_dir, speaker_store=args.speaker_store)
+        speakers = bark.list_speakers()
+        if args.json:
+            print(json.dumps(speakers, indent=2, ensure_ascii=False))
+            return
+        for speaker in speakers:
+            source = speaker["metadata"].get("source", "")
+            print(f"{speaker['speaker_id']:<40} {speaker['bytes'] / 1024:>8.1f} Ko  {source}")
+        logger.info(f"{len(speakers)} voix")
+    except Exception as e:
+        logger.error(f"Erreur lors de la liste des voix: {e}")
+        sys.exit(1)
+
+def inspect_command(args):
+    """Commande pour afficher le détail d'une voix."""
+    try:
+        bark = StandaloneBark(model_dir=args.model_dir, speaker_store=args.speaker_store)
+        print(json.dumps(bark.speaker_info(args.speaker_id), indent=2, ensure_ascii=False))
+    except Exception as e:
+        logger.error(f"Erreur lors de l'inspection de la voix: {e}")
+        sys.exit(1)
+
+def delete_command(args):
+    """Commande pour supprimer des voix de la bibliothèque."""
+    try:
+        bark = StandaloneBark(model_dir=args.model_dir, speaker_store=args.speaker_store)
+        missing = [speaker_id for speaker_id in args.speaker_ids if not bark.delete_speaker(speaker_id)]
+        if missing:
+            logger.error(f"Voix introuvable(s): {', '.join(missing)}")
+            sys.exit(1)
+    except Exception as e:
+        logger.error(f"Erreur lors de la suppression des voix: {e}")
+        sys.exit(1)
+
+def serve_command(args):
+    """Commande pour démarrer le serveur de synthèse persistant."""
+    try:
+        from src.server import BarkEngine, StubEngine, serve
+        
+        workers = args.workers
+        if args.stub:
+            engine = StubEngine()
+        else:
+            bark = StandaloneBark(**_bark_options(args))
+            scheduler = None
+            if args.max_batch_size > 1:
+                from src.scheduler import MicroBatchScheduler
+                scheduler = MicroBatchScheduler(bark, max_batch_size=args.max_batch_size, max_wait_ms=args.batch_wait_ms)
+                # Il faut au moins autant de threads que de requêtes par lot pour remplir les lots
+                workers = max(workers, args.max_batch_size)
+            engine = BarkEngine(bark, scheduler=scheduler)
+        serve(
+            engine,
+            host=args.host,
+            port=args.port,
+            unix_socket=args.unix_socket,
+            max_queue=args.max_queue,
+            workers=workers
+        )
+    except Exception as e:
+        logger.error(f"Erreur du serveur de synthèse: {e}")
+        sys.exit(1)
+
+def precision_report_command(args):
+    """Commande pour comparer la vitesse et la qualité des précisions d'inférence."""
+    try:
+        from src.precision_report import format_report, run_precision_report
+        
+        prompts = None
+        if args.prompts_file:
+            with open(args.prompts_file, 'r', encoding='utf-8') as f:
+                prompts = json.load(f)
+        
+        report = run_precision_report(
+            speaker_id=args.speaker_id,
+            model_dir=args.model_dir,
+            prompts=prompts,
+            precisions=args.precisions.split(","),
+            temperature=args.temperature,
+            seed=args.seed,
+            model_size=args.model_size
+        )
+        print(format_report(report))
+        
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            logger.info(f"Rapport enregistré dans: {args.output}")
+            
+    except Exception as e:
+        logger.error(f"Erreur lors de la comparaison des précisions: {e}")
+        sys.exit(1)
+
 def main():
     """Fonction principale pour l'interface en ligne de commande."""
     
@@ -114,7 +466,10 @@ def main():
     extract_parser = subparsers.add_parser("extract", help="Extraire l'identité vocale d'un fichier audio")
     extract_parser.add_argument("--audio", required=True, help="Fichier audio de référence")
     extract_parser.add_argument("--speaker-id", help="Identifiant du locuteur (optionnel)")
+    extract_parser.add_argument("--transcript", help="Transcription de l'audio (utilisée si HuBERT n'est pas installé)")
     extract_parser.add_argument("--model-dir", help="Répertoire des modèles (optionnel)")
+    _add_model_options(extract_parser)
+    _add_profile_options(extract_parser)
     
     # Sous-commande pour générer de l'audio
     generate_parser = subparsers.add_parser("generate", help="Générer de l'audio à partir d'un texte")
@@ -125,6 +480,14 @@ def main():
     generate_parser.add_argument("--language", default="en", help="Code de langue (en, fr, etc.)")
     generate_parser.add_argument("--temperature", type=float, default=0.7, help="Température (0.5-1.0)")
     generate_parser.add_argument("--model-dir", help="Répertoire des modèles (optionnel)")
+    _add_model_options(generate_parser)
+    _add_limit_options(generate_parser)
+    _add_output_options(generate_parser)
+    _add_profile_options(generate_parser)
+    _add_seed_options(generate_parser)
+    generate_parser.add_argument("--semantic-cache-dir", help="Répertoire du cache des tokens sémantiques (optionnel)")
+    generate_parser.add_argument("--stream", action="store_true",
+                            help="Générer phrase par phrase et écrire l'audio au fur et à mesure (textes longs)")
     
     # Sous-commande pour générer de l'audio avec émotion
     emotion_parser = subparsers.add_parser("emotion", help="Générer de l'audio avec une émotion spécifiée")
@@ -137,6 +500,12 @@ def main():
                             help="Émotion à exprimer")
     emotion_parser.add_argument("--temperature", type=float, default=0.7, help="Température (0.5-1.0)")
     emotion_parser.add_argument("--model-dir", help="Répertoire des modèles (optionnel)")
+    _add_model_options(emotion_parser)
+    _add_limit_options(emotion_parser)
+    _add_output_options(emotion_parser)
+    _add_profile_options(emotion_parser)
+    _add_seed_options(emotion_parser)
+    emotion_parser.add_argument("--semantic-cache-dir", help="Répertoire du cache des tokens sémantiques (optionnel)")
     
     # Sous-commande pour la génération multilingue
     multilingual_parser = subparsers.add_parser("multilingual", help="Générer de l'audio dans plusieurs langues")
@@ -146,6 +515,103 @@ def main():
     multilingual_parser.add_argument("--output-dir", help="Répertoire de sortie (optionnel)")
     multilingual_parser.add_argument("--temperature", type=float, default=0.7, help="Température (0.5-1.0)")
     multilingual_parser.add_argument("--model-dir", help="Répertoire des modèles (optionnel)")
+    _add_model_options(multilingual_parser)
+    _add_limit_options(multilingual_parser)
+    _add_output_options(multilingual_parser)
+    _add_profile_options(multilingual_parser)
+    multilingual_parser.add_argument("--semantic-cache-dir", help="Répertoire du cache des tokens sémantiques (optionnel)")
+    multilingual_parser.add_argument("--workers", type=int, default=1, help="Nombre de processus de génération (CPU)")
+    multilingual_parser.add_argument("--threads-per-worker", type=int, help="Threads torch par processus (par défaut : cœurs / processus)")
+    
+    # Sous-commande pour la génération par lots
+    batch_parser = subparsers.add_parser("batch", help="Générer de l'audio pour de nombreux textes par lots")
+    batch_parser.add_argument("--texts-file", required=True, help="Fichier JSON contenant une liste de textes (ou un dictionnaire nom -> texte)")
+    batch_parser.add_argument("--speaker-id", help="Identifiant du locuteur (optionnel)")
+    batch_parser.add_argument("--audio", help="Fichier audio de référence (alternative à speaker-id)")
+    batch_parser.add_argument("--output-dir", help="Répertoire de sortie (optionnel)")
+    batch_parser.add_argument("--batch-size", type=int, default=8, help="Nombre de textes générés par lot")
+    batch_parser.add_argument("--temperature", type=float, default=0.7, help="Température (0.5-1.0)")
+    batch_parser.add_argument("--model-dir", help="Répertoire des modèles (optionnel)")
+    _add_model_options(batch_parser)
+    _add_limit_options(batch_parser)
+    _add_output_options(batch_parser)
+    _add_profile_options(batch_parser)
+    batch_parser.add_argument("--semantic-cache-dir", help="Répertoire du cache des tokens sémantiques (optionnel)")
+    batch_parser.add_argument("--workers", type=int, default=1, help="Nombre de processus de génération (CPU)")
+    batch_parser.add_argument("--threads-per-worker", type=int, help="Threads torch par processus (par défaut : cœurs / processus)")
+    
+    # Sous-commande pour nettoyer les prompts temporaires
+    gc_parser = subparsers.add_parser("gc", help="Supprimer les prompts vocaux temporaires inutilisés")
+    gc_parser.add_argument("--max-age-hours", type=float, default=24.0,
+                            help="Supprimer les prompts inutilisés depuis plus de N heures")
+    gc_parser.add_argument("--max-total-mb", type=float, help="Taille totale maximale des prompts temporaires (Mo)")
+    gc_parser.add_argument("--dry-run", action="store_true", help="Lister les fichiers sans les supprimer")
+    gc_parser.add_argument("--model-dir", help="Répertoire des modèles (optionnel)")
+    gc_parser.add_argument("--speaker-store", choices=SPEAKER_STORES, default="files", help="Stockage des voix: un fichier npz par voix, ou magasin compact (packed)")
+    
+    # Sous-commande pour le magasin compact des voix
+    store_parser = subparsers.add_parser("store", help="Gérer le magasin compact des voix (import, export, compactage)")
+    store_parser.add_argument("action", choices=["import", "export", "compact", "stats"], help="Opération à effectuer")
+    store_parser.add_argument("--dir", help="Répertoire des fichiers npz à importer ou exporter (speaker_embeddings/ par défaut)")
+    store_parser.add_argument("--speaker-ids", help="Voix à exporter, séparées par des virgules (toutes par défaut)")
+    store_parser.add_argument("--overwrite", action="store_true", help="Remplacer les voix déjà présentes lors de l'import")
+    store_parser.add_argument("--model-dir", help="Répertoire des modèles (optionnel)")
+    
+    # Sous-commande pour l'extraction en masse
+    bulk_parser = subparsers.add_parser("extract-bulk", help="Extraire les voix d'un répertoire de clips ou d'un manifeste CSV/JSONL")
+    bulk_parser.add_argument("source", help="Répertoire de clips audio, ou manifeste .csv/.jsonl (colonnes audio, speaker_id, transcript)")
+    bulk_parser.add_argument("--workers", type=int, default=4, help="Nombre d'extractions simultanées")
+    bulk_parser.add_argument("--executor", choices=["thread", "process"], default="thread",
+                            help="Extraire dans des threads (modèles partagés) ou des processus (un jeu de modèles chacun)")
+    bulk_parser.add_argument("--id-from", choices=["content", "stem"], default="content",
+                            help="Identifiant des clips sans speaker_id: empreinte du contenu ou nom du fichier")
+    bulk_parser.add_argument("--summary", help="Manifeste de synthèse JSONL (speaker_embeddings/extract_manifest.jsonl par défaut)")
+    bulk_parser.add_argument("--overwrite", action="store_true", help="Réextraire les clips déjà extraits")
+    bulk_parser.add_argument("--model-dir", help="Répertoire des modèles (optionnel)")
+    _add_model_options(bulk_parser)
+    
+    # Sous-commandes de gestion de la bibliothèque de voix
+    list_parser = subparsers.add_parser("list", help="Lister les voix de la bibliothèque")
+    list_parser.add_argument("--json", action="store_true", help="Afficher la liste en JSON")
+    inspect_parser = subparsers.add_parser("inspect", help="Afficher le détail d'une voix")
+    inspect_parser.add_argument("speaker_id", help="Identifiant du locuteur")
+    delete_parser = subparsers.add_parser("delete", help="Supprimer des voix de la bibliothèque")
+    delete_parser.add_argument("speaker_ids", nargs="+", help="Identifiants des locuteurs")
+    for library_parser in (list_parser, inspect_parser, delete_parser):
+        library_parser.add_argument("--model-dir", help="Répertoire des modèles (optionnel)")
+        library_parser.add_argument("--speaker-store", choices=SPEAKER_STORES, default="files", help="Stockage des voix: un fichier npz par voix, ou magasin compact (packed)")
+    
+    # Sous-commande pour le serveur de synthèse
+    serve_parser = subparsers.add_parser("serve", help="Démarrer un serveur de synthèse local (modèles gardés en mémoire)")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Adresse d'écoute")
+    serve_parser.add_argument("--port", type=int, default=8765, help="Port d'écoute")
+    serve_parser.add_argument("--unix-socket", help="Écouter sur une socket Unix plutôt qu'un port TCP")
+    serve_parser.add_argument("--max-queue", type=int, default=16, help="Nombre maximal de requêtes en attente")
+    serve_parser.add_argument("--workers", type=int, default=1, help="Nombre de threads de synthèse")
+    serve_parser.add_argument("--max-batch-size", type=int, default=1, help="Regrouper jusqu'à N requêtes concurrentes par lot (1 = désactivé)")
+    serve_parser.add_argument("--batch-wait-ms", type=float, default=20.0, help="Latence maximale ajoutée pour remplir un lot (ms)")
+    serve_parser.add_argument("--stub", action="store_true", help="Utiliser un moteur factice (tests, sans modèles)")
+    serve_parser.add_argument("--model-dir", help="Répertoire des modèles (optionnel)")
+    _add_model_options(serve_parser)
+    _add_limit_options(serve_parser)
+    serve_parser.add_argument("--semantic-cache-dir", help="Répertoire du cache des tokens sémantiques (optionnel)")
+    serve_parser.add_argument("--idle-offload-s", type=float, help="Libérer un modèle inutilisé depuis N secondes (jamais par défaut)")
+    serve_parser.add_argument("--output-cache-dir", help="Répertoire du cache de l'audio généré avec graine (optionnel)")
+    serve_parser.add_argument("--output-cache-max-mb", type=float, help="Taille maximale du cache de l'audio généré (Mo)")
+    serve_parser.add_argument("--sample-rate", type=int, help="Fréquence d'échantillonnage de l'audio renvoyé (24000 Hz par défaut)")
+    serve_parser.add_argument("--target-lufs", type=float, help="Normaliser la sonie de l'audio renvoyé (LUFS)")
+    serve_parser.add_argument("--offload-mode", choices=OFFLOAD_MODES, default="unload", help="Libération par déchargement ou par copie CPU projetée en mémoire (mmap)")
+    
+    # Sous-commande pour comparer les précisions d'inférence
+    report_parser = subparsers.add_parser("precision-report", help="Comparer vitesse et qualité des précisions fp32/bf16/int8")
+    report_parser.add_argument("--speaker-id", required=True, help="Identifiant du locuteur")
+    report_parser.add_argument("--prompts-file", help="Fichier JSON contenant une liste de textes (jeu par défaut sinon)")
+    report_parser.add_argument("--precisions", default=",".join(SUPPORTED_PRECISIONS), help="Précisions à comparer, séparées par des virgules")
+    report_parser.add_argument("--temperature", type=float, default=0.7, help="Température (0.5-1.0)")
+    report_parser.add_argument("--seed", type=int, default=0, help="Graine aléatoire")
+    report_parser.add_argument("--output", help="Fichier JSON où enregistrer le rapport (optionnel)")
+    report_parser.add_argument("--model-dir", help="Répertoire des modèles (optionnel)")
+    report_parser.add_argument("--model-size", default="large", help="Taille des modèles comparés (large, small ou par étape)")
     
     # Analyser les arguments
     args = parser.parse_args()
@@ -159,6 +625,24 @@ def main():
         emotion_command(args)
     elif args.command == "multilingual":
         multilingual_command(args)
+    elif args.command == "batch":
+        batch_command(args)
+    elif args.command == "gc":
+        gc_command(args)
+    elif args.command == "store":
+        store_command(args)
+    elif args.command == "extract-bulk":
+        extract_bulk_command(args)
+    elif args.command == "list":
+        list_command(args)
+    elif args.command == "inspect":
+        inspect_command(args)
+    elif args.command == "delete":
+        delete_command(args)
+    elif args.command == "serve":
+        serve_command(args)
+    elif args.command == "precision-report":
+        precision_report_command(args)
     else:
         parser.print_help()
         
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Génération Bark par lots.
+
+Réimplémente les étapes texte→sémantique, sémantique→coarse, coarse→fine et
+le décodage EnCodec de bark.generation pour traiter plusieurs textes d'un même
+locuteur en une seule passe de modèle par pas de décodage. La logique suit
+celle de Bark pas à pas ; seules les dimensions de lot changent.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from src.generation_control import generation_step
+from src.kv_cache import CachedDecoder
+from src.profiling import profile_stage
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _model_device(model) -> torch.device:
+    return next(model.parameters()).device
+
+
+def generate_text_semantic_batch(
+    models: Dict[str, Any],
+    texts: List[str],
+    history_prompt: Optional[Any] = None,
+    temp: float = 0.7,
+    min_eos_p: float = 0.2,
+    max_gen_duration_s: Optional[float] = None,
+    kv_cache: str = "static",
+) -> List[np.ndarray]:
+    """
+    Génère les tokens sémantiques de plusieurs textes en un seul lot.
+
+    Args:
+        models: Modèles Bark chargés (voir model_registry.LoadedModels.models).
+        texts: Textes à prononcer.
+        history_prompt: Prompt vocal commun à tous les textes.
+        temp: Température d'échantillonnage.
+        min_eos_p: Probabilité de fin de séquence à partir de laquelle on s'arrête.
+        max_gen_duration_s: Durée maximale générée par texte.
+        kv_cache: Mode du cache clés/valeurs (voir src.kv_cache).
+
+    Returns:
+        Un tableau de tokens sémantiques par texte.
+    """
+    from bark import generation as g
+
+    model = models["text"]["model"]
+    device = _model_device(model)
+
+    x = torch.from_numpy(semantic_prefix(models["text"]["tokenizer"], texts, history_prompt))
+    batch_size = len(texts)
+    n_prefix = x.shape[1]
+    n_tot_steps = 768
+    if max_gen_duration_s is not None:
+        # La boucle s'arrête au premier pas dépassant la durée maximale
+        n_tot_steps = min(n_tot_steps, int(np.floor(max_gen_duration_s * g.SEMANTIC_RATE_HZ)) + 1)
+    lengths = np.full(batch_size, -1)
+
+    # Le préfixe fusionné occupe n_prefix - 256 positions
+    decoder = CachedDecoder(model, kv_cache, max_len=n_prefix - 256 + n_tot_steps, merge_context=True)
+    with g._inference_mode():
+        x = x.to(device)
+        for n in range(n_tot_steps):
+            generation_step("text", n, n_tot_steps)
+            logits = decoder(x)
+            relevant_logits = torch.cat(
+                (logits[:, 0, :g.SEMANTIC_VOCAB_SIZE], logits[:, 0, [g.SEMANTIC_PAD_TOKEN]]),  # eos
+                dim=-1,
+            )
+            probs = F.softmax(relevant_logits / temp, dim=-1)
+            item_next = torch.multinomial(probs, num_samples=1)
+
+            is_eos = (item_next[:, 0] == g.SEMANTIC_VOCAB_SIZE)
+            if min_eos_p is not None:
+                is_eos |= probs[:, -1] >= min_eos_p
+            is_eos = is_eos.cpu().numpy()
+            lengths[(lengths < 0) & is_eos] = n
+            if (lengths >= 0).all():
+                break
+
+            x = torch.cat((x, item_next), dim=1)
+            if max_gen_duration_s is not None and (n + 1) / g.SEMANTIC_RATE_HZ > max_gen_duration_s:
+                break
+        lengths[lengths < 0] = x.shape[1] - n_prefix
+        out = x.detach().cpu().numpy()[:, n_prefix:]
+
+    g._clear_cuda_cache()
+    return [out[i, :lengths[i]] for i in range(batch_size)]
+
+
+def semantic_prefix(tokenizer: Any, texts: List[str], history_prompt: Optional[Any] = None) -> np.ndarray:
+    """
+    Construit l'entrée du modèle sémantique pour plusieurs textes.
+
+    Chaque ligne contient les 256 tokens du texte, les 256 derniers tokens
+    sémantiques du prompt vocal et le token d'inférence, comme dans Bark.
+    """
+    from bark import generation as g
+
+    encoded = []
+    for text in texts:
+        text = g._normalize_whitespace(text)
+        tokens = np.array(g._tokenize(tokenizer, text)) + g.TEXT_ENCODING_OFFSET
+        if len(tokens) > 256:
+            p = round((len(tokens) - 256) / len(tokens) * 100, 1)
+            logger.warning(f"Texte trop long, {p}% de la fin est ignoré")
+            tokens = tokens[:256]
+        encoded.append(np.pad(tokens, (0, 256 - len(tokens)), constant_values=g.TEXT_PAD_TOKEN, mode="constant"))
+
+    if history_prompt is not None:
+        semantic_history = g._load_history_prompt(history_prompt)["semantic_prompt"].astype(np.int64)[-256:]
+        semantic_history = np.pad(
+            semantic_history,
+            (0, 256 - len(semantic_history)),
+            constant_values=g.SEMANTIC_PAD_TOKEN,
+            mode="constant",
+        )
+    else:
+        semantic_history = np.array([g.SEMANTIC_PAD_TOKEN] * 256)
+
+    return np.stack([
+        np.hstack([tokens, semantic_history, np.array([g.SEMANTIC_INFER_TOKEN])])
+        for tokens in encoded
+    ]).astype(np.int64)
+
+
+def generate_coarse_batch(
+    models: Dict[str, Any],
+    semantic_tokens: List[np.ndarray],
+    history_prompt: Optional[Any] = None,
+    temp: float = 0.7,
+    max_coarse_history: int = 630,
+    sliding_window_len: int = 60,
+    kv_cache: str = "static",
+) -> List[np.ndarray]:
+    """
+    Génère les codes coarse de plusieurs séquences sémantiques en un seul lot.
+
+    Les séquences plus courtes sont complétées à droite par le token de
+    remplissage de Bark ; les pas générés au-delà de leur longueur sont ignorés.
+
+    Args:
+        models: Modèles Bark chargés.
+        semantic_tokens: Tokens sémantiques de chaque élément (non vides).
+        history_prompt: Prompt vocal commun à tous les éléments.
+        temp: Température d'échantillonnage.
+        max_coarse_history: Contexte coarse maximal (entre 60 et 630).
+        sliding_window_len: Nombre de pas par fenêtre glissante.
+        kv_cache: Mode du cache clés/valeurs (voir src.kv_cache).
+
+    Returns:
+        Un tableau de codes coarse (2, T) par élément.
+    """
+    from bark import generation as g
+
+    assert 60 <= max_coarse_history <= 630
+    assert max_coarse_history + sliding_window_len <= 1024 - 256
+    semantic_to_coarse_ratio = g.COARSE_RATE_HZ / g.SEMANTIC_RATE_HZ * g.N_COARSE_CODEBOOKS
+    max_semantic_history = int(np.floor(max_coarse_history / semantic_to_coarse_ratio))
+
+    if history_prompt is not None:
+        history_prompt = g._load_history_prompt(history_prompt)
+        x_semantic_history = history_prompt["semantic_prompt"]
+        x_coarse_history = g._flatten_codebooks(history_prompt["coarse_prompt"]) + g.SEMANTIC_VOCAB_SIZE
+        # Découper les historiques comme le fait Bark
+        n_semantic_hist_provided = np.min([
+            max_semantic_history,
+            len(x_semantic_history) - len(x_semantic_history) % 2,
+            int(np.floor(len(x_coarse_history) / semantic_to_coarse_ratio)),
+        ])
+        n_coarse_hist_provided = int(round(n_semantic_hist_provided * semantic_to_coarse_ratio))
+        x_semantic_history = x_semantic_history[-n_semantic_hist_provided:].astype(np.int32)
+        x_coarse_history = x_coarse_history[-n_coarse_hist_provided:].astype(np.int32)
+        x_coarse_history = x_coarse_history[:-2]
+    else:
+        x_semantic_history = np.array([], dtype=np.int32)
+        x_coarse_history = np.array([], dtype=np.int32)
+
+    model = models["coarse"]
+    device = _model_device(model)
+
+    item_n_steps = [
+        int(round(np.floor(len(tokens) * semantic_to_coarse_ratio / g.N_COARSE_CODEBOOKS) * g.N_COARSE_CODEBOOKS))
+        for tokens in semantic_tokens
+    ]
+    n_steps = max(item_n_steps)
+    batch_size = len(semantic_tokens)
+
+    max_len = max(len(tokens) for tokens in semantic_tokens)
+    x_semantic = np.full((batch_size, len(x_semantic_history) + max_len), g.COARSE_SEMANTIC_PAD_TOKEN, dtype=np.int32)
+    for i, tokens in enumerate(semantic_tokens):
+        x_semantic[i, :len(x_semantic_history) + len(tokens)] = np.hstack([x_semantic_history, tokens])
+    x_coarse = np.tile(x_coarse_history.astype(np.int32), (batch_size, 1))
+    base_semantic_idx = len(x_semantic_history)
+
+    # Chaque fenêtre est recalculée depuis son préfixe (256 tokens sémantiques,
+    # token d'inférence, historique coarse), comme dans Bark : le cache est vidé
+    # à chaque fenêtre mais ses tampons, dimensionnés pour une fenêtre, sont réutilisés
+    window_len = 256 + 1 + min(max_coarse_history, len(x_coarse_history) + n_steps) + sliding_window_len
+    decoder = CachedDecoder(model, kv_cache, max_len=window_len)
+    with g._inference_mode():
+        x_semantic_in = torch.from_numpy(x_semantic).to(device)
+        x_coarse_in = torch.from_numpy(x_coarse).to(device)
+        infer_token = torch.full((batch_size, 1), g.COARSE_INFER_TOKEN, dtype=x_semantic_in.dtype, device=device)
+        n_window_steps = int(np.ceil(n_steps / sliding_window_len))
+        n_step = 0
+        for _ in range(n_window_steps):
+            semantic_idx = base_semantic_idx + int(round(n_step / semantic_to_coarse_ratio))
+            x_in = x_semantic_in[:, np.max([0, semantic_idx - max_semantic_history]):]
+            x_in = x_in[:, :256]
+            x_in = F.pad(x_in, (0, 256 - x_in.shape[-1]), "constant", g.COARSE_SEMANTIC_PAD_TOKEN)
+            x_in = torch.hstack([x_in, infer_token, x_coarse_in[:, -max_coarse_history:]])
+            decoder.reset()
+            for _ in range(sliding_window_len):
+                if n_step >= n_steps:
+                    continue
+                generation_step("coarse", n_step, n_steps)
+                is_major_step = n_step % g.N_COARSE_CODEBOOKS == 0
+                logits = decoder(x_in)
+                logit_start_idx = g.SEMANTIC_VOCAB_SIZE + (1 - int(is_major_step)) * g.CODEBOOK_SIZE
+                logit_end_idx = g.SEMANTIC_VOCAB_SIZE + (2 - int(is_major_step)) * g.CODEBOOK_SIZE
+                probs = F.softmax(logits[:, 0, logit_start_idx:logit_end_idx] / temp, dim=-1)
+                item_next = torch.multinomial(probs, num_samples=1).to(x_in.dtype) + logit_start_idx
+                x_coarse_in = torch.cat((x_coarse_in, item_next), dim=1)
+                x_in = torch.cat((x_in, item_next), dim=1)
+                n_step += 1
+            del x_in
+        gen_coarse = x_coarse_in.detach().cpu().numpy()[:, len(x_coarse_history):]
+
+    results = []
+    for i in range(batch_size):
+        arr = gen_coarse[i, :item_n_steps[i]].reshape(-1, g.N_COARSE_CODEBOOKS).T - g.SEMANTIC_VOCAB_SIZE
+        for n in range(1, g.N_COARSE_CODEBOOKS):
+            arr[n, :] -= n * g.CODEBOOK_SIZE
+        results.append(arr)
+    g._clear_cuda_cache()
+    return results
+
+
+def generate_fine_batch(
+    models: Dict[str, Any],
+    coarse_tokens: List[np.ndarray],
+    history_prompt: Optional[Any] = None,
+    temp: float = 0.5,
+) -> List[np.ndarray]:
+    """
+    Génère les codes fine de plusieurs séquences coarse en un seul lot.
+
+    Args:
+        models: Modèles Bark chargés.
+        coarse_tokens: Codes coarse (2, T) de chaque élément.
+        history_prompt: Prompt vocal commun à tous les éléments.
+        temp: Température d'échantillonnage (None pour argmax).
+
+    Returns:
+        Un tableau de codes fine (8, T) par élément.
+    """
+    from bark import generation as g
+
+    if history_prompt is not None:
+        x_fine_history = g._load_history_prompt(history_prompt)["fine_prompt"].astype(np.int32)[:, -512:]
+        n_history = x_fine_history.shape[1]
+    else:
+        x_fine_history = None
+        n_history = 0
+
+    model = models["fine"]
+    device = _model_device(model)
+    n_coarse = coarse_tokens[0].shape[0]
+    lengths = [tokens.shape[1] for tokens in coarse_tokens]
+    max_len = max(lengths)
+
+    # Tableau d'entrée (B, 8, T) complété par le token de remplissage CODEBOOK_SIZE
+    total_len = max(n_history + max_len, 1024)
+    in_arr = np.full((len(coarse_tokens), g.N_FINE_CODEBOOKS, total_len), g.CODEBOOK_SIZE, dtype=np.int32)
+    for i, tokens in enumerate(coarse_tokens):
+        if x_fine_history is not None:
+            in_arr[i, :, :n_history] = x_fine_history
+        in_arr[i, :n_coarse, n_history:n_history + tokens.shape[1]] = tokens
+
+    n_loops = np.max([0, int(np.ceil((max_len - (1024 - n_history)) / 512))]) + 1
+    with g._inference_mode():
+        in_arr = torch.tensor(in_arr.transpose(0, 2, 1)).to(device)
+        for n in range(n_loops):
+            generation_step("fine", n, n_loops)
+            start_idx = np.min([n * 512, in_arr.shape[1] - 1024])
+            start_fill_idx = np.min([n_history + n * 512, in_arr.shape[1] - 512])
+            rel_start_fill_idx = start_fill_idx - start_idx
+            in_buffer = in_arr[:, start_idx:start_idx + 1024, :]
+            for nn in range(n_coarse, g.N_FINE_CODEBOOKS):
+                logits = model(nn, in_buffer)
+                relevant_logits = logits[:, rel_start_fill_idx:, :g.CODEBOOK_SIZE]
+                if temp is None:
+                    codebook_preds = torch.argmax(relevant_logits, -1)
+                else:
+                    probs = F.softmax(relevant_logits / temp, dim=-1)
+                    codebook_preds = torch.multinomial(
+                        probs.reshape(-1, probs.shape[-1]), num_samples=1
+                    ).reshape(probs.shape[:2])
+                in_buffer[:, rel_start_fill_idx:, nn] = codebook_preds.to(in_buffer.dtype)
+                del logits, codebook_preds
+            in_arr[:, start_fill_idx:start_fill_idx + (1024 - rel_start_fill_idx), n_coarse:] = \
+                in_buffer[:, rel_start_fill_idx:, n_coarse:]
+            del in_buffer
+        gen_fine = in_arr.detach().cpu().numpy().transpose(0, 2, 1)
+
+    g._clear_cuda_cache()
+    return [gen_fine[i, :, n_history:n_history + lengths[i]] for i in range(len(coarse_tokens))]
+
+
+def codec_decode_batch(models: Dict[str, Any], fine_tokens: List[np.ndarray]) -> List[np.ndarray]:
+    """
+    Décode plusieurs séquences de codes fine avec EnCodec en un seul lot.
+
+    Args:
+        models: Modèles Bark chargés.
+        fine_tokens: Codes fine (8, T) de chaque élément.
+
+    Returns:
+        Un signal audio à 24 kHz par élément.
+    """
+    from bark import generation as g
+
+    model = models["codec"]
+    device = _model_device(model)
+    hop_length = g.SAMPLE_RATE // g.COARSE_RATE_HZ
+    lengths = [tokens.shape[1] for tokens in fine_tokens]
+
+    arr = np.zeros((len(fine_tokens), fine_tokens[0].shape[0], max(lengths)), dtype=np.int64)
+    for i, tokens in enumerate(fine_tokens):
+        arr[i, :, :tokens.shape[1]] = tokens
+
+    with torch.inference_mode():
+        arr = torch.from_numpy(arr).to(device).transpose(0, 1)
+        emb = model.quantizer.decode(arr)
+        out = model.decoder(emb)
+        audio = out.detach().cpu().numpy()[:, 0, :]
+
+    return [audio[i, :lengths[i] * hop_length] for i in range(len(fine_tokens))]
+
+
+def semantic_to_waveform_batch(
+    models: Dict[str, Any],
+    semantic_tokens: List[np.ndarray],
+    history_prompt: Optional[Any] = None,
+    temp: float = 0.7,
+    silence_codes: Optional[np.ndarray] = None,
+) -> List[np.ndarray]:
+    """
+    Équivalent par lots de bark.api.semantic_to_waveform.
+
+    Args:
+        models: Modèles Bark chargés.
+        semantic_tokens: Tokens sémantiques de chaque élément.
+        history_prompt: Prompt vocal commun à tous les éléments.
+        temp: Température de l'étape coarse.
+        silence_codes: Codes EnCodec du silence (voir src.generation_limits) ;
+            le silence final de chaque élément est coupé avant l'étape fine.
+
+    Returns:
+        Un signal audio à 24 kHz par élément, dans l'ordre.
+    """
+    # Un texte peut produire une séquence vide si la fin est prédite immédiatement
+    valid = [i for i, tokens in enumerate(semantic_tokens) if len(tokens) > 0]
+    audio = [np.zeros(0, dtype=np.float32) for _ in semantic_tokens]
+    if not valid:
+        return audio
+
+    with profile_stage("coarse") as timer:
+        coarse = generate_coarse_batch(models, [semantic_tokens[i] for i in valid], history_prompt=history_prompt, temp=temp)
+        timer.tokens = sum(tokens.size for tokens in coarse)
+    if silence_codes is not None:
+        from src.generation_limits import trim_trailing_silence
+        coarse = [trim_trailing_silence(tokens, silence_codes) for tokens in coarse]
+    with profile_stage("fine") as timer:
+        fine = generate_fine_batch(models, coarse, history_prompt=history_prompt, temp=0.5)
+        timer.tokens = sum(f.size - c.size for f, c in zip(fine, coarse))
+    with profile_stage("codec"):
+        waveforms = codec_decode_batch(models, fine)
+    for i, waveform in zip(valid, waveforms):
+        audio[i] = waveform
+    return audio
+
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Extraction en masse de voix depuis un répertoire de clips ou un manifeste.
+
+Les clips sont lus depuis un répertoire (recherche récursive des fichiers
+audio) ou un manifeste CSV / JSONL (colonnes audio, speaker_id et transcript
+optionnels). Chaque clip est identifié par l'empreinte de son contenu : un
+clip déjà extrait sous le même identifiant est ignoré. Le manifeste de
+synthèse (JSONL) garde pour chaque voix le clip et l'empreinte d'origine ;
+il sert aussi de référence aux exécutions suivantes.
+"""
+
+import os
+import csv
+import json
+import time
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from src.speaker_library import content_speaker_id
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg", ".mp3")
+
+# Manifeste de synthèse par défaut, dans le répertoire des voix
+SUMMARY_FILE = "extract_manifest.jsonl"
+
+ID_SOURCES = ("content", "stem")
+
+# Intervalle minimal entre deux messages de progression
+_PROGRESS_INTERVAL_S = 2.0
+
+
+class ExtractionItem(NamedTuple):
+    """Un clip à extraire."""
+    audio_file: str
+    speaker_id: Optional[str] = None
+    transcript: Optional[str] = None
+
+
+def scan_directory(directory: str) -> List[ExtractionItem]:
+    """Liste récursivement les fichiers audio d'un répertoire."""
+    items = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                items.append(ExtractionItem(os.path.join(root, name)))
+    return sorted(items)
+
+
+def read_manifest(path: str) -> List[ExtractionItem]:
+    """
+    Lit un manifeste CSV ou JSONL.
+
+    Chaque ligne donne le chemin du clip (colonne "audio"), et éventuellement
+    "speaker_id" et "transcript". Les chemins relatifs sont résolus par
+    rapport au répertoire du manifeste.
+
+    Raises:
+        ValueError: Si une ligne n'indique pas de fichier audio.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    items = []
+    for line_number, row in enumerate(rows, start=1):
+        audio = row.get("audio") or row.get("audio_file")
+        if not audio:
+            raise ValueError(f"{path}, ligne {line_number}: colonne \"audio\" manquante")
+        items.append(ExtractionItem(
+            os.path.join(base_dir, audio),
+            row.get("speaker_id") or None,
+            row.get("transcript") or None,
+        ))
+    return items
+
+
+def load_items(source: str) -> List[ExtractionItem]:
+    """Clips d'un répertoire ou d'un manifeste (.csv, .jsonl)."""
+    if os.path.isdir(source):
+        return scan_directory(source)
+    return read_manifest(source)
+
+
+def _load_summary(path: str) -> Dict[str, Dict[str, Any]]:
+    """Dernier enregistrement de chaque voix dans un manifeste de synthèse existant."""
+    records: Dict[str, Dict[str, Any]] = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                records[record["speaker_id"]] = record
+    return records
+
+
+def _write_summary(path: str, records: Dict[str, Dict[str, Any]]):
+    """Écrit le manifeste de synthèse de façon atomique."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for speaker_id in sorted(records):
+            f.write(json.dumps(records[speaker_id], ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+
+
+def extract_bulk(
+    bark,
+    items: List[ExtractionItem],
+    workers: int = 4,
+    pool=None,
+    id_from: str = "content",
+    summary_path: Optional[str] = None,
+    overwrite: bool = False,
+) -> Dict[str, Any]:
+    """
+    Extrait les voix d'une liste de clips en parallèle.
+
+    Args:
+        bark: Instance de StandaloneBark (bibliothèque de voix, et extraction
+            dans des threads si aucun pool n'est fourni).
+        items: Clips à extraire.
+        workers: Nombre de threads d'extraction (sans pool).
+        pool: BarkWorkerPool optionnel réalisant les extractions dans ses processus.
+        id_from: Identifiant des clips sans speaker_id : "content" (empreinte
+            du contenu, clip_...) ou "stem" (nom du fichier sans extension).
+        summary_path: Manifeste de synthèse (speaker_embeddings/extract_manifest.jsonl par défaut).
+        overwrite: Réextraire même les clips déjà extraits.
+
+    Returns:
+        Les totaux : clips, extraits, ignorés, en échec, durée et débit.
+    """
+    if id_from not in ID_SOURCES:
+        raise ValueError(f"Source d'identifiant inconnue: {id_from} (valeurs possibles: {', '.join(ID_SOURCES)})")
+    summary_path = summary_path or os.path.join(bark.speaker_embeddings_dir, SUMMARY_FILE)
+    previous = _load_summary(summary_path)
+    params = bark._extraction_params()
+    start = time.perf_counter()
+
+    # Empreintes des clips (lecture seule des fichiers, en parallèle)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        content_ids = list(executor.map(
+            lambda item: content_speaker_id(item.audio_file, params) if os.path.exists(item.audio_file) else None,
+            items,
+        ))
+
+    records: Dict[str, Dict[str, Any]] = {}
+    requests: List[Dict[str, Any]] = []
+    for item, content_id in zip(items, content_ids):
+        if item.speaker_id:
+            speaker_id = item.speaker_id
+        elif id_from == "stem":
+            speaker_id = os.path.splitext(os.path.basename(item.audio_file))[0]
+        else:
+            speaker_id = content_id or os.path.basename(item.audio_file)
+        record = {"speaker_id": speaker_id, "audio_file": item.audio_file, "content_id": content_id}
+
+        if speaker_id in records:
+            # Même identifiant plusieurs fois dans la liste : seul le premier clip compte
+            continue
+        if content_id is None:
+            records[speaker_id] = {**record, "status": "failed", "error": "Fichier audio non trouvé"}
+            continue
+        # Déjà extrait depuis le même contenu : identifiant adressé par le contenu,
+        # ou empreinte enregistrée lors d'une exécution précédente
+        known = previous.get(speaker_id, {}).get("content_id")
+        if not overwrite and bark.has_speaker(speaker_id) and (speaker_id == content_id or known == content_id):
+            records[speaker_id] = {**record, "status": "skipped"}
+            continue
+        requests.append({
+            "audio_file": item.audio_file,
+            "speaker_id": speaker_id,
+            "transcript": item.transcript,
+            "metadata": {"content_id": content_id},
+        })
+        records[speaker_id] = {**record, "status": "pending"}
+
+    skipped = sum(1 for r in records.values() if r["status"] == "skipped")
+    logger.info(f"{len(items)} clip(s) : {len(requests)} à extraire, {skipped} déjà extrait(s)")
+
+    def finished(position: int, error: Optional[str], seconds: Optional[float] = None):
+        record = records[requests[position]["speaker_id"]]
+        record["status"] = "failed" if error else "extracted"
+        if error:
+            record["error"] = error
+        if seconds is not None:
+            record["seconds"] = round(seconds, 3)
+
+    done, last_report = 0, time.perf_counter()
+
+    def progress():
+        nonlocal last_report
+        now = time.perf_counter()
+        if now - last_report >= _PROGRESS_INTERVAL_S or done == len(requests):
+            last_report = now
+            rate = done / max(now - start, 1e-9)
+            logger.info(f"[{done}/{len(requests)}] {rate:.2f} clip(s)/s")
+
+    if pool is not None:
+        for position, _, error in pool.extract_speakers(requests):
+            finished(position, error)
+            done += 1
+            progress()
+    else:
+        bark._load_models()
+
+        def run(request):
+            t0 = time.perf_counter()
+            bark.extract_speaker(**request)
+            return time.perf_counter() - t0
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {executor.submit(run, request): position for position, request in enumerate(requests)}
+            for future in as_completed(futures):
+                try:
+                    finished(futures[future], None, future.result())
+                except Exception as e:
+                    finished(futures[future], f"{type(e).__name__}: {e}")
+                done += 1
+                progress()
+
+    elapsed = time.perf_counter() - start
+    previous.update(records)
+    _write_summary(summary_path, previous)
+
+    counts = {status: sum(1 for r in records.values() if r["status"] == status) for status in ("extracted", "skipped", "failed")}
+    summary = {
+        "clips": len(items),
+        **counts,
+        "seconds": round(elapsed, 2),
+        "clips_per_s": round(counts["extracted"] / elapsed, 3) if elapsed > 0 else None,
+        "summary_path": summary_path,
+    }
+    logger.info(
+        f"Extraction terminée: {counts['extracted']} extraite(s), {counts['skipped']} ignorée(s), "
+        f"{counts['failed']} en échec en {elapsed:.1f} s"
+    )
+    return summary
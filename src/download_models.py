@@ -13,12 +13,14 @@ from pathlib import Path
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def download_bark_models(output_dir=None):
+def download_bark_models(output_dir=None, model_size="large"):
     """
     Télécharge les modèles nécessaires pour Bark Voice Cloning.
     
     Args:
         output_dir: Répertoire de sortie pour les modèles
+        model_size: Taille des modèles à télécharger : "large", "small", "auto",
+            ou par étape ("text=large,coarse=small,fine=small")
     """
     # Définir le répertoire de sortie par défaut si non fourni
     if output_dir is None:
@@ -38,7 +40,14 @@ def download_bark_models(output_dir=None):
         logger.info("Téléchargement des modèles Bark...")
         try:
             from bark import preload_models
-            preload_models()
+            from src.model_sizes import resolve_model_sizes
+            
+            text_size, coarse_size, fine_size = resolve_model_sizes(model_size)
+            preload_models(
+                text_use_small=(text_size == "small"),
+                coarse_use_small=(coarse_size == "small"),
+                fine_use_small=(fine_size == "small")
+            )
             logger.info("Modèles Bark téléchargés avec succès")
         except ImportError:
             logger.error("Bark n'est pas installé. Installez-le d'abord avec 'pip install git+https://github.com/suno-ai/bark.git'")
@@ -87,6 +96,12 @@ def main():
         type=str, 
         help="Répertoire de sortie pour les modèles"
     )
+    parser.add_argument(
+        "--model-size",
+        type=str,
+        default="large",
+        help="Taille des modèles: large, small, auto, ou par étape (text=large,coarse=small,fine=small)"
+    )
     
     args = parser.parse_args()
     
@@ -96,7 +111,7 @@ def main():
         sys.exit(1)
         
     # Télécharger les modèles
-    success = download_bark_models(args.output_dir)
+    success = download_bark_models(args.output_dir, model_size=args.model_size)
     
     if success:
         logger.info("Tous les modèles ont été téléchargés avec succès")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Annulation, délai et progression d'une génération en cours.
+
+Une génération exécutée dans un thread (voir src.async_bark) y installe un
+GenerationControl avec generation_control ; les étapes instrumentées
+(profile_stage) et les boucles de décodage (src.batched_generation) le
+consultent via le contrôle courant du thread, sans avoir à le transmettre :
+    - au début de chaque étape et à chaque pas de décodage, une génération
+      annulée ou hors délai s'interrompt (GenerationCancelled) ;
+    - le début et la fin des étapes et l'avancement des boucles sont
+      signalés par des ProgressEvent.
+Hors d'une génération contrôlée, ces points de contrôle ne coûtent qu'un
+accès à une variable locale au thread.
+"""
+
+import time
+import logging
+import threading
+import contextlib
+from typing import Callable, Iterator, NamedTuple, Optional
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Intervalle minimal entre deux événements d'avancement d'une même boucle
+PROGRESS_INTERVAL_S = 0.1
+
+_local = threading.local()
+
+
+class GenerationCancelled(Exception):
+    """Génération interrompue à un point de contrôle (annulation ou délai dépassé)."""
+
+
+class GenerationTimeout(GenerationCancelled):
+    """Génération interrompue car son délai est dépassé."""
+
+
+class ProgressEvent(NamedTuple):
+    """
+    Événement de progression d'une génération.
+
+    event vaut "start" ou "end" (début ou fin d'une étape, tokens produits
+    dans step à la fin) ou "step" (pas step sur total d'une boucle de décodage).
+    """
+    stage: str
+    event: str
+    step: int = 0
+    total: Optional[int] = None
+    elapsed_s: float = 0.0
+
+
+class GenerationControl:
+    """État partagé entre une génération et celui qui la pilote (annulation, délai, progression)."""
+
+    def __init__(
+        self,
+        on_progress: Optional[Callable[[ProgressEvent], None]] = None,
+        timeout_s: Optional[float] = None,
+        progress_interval_s: float = PROGRESS_INTERVAL_S,
+    ):
+        """
+        Args:
+            on_progress: Appelée dans le thread de la génération à chaque événement.
+            timeout_s: Délai au-delà duquel la génération s'interrompt (aucun si None).
+            progress_interval_s: Intervalle minimal entre deux événements "step".
+        """
+        if timeout_s is not None and timeout_s <= 0:
+            raise ValueError(f"timeout_s doit être positif (reçu: {timeout_s})")
+        self.on_progress = on_progress
+        self.progress_interval_s = progress_interval_s
+        self._start = time.monotonic()
+        self.deadline = self._start + timeout_s if timeout_s is not None else None
+        self.reason: Optional[str] = None
+        self.timed_out = False
+        self._cancelled = threading.Event()
+        self._last_step = 0.0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def elapsed_s(self) -> float:
+        return time.monotonic() - self._start
+
+    def cancel(self, reason: str = "génération annulée"):
+        """Demande l'arrêt de la génération à son prochain point de contrôle."""
+        if not self._cancelled.is_set():
+            self.reason = reason
+            self._cancelled.set()
+
+    def check(self):
+        """
+        Point de contrôle.
+
+        Raises:
+            GenerationTimeout: Si le délai est dépassé.
+            GenerationCancelled: Si la génération est annulée.
+        """
+        if self.deadline is not None and not self._cancelled.is_set() and time.monotonic() > self.deadline:
+            self.timed_out = True
+            self.cancel("délai dépassé")
+        if self._cancelled.is_set():
+            raise (GenerationTimeout if self.timed_out else GenerationCancelled)(self.reason)
+
+    def _report(self, stage: str, event: str, step: int = 0, total: Optional[int] = None):
+        if self.on_progress is None:
+            return
+        try:
+            self.on_progress(ProgressEvent(stage, event, step, total, self.elapsed_s))
+        except Exception as e:
+            logger.warning(f"Erreur du suivi de progression: {e}")
+
+    def enter_stage(self, stage: str):
+        """Début d'une étape : point de contrôle puis événement "start"."""
+        self.check()
+        self._report(stage, "start")
+
+    def exit_stage(self, stage: str, tokens: int = 0):
+        """Fin d'une étape : événement "end" (tokens produits dans step)."""
+        self._report(stage, "end", tokens)
+
+    def step(self, stage: str, step: int, total: Optional[int] = None):
+        """Pas d'une boucle de décodage : point de contrôle et, au plus tous les progress_interval_s, événement "step"."""
+        self.check()
+        now = time.monotonic()
+        if now - self._last_step >= self.progress_interval_s:
+            self._last_step = now
+            self._report(stage, "step", step, total)
+
+
+def current_control() -> Optional[GenerationControl]:
+    """Contrôle de la génération en cours dans ce thread (None hors d'une génération contrôlée)."""
+    return getattr(_local, "control", None)
+
+
+@contextlib.contextmanager
+def generation_control(control: GenerationControl) -> Iterator[GenerationControl]:
+    """Installe un contrôle pour les générations exécutées dans ce thread."""
+    previous = current_control()
+    _local.control = control
+    try:
+        yield control
+    finally:
+        _local.control = previous
+
+
+def generation_step(stage: str, step: int, total: Optional[int] = None):
+    """Point de contrôle d'une boucle de décodage (sans effet hors d'une génération contrôlée)."""
+    control = getattr(_local, "control", None)
+    if control is not None:
+        control.step(stage, step, total)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bornes de la durée d'une génération.
+
+Sans limite, l'étape sémantique de Bark peut produire jusqu'à 768 tokens
+(environ 15 s) de silence ou de babillage quand la fin de séquence n'est pas
+prédite, et les étapes fine et EnCodec traitent ensuite toute cette durée.
+Trois réglages bornent ce pire cas :
+
+    max_duration_s  durée maximale générée par l'étape sémantique
+    min_eos_p       probabilité de fin de séquence à partir de laquelle
+                    l'étape sémantique s'arrête
+    trim_silence    coupe du silence final dans les codes coarse, avant
+                    les étapes fine et EnCodec
+
+Le silence est reconnu à partir des codes qu'EnCodec attribue à des signaux
+quasi silencieux : ils sont calculés une fois par modèle EnCodec.
+"""
+
+import logging
+from typing import Any, NamedTuple, Optional
+
+import numpy as np
+
+from src.speaker_prompt import CODEC_SAMPLE_RATE, COARSE_RATE_HZ, SEMANTIC_RATE_HZ, encode_audio_codes
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Seuil de fin de séquence de Bark (generate_text_semantic)
+DEFAULT_MIN_EOS_P = 0.2
+
+# Un silence final n'est coupé qu'au-delà de cette durée ; une fin de
+# cette longueur est conservée pour ne pas tronquer la chute du signal
+TRAILING_SILENCE_MIN_S = 0.5
+TRAILING_SILENCE_KEEP_S = 0.2
+
+# Niveaux (dBFS) des bruits encodés pour reconnaître le silence, en plus d'un signal nul
+SILENCE_LEVELS_DB = (-70.0, -60.0, -50.0)
+
+
+class GenerationLimits(NamedTuple):
+    """Bornes d'une génération : durée maximale, seuil de fin de séquence et coupe du silence final."""
+    max_duration_s: Optional[float] = None
+    min_eos_p: float = DEFAULT_MIN_EOS_P
+    trim_silence: bool = True
+
+    def override(self, max_duration_s: Optional[float] = None, min_eos_p: Optional[float] = None) -> "GenerationLimits":
+        """Bornes d'une requête : les valeurs fournies remplacent celles-ci."""
+        limits = self._replace(
+            max_duration_s=self.max_duration_s if max_duration_s is None else max_duration_s,
+            min_eos_p=self.min_eos_p if min_eos_p is None else min_eos_p,
+        )
+        check_limits(limits)
+        return limits
+
+    def semantic_key(self) -> str:
+        """Partie de la clé du cache sémantique (vide avec les réglages de Bark)."""
+        if self.max_duration_s is None and self.min_eos_p == DEFAULT_MIN_EOS_P:
+            return ""
+        return f"max={self.max_duration_s!r}|eos={float(self.min_eos_p)!r}"
+
+    def output_key(self) -> str:
+        """Partie de la clé du cache de sortie."""
+        return f"max={self.max_duration_s!r}|eos={float(self.min_eos_p)!r}|trim={int(self.trim_silence)}"
+
+
+def check_limits(limits: GenerationLimits):
+    """
+    Vérifie des bornes de génération.
+
+    Raises:
+        ValueError: Si une borne est hors de son domaine.
+    """
+    if limits.max_duration_s is not None and limits.max_duration_s <= 0:
+        raise ValueError(f"max_duration_s doit être positif (reçu: {limits.max_duration_s})")
+    if not 0 < limits.min_eos_p <= 1:
+        raise ValueError(f"min_eos_p doit être compris entre 0 (exclu) et 1 (reçu: {limits.min_eos_p})")
+
+
+def silence_codes(codec: Any) -> np.ndarray:
+    """
+    Codes du premier livre de codes d'EnCodec correspondant au silence.
+
+    Le résultat est conservé sur le module EnCodec (libéré avec lui).
+    """
+    codes = codec.__dict__.get("_bark_silence_codes")
+    if codes is None:
+        rng = np.random.RandomState(0)
+        signals = [np.zeros(CODEC_SAMPLE_RATE, dtype=np.float32)]
+        signals += [rng.randn(CODEC_SAMPLE_RATE).astype(np.float32) * 10 ** (db / 20) for db in SILENCE_LEVELS_DB]
+        found = set()
+        for signal in signals:
+            found.update(encode_audio_codes(codec, signal)[0].tolist())
+        codes = codec.__dict__["_bark_silence_codes"] = np.array(sorted(found), dtype=np.int64)
+    return codes
+
+
+def trailing_silence_frames(coarse_tokens: np.ndarray, codes: np.ndarray) -> int:
+    """Nombre de trames silencieuses consécutives à la fin de codes coarse (2, T)."""
+    silent = np.isin(coarse_tokens[0], codes)
+    voiced = np.flatnonzero(~silent)
+    return len(silent) - (int(voiced[-1]) + 1 if len(voiced) else 0)
+
+
+def trim_trailing_silence(
+    coarse_tokens: np.ndarray,
+    codes: np.ndarray,
+    min_silence_s: float = TRAILING_SILENCE_MIN_S,
+    keep_s: float = TRAILING_SILENCE_KEEP_S,
+) -> np.ndarray:
+    """
+    Coupe le silence final de codes coarse (2, T).
+
+    Args:
+        coarse_tokens: Codes coarse.
+        codes: Codes du silence (voir silence_codes).
+        min_silence_s: Durée de silence final en dessous de laquelle rien n'est coupé.
+        keep_s: Durée de silence conservée après la dernière trame non silencieuse.
+
+    Returns:
+        Les codes coarse, éventuellement raccourcis.
+    """
+    n_silent = trailing_silence_frames(coarse_tokens, codes)
+    if n_silent < min_silence_s * COARSE_RATE_HZ:
+        return coarse_tokens
+    end = coarse_tokens.shape[1] - n_silent + int(keep_s * COARSE_RATE_HZ)
+    logger.info(f"Silence final coupé: {(coarse_tokens.shape[1] - end) / COARSE_RATE_HZ:.2f} s")
+    return coarse_tokens[:, :end]
+
+
+def trim_semantic(semantic_tokens: np.ndarray, coarse_tokens: np.ndarray) -> np.ndarray:
+    """Tokens sémantiques correspondant à des codes coarse raccourcis (prompts de génération)."""
+    n_semantic = int(np.ceil(coarse_tokens.shape[1] * SEMANTIC_RATE_HZ / COARSE_RATE_HZ))
+    return semantic_tokens[:n_semantic]
@@ -11,9 +11,6 @@ import threading
 # Ajouter le répertoire parent au chemin
 sys.path.append(str(Path(__file__).parent.parent))
 
-# Importer notre module StandaloneBark
-from src.standalone_bark import StandaloneBark
-
 class BarkGUI(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -297,8 +294,11 @@ class BarkGUI(tk.Tk):
         
         def clone_thread():
             try:
-                # Initialiser Bark si ce n'est pas déjà fait
-                if self.bark is None:
+                # Initialiser Bark si ce n'est pas déjà fait ou si le répertoire des modèles a changé
+                # (les poids déjà chargés sont réutilisés via le registre de modèles)
+                if self.bark is None or os.path.abspath(self.bark.model_dir) != os.path.abspath(model_dir):
+                    # Import différé : torch et Bark ne ralentissent pas l'ouverture de la fenêtre
+                    from src.standalone_bark import StandaloneBark
                     self._log("Initialisation de Bark...")
                     self.bark = StandaloneBark(model_dir=model_dir)
                 
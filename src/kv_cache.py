@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache clés/valeurs préalloué des GPT de Bark (étapes sémantique et coarse).
+
+Avec use_kv_caching, Bark concatène à chaque pas les clés et valeurs du
+nouveau token à celles du préfixe (torch.cat) : chaque pas recopie tout le
+cache. StaticKVCache écrit les nouvelles clés et valeurs en place dans des
+tampons alloués par tranches de KV_CACHE_CHUNK positions, et cached_forward
+reproduit GPT.forward de bark.model en lisant et écrivant ces tampons.
+
+Modes de cache des étapes autorégressives (voir src.batched_generation) :
+    static   tampons préalloués (par défaut)
+    dynamic  cache de Bark, concaténé à chaque pas
+    off      sans cache : tout le préfixe est recalculé à chaque pas
+"""
+
+import logging
+from typing import Any, List, Optional, Tuple
+
+import torch
+import torch.nn.functional as F
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+KV_CACHE_MODES = ("static", "dynamic", "off")
+
+# Granularité d'allocation des tampons (en positions)
+KV_CACHE_CHUNK = 256
+
+
+def supports_static_cache(model: Any) -> bool:
+    """Vrai si le modèle est un GPT de bark.model (les modules remplacés par un backend n'en sont pas)."""
+    return hasattr(model, "transformer") and hasattr(model, "lm_head") and hasattr(model.transformer, "wpe")
+
+
+class StaticKVCache:
+    """
+    Tampons clés/valeurs d'un GPT, un par couche, de forme (B, têtes, capacité, dim).
+
+    Les tampons sont alloués au premier appel (type et périphérique des
+    projections du modèle) puis agrandis par tranches de KV_CACHE_CHUNK
+    positions jusqu'à max_len ; reset() les réutilise pour une nouvelle
+    séquence (fenêtres glissantes de l'étape coarse).
+    """
+
+    def __init__(self, n_layer: int, max_len: int, chunk: int = KV_CACHE_CHUNK):
+        """
+        Args:
+            n_layer: Nombre de couches du modèle.
+            max_len: Nombre maximal de positions en cache.
+            chunk: Granularité d'allocation des tampons.
+        """
+        self.max_len = max_len
+        self.chunk = chunk
+        self.length = 0
+        self._keys: List[Optional[torch.Tensor]] = [None] * n_layer
+        self._values: List[Optional[torch.Tensor]] = [None] * n_layer
+
+    @classmethod
+    def for_model(cls, model: Any, max_len: int, chunk: int = KV_CACHE_CHUNK) -> "StaticKVCache":
+        """Cache d'un GPT de Bark, limité à la taille de bloc du modèle."""
+        return cls(len(model.transformer.h), min(max_len, model.config.block_size), chunk)
+
+    @property
+    def capacity(self) -> int:
+        """Nombre de positions allouées."""
+        return 0 if self._keys[0] is None else self._keys[0].shape[2]
+
+    def reset(self):
+        """Vide le cache sans libérer les tampons."""
+        self.length = 0
+
+    def _reserve(self, like: torch.Tensor, end: int):
+        """Alloue ou agrandit les tampons pour contenir end positions."""
+        keys = self._keys[0]
+        if keys is not None and end <= keys.shape[2] and keys.shape[:2] == like.shape[:2] \
+                and keys.dtype == like.dtype and keys.device == like.device:
+            return
+        capacity = min(self.max_len, -(-end // self.chunk) * self.chunk)
+        batch_size, n_head, _, head_dim = like.shape
+        for layer in range(len(self._keys)):
+            for buffers in (self._keys, self._values):
+                new = torch.empty((batch_size, n_head, capacity, head_dim), dtype=like.dtype, device=like.device)
+                old = buffers[layer]
+                if old is not None and self.length and old.shape[:2] == like.shape[:2]:
+                    new[:, :, :self.length] = old[:, :, :self.length]
+                buffers[layer] = new
+
+    def update(self, layer: int, k: torch.Tensor, v: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Écrit les clés et valeurs des nouvelles positions d'une couche.
+
+        Returns:
+            Les clés et valeurs de toutes les positions en cache, nouvelles comprises.
+
+        Raises:
+            ValueError: Si le cache est plein.
+        """
+        start = self.length
+        end = start + k.shape[2]
+        if end > self.max_len:
+            raise ValueError(f"Cache clés/valeurs plein ({self.max_len} positions)")
+        if layer == 0:
+            self._reserve(k, end)
+        self._keys[layer][:, :, start:end] = k
+        self._values[layer][:, :, start:end] = v
+        return self._keys[layer][:, :, :end], self._values[layer][:, :, :end]
+
+    def advance(self, n: int):
+        """Valide les positions écrites par toutes les couches."""
+        self.length += n
+
+
+def _cached_attention(attn: Any, x: torch.Tensor, cache: StaticKVCache, layer: int) -> torch.Tensor:
+    """CausalSelfAttention.forward de bark.model, clés et valeurs lues dans le cache."""
+    B, T, C = x.size()
+    q, k, v = attn.c_attn(x).split(attn.n_embd, dim=2)
+    k = k.view(B, T, attn.n_head, C // attn.n_head).transpose(1, 2)
+    q = q.view(B, T, attn.n_head, C // attn.n_head).transpose(1, 2)
+    v = v.view(B, T, attn.n_head, C // attn.n_head).transpose(1, 2)
+
+    # Masque causal pour le préfixe initial ; un pas unique voit toutes les positions
+    is_causal = cache.length == 0
+    if not is_causal and T != 1:
+        raise ValueError("Après le préfixe, le cache avance d'une position à la fois")
+    k, v = cache.update(layer, k, v)
+
+    if hasattr(F, "scaled_dot_product_attention"):
+        y = F.scaled_dot_product_attention(q, k, v, is_causal=is_causal)
+    else:
+        att = (q @ k.transpose(-2, -1)) * (1.0 / k.size(-1) ** 0.5)
+        if is_causal:
+            mask = torch.ones(T, T, dtype=torch.bool, device=x.device).tril()
+            att = att.masked_fill(~mask, float("-inf"))
+        y = F.softmax(att, dim=-1) @ v
+    y = y.transpose(1, 2).contiguous().view(B, T, C)
+    return attn.c_proj(y)
+
+
+def cached_forward(model: Any, idx: torch.Tensor, cache: StaticKVCache, merge_context: bool = False) -> torch.Tensor:
+    """
+    GPT.forward de bark.model avec un cache préalloué.
+
+    Le premier appel après reset() traite le préfixe complet (avec fusion du
+    contexte texte pour le modèle sémantique), les suivants un token chacun.
+
+    Args:
+        model: GPT de Bark (voir supports_static_cache).
+        idx: Tokens d'entrée (B, T).
+        cache: Cache du modèle.
+        merge_context: Fusion des 256 tokens de texte et des 256 tokens
+            d'historique (modèle sémantique, préfixe uniquement).
+
+    Returns:
+        Les logits de la dernière position (B, 1, vocabulaire).
+    """
+    transformer = model.transformer
+    past_length = cache.length
+    if past_length == 0 and merge_context:
+        tok_emb = torch.cat([
+            transformer.wte(idx[:, :256]) + transformer.wte(idx[:, 256:256 + 256]),
+            transformer.wte(idx[:, 256 + 256:])
+        ], dim=1)
+    else:
+        tok_emb = transformer.wte(idx)
+    t = tok_emb.shape[1]
+    position_ids = torch.arange(past_length, past_length + t, dtype=torch.long, device=idx.device).unsqueeze(0)
+    x = transformer.drop(tok_emb + transformer.wpe(position_ids))
+
+    for layer, block in enumerate(transformer.h):
+        x = x + block.attn.resid_dropout(_cached_attention(block.attn, block.ln_1(x), cache, layer))
+        x = x + block.mlp(block.ln_2(x))
+    cache.advance(t)
+
+    # La normalisation finale est indépendante par position : seule la dernière sert
+    x = transformer.ln_f(x[:, [-1], :])
+    return model.lm_head(x)
+
+
+class CachedDecoder:
+    """
+    Pas de décodage autorégressif d'un GPT de Bark selon le mode de cache.
+
+    Chaque appel reçoit toute la séquence courante ; seules les positions
+    absentes du cache sont calculées.
+    """
+
+    def __init__(self, model: Any, mode: str = "static", max_len: int = 1024, merge_context: bool = False):
+        """
+        Args:
+            model: GPT de Bark, ou module le remplaçant (mode dynamic dans ce cas).
+            mode: Mode de cache (voir KV_CACHE_MODES).
+            max_len: Nombre maximal de positions d'une séquence.
+            merge_context: Fusion du contexte texte (modèle sémantique).
+
+        Raises:
+            ValueError: Si le mode est inconnu.
+        """
+        if mode not in KV_CACHE_MODES:
+            raise ValueError(f"Mode de cache inconnu: {mode} (valeurs possibles: {', '.join(KV_CACHE_MODES)})")
+        if mode == "static" and not supports_static_cache(model):
+            mode = "dynamic"
+        self.model = model
+        self.mode = mode
+        self.merge_context = merge_context
+        self._cache = StaticKVCache.for_model(model, max_len) if mode == "static" else None
+        self._past_kv = None
+
+    def reset(self):
+        """Commence une nouvelle séquence (les tampons préalloués sont conservés)."""
+        if self._cache is not None:
+            self._cache.reset()
+        self._past_kv = None
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        """Logits de la position suivant la séquence x (B, T)."""
+        if self.mode == "static":
+            x_input = x if self._cache.length == 0 else x[:, [-1]]
+            return cached_forward(self.model, x_input, self._cache, merge_context=self.merge_context)
+        if self.mode == "dynamic":
+            x_input = x if self._past_kv is None else x[:, [-1]]
+            logits, self._past_kv = self.model(
+                x_input, merge_context=self.merge_context, use_cache=True, past_kv=self._past_kv
+            )
+            return logits
+        logits, _ = self.model(x, merge_context=self.merge_context)
+        return logits
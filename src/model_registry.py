@@ -0,0 +1,726 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registre des modèles Bark partagé par tout le processus.
+
+Les modèles (texte, coarse, fine et codec) sont chargés une seule fois par
+clé (model_dir, device, precision, tailles des modèles) puis partagés entre
+toutes les instances de StandaloneBark. Chaque étape n'est chargée qu'à sa
+première utilisation et peut être libérée après une période d'inactivité.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+import contextlib
+from collections.abc import Mapping
+from typing import Optional, Dict, List, Tuple, Any, Callable, Union
+
+from src.profiling import current_rss_bytes, profile_stage
+from src.model_sizes import GPT_STAGES, ModelSizes, format_model_sizes, parse_model_size, remote_model_key
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Étapes du pipeline Bark
+STAGES = ("text", "coarse", "fine", "codec")
+
+# Précisions supportées pour l'inférence : fp32, bfloat16, ou quantification
+# dynamique int8 des couches Linear des transformeurs (CPU uniquement)
+SUPPORTED_PRECISIONS = ("fp32", "bf16", "int8")
+
+# Sous-répertoire de model_dir où sont conservés les modèles convertis
+QUANTIZED_DIR = "quantized"
+
+# Modes de libération des étapes inactives
+OFFLOAD_MODES = ("unload", "mmap")
+
+# Les fonctions de bark.generation lisent les modèles dans un dictionnaire
+# global : ce verrou garantit qu'une seule entrée du registre y est installée
+# pendant une génération. Il réserve aussi le générateur aléatoire global de
+# torch à cette génération (reproductibilité des générations avec graine).
+_BARK_GLOBALS_LOCK = threading.RLock()
+
+RegistryKey = Tuple[str, str, str, ModelSizes]
+
+
+def _module_bytes(model: Any) -> int:
+    """Calcule la taille des paramètres et buffers d'un modèle torch."""
+    if isinstance(model, dict):
+        model = model.get("model")
+    if model is None or not hasattr(model, "state_dict"):
+        return 0
+
+    # Parcours du state_dict : les poids des couches quantifiées n'y figurent
+    # que sous forme de paramètres empaquetés (tuples de tenseurs)
+    def tensor_bytes(value: Any) -> int:
+        if isinstance(value, (tuple, list)):
+            return sum(tensor_bytes(v) for v in value)
+        if hasattr(value, "element_size"):
+            return value.numel() * value.element_size()
+        return 0
+
+    return sum(tensor_bytes(v) for v in model.state_dict().values())
+
+
+def _empty_cuda_cache():
+    """Rend au pilote la mémoire GPU libérée, si CUDA est utilisé."""
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+def _resolve_checkpoint(model_dir: str, model_type: str, size: str = "large") -> str:
+    """
+    Trouve le checkpoint d'un modèle Bark.
+
+    Le répertoire des modèles du projet est prioritaire ; à défaut, le chemin
+    du cache de Bark est utilisé (Bark le télécharge s'il est absent).
+    """
+    from bark import generation
+
+    file_name = generation.REMOTE_MODEL_PATHS[remote_model_key(model_type, size)]["file_name"]
+    local_path = os.path.join(model_dir, file_name)
+    if os.path.exists(local_path):
+        return local_path
+    return generation._get_ckpt_path(model_type, use_small=(size == "small"))
+
+
+def _load_gpt_model(
+    ckpt_path: str,
+    device: str,
+    model_type: str,
+    mmap: bool = False,
+    size: str = "large",
+) -> Any:
+    """
+    Charge un modèle GPT de Bark (texte, coarse ou fine).
+
+    Avec mmap=True (CPU uniquement), les poids sont projetés en mémoire depuis
+    le checkpoint au lieu d'être copiés : plusieurs processus qui chargent le
+    même fichier partagent alors les mêmes pages du cache disque.
+    """
+    from bark import generation
+
+    if not mmap or device != "cpu":
+        return generation._load_model(ckpt_path, device, use_small=(size == "small"), model_type=model_type)
+
+    import torch
+    from bark.model import GPT, GPTConfig
+    from bark.model_fine import FineGPT, FineGPTConfig
+
+    config_class, model_class = (FineGPTConfig, FineGPT) if model_type == "fine" else (GPTConfig, GPT)
+    checkpoint = torch.load(ckpt_path, map_location="cpu", mmap=True)
+    model_args = checkpoint["model_args"]
+    if "input_vocab_size" not in model_args:
+        model_args["input_vocab_size"] = model_args["vocab_size"]
+        model_args["output_vocab_size"] = model_args["vocab_size"]
+        del model_args["vocab_size"]
+    model = model_class(config_class(**model_args))
+
+    unwanted_prefix = "_orig_mod."
+    state_dict = {
+        (k[len(unwanted_prefix):] if k.startswith(unwanted_prefix) else k): v
+        for k, v in checkpoint["model"].items()
+    }
+    # assign=True : les paramètres du modèle deviennent les tenseurs projetés
+    model.load_state_dict(state_dict, strict=False, assign=True)
+    model.eval()
+
+    if model_type == "text":
+        tokenizer = generation.BertTokenizer.from_pretrained("bert-base-multilingual-cased")
+        return {"model": model, "tokenizer": tokenizer}
+    return model
+
+
+def _convert_precision(model: Any, precision: str) -> Any:
+    """Convertit un modèle GPT de Bark à la précision demandée."""
+    import torch
+
+    if precision == "bf16":
+        return model.to(torch.bfloat16)
+    if precision == "int8":
+        from torch.ao.quantization import quantize_dynamic
+        return quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def _load_converted_model(
+    model_dir: str,
+    ckpt_path: str,
+    device: str,
+    model_type: str,
+    precision: str,
+    mmap: bool = False,
+    size: str = "large",
+) -> Any:
+    """
+    Charge un modèle GPT de Bark en précision réduite.
+
+    Le modèle converti est conservé dans model_dir/quantized : la conversion
+    n'est faite qu'une fois par checkpoint. Le cache est invalidé si le
+    checkpoint source ou la version de torch changent.
+    """
+    import torch
+    from bark import generation
+
+    def checkpoint_signature() -> Dict[str, Any]:
+        stat = os.stat(ckpt_path)
+        return {
+            "checkpoint": os.path.abspath(ckpt_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "torch": torch.__version__,
+        }
+
+    cache_path = os.path.join(model_dir, QUANTIZED_DIR, f"{remote_model_key(model_type, size)}_{precision}.pt")
+    # Le checkpoint peut être absent : Bark le télécharge lors du premier chargement
+    source = checkpoint_signature() if os.path.exists(ckpt_path) else None
+
+    model = None
+    if source is not None and os.path.exists(cache_path):
+        try:
+            # Les tenseurs bf16 se projettent en mémoire ; pas les poids int8 empaquetés
+            cached = torch.load(
+                cache_path,
+                map_location=device,
+                weights_only=False,
+                mmap=mmap and precision == "bf16" and device == "cpu",
+            )
+            if cached.get("source") == source:
+                model = cached["model"]
+                logger.info(f"Modèle {model_type} ({precision}) chargé depuis {cache_path}")
+        except Exception as e:
+            logger.warning(f"Cache de modèle converti illisible ({cache_path}): {e}")
+
+    if model is None:
+        loaded = _load_gpt_model(ckpt_path, device, model_type, mmap=mmap, size=size)
+        float_model = loaded["model"] if model_type == "text" else loaded
+        start = time.perf_counter()
+        model = _convert_precision(float_model, precision)
+        logger.info(f"Modèle {model_type} converti en {precision} en {time.perf_counter() - start:.1f} s")
+
+        source = source or checkpoint_signature()
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            torch.save({"source": source, "model": model}, tmp_path)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"Impossible d'enregistrer le modèle converti ({cache_path}): {e}")
+
+    model.eval()
+    if model_type == "text":
+        tokenizer = generation.BertTokenizer.from_pretrained("bert-base-multilingual-cased")
+        return {"model": model, "tokenizer": tokenizer}
+    return model
+
+
+def _forget_bark_globals(stage: str, model: Any):
+    """Retire un modèle du dictionnaire global de bark.generation s'il y est installé."""
+    with _BARK_GLOBALS_LOCK:
+        try:
+            from bark import generation
+        except ImportError:
+            return
+        if generation.models.get(stage) is model:
+            del generation.models[stage]
+
+
+class _StageMapping(Mapping):
+    """Vue dictionnaire des modèles d'une entrée : chaque étape est chargée au premier accès."""
+
+    def __init__(self, entry: "LoadedModels"):
+        self._entry = entry
+
+    def __getitem__(self, stage: str) -> Any:
+        if stage not in STAGES:
+            raise KeyError(stage)
+        return self._entry._stage(stage)
+
+    def __iter__(self):
+        return iter(STAGES)
+
+    def __len__(self) -> int:
+        return len(STAGES)
+
+
+class LoadedModels:
+    """
+    Modèles Bark d'une clé du registre, chargés étape par étape à la demande.
+
+    Chaque étape (texte, coarse, fine, codec) est chargée à sa première
+    utilisation. Après une période d'inactivité, une étape peut être déchargée
+    ou remplacée par une copie CPU projetée en mémoire depuis le checkpoint
+    (voir ModelRegistry.configure_offload).
+    """
+
+    def __init__(
+        self,
+        key: RegistryKey,
+        models: Optional[Dict[str, Any]] = None,
+        load_time_s: float = 0.0,
+        rss_delta_bytes: int = 0,
+        loader: Optional[Callable[[str, bool], Any]] = None,
+    ):
+        """
+        Args:
+            key: Clé (model_dir, device, precision, tailles des modèles).
+            models: Modèles déjà chargés, par étape ("text", "coarse", "fine", "codec").
+            load_time_s: Durée de chargement des modèles fournis, en secondes.
+            rss_delta_bytes: Augmentation de la mémoire résidente due à ce chargement.
+            loader: Fonction (étape, mmap) -> modèle chargeant une étape ;
+                avec mmap=True, elle retourne une copie CPU projetée en mémoire
+                (ou None si l'étape ne le permet pas).
+        """
+        self.key = key
+        self.load_time_s = load_time_s
+        self.rss_delta_bytes = rss_delta_bytes
+        self._loader = loader
+        self._resident: Dict[str, Any] = dict(models or {})
+        self._state: Dict[str, str] = dict.fromkeys(self._resident, "resident")
+        now = time.monotonic()
+        self._last_used: Dict[str, float] = dict.fromkeys(self._resident, now)
+        self._pins: Dict[str, int] = dict.fromkeys(STAGES, 0)
+        self._lock = threading.RLock()
+        self.models = _StageMapping(self)
+
+    @property
+    def model_dir(self) -> str:
+        return self.key[0]
+
+    @property
+    def device(self) -> str:
+        return self.key[1]
+
+    @property
+    def precision(self) -> str:
+        return self.key[2]
+
+    @property
+    def model_sizes(self) -> Dict[str, str]:
+        return dict(zip(GPT_STAGES, self.key[3]))
+
+    @property
+    def memory_bytes(self) -> Dict[str, int]:
+        """Taille des poids de chaque étape actuellement en mémoire."""
+        with self._lock:
+            return {stage: _module_bytes(model) for stage, model in self._resident.items()}
+
+    def _stage(self, stage: str) -> Any:
+        """Retourne le modèle d'une étape, en le chargeant si nécessaire."""
+        with self._lock:
+            self._last_used[stage] = time.monotonic()
+            model = self._resident.get(stage)
+            if model is not None:
+                if self._state[stage] == "mmap" and self.device != "cpu":
+                    # Retour de la copie CPU projetée vers l'appareil d'inférence
+                    model = self._move_to_device(model)
+                    self._resident[stage] = model
+                    self._state[stage] = "resident"
+                return model
+
+            if self._loader is None:
+                raise KeyError(stage)
+            logger.info(f"Chargement du modèle {stage}...")
+            rss_before = current_rss_bytes()
+            start = time.perf_counter()
+            with profile_stage(f"load_{stage}"):
+                model = self._loader(stage, False)
+            elapsed = time.perf_counter() - start
+            self.load_time_s += elapsed
+            self.rss_delta_bytes += max(0, current_rss_bytes() - rss_before)
+            self._resident[stage] = model
+            self._state[stage] = "mmap" if getattr(model, "_bark_mmap", False) else "resident"
+            logger.info(f"Modèle {stage} chargé en {elapsed:.1f} s ({_module_bytes(model) / 2**20:.0f} Mo de poids)")
+            return model
+
+    def _move_to_device(self, model: Any) -> Any:
+        if isinstance(model, dict):
+            model["model"].to(self.device)
+            return model
+        return model.to(self.device)
+
+    @contextlib.contextmanager
+    def use(self, *stages: str):
+        """
+        Charge les étapes demandées (toutes par défaut) et les protège du
+        déchargement pour inactivité pendant le bloc.
+
+        Returns:
+            La vue dictionnaire des modèles.
+        """
+        stages = stages or STAGES
+        with self._lock:
+            for stage in stages:
+                self._pins[stage] += 1
+        try:
+            for stage in stages:
+                self._stage(stage)
+            yield self.models
+        finally:
+            now = time.monotonic()
+            with self._lock:
+                for stage in stages:
+                    self._pins[stage] -= 1
+                    self._last_used[stage] = now
+
+    @contextlib.contextmanager
+    def activate(self, *stages: str):
+        """
+        Installe ces modèles dans bark.generation le temps d'une génération.
+
+        Les appels à generate_audio, generate_text_semantic, etc. faits dans ce
+        contexte utilisent donc les modèles de cette entrée. Seules les étapes
+        demandées (toutes par défaut) sont chargées. Les blocs activate de
+        threads différents s'exécutent l'un après l'autre : tout échantillonnage
+        dans le générateur aléatoire global de torch doit s'y trouver.
+        """
+        from bark import generation
+
+        stages = stages or STAGES
+        with self.use(*stages) as models:
+            with _BARK_GLOBALS_LOCK:
+                for stage in stages:
+                    generation.models[stage] = models[stage]
+                    generation.models_devices[stage] = self.device
+                yield self
+
+    def offload(self, stage: str, mode: str = "unload") -> bool:
+        """
+        Libère la mémoire d'une étape inutilisée.
+
+        Args:
+            stage: Étape à libérer.
+            mode: "unload" pour décharger le modèle, "mmap" pour le remplacer
+                par une copie CPU projetée en mémoire (déchargement si l'étape
+                ne le permet pas).
+
+        Returns:
+            True si l'étape a été libérée.
+        """
+        with self._lock:
+            model = self._resident.get(stage)
+            if model is None or self._pins[stage] > 0:
+                return False
+            if mode == "mmap":
+                if self._state[stage] == "mmap":
+                    return False
+                mapped = self._loader(stage, True) if self._loader is not None else None
+                if mapped is not None:
+                    self._resident[stage] = mapped
+                    self._state[stage] = "mmap"
+                    logger.info(f"Modèle {stage} inactif remplacé par une copie projetée en mémoire")
+                    _forget_bark_globals(stage, model)
+                    return True
+            del self._resident[stage]
+            del self._state[stage]
+            logger.info(f"Modèle {stage} inactif déchargé")
+        _forget_bark_globals(stage, model)
+        return True
+
+    def offload_idle(self, idle_timeout_s: float, mode: str = "unload", now: Optional[float] = None) -> List[str]:
+        """Libère les étapes inutilisées depuis plus de idle_timeout_s secondes."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            idle = [
+                stage for stage in list(self._resident)
+                if self._pins[stage] == 0 and now - self._last_used[stage] >= idle_timeout_s
+            ]
+        return [stage for stage in idle if self.offload(stage, mode)]
+
+    def release(self):
+        """Décharge toutes les étapes."""
+        with self._lock:
+            released = list(self._resident.items())
+            self._resident.clear()
+            self._state.clear()
+        for stage, model in released:
+            _forget_bark_globals(stage, model)
+
+    def residency(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Retourne l'état de chaque étape : "resident" (en mémoire sur l'appareil),
+        "mmap" (copie CPU projetée depuis le disque) ou "unloaded".
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                stage: {
+                    "state": self._state.get(stage, "unloaded"),
+                    "bytes": _module_bytes(self._resident[stage]) if stage in self._resident else 0,
+                    "idle_s": round(now - self._last_used[stage], 1) if stage in self._last_used else None,
+                    "in_use": self._pins[stage] > 0,
+                }
+                for stage in STAGES
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        """Retourne les statistiques de chargement de cette entrée."""
+        return {
+            "model_dir": self.model_dir,
+            "device": self.device,
+            "precision": self.precision,
+            "model_size": format_model_sizes(self.key[3]),
+            "load_time_s": round(self.load_time_s, 3),
+            "rss_delta_bytes": self.rss_delta_bytes,
+            "memory_bytes": self.memory_bytes,
+            "residency": self.residency(),
+        }
+
+
+class ModelRegistry:
+    """Registre thread-safe des modèles Bark chargés dans le processus."""
+
+    def __init__(self, mmap_weights: bool = False):
+        """
+        Args:
+            mmap_weights: Projeter les poids en mémoire depuis les checkpoints (CPU).
+        """
+        self.mmap_weights = mmap_weights
+        self.idle_timeout_s: Optional[float] = None
+        self.offload_mode = "unload"
+        self._entries: Dict[RegistryKey, LoadedModels] = {}
+        self._key_locks: Dict[RegistryKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self._reaper_wakeup = threading.Event()
+
+    @staticmethod
+    def make_key(
+        model_dir: str,
+        device: str,
+        precision: str = "fp32",
+        model_size: Union[str, Dict[str, str], ModelSizes, None] = None,
+    ) -> RegistryKey:
+        """Normalise une clé du registre."""
+        if precision not in SUPPORTED_PRECISIONS:
+            raise ValueError(
+                f"Précision non supportée: {precision} (valeurs possibles: {', '.join(SUPPORTED_PRECISIONS)})"
+            )
+        if precision == "int8" and device != "cpu":
+            raise ValueError("La quantification int8 n'est disponible que sur CPU")
+        sizes = parse_model_size(model_size)
+        if sizes == "auto":
+            raise ValueError("La taille \"auto\" doit être résolue avant d'interroger le registre")
+        return (os.path.abspath(model_dir), device, precision, tuple(sizes))
+
+    def get(
+        self,
+        model_dir: str,
+        device: str,
+        precision: str = "fp32",
+        model_size: Union[str, Dict[str, str], ModelSizes, None] = None,
+    ) -> LoadedModels:
+        """
+        Retourne l'entrée du registre pour la clé donnée, en la créant au premier appel.
+
+        Les modèles de l'entrée sont ensuite chargés étape par étape, à leur
+        première utilisation. Deux threads demandant la même clé partagent la
+        même entrée.
+
+        Args:
+            model_dir: Répertoire des modèles.
+            device: Appareil d'inférence ("cpu", "cuda", ...).
+            precision: Précision d'inférence.
+            model_size: Taille des modèles, globale ou par étape (grands modèles par défaut).
+
+        Returns:
+            Les modèles (chargés à la demande).
+        """
+        key = self.make_key(model_dir, device, precision, model_size)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None:
+                return entry
+
+            entry = self._load(key)
+            with self._lock:
+                self._entries[key] = entry
+            return entry
+
+    def _load(self, key: RegistryKey) -> LoadedModels:
+        """Crée l'entrée d'une clé ; ses étapes seront chargées à la demande."""
+        model_dir, device, precision, sizes = key
+        logger.info(
+            f"Modèles Bark enregistrés (répertoire: {model_dir}, appareil: {device}, "
+            f"précision: {precision}, taille: {format_model_sizes(sizes)}), chargement à la demande"
+        )
+        return LoadedModels(key, loader=lambda stage, mmap: self._load_stage(key, stage, mmap))
+
+    def _load_stage(self, key: RegistryKey, stage: str, mmap: bool = False) -> Any:
+        """
+        Charge le modèle d'une étape.
+
+        Avec mmap=True, retourne une copie CPU projetée en mémoire depuis le
+        checkpoint, ou None si l'étape ne le permet pas (codec, int8).
+        """
+        model_dir, device, precision, sizes = key
+        from bark import generation
+
+        if stage == "codec":
+            return None if mmap else generation._load_codec_model(device)
+        if mmap and precision == "int8":
+            return None
+
+        size = sizes[GPT_STAGES.index(stage)]
+        ckpt_path = _resolve_checkpoint(model_dir, stage, size)
+        target_device = "cpu" if mmap else device
+        use_mmap = (mmap or self.mmap_weights) and target_device == "cpu"
+        if precision == "fp32":
+            model = _load_gpt_model(ckpt_path, target_device, stage, mmap=use_mmap, size=size)
+        else:
+            model = _load_converted_model(
+                model_dir, ckpt_path, target_device, stage, precision, mmap=use_mmap, size=size
+            )
+        if use_mmap and precision != "int8":
+            # Marque le modèle comme adossé au fichier (libérable par le système)
+            module = model["model"] if isinstance(model, dict) else model
+            module._bark_mmap = True
+        return model
+
+    def configure_offload(self, idle_timeout_s: Optional[float], mode: str = "unload"):
+        """
+        Active la libération des étapes inactives.
+
+        Args:
+            idle_timeout_s: Durée d'inactivité après laquelle une étape est libérée
+                (None pour désactiver).
+            mode: "unload" (déchargement) ou "mmap" (copie CPU projetée en mémoire).
+        """
+        if mode not in OFFLOAD_MODES:
+            raise ValueError(f"Mode de libération inconnu: {mode} (valeurs possibles: {', '.join(OFFLOAD_MODES)})")
+        self.idle_timeout_s = idle_timeout_s
+        self.offload_mode = mode
+        self._reaper_wakeup.set()
+        if idle_timeout_s is not None and self._reaper is None:
+            self._reaper = threading.Thread(target=self._reaper_loop, name="bark-model-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reaper_loop(self):
+        while True:
+            timeout = self.idle_timeout_s
+            interval = min(30.0, max(1.0, timeout / 4)) if timeout is not None else None
+            self._reaper_wakeup.wait(interval)
+            self._reaper_wakeup.clear()
+            if self.idle_timeout_s is not None:
+                try:
+                    self.offload_idle()
+                except Exception as e:
+                    logger.error(f"Erreur lors de la libération des modèles inactifs: {e}")
+
+    def offload_idle(self, now: Optional[float] = None) -> List[Tuple[RegistryKey, str]]:
+        """
+        Libère immédiatement les étapes inactives depuis plus de idle_timeout_s.
+
+        Returns:
+            Les couples (clé, étape) libérés.
+        """
+        if self.idle_timeout_s is None:
+            return []
+        with self._lock:
+            entries = list(self._entries.values())
+        released = [
+            (entry.key, stage)
+            for entry in entries
+            for stage in entry.offload_idle(self.idle_timeout_s, self.offload_mode, now)
+        ]
+        if released:
+            import gc
+            gc.collect()
+            _empty_cuda_cache()
+        return released
+
+    def is_loaded(
+        self,
+        model_dir: str,
+        device: str,
+        precision: str = "fp32",
+        model_size: Union[str, Dict[str, str], ModelSizes, None] = None,
+    ) -> bool:
+        """Indique si une entrée existe pour une clé (ses étapes peuvent être déchargées)."""
+        key = self.make_key(model_dir, device, precision, model_size)
+        with self._lock:
+            return key in self._entries
+
+    def unload(
+        self,
+        model_dir: Optional[str] = None,
+        device: Optional[str] = None,
+        precision: str = "fp32",
+        model_size: Union[str, Dict[str, str], ModelSizes, None] = None,
+    ):
+        """
+        Décharge une entrée du registre, ou toutes si aucune clé n'est fournie.
+
+        Args:
+            model_dir: Répertoire des modèles de l'entrée à décharger.
+            device: Appareil de l'entrée à décharger.
+            precision: Précision de l'entrée à décharger.
+            model_size: Taille des modèles de l'entrée à décharger.
+        """
+        with self._lock:
+            if model_dir is None:
+                keys = list(self._entries)
+            else:
+                keys = [self.make_key(model_dir, device, precision, model_size)]
+            removed = [self._entries.pop(k) for k in keys if k in self._entries]
+
+        if not removed:
+            return
+
+        for entry in removed:
+            entry.release()
+
+        import gc
+        gc.collect()
+        _empty_cuda_cache()
+        logger.info(f"{len(removed)} entrée(s) du registre de modèles déchargée(s)")
+
+    def residency(self) -> List[Dict[str, Any]]:
+        """Retourne l'état de chargement des étapes de chaque entrée."""
+        with self._lock:
+            entries = list(self._entries.values())
+        return [
+            {
+                "model_dir": entry.model_dir,
+                "device": entry.device,
+                "precision": entry.precision,
+                "model_size": format_model_sizes(entry.key[3]),
+                "stages": entry.residency(),
+            }
+            for entry in entries
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Retourne les statistiques de toutes les entrées chargées."""
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            "entries": [entry.stats() for entry in entries],
+            "rss_bytes": current_rss_bytes(),
+        }
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """Retourne le registre de modèles du processus."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
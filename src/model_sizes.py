@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Choix de la taille (small / large) des modèles de chaque étape de Bark.
+
+Chaque étape (texte, coarse, fine) peut utiliser indépendamment le petit ou
+le grand checkpoint. La politique "auto" part des grands modèles et réduit
+les étapes une à une (fine, puis coarse, puis texte : de la moins à la plus
+sensible pour la qualité) tant que l'estimation de la mémoire ou du facteur
+temps réel dépasse le budget.
+"""
+
+import logging
+from typing import Dict, Optional, Tuple, Union
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Étapes dont la taille est configurable (le codec EnCodec n'a qu'une taille)
+GPT_STAGES = ("text", "coarse", "fine")
+MODEL_SIZES = ("small", "large")
+
+# Ordre dans lequel la politique auto réduit les étapes
+DOWNGRADE_ORDER = ("fine", "coarse", "text")
+
+# Nombre approximatif de paramètres de chaque checkpoint
+STAGE_PARAMETERS = {
+    ("text", "large"): 312e6,
+    ("coarse", "large"): 314e6,
+    ("fine", "large"): 302e6,
+    ("text", "small"): 80e6,
+    ("coarse", "small"): 80e6,
+    ("fine", "small"): 78e6,
+}
+CODEC_BYTES = 93 * 2**20
+
+# Octets par paramètre selon la précision (int8 : Linear quantifiées, le reste en fp32)
+BYTES_PER_PARAMETER = {"fp32": 4.0, "bf16": 2.0, "int8": 1.25}
+
+# Part approximative de chaque étape dans le temps de génération, et coût
+# relatif d'un petit modèle par rapport au grand
+STAGE_TIME_SHARE = {"text": 0.35, "coarse": 0.55, "fine": 0.10}
+SMALL_COST_RATIO = 0.3
+
+# Facteur temps réel approximatif des grands modèles (secondes de calcul par
+# seconde d'audio) ; à ajuster avec precision-report sur la machine cible
+REFERENCE_REAL_TIME_FACTOR = {"cpu": 6.0, "cuda": 0.4}
+
+ModelSizes = Tuple[str, str, str]
+
+
+def parse_model_size(spec: Union[str, Dict[str, str], ModelSizes, None]) -> Union[ModelSizes, str]:
+    """
+    Interprète une configuration de taille de modèles.
+
+    Args:
+        spec: "large", "small", "auto", une liste par étape
+            ("text=large,coarse=small,fine=small"), un dictionnaire étape -> taille
+            ou un tuple (texte, coarse, fine). Les étapes non précisées utilisent
+            le grand modèle.
+
+    Returns:
+        Les tailles (texte, coarse, fine), ou "auto".
+
+    Raises:
+        ValueError: Si la configuration est invalide.
+    """
+    if spec is None:
+        return ("large",) * len(GPT_STAGES)
+    if isinstance(spec, str):
+        spec = spec.strip().lower()
+        if spec == "auto":
+            return "auto"
+        if spec in MODEL_SIZES:
+            return (spec,) * len(GPT_STAGES)
+        try:
+            spec = dict(part.split("=", 1) for part in spec.split(",") if part)
+        except ValueError:
+            raise ValueError(
+                f"Taille de modèle invalide: {spec} (valeurs possibles: small, large, auto "
+                f"ou text=...,coarse=...,fine=...)"
+            )
+    elif isinstance(spec, (tuple, list)):
+        if len(spec) != len(GPT_STAGES):
+            raise ValueError(f"Il faut une taille par étape ({', '.join(GPT_STAGES)})")
+        spec = dict(zip(GPT_STAGES, spec))
+
+    unknown = set(spec) - set(GPT_STAGES)
+    if unknown:
+        raise ValueError(f"Étape(s) inconnue(s): {', '.join(sorted(unknown))}")
+    sizes = tuple(str(spec.get(stage, "large")).strip().lower() for stage in GPT_STAGES)
+    for size in sizes:
+        if size not in MODEL_SIZES:
+            raise ValueError(f"Taille de modèle inconnue: {size} (valeurs possibles: {', '.join(MODEL_SIZES)})")
+    return sizes
+
+
+def format_model_sizes(sizes: ModelSizes) -> str:
+    """Représentation compacte des tailles par étape."""
+    if len(set(sizes)) == 1:
+        return sizes[0]
+    return ",".join(f"{stage}={size}" for stage, size in zip(GPT_STAGES, sizes))
+
+
+def estimate_memory_bytes(sizes: ModelSizes, precision: str = "fp32") -> int:
+    """Estime la mémoire occupée par les modèles d'une configuration."""
+    per_parameter = BYTES_PER_PARAMETER.get(precision, 4.0)
+    total = sum(STAGE_PARAMETERS[(stage, size)] * per_parameter for stage, size in zip(GPT_STAGES, sizes))
+    return int(total) + CODEC_BYTES
+
+
+def estimate_real_time_factor(sizes: ModelSizes, device: str = "cpu") -> float:
+    """Estime le facteur temps réel (calcul / durée audio) d'une configuration."""
+    reference = REFERENCE_REAL_TIME_FACTOR.get(device.split(":")[0], REFERENCE_REAL_TIME_FACTOR["cpu"])
+    cost = sum(
+        STAGE_TIME_SHARE[stage] * (SMALL_COST_RATIO if size == "small" else 1.0)
+        for stage, size in zip(GPT_STAGES, sizes)
+    )
+    return reference * cost
+
+
+def available_memory_bytes(device: str = "cpu") -> Optional[int]:
+    """Retourne la mémoire disponible sur l'appareil (None si inconnue)."""
+    if device.startswith("cuda"):
+        try:
+            import torch
+            return int(torch.cuda.mem_get_info(device)[0])
+        except Exception:
+            return None
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        return int(psutil.virtual_memory().available)
+    except ImportError:
+        return None
+
+
+def choose_model_sizes(
+    device: str = "cpu",
+    precision: str = "fp32",
+    available_bytes: Optional[int] = None,
+    max_real_time_factor: Optional[float] = None,
+    memory_fraction: float = 0.8,
+) -> ModelSizes:
+    """
+    Politique "auto" : les plus grands modèles qui tiennent dans les budgets.
+
+    Args:
+        device: Appareil d'inférence.
+        precision: Précision d'inférence.
+        available_bytes: Mémoire disponible (mesurée si None).
+        max_real_time_factor: Budget de latence, en secondes de calcul par
+            seconde d'audio (ignoré si None).
+        memory_fraction: Part de la mémoire disponible utilisable par les modèles.
+
+    Returns:
+        Les tailles (texte, coarse, fine) retenues.
+    """
+    if available_bytes is None:
+        available_bytes = available_memory_bytes(device)
+    memory_budget = available_bytes * memory_fraction if available_bytes is not None else None
+
+    sizes = dict.fromkeys(GPT_STAGES, "large")
+
+    def within_budget() -> bool:
+        current = tuple(sizes[stage] for stage in GPT_STAGES)
+        if memory_budget is not None and estimate_memory_bytes(current, precision) > memory_budget:
+            return False
+        if max_real_time_factor is not None and estimate_real_time_factor(current, device) > max_real_time_factor:
+            return False
+        return True
+
+    for stage in DOWNGRADE_ORDER:
+        if within_budget():
+            break
+        sizes[stage] = "small"
+
+    chosen = tuple(sizes[stage] for stage in GPT_STAGES)
+    if not within_budget():
+        logger.warning("Même les petits modèles dépassent le budget mémoire ou de latence demandé")
+    logger.info(
+        f"Taille des modèles choisie automatiquement: {format_model_sizes(chosen)} "
+        f"(~{estimate_memory_bytes(chosen, precision) / 2**20:.0f} Mo, "
+        f"facteur temps réel estimé {estimate_real_time_factor(chosen, device):.1f})"
+    )
+    return chosen
+
+
+def resolve_model_sizes(
+    spec: Union[str, Dict[str, str], ModelSizes, None],
+    device: str = "cpu",
+    precision: str = "fp32",
+    max_real_time_factor: Optional[float] = None,
+) -> ModelSizes:
+    """Interprète une configuration de taille, en appliquant la politique auto si demandée."""
+    sizes = parse_model_size(spec)
+    if sizes == "auto":
+        return choose_model_sizes(device, precision, max_real_time_factor=max_real_time_factor)
+    return sizes
+
+
+def remote_model_key(model_type: str, size: str) -> str:
+    """Clé de bark.generation.REMOTE_MODEL_PATHS pour une étape et une taille."""
+    return f"{model_type}_small" if size == "small" else model_type
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache disque de l'audio généré.
+
+Une génération avec graine est entièrement déterminée par le texte, le prompt
+vocal, l'émotion, la langue, les températures, la graine et la configuration
+des modèles : ces éléments forment la clé du cache, qui renvoie le signal
+déjà produit sans charger aucun modèle. Le signal est conservé brut (float32
+à la fréquence de Bark) ; l'encodage de sortie est appliqué à chaque lecture.
+Les générations sans graine sont aléatoires et ne sont pas mises en cache.
+"""
+
+import os
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from src.semantic_cache import normalize_text
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Température de l'étape fine, fixée par Bark
+FINE_TEMPERATURE = 0.5
+
+
+def full_prompt_hash(history_prompt: Optional[Dict[str, np.ndarray]]) -> str:
+    """Empreinte des trois tableaux d'un prompt vocal (sémantique, coarse et fine)."""
+    if history_prompt is None:
+        return "none"
+    digest = hashlib.sha256()
+    for key in ("semantic_prompt", "coarse_prompt", "fine_prompt"):
+        value = np.ascontiguousarray(history_prompt[key], dtype=np.int64)
+        digest.update(f"{key}:{value.shape}".encode("utf-8"))
+        digest.update(value.tobytes())
+    return digest.hexdigest()[:32]
+
+
+class OutputCache:
+    """Cache de signaux générés, un fichier .npy par entrée, avec éviction LRU optionnelle."""
+
+    def __init__(self, cache_dir: str, max_bytes: Optional[int] = None):
+        """
+        Args:
+            cache_dir: Répertoire du cache (créé si nécessaire).
+            max_bytes: Taille maximale du cache ; les entrées lues le moins
+                récemment sont supprimées au-delà (pas de limite si None).
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(
+        text: str,
+        history_prompt: Optional[Dict[str, np.ndarray]],
+        temperature: float,
+        seed: int,
+        emotion: Optional[str] = None,
+        language: str = "en",
+        model_config: str = "",
+        limits: str = "",
+    ) -> str:
+        """
+        Construit la clé de cache d'une génération complète ; limits décrit
+        les bornes de la génération (voir GenerationLimits.output_key).
+        """
+        parts = [
+            normalize_text(text),
+            full_prompt_hash(history_prompt),
+            repr(emotion or "neutral"),
+            language,
+            repr(float(temperature)),
+            repr(FINE_TEMPERATURE),
+            repr(int(seed)),
+            model_config,
+        ]
+        if limits:
+            parts.append(limits)
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.npy")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Retourne le signal en cache pour une clé, ou None."""
+        path = self._path(key)
+        try:
+            audio = np.load(path)
+            # La date de modification sert d'horodatage d'accès pour l'éviction
+            os.utime(path)
+        except (FileNotFoundError, ValueError, OSError):
+            audio = None
+        with self._lock:
+            if audio is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return audio
+
+    def put(self, key: str, audio: np.ndarray):
+        """Enregistre un signal (écriture atomique), puis applique la limite de taille."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.asarray(audio, dtype=np.float32))
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if self.max_bytes is not None:
+            self._account(os.path.getsize(path))
+
+    def _entries(self):
+        """Fichiers du cache : (date d'accès, taille, chemin)."""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".npy"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _account(self, added_bytes: int):
+        """Met à jour la taille du cache et supprime les entrées les plus anciennes si besoin."""
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._entries())
+            else:
+                self._total_bytes += added_bytes
+            if self._total_bytes <= self.max_bytes:
+                return
+            # Recalcul exact (autres processus), puis éviction par ancienneté d'accès
+            entries = sorted(self._entries())
+            self._total_bytes = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                self._total_bytes -= size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs du cache."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rapport qualité / vitesse des précisions d'inférence (fp32, bf16, int8).
+
+Pour chaque précision, le rapport mesure le temps de chargement, la taille
+des poids et le facteur temps réel sur un jeu de textes fixe. La qualité est
+estimée sur le modèle sémantique en forçant la séquence de tokens produite en
+fp32 : à chaque pas, on compare la distribution prédite à celle du modèle
+fp32 (divergence de Kullback-Leibler et accord du token le plus probable).
+"""
+
+import time
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from src.model_registry import SUPPORTED_PRECISIONS
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Jeu de textes fixe pour comparer les précisions
+DEFAULT_PROMPTS = [
+    "Hello, this is a short test of the voice cloning system.",
+    "The quick brown fox jumps over the lazy dog.",
+    "Bonjour, ceci est un test de synthèse vocale.",
+    "Numbers like three hundred and twenty-one are often hard to pronounce.",
+]
+
+
+def semantic_divergence(
+    reference_models: Dict[str, Any],
+    models: Dict[str, Any],
+    text: str,
+    history_prompt: Optional[Dict[str, np.ndarray]],
+    reference_tokens: np.ndarray,
+    max_steps: int = 128,
+) -> Dict[str, float]:
+    """
+    Compare les prédictions sémantiques de deux jeux de modèles sur une même séquence.
+
+    Args:
+        reference_models: Modèles de référence (fp32).
+        models: Modèles à évaluer.
+        text: Texte prononcé.
+        history_prompt: Prompt vocal.
+        reference_tokens: Tokens sémantiques de référence, imposés à chaque pas.
+        max_steps: Nombre maximal de pas comparés.
+
+    Returns:
+        La divergence KL moyenne et le taux d'accord du token le plus probable.
+    """
+    import torch
+    import torch.nn.functional as F
+    from bark import generation as g
+
+    from src.batched_generation import semantic_prefix
+    from src.kv_cache import CachedDecoder
+
+    def next_distribution(decoder, x):
+        logits = decoder(x)
+        relevant = torch.cat((logits[:, 0, :g.SEMANTIC_VOCAB_SIZE], logits[:, 0, [g.SEMANTIC_PAD_TOKEN]]), dim=-1)
+        return F.log_softmax(relevant.float(), dim=-1)
+
+    ref_model = reference_models["text"]["model"]
+    model = models["text"]["model"]
+    prefix = torch.from_numpy(semantic_prefix(reference_models["text"]["tokenizer"], [text], history_prompt))
+    steps = min(max_steps, len(reference_tokens) + 1)
+    max_len = prefix.shape[1] - 256 + steps
+    ref_decoder = CachedDecoder(ref_model, max_len=max_len, merge_context=True)
+    decoder = CachedDecoder(model, max_len=max_len, merge_context=True)
+
+    kl_total, agree = 0.0, 0
+    with g._inference_mode():
+        ref_input = prefix.to(next(ref_model.parameters()).device)
+        input_ = prefix.to(next(model.parameters()).device)
+        for n in range(steps):
+            ref_logp = next_distribution(ref_decoder, ref_input)
+            logp = next_distribution(decoder, input_).to(ref_logp.device)
+            kl_total += float((ref_logp.exp() * (ref_logp - logp)).sum())
+            agree += int(ref_logp.argmax() == logp.argmax())
+            if n < len(reference_tokens):
+                token = torch.tensor([[int(reference_tokens[n])]])
+                ref_input = torch.cat((ref_input, token.to(ref_input.device)), dim=1)
+                input_ = torch.cat((input_, token.to(input_.device)), dim=1)
+    return {"kl": kl_total / steps, "top1_agreement": agree / steps}
+
+
+def run_precision_report(
+    speaker_id: str,
+    model_dir: Optional[str] = None,
+    prompts: Optional[Sequence[str]] = None,
+    precisions: Sequence[str] = SUPPORTED_PRECISIONS,
+    temperature: float = 0.7,
+    seed: int = 0,
+    max_quality_steps: int = 128,
+    model_size: Union[str, Dict[str, str]] = "large",
+) -> Dict[str, Any]:
+    """
+    Compare la vitesse et la qualité des précisions d'inférence.
+
+    Args:
+        speaker_id: Voix utilisée pour toutes les générations.
+        model_dir: Répertoire des modèles.
+        prompts: Textes à synthétiser (DEFAULT_PROMPTS par défaut).
+        precisions: Précisions à comparer.
+        temperature: Température d'échantillonnage.
+        seed: Graine fixée avant chaque génération.
+        max_quality_steps: Nombre de pas sémantiques comparés à fp32.
+        model_size: Taille des modèles comparés (voir StandaloneBark).
+
+    Returns:
+        Le rapport, par précision.
+    """
+    import torch
+    from src.batched_generation import generate_text_semantic_batch
+    from src.standalone_bark import StandaloneBark
+
+    prompts = list(prompts or DEFAULT_PROMPTS)
+    reference = StandaloneBark(model_dir=model_dir, precision="fp32", model_size=model_size)
+    reference._load_models()
+    history_prompt = reference._load_speaker_prompt(speaker_id)
+
+    # Séquences sémantiques de référence, produites une fois en fp32
+    reference_tokens: List[np.ndarray] = []
+    for text in prompts:
+        torch.manual_seed(seed)
+        reference_tokens.append(
+            generate_text_semantic_batch(reference.models.models, [text], history_prompt, temp=temperature)[0]
+        )
+
+    report: Dict[str, Any] = {
+        "speaker_id": speaker_id,
+        "model_size": reference.models.stats()["model_size"],
+        "prompts": prompts,
+        "precisions": {},
+    }
+    for precision in precisions:
+        bark = reference if precision == "fp32" else StandaloneBark(
+            model_dir=model_dir, precision=precision, model_size=reference.model_sizes
+        )
+        bark._load_models()
+        logger.info(f"Évaluation de la précision {precision}...")
+
+        synthesis_s, audio_s = 0.0, 0.0
+        for text in prompts:
+            torch.manual_seed(seed)
+            start = time.perf_counter()
+            audio = bark.synthesize(text, speaker_id=speaker_id, temperature=temperature)
+            synthesis_s += time.perf_counter() - start
+            audio_s += len(audio) / bark.bark_sr
+
+        quality = [
+            semantic_divergence(reference.models.models, bark.models.models, text, history_prompt,
+                                tokens, max_steps=max_quality_steps)
+            for text, tokens in zip(prompts, reference_tokens)
+        ]
+        report["precisions"][precision] = {
+            "device": bark.device,
+            "load_time_s": round(bark.models.load_time_s, 3),
+            "weights_mb": round(sum(bark.models.memory_bytes.values()) / 2**20, 1),
+            "synthesis_s": round(synthesis_s, 3),
+            "audio_s": round(audio_s, 3),
+            "real_time_factor": round(synthesis_s / audio_s, 3) if audio_s else None,
+            "semantic_kl": round(float(np.mean([q["kl"] for q in quality])), 5),
+            "semantic_top1_agreement": round(float(np.mean([q["top1_agreement"] for q in quality])), 4),
+        }
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Met en forme le rapport sous forme de tableau texte."""
+    header = f"{'précision':<10} {'chargement':>11} {'poids (Mo)':>11} {'RTF':>7} {'KL sém.':>9} {'accord top-1':>13}"
+    lines = [header, "-" * len(header)]
+    for precision, r in report["precisions"].items():
+        rtf = f"{r['real_time_factor']:.2f}" if r["real_time_factor"] is not None else "-"
+        lines.append(
+            f"{precision:<10} {r['load_time_s']:>10.1f}s {r['weights_mb']:>11.1f} {rtf:>7} "
+            f"{r['semantic_kl']:>9.2e} {r['semantic_top1_agreement']:>12.1%}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mesures par requête : durée de chaque étape, débit en tokens, facteur temps
+réel et mémoire.
+
+Une requête (synthesize, clone_voice, extract_speaker...) ouvre un profil
+avec profile_request ; les étapes instrumentées (profile_stage) s'y
+enregistrent via le profil courant du thread, sans avoir à le transmettre.
+Hors d'une requête, profile_stage ne coûte qu'un accès à une variable
+locale au thread. Au début de chaque étape, une génération contrôlée (voir
+src.generation_control) peut être interrompue et sa progression signalée.
+
+Étapes mesurées : load_audio, codec_encode, semantic_extract, prompt_load,
+text, coarse, fine, codec, encode et load_<étape> (chargement d'un modèle).
+
+Les profils terminés alimentent un MetricsCollector, exporté au format
+Prometheus ou en JSON. Une trace du profileur de torch (format Chrome) peut
+être enregistrée avec torch_trace ; chaque étape y apparaît comme une plage
+nommée.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import contextlib
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.generation_control import current_control
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Intervalle d'échantillonnage de la mémoire résidente pendant une requête
+RSS_SAMPLE_INTERVAL_S = 0.01
+
+_local = threading.local()
+_trace_active = False
+
+
+def current_rss_bytes() -> int:
+    """Retourne la mémoire résidente du processus (0 si indisponible)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError, IndexError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss est en octets sous macOS et en kilo-octets ailleurs
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+    except ImportError:
+        return 0
+
+
+def _cuda_in_use() -> bool:
+    """Indique si CUDA a été initialisé (sans importer torch s'il ne l'est pas déjà)."""
+    torch = sys.modules.get("torch")
+    return torch is not None and torch.cuda.is_available() and torch.cuda.is_initialized()
+
+
+class StageRecord:
+    """Mesure d'une étape au sein d'une requête (cumulée si l'étape se répète)."""
+
+    __slots__ = ("seconds", "calls", "tokens")
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self.tokens = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = {"seconds": round(self.seconds, 4), "calls": self.calls}
+        if self.tokens:
+            record["tokens"] = self.tokens
+            record["tokens_per_s"] = round(self.tokens / self.seconds, 1) if self.seconds > 0 else None
+        return record
+
+
+class StageTimer:
+    """Objet renvoyé par profile_stage : permet d'indiquer le nombre de tokens produits."""
+
+    __slots__ = ("tokens",)
+
+    def __init__(self):
+        self.tokens = 0
+
+
+class RequestProfile:
+    """Profil d'une requête : étapes, durée d'audio produite et mémoire."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.stages: Dict[str, StageRecord] = {}
+        self.audio_s = 0.0
+        self.total_s = 0.0
+        self.rss_start_bytes = current_rss_bytes()
+        self.peak_rss_bytes = self.rss_start_bytes
+        self.peak_cuda_bytes: Optional[int] = None
+        self._start = time.perf_counter()
+
+    def add_audio(self, seconds: float):
+        """Ajoute la durée d'un signal produit par la requête."""
+        self.audio_s += seconds
+
+    def _sample_memory(self):
+        rss = current_rss_bytes()
+        if rss > self.peak_rss_bytes:
+            self.peak_rss_bytes = rss
+
+    @property
+    def real_time_factor(self) -> Optional[float]:
+        """Secondes de calcul par seconde d'audio produite."""
+        return self.total_s / self.audio_s if self.audio_s > 0 else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        rtf = self.real_time_factor
+        return {
+            "kind": self.kind,
+            "total_s": round(self.total_s, 4),
+            "audio_s": round(self.audio_s, 3),
+            "real_time_factor": round(rtf, 3) if rtf is not None else None,
+            "stages": {name: record.to_dict() for name, record in self.stages.items()},
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "rss_delta_bytes": self.peak_rss_bytes - self.rss_start_bytes,
+            "peak_cuda_bytes": self.peak_cuda_bytes,
+        }
+
+    def format(self) -> str:
+        """Tableau lisible de la répartition du temps par étape."""
+        lines = [f"{'étape':<18} {'durée':>9} {'part':>6} {'appels':>7} {'tokens/s':>9}"]
+        for name, record in sorted(self.stages.items(), key=lambda item: -item[1].seconds):
+            share = record.seconds / self.total_s * 100 if self.total_s > 0 else 0.0
+            rate = f"{record.tokens / record.seconds:.1f}" if record.tokens and record.seconds > 0 else "-"
+            lines.append(f"{name:<18} {record.seconds:>8.3f}s {share:>5.1f}% {record.calls:>7} {rate:>9}")
+        rtf = self.real_time_factor
+        lines.append(
+            f"{'total':<18} {self.total_s:>8.3f}s  audio {self.audio_s:.2f} s"
+            + (f", facteur temps réel {rtf:.2f}" if rtf is not None else "")
+        )
+        memory = f"mémoire résidente max {self.peak_rss_bytes / 2**20:.0f} Mo " \
+                 f"(+{(self.peak_rss_bytes - self.rss_start_bytes) / 2**20:.0f} Mo)"
+        if self.peak_cuda_bytes is not None:
+            memory += f", CUDA max {self.peak_cuda_bytes / 2**20:.0f} Mo"
+        lines.append(memory)
+        return "\n".join(lines)
+
+
+class _RssSampler:
+    """Thread échantillonnant la mémoire résidente tant qu'une requête est profilée."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles: List[RequestProfile] = []
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="bark-rss-sampler", daemon=True)
+                self._thread.start()
+
+    def remove(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles.remove(profile)
+
+    def _run(self):
+        while True:
+            time.sleep(RSS_SAMPLE_INTERVAL_S)
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+                rss = current_rss_bytes()
+                for profile in self._profiles:
+                    if rss > profile.peak_rss_bytes:
+                        profile.peak_rss_bytes = rss
+
+
+_sampler = _RssSampler()
+
+
+def current_profile() -> Optional[RequestProfile]:
+    """Profil de la requête en cours dans ce thread, ou None."""
+    return getattr(_local, "profile", None)
+
+
+@contextlib.contextmanager
+def profile_stage(name: str) -> Iterator[StageTimer]:
+    """
+    Mesure une étape de la requête en cours (sans effet hors d'une requête).
+
+    Usage :
+        with profile_stage("coarse") as timer:
+            tokens = generate_coarse(...)
+            timer.tokens = tokens.size
+    """
+    profile = getattr(_local, "profile", None)
+    control = current_control()
+    timer = StageTimer()
+    if profile is None and control is None and not _trace_active:
+        yield timer
+        return
+
+    if control is not None:
+        control.enter_stage(name)
+    trace_range = contextlib.nullcontext()
+    if _trace_active:
+        from torch.profiler import record_function
+        trace_range = record_function(f"bark::{name}")
+    start = time.perf_counter()
+    with trace_range:
+        yield timer
+    if control is not None:
+        control.exit_stage(name, timer.tokens)
+    if profile is None:
+        return
+    if _cuda_in_use():
+        # Les noyaux CUDA sont asynchrones : attendre leur fin pour attribuer le temps à l'étape
+        sys.modules["torch"].cuda.synchronize()
+    record = profile.stages.get(name)
+    if record is None:
+        record = profile.stages[name] = StageRecord()
+    record.seconds += time.perf_counter() - start
+    record.calls += 1
+    record.tokens += timer.tokens
+    profile._sample_memory()
+
+
+class MetricsCollector:
+    """Agrégation des profils de requêtes, exportée au format Prometheus ou JSON."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+        self.request_seconds = 0.0
+        self.audio_seconds = 0.0
+        self.stage_seconds: Dict[str, float] = {}
+        self.stage_calls: Dict[str, int] = {}
+        self.stage_tokens: Dict[str, int] = {}
+        self.peak_rss_bytes = 0
+        self.peak_cuda_bytes = 0
+
+    def record(self, profile: RequestProfile):
+        """Ajoute un profil terminé aux totaux."""
+        with self._lock:
+            self.requests[profile.kind] = self.requests.get(profile.kind, 0) + 1
+            self.request_seconds += profile.total_s
+            self.audio_seconds += profile.audio_s
+            for name, record in profile.stages.items():
+                self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + record.seconds
+                self.stage_calls[name] = self.stage_calls.get(name, 0) + record.calls
+                self.stage_tokens[name] = self.stage_tokens.get(name, 0) + record.tokens
+            self.peak_rss_bytes = max(self.peak_rss_bytes, profile.peak_rss_bytes)
+            if profile.peak_cuda_bytes is not None:
+                self.peak_cuda_bytes = max(self.peak_cuda_bytes, profile.peak_cuda_bytes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Totaux au format JSON."""
+        with self._lock:
+            return {
+                "requests": dict(self.requests),
+                "request_seconds": round(self.request_seconds, 4),
+                "audio_seconds": round(self.audio_seconds, 3),
+                "real_time_factor": round(self.request_seconds / self.audio_seconds, 3) if self.audio_seconds else None,
+                "stages": {
+                    name: {
+                        "seconds": round(seconds, 4),
+                        "calls": self.stage_calls[name],
+                        "tokens": self.stage_tokens[name],
+                        "tokens_per_s": round(self.stage_tokens[name] / seconds, 1) if seconds > 0 and self.stage_tokens[name] else None,
+                    }
+                    for name, seconds in self.stage_seconds.items()
+                },
+                "peak_rss_bytes": self.peak_rss_bytes,
+                "peak_cuda_bytes": self.peak_cuda_bytes,
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def prometheus(self, prefix: str = "bark") -> str:
+        """Totaux au format texte de Prometheus."""
+        with self._lock:
+            lines = [f"# TYPE {prefix}_requests_total counter"]
+            lines += [f'{prefix}_requests_total{{kind="{kind}"}} {count}' for kind, count in sorted(self.requests.items())]
+            lines.append(f"# TYPE {prefix}_request_seconds_total counter")
+            lines.append(f"{prefix}_request_seconds_total {self.request_seconds:.6f}")
+            lines.append(f"# TYPE {prefix}_audio_seconds_total counter")
+            lines.append(f"{prefix}_audio_seconds_total {self.audio_seconds:.6f}")
+            stage_tokens = {name: tokens for name, tokens in self.stage_tokens.items() if tokens}
+            for metric, values, fmt in (
+                ("stage_seconds_total", self.stage_seconds, "{:.6f}"),
+                ("stage_calls_total", self.stage_calls, "{}"),
+                ("stage_tokens_total", stage_tokens, "{}"),
+            ):
+                lines.append(f"# TYPE {prefix}_{metric} counter")
+                lines += [f'{prefix}_{metric}{{stage="{name}"}} {fmt.format(value)}' for name, value in sorted(values.items())]
+            lines.append(f"# TYPE {prefix}_peak_rss_bytes gauge")
+            lines.append(f"{prefix}_peak_rss_bytes {self.peak_rss_bytes}")
+            lines.append(f"# TYPE {prefix}_peak_cuda_bytes gauge")
+            lines.append(f"{prefix}_peak_cuda_bytes {self.peak_cuda_bytes}")
+        return "\n".join(lines) + "\n"
+
+
+@contextlib.contextmanager
+def profile_request(kind: str, collector: Optional[MetricsCollector] = None) -> Iterator[RequestProfile]:
+    """
+    Ouvre le profil d'une requête dans le thread courant.
+
+    Un appel imbriqué (clone_voice appelant synthesize, par exemple) réutilise
+    le profil déjà ouvert : une requête produit un seul profil.
+
+    Args:
+        kind: Type de requête (synthesize, clone_voice_batch, etc.).
+        collector: Agrégateur recevant le profil terminé.
+
+    Yields:
+        Le profil de la requête, complété à la sortie du contexte.
+    """
+    outer = getattr(_local, "profile", None)
+    if outer is not None:
+        yield outer
+        return
+
+    profile = RequestProfile(kind)
+    cuda = _cuda_in_use()
+    if cuda:
+        sys.modules["torch"].cuda.reset_peak_memory_stats()
+    _local.profile = profile
+    _sampler.add(profile)
+    try:
+        yield profile
+    finally:
+        _local.profile = None
+        _sampler.remove(profile)
+        profile.total_s = time.perf_counter() - profile._start
+        profile._sample_memory()
+        if cuda or _cuda_in_use():
+            profile.peak_cuda_bytes = int(sys.modules["torch"].cuda.max_memory_allocated())
+        if collector is not None:
+            collector.record(profile)
+
+
+@contextlib.contextmanager
+def torch_trace(path: str):
+    """
+    Enregistre une trace du profileur de torch (format Chrome, chrome://tracing
+    ou Perfetto) ; les étapes instrumentées y apparaissent comme plages nommées.
+    """
+    global _trace_active
+    import torch
+    from torch.profiler import ProfilerActivity, profile
+
+    activities = [ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(ProfilerActivity.CUDA)
+    with profile(activities=activities) as prof:
+        _trace_active = True
+        try:
+            yield prof
+        finally:
+            _trace_active = False
+    prof.export_chrome_trace(path)
+    logger.info(f"Trace du profileur enregistrée dans: {path}")
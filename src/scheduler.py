@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ordonnanceur de micro-lots pour les requêtes concurrentes.
+
+Les requêtes arrivant dans une courte fenêtre (max_wait_ms) ou jusqu'à
+max_batch_size éléments sont regroupées par (voix, température) et chaque
+étape de Bark est exécutée en un seul lot rembourré. Un unique thread de
+dispatch exécute les modèles : les appelants concurrents ne se disputent plus
+les modèles et reçoivent leur résultat via un Future.
+"""
+
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.profiling import profile_request
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class _Request:
+    """Requête de synthèse en attente de dispatch."""
+
+    def __init__(self, text: str, speaker_id: Optional[str], audio_file: Optional[str], temperature: float, limits):
+        self.text = text
+        self.speaker_id = speaker_id
+        self.audio_file = audio_file
+        self.temperature = temperature
+        self.limits = limits
+        self.enqueued = time.monotonic()
+        self.future: Future = Future()
+
+    @property
+    def group_key(self) -> Tuple:
+        return (self.speaker_id, self.audio_file, float(self.temperature), self.limits)
+
+
+class MicroBatchScheduler:
+    """Regroupe les requêtes concurrentes en lots pour les étapes de Bark."""
+
+    def __init__(
+        self,
+        bark,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 20.0,
+        max_pending: int = 256,
+    ):
+        """
+        Args:
+            bark: Instance de StandaloneBark.
+            max_batch_size: Nombre maximal de requêtes par lot.
+            max_wait_ms: Latence maximale ajoutée pour attendre d'autres requêtes.
+            max_pending: Nombre maximal de requêtes en attente (au-delà : refus).
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size doit être au moins 1")
+        self.bark = bark
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.batches = 0
+        self.requests = 0
+        self.batch_size_total = 0
+        self._thread = threading.Thread(target=self._run, name="bark-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        text: str,
+        speaker_id: Optional[str] = None,
+        audio_file: Optional[str] = None,
+        temperature: float = 0.7,
+        emotion: Optional[str] = None,
+        max_duration_s: Optional[float] = None,
+        min_eos_p: Optional[float] = None,
+    ) -> Future:
+        """
+        Soumet une requête de synthèse.
+
+        Args:
+            text: Texte à prononcer.
+            speaker_id: Identifiant d'une voix précédemment extraite.
+            audio_file: Fichier audio de référence (alternative à speaker_id).
+            temperature: Contrôle de la créativité (0.5-1.0).
+            emotion: Émotion optionnelle.
+            max_duration_s: Durée maximale générée (celle de l'instance si None).
+            min_eos_p: Seuil de fin de séquence (celui de l'instance si None).
+
+        Returns:
+            Un Future dont le résultat est le signal audio.
+
+        Raises:
+            queue.Full: Si trop de requêtes sont en attente.
+            RuntimeError: Si l'ordonnanceur est arrêté.
+        """
+        from src.standalone_bark import apply_emotion
+
+        if not speaker_id and not audio_file:
+            raise ValueError("Vous devez fournir soit un speaker_id, soit un fichier audio")
+        if emotion:
+            text = apply_emotion(text, emotion)
+        # Les requêtes ne sont regroupées qu'avec des bornes identiques
+        limits = self.bark.generation_limits.override(max_duration_s, min_eos_p)
+        request = _Request(text, speaker_id, audio_file, temperature, limits)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("L'ordonnanceur est arrêté")
+            self._queue.put_nowait(request)
+        return request.future
+
+    def synthesize(self, text: str, speaker_id: Optional[str] = None, audio_file: Optional[str] = None,
+                   temperature: float = 0.7, emotion: Optional[str] = None,
+                   timeout: Optional[float] = None, max_duration_s: Optional[float] = None,
+                   min_eos_p: Optional[float] = None) -> np.ndarray:
+        """Soumet une requête et attend son résultat."""
+        return self.submit(text, speaker_id, audio_file, temperature, emotion, max_duration_s, min_eos_p).result(timeout)
+
+    def _collect(self, first: _Request) -> List[_Request]:
+        """Rassemble les requêtes arrivées pendant la fenêtre de la première."""
+        batch = [first]
+        deadline = first.enqueued + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                # Arrêt demandé : le signal est remis pour la boucle principale
+                self._queue.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = self._collect(first)
+
+            groups: Dict[Tuple, List[_Request]] = {}
+            for request in batch:
+                groups.setdefault(request.group_key, []).append(request)
+
+            with self._lock:
+                self.batches += 1
+                self.requests += len(batch)
+                self.batch_size_total += len(batch)
+            logger.info(f"Dispatch d'un micro-lot: {len(batch)} requête(s), {len(groups)} groupe(s)")
+
+            for (speaker_id, audio_file, temperature, limits), requests in groups.items():
+                self._run_group(speaker_id, audio_file, temperature, limits, requests)
+
+    def _run_group(self, speaker_id: Optional[str], audio_file: Optional[str], temperature: float,
+                   limits, requests: List[_Request]):
+        """Exécute un groupe de requêtes partageant la même voix, la même température et les mêmes bornes."""
+        requests = [r for r in requests if r.future.set_running_or_notify_cancel()]
+        if not requests:
+            return
+        try:
+            self.bark._load_models()
+            # Mesures du micro-lot (voir src.profiling), ajoutées à celles de l'instance
+            with profile_request("micro_batch", getattr(self.bark, "metrics", None)):
+                speaker_id = self.bark._prepare_speaker(speaker_id, audio_file)
+                history_prompt = self.bark._load_speaker_prompt(speaker_id)
+                audio_arrays = self.bark._generate_batch(
+                    [r.text for r in requests], history_prompt, temperature, self.max_batch_size, limits=limits
+                )
+        except Exception as e:
+            logger.error(f"Erreur lors de la génération d'un micro-lot: {e}")
+            for request in requests:
+                request.future.set_exception(e)
+            return
+        for request, audio in zip(requests, audio_arrays):
+            request.future.set_result(audio)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs de l'ordonnanceur."""
+        with self._lock:
+            return {
+                "pending": self._queue.qsize(),
+                "batches": self.batches,
+                "requests": self.requests,
+                "mean_batch_size": self.batch_size_total / self.batches if self.batches else 0.0,
+            }
+
+    def close(self, wait: bool = True):
+        """Arrête l'ordonnanceur après avoir traité les requêtes déjà soumises."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(None)
+        if wait:
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
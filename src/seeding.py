@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Graines des générations reproductibles.
+
+Chaque étape de Bark (texte, coarse, fine) est initialisée avec sa propre
+graine, dérivée de la graine de la requête : le résultat d'une étape ne
+dépend pas de l'aléa consommé par les étapes précédentes, si bien qu'une
+génération dont l'étape texte est servie par le cache sémantique produit le
+même audio qu'une génération complète.
+
+Les générateurs aléatoires de torch, numpy et random sont globaux au
+processus ; les générations reproductibles se font sous le verrou des
+modèles Bark (voir LoadedModels.activate).
+"""
+
+import random
+import hashlib
+import logging
+
+import numpy as np
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SEEDED_STAGES = ("text", "coarse", "fine")
+
+
+def stage_seed(seed: int, stage: str) -> int:
+    """Graine (32 bits) d'une étape, dérivée de la graine de la requête."""
+    digest = hashlib.sha256(f"{int(seed)}:{stage}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "little")
+
+
+def seed_stage(seed: int, stage: str):
+    """Initialise torch, numpy et random avant une étape de génération."""
+    import torch
+
+    value = stage_seed(seed, stage)
+    random.seed(value)
+    np.random.seed(value)
+    # Initialise aussi les générateurs CUDA
+    torch.manual_seed(value)
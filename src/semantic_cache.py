@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache disque des tokens sémantiques.
+
+L'étape texte→sémantique est la plus coûteuse de Bark ; quand le même texte
+est prononcé avec la même voix, seules les étapes acoustiques doivent être
+recalculées. La clé est (texte normalisé, empreinte du prompt sémantique,
+température du texte, graine) ; chaque modèle texte a son propre espace de noms.
+"""
+
+import os
+import re
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Normalise les espaces comme le fait Bark avant la tokenisation."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def prompt_hash(history_prompt: Optional[Dict[str, np.ndarray]]) -> str:
+    """
+    Empreinte de la partie d'un prompt vocal lue par l'étape sémantique.
+
+    Seul semantic_prompt influence generate_text_semantic.
+    """
+    if history_prompt is None:
+        return "none"
+    semantic = np.ascontiguousarray(history_prompt["semantic_prompt"], dtype=np.int64)
+    return hashlib.sha256(semantic.tobytes()).hexdigest()[:32]
+
+
+class SemanticTokenCache:
+    """Cache de tokens sémantiques sur disque, un fichier .npy par entrée."""
+
+    def __init__(self, cache_dir: str, namespace: str = ""):
+        """
+        Args:
+            cache_dir: Répertoire du cache (créé si nécessaire).
+            namespace: Identifiant du modèle texte (taille, précision) ; les entrées
+                de chaque espace de noms sont rangées dans un sous-répertoire.
+        """
+        self.cache_dir = cache_dir
+        self.namespace = namespace
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(
+        text: str,
+        history_prompt: Optional[Dict[str, np.ndarray]],
+        text_temp: float,
+        seed: Optional[int] = None,
+        limits: str = "",
+    ) -> str:
+        """
+        Construit la clé de cache d'une génération sémantique ; limits décrit
+        les bornes de la génération (voir GenerationLimits.semantic_key).
+        """
+        parts = [normalize_text(text), prompt_hash(history_prompt), repr(float(text_temp)), repr(seed)]
+        if limits:
+            parts.append(limits)
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, self.namespace, key[:2], f"{key}.npy")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Retourne les tokens en cache pour une clé, ou None."""
+        try:
+            tokens = np.load(self._path(key)).astype(np.int64)
+        except (FileNotFoundError, ValueError, OSError):
+            tokens = None
+        with self._lock:
+            if tokens is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return tokens
+
+    def put(self, key: str, tokens: np.ndarray):
+        """Enregistre des tokens sémantiques (écriture atomique)."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.asarray(tokens, dtype=np.int16))
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs du cache."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Serveur de synthèse local et persistant.
+
+Les modèles restent chargés entre les requêtes ; les requêtes JSON sont mises
+en file d'attente (bornée) et traitées par des threads de travail. Le serveur
+écoute en HTTP sur un port local ou sur une socket Unix et fonctionne
+entièrement hors ligne.
+
+Points d'entrée :
+    POST /synthesize      {"text", "speaker_id", "language", "emotion", "temperature", "seed", "format",
+                           "max_duration_s", "min_eos_p", "async"}
+    GET  /jobs/<id>       état d'une tâche asynchrone
+    GET  /jobs/<id>/audio audio d'une tâche terminée (format demandé, WAV float32 par défaut)
+    GET  /health          état du serveur
+    GET  /metrics         métriques au format Prometheus
+    GET  /metrics.json    métriques au format JSON (dont la durée de chaque étape)
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import logging
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from src.audio_output import DEFAULT_FORMAT, check_format, encode_audio
+from src.generation_limits import GenerationLimits
+from src.profiling import profile_stage
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class BarkEngine:
+    """Moteur de synthèse reposant sur StandaloneBark."""
+
+    def __init__(self, bark, scheduler=None):
+        """
+        Args:
+            bark: Instance de StandaloneBark.
+            scheduler: MicroBatchScheduler optionnel regroupant les requêtes concurrentes.
+        """
+        self.bark = bark
+        self.scheduler = scheduler
+
+    def warm_up(self):
+        """Charge toutes les étapes avant la première requête."""
+        self.bark._load_models()
+        with self.bark.models.use():
+            pass
+
+    def residency(self) -> Dict[str, Dict[str, Any]]:
+        """État de chargement de chaque modèle."""
+        return self.bark.residency()
+
+    def synthesize(self, text: str, speaker_id: str, language: str = "en",
+                   emotion: Optional[str] = None, temperature: float = 0.7,
+                   format: str = DEFAULT_FORMAT, seed: Optional[int] = None,
+                   max_duration_s: Optional[float] = None, min_eos_p: Optional[float] = None) -> bytes:
+        # Les requêtes avec graine ne sont pas regroupées : l'échantillonnage par
+        # lots ne reproduirait pas la génération individuelle
+        # (les micro-lots sont profilés par l'ordonnanceur, dans son propre thread)
+        if self.scheduler is not None and seed is None:
+            audio = self.scheduler.synthesize(text, speaker_id=speaker_id, temperature=temperature, emotion=emotion,
+                                              max_duration_s=max_duration_s, min_eos_p=min_eos_p)
+            options = self.bark.output_options
+            return encode_audio(audio, self.bark.bark_sr, format, options.sample_rate, options.target_lufs)
+        with self.bark.profile("server"):
+            audio = self.bark.synthesize(text, speaker_id=speaker_id, temperature=temperature, emotion=emotion,
+                                         seed=seed, language=language, max_duration_s=max_duration_s,
+                                         min_eos_p=min_eos_p)
+            options = self.bark.output_options
+            with profile_stage("encode"):
+                return encode_audio(audio, self.bark.bark_sr, format, options.sample_rate, options.target_lufs)
+
+    def prometheus_metrics(self) -> str:
+        """Mesures par étape des requêtes traitées (voir src.profiling)."""
+        return self.bark.metrics.prometheus(prefix="bark_engine")
+
+    def metrics(self) -> Dict[str, Any]:
+        """Mesures par étape au format JSON."""
+        return self.bark.metrics.to_dict()
+
+
+class StubEngine:
+    """
+    Moteur factice pour les tests : produit une sinusoïde dont la durée dépend
+    de la longueur du texte, sans charger de modèle.
+    """
+
+    sample_rate = 24_000
+
+    def __init__(self, delay_s: float = 0.0):
+        """
+        Args:
+            delay_s: Durée simulée de chaque synthèse.
+        """
+        self.delay_s = delay_s
+        self.calls = 0
+
+    def warm_up(self):
+        pass
+
+    def synthesize(self, text: str, speaker_id: str, language: str = "en",
+                   emotion: Optional[str] = None, temperature: float = 0.7,
+                   format: str = DEFAULT_FORMAT, seed: Optional[int] = None,
+                   max_duration_s: Optional[float] = None, min_eos_p: Optional[float] = None) -> bytes:
+        if not speaker_id:
+            raise ValueError("speaker_id manquant")
+        self.calls += 1
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        duration_s = 0.05 * max(1, len(text))
+        if max_duration_s is not None:
+            duration_s = min(duration_s, max_duration_s)
+        n_samples = int(self.sample_rate * duration_s)
+        t = np.arange(n_samples) / self.sample_rate
+        return encode_audio(0.1 * np.sin(2 * np.pi * 220 * t), self.sample_rate, format)
+
+
+class Job:
+    """Requête de synthèse en attente ou traitée."""
+
+    def __init__(self, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.status = "queued"
+        self.result: Optional[bytes] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.done = threading.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class SynthesisService:
+    """File d'attente bornée, threads de travail et suivi des tâches."""
+
+    def __init__(self, engine, max_queue: int = 16, workers: int = 1, max_jobs: int = 1000):
+        """
+        Args:
+            engine: Moteur de synthèse (BarkEngine ou StubEngine).
+            max_queue: Nombre maximal de requêtes en attente (au-delà : refus).
+            workers: Nombre de threads de synthèse.
+            max_jobs: Nombre maximal de tâches terminées conservées.
+        """
+        self.engine = engine
+        self.queue: "queue.Queue[Optional[Job]]" = queue.Queue(maxsize=max_queue)
+        self.max_jobs = max_jobs
+        self.jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.metrics = {
+            "requests_total": 0,
+            "rejected_total": 0,
+            "completed_total": 0,
+            "failed_total": 0,
+            "synthesis_seconds_total": 0.0,
+            "queue_wait_seconds_total": 0.0,
+        }
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"bark-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, params: Dict[str, Any]) -> Job:
+        """
+        Met une requête en file d'attente.
+
+        Raises:
+            queue.Full: Si la file d'attente est pleine.
+        """
+        job = Job(params)
+        with self._lock:
+            self.metrics["requests_total"] += 1
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self.metrics["rejected_total"] += 1
+            raise
+        with self._lock:
+            self.jobs[job.id] = job
+            self._prune_jobs()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _prune_jobs(self):
+        """Oublie les tâches terminées les plus anciennes au-delà de max_jobs."""
+        if len(self.jobs) <= self.max_jobs:
+            return
+        finished = sorted((j for j in self.jobs.values() if j.done.is_set()), key=lambda j: j.finished)
+        for job in finished[:len(self.jobs) - self.max_jobs]:
+            del self.jobs[job.id]
+
+    def _worker(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            job.status = "running"
+            job.started = time.time()
+            try:
+                job.result = self.engine.synthesize(**job.params)
+                job.status = "done"
+            except Exception as e:
+                logger.error(f"Erreur lors de la synthèse de la tâche {job.id}: {e}")
+                job.status = "failed"
+                job.error = str(e)
+            job.finished = time.time()
+            with self._lock:
+                self.metrics["completed_total" if job.status == "done" else "failed_total"] += 1
+                self.metrics["synthesis_seconds_total"] += job.finished - job.started
+                self.metrics["queue_wait_seconds_total"] += job.started - job.created
+            job.done.set()
+            self.queue.task_done()
+
+    def health(self) -> Dict[str, Any]:
+        health = {
+            "status": "ok",
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "workers": len(self._workers),
+            "uptime_s": round(time.time() - self.started_at, 1),
+        }
+        if hasattr(self.engine, "residency"):
+            health["models"] = self.engine.residency()
+        return health
+
+    def prometheus_metrics(self) -> str:
+        """Retourne les métriques au format texte de Prometheus."""
+        with self._lock:
+            metrics = dict(self.metrics)
+        lines = []
+        for name, value in metrics.items():
+            lines.append(f"# TYPE bark_{name} counter")
+            lines.append(f"bark_{name} {value}")
+        lines.append("# TYPE bark_queue_depth gauge")
+        lines.append(f"bark_queue_depth {self.queue.qsize()}")
+        text = "\n".join(lines) + "\n"
+        if hasattr(self.engine, "prometheus_metrics"):
+            text += self.engine.prometheus_metrics()
+        return text
+
+    def metrics_json(self) -> Dict[str, Any]:
+        """Retourne les métriques au format JSON."""
+        with self._lock:
+            payload: Dict[str, Any] = dict(self.metrics)
+        payload["queue_depth"] = self.queue.qsize()
+        if hasattr(self.engine, "metrics"):
+            payload["engine"] = self.engine.metrics()
+        return payload
+
+    def shutdown(self):
+        """Arrête les threads de travail après les requêtes en cours."""
+        for _ in self._workers:
+            self.queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+
+class SynthesisRequestHandler(BaseHTTPRequestHandler):
+    """Gestionnaire HTTP des requêtes de synthèse."""
+
+    server_version = "BarkServer/1.0"
+
+    # Délai maximal d'attente d'une requête synchrone
+    sync_timeout_s = 600.0
+
+    @property
+    def service(self) -> SynthesisService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+    def address_string(self):
+        # Les sockets Unix n'ont pas d'adresse client
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json", headers)
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path == "/health":
+            self._send_json(200, self.service.health())
+        elif path == "/metrics":
+            self._send(200, self.service.prometheus_metrics().encode("utf-8"), "text/plain; version=0.0.4")
+        elif path == "/metrics.json":
+            self._send_json(200, self.service.metrics_json())
+        elif path.startswith("/jobs/"):
+            parts = path.split("/")
+            job = self.service.get_job(parts[2])
+            if job is None:
+                self._send_json(404, {"error": "tâche inconnue"})
+            elif len(parts) == 4 and parts[3] == "audio":
+                if job.status != "done":
+                    self._send_json(409, job.to_dict())
+                else:
+                    self._send(200, job.result, check_format(job.params["format"]).mime_type)
+            else:
+                self._send_json(200, job.to_dict())
+        else:
+            self._send_json(404, {"error": "chemin inconnu"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/synthesize":
+            self._send_json(404, {"error": "chemin inconnu"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            params = {
+                "text": str(request["text"]),
+                "speaker_id": str(request["speaker_id"]),
+                "language": str(request.get("language", "en")),
+                "emotion": request.get("emotion"),
+                "temperature": float(request.get("temperature", 0.7)),
+                "format": str(request.get("format", DEFAULT_FORMAT)),
+                "seed": int(request["seed"]) if request.get("seed") is not None else None,
+                "max_duration_s": float(request["max_duration_s"]) if request.get("max_duration_s") is not None else None,
+                "min_eos_p": float(request["min_eos_p"]) if request.get("min_eos_p") is not None else None,
+            }
+            check_format(params["format"])
+            GenerationLimits().override(params["max_duration_s"], params["min_eos_p"])
+        except (KeyError, ValueError, TypeError) as e:
+            self._send_json(400, {"error": f"requête invalide: {e}"})
+            return
+
+        try:
+            job = self.service.submit(params)
+        except queue.Full:
+            self._send_json(503, {"error": "file d'attente pleine"}, {"Retry-After": "1"})
+            return
+
+        if request.get("async"):
+            self._send_json(202, {"job_id": job.id, "status": job.status})
+            return
+
+        if not job.done.wait(self.sync_timeout_s):
+            self._send_json(504, {"job_id": job.id, "error": "délai dépassé"})
+        elif job.status == "done":
+            self._send(200, job.result, check_format(job.params["format"]).mime_type, {"X-Job-Id": job.id})
+        else:
+            self._send_json(500, job.to_dict())
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serveur HTTP sur socket Unix."""
+
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        super().server_bind()
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def create_server(
+    engine,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    unix_socket: Optional[str] = None,
+    max_queue: int = 16,
+    workers: int = 1,
+):
+    """
+    Crée le serveur de synthèse (sans le démarrer).
+
+    Args:
+        engine: Moteur de synthèse (BarkEngine ou StubEngine).
+        host: Adresse d'écoute HTTP.
+        port: Port d'écoute HTTP (0 pour un port libre).
+        unix_socket: Chemin d'une socket Unix (remplace host/port).
+        max_queue: Nombre maximal de requêtes en attente.
+        workers: Nombre de threads de synthèse.
+
+    Returns:
+        Le serveur ; appeler serve_forever() pour le démarrer.
+    """
+    engine.warm_up()
+    if unix_socket:
+        server = UnixHTTPServer(unix_socket, SynthesisRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), SynthesisRequestHandler)
+    server.service = SynthesisService(engine, max_queue=max_queue, workers=workers)
+    return server
+
+
+def serve(engine, **kwargs):
+    """Démarre le serveur de synthèse et bloque jusqu'à son arrêt."""
+    server = create_server(engine, **kwargs)
+    address = server.server_address
+    logger.info(f"Serveur de synthèse à l'écoute sur {address if isinstance(address, str) else '%s:%d' % address[:2]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Arrêt du serveur...")
+    finally:
+        server.server_close()
+        server.service.shutdown()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache LRU en mémoire des prompts vocaux.
+
+Les prompts sont invalidés dès que la date de modification ou la taille du
+fichier change ; une seule lecture de métadonnées (os.stat) est faite par
+accès au lieu d'un os.path.exists suivi d'un np.load.
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class CachedPrompt:
+    """Prompt vocal décodé, avec la signature du fichier dont il provient."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], mtime_ns: int, size: int):
+        self.arrays = arrays
+        self.mtime_ns = mtime_ns
+        self.size = size
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self.arrays.values())
+
+
+class SpeakerPromptCache:
+    """Cache LRU thread-safe de prompts vocaux, borné en nombre et en octets."""
+
+    def __init__(
+        self,
+        loader: Callable[[str], Dict[str, np.ndarray]],
+        max_entries: int = 256,
+        max_bytes: int = 256 * 2**20,
+    ):
+        """
+        Args:
+            loader: Fonction qui charge un prompt depuis son chemin.
+            max_entries: Nombre maximal de prompts conservés.
+            max_bytes: Taille mémoire maximale des prompts conservés.
+        """
+        self.loader = loader
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedPrompt]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, path: str) -> CachedPrompt:
+        """
+        Retourne le prompt vocal d'un fichier, depuis le cache si possible.
+
+        Args:
+            path: Chemin du fichier de prompt.
+
+        Returns:
+            Le prompt en cache.
+
+        Raises:
+            FileNotFoundError: Si le fichier n'existe pas.
+        """
+        stat = os.stat(path)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                if entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                    self._entries.move_to_end(path)
+                    self.hits += 1
+                    return entry
+                # Le fichier a changé depuis sa mise en cache
+                self._remove(path)
+                self.invalidations += 1
+            self.misses += 1
+
+        # Lecture hors verrou : deux lectures concurrentes du même fichier sont sans danger
+        entry = CachedPrompt(self.loader(path), stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            if path in self._entries:
+                self._remove(path)
+            self._entries[path] = entry
+            self._bytes += entry.nbytes
+            self._evict()
+        return entry
+
+    def _remove(self, path: str):
+        entry = self._entries.pop(path)
+        self._bytes -= entry.nbytes
+
+    def _evict(self):
+        """Retire les entrées les moins récemment utilisées au-delà des limites."""
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, path: Optional[str] = None):
+        """Retire un prompt du cache, ou tous si aucun chemin n'est fourni."""
+        with self._lock:
+            paths = list(self._entries) if path is None else [path]
+            for p in paths:
+                if p in self._entries:
+                    self._remove(p)
+                    self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Retourne les compteurs du cache."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
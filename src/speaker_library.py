@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gestion de la bibliothèque de voix : identifiants adressés par contenu et
+nettoyage des prompts temporaires (fichiers ou magasin compact).
+"""
+
+import os
+import time
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# À incrémenter quand le format ou l'algorithme d'extraction change, pour que
+# les anciens prompts adressés par contenu ne soient plus réutilisés.
+EXTRACTION_VERSION = 1
+
+# Préfixes des prompts créés automatiquement (et donc supprimables par le nettoyage)
+CONTENT_PREFIX = "clip_"
+TEMP_PREFIX = "temp_"
+AUTO_PREFIXES = (CONTENT_PREFIX, TEMP_PREFIX)
+
+PROMPT_EXTENSIONS = (".npz", ".npy")
+
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+def audio_content_hash(audio_file: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Calcule l'empreinte SHA-256 d'un fichier audio et des paramètres d'extraction.
+
+    Args:
+        audio_file: Chemin vers le fichier audio.
+        params: Paramètres d'extraction influant sur le prompt produit.
+
+    Returns:
+        L'empreinte hexadécimale.
+    """
+    digest = hashlib.sha256()
+    with open(audio_file, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    digest.update(f"v{EXTRACTION_VERSION}".encode())
+    for key in sorted(params or {}):
+        digest.update(f"|{key}={params[key]}".encode())
+    return digest.hexdigest()
+
+
+def content_speaker_id(audio_file: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Retourne l'identifiant de locuteur adressé par le contenu d'un fichier audio."""
+    return f"{CONTENT_PREFIX}{audio_content_hash(audio_file, params)[:16]}"
+
+
+def is_auto_speaker(speaker_id: str) -> bool:
+    """Indique si un prompt a été créé automatiquement (et n'est pas nommé par l'utilisateur)."""
+    return speaker_id.startswith(AUTO_PREFIXES)
+
+
+def collect_garbage(
+    speaker_dir: str,
+    max_age_s: Optional[float] = 24 * 3600,
+    max_total_bytes: Optional[int] = None,
+    dry_run: bool = False,
+) -> List[str]:
+    """
+    Supprime les prompts temporaires ou adressés par contenu inutilisés.
+
+    Les prompts nommés explicitement ne sont jamais supprimés. Sont retirés
+    d'abord les prompts automatiques dont la dernière utilisation est plus
+    ancienne que max_age_s, puis les moins récemment utilisés tant que leur
+    taille totale dépasse max_total_bytes.
+
+    Args:
+        speaker_dir: Répertoire des prompts vocaux.
+        max_age_s: Âge maximal depuis la dernière utilisation (None pour ignorer).
+        max_total_bytes: Taille totale maximale des prompts automatiques (None pour ignorer).
+        dry_run: Lister les fichiers sans les supprimer.
+
+    Returns:
+        Chemins des fichiers supprimés (ou à supprimer en mode dry_run).
+    """
+    candidates = []
+    with os.scandir(speaker_dir) as entries:
+        for entry in entries:
+            speaker_id, ext = os.path.splitext(entry.name)
+            if ext in PROMPT_EXTENSIONS and is_auto_speaker(speaker_id) and entry.is_file():
+                # Dernière utilisation : date d'accès (mise à jour à chaque réutilisation
+                # d'un clip), ou date de création si le système de fichiers ne la tient pas à jour
+                stat = entry.stat()
+                candidates.append((max(stat.st_mtime, stat.st_atime), stat.st_size, entry.path))
+
+    removed, total_bytes = _select_unused(candidates, max_age_s, max_total_bytes)
+    if not dry_run:
+        for path in removed:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    logger.info(
+        f"Nettoyage des prompts temporaires: {len(removed)} fichier(s) "
+        f"{'à supprimer' if dry_run else 'supprimé(s)'}, {total_bytes / 2**20:.1f} Mo restants"
+    )
+    return removed
+
+
+def collect_store_garbage(
+    store: Any,
+    max_age_s: Optional[float] = 24 * 3600,
+    max_total_bytes: Optional[int] = None,
+    dry_run: bool = False,
+) -> List[str]:
+    """
+    Équivalent de collect_garbage pour le magasin compact (PackedSpeakerStore).
+
+    La dernière utilisation d'une voix est celle enregistrée dans l'index
+    (PackedSpeakerStore.touch). Les voix retirées sont supprimées de l'index,
+    puis le magasin est compacté pour récupérer leur place.
+
+    Returns:
+        Identifiants des voix supprimées (ou à supprimer en mode dry_run).
+    """
+    candidates = [
+        (store.last_used(speaker_id), store.entry_bytes(speaker_id), speaker_id)
+        for speaker_id in store.ids()
+        if is_auto_speaker(speaker_id)
+    ]
+    removed, total_bytes = _select_unused(candidates, max_age_s, max_total_bytes)
+    if removed and not dry_run:
+        for speaker_id in removed:
+            store.delete(speaker_id)
+        store.compact()
+
+    logger.info(
+        f"Nettoyage du magasin de voix: {len(removed)} voix "
+        f"{'à supprimer' if dry_run else 'supprimée(s)'}, {total_bytes / 2**20:.1f} Mo restants"
+    )
+    return removed
+
+
+def _select_unused(
+    candidates: List[Tuple[float, int, str]],
+    max_age_s: Optional[float],
+    max_total_bytes: Optional[int],
+) -> Tuple[List[str], int]:
+    """
+    Choisit les prompts à retirer parmi (dernière utilisation, taille, nom).
+
+    Returns:
+        Les noms retenus, du moins récemment utilisé au plus récent, et la
+        taille totale restante.
+    """
+    candidates = sorted(candidates)
+    now = time.time()
+    total_bytes = sum(size for _, size, _ in candidates)
+    removed = []
+    for last_used, size, name in candidates:
+        too_old = max_age_s is not None and now - last_used > max_age_s
+        too_big = max_total_bytes is not None and total_bytes > max_total_bytes
+        if not (too_old or too_big):
+            continue
+        total_bytes -= size
+        removed.append(name)
+    return removed, total_bytes
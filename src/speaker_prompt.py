@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Extraction des prompts vocaux Bark à partir d'un enregistrement de référence.
+
+Un prompt vocal Bark est un fichier npz contenant trois tableaux de tokens :
+semantic_prompt (1D, ~50 Hz), coarse_prompt (2, T) et fine_prompt (8, T) à
+75 Hz. Les codes acoustiques sont obtenus en encodant l'audio avec EnCodec ;
+les tokens sémantiques viennent du quantificateur HuBERT si celui-ci est
+installé, sinon d'une transcription passée au modèle texte de Bark.
+"""
+
+import os
+import logging
+import tempfile
+import threading
+import contextlib
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PROMPT_KEYS = ("semantic_prompt", "coarse_prompt", "fine_prompt")
+
+# Fréquences de Bark (voir bark.generation)
+SEMANTIC_RATE_HZ = 49.9
+COARSE_RATE_HZ = 75
+CODEC_SAMPLE_RATE = 24_000
+
+# Bark n'utilise que les 256 derniers tokens sémantiques du prompt : au-delà,
+# le prompt grossit sans effet sur la génération.
+MAX_SEMANTIC_PROMPT_TOKENS = 256
+
+# Emplacement des checkpoints HuBERT dans le répertoire des modèles
+HUBERT_SUBDIR = "hubert"
+HUBERT_CHECKPOINT = "hubert.pt"
+HUBERT_TOKENIZER = "tokenizer.pth"
+
+_hubert_cache: Dict[Tuple[str, str], Any] = {}
+_hubert_lock = threading.Lock()
+
+
+def encode_audio_codes(codec_model, audio: np.ndarray) -> np.ndarray:
+    """
+    Encode un signal à 24 kHz en codes EnCodec.
+
+    Args:
+        codec_model: Modèle EnCodec 24 kHz de Bark (8 codebooks à 6 kbit/s).
+        audio: Signal mono à 24 kHz.
+
+    Returns:
+        Codes de forme (8, T) à 75 Hz.
+    """
+    import torch
+
+    device = next(codec_model.parameters()).device
+    wav = torch.from_numpy(np.asarray(audio, dtype=np.float32))[None, None].to(device)
+    with torch.inference_mode():
+        frames = codec_model.encode(wav)
+    codes = torch.cat([codes for codes, _ in frames], dim=-1)
+    return codes[0].cpu().numpy().astype(np.int64)
+
+
+def _load_hubert(model_dir: str, device: str):
+    """Charge (une seule fois) HuBERT et son quantificateur, ou retourne None."""
+    hubert_dir = os.path.join(model_dir, HUBERT_SUBDIR)
+    checkpoint = os.path.join(hubert_dir, HUBERT_CHECKPOINT)
+    tokenizer_path = os.path.join(hubert_dir, HUBERT_TOKENIZER)
+
+    key = (os.path.abspath(hubert_dir), device)
+    with _hubert_lock:
+        if key in _hubert_cache:
+            return _hubert_cache[key]
+
+        try:
+            from bark_hubert_quantizer.pre_kmeans_hubert import CustomHubert
+            from bark_hubert_quantizer.customtokenizer import CustomTokenizer
+        except ImportError:
+            logger.warning("bark_hubert_quantizer non installé, extraction sémantique HuBERT indisponible")
+            _hubert_cache[key] = None
+            return None
+
+        if not (os.path.exists(checkpoint) and os.path.exists(tokenizer_path)):
+            logger.warning(f"Checkpoints HuBERT absents de {hubert_dir}, extraction sémantique HuBERT indisponible")
+            _hubert_cache[key] = None
+            return None
+
+        logger.info("Chargement du quantificateur sémantique HuBERT...")
+        hubert = CustomHubert(checkpoint_path=checkpoint).to(device)
+        tokenizer = CustomTokenizer.load_from_checkpoint(tokenizer_path).to(device)
+        _hubert_cache[key] = (hubert, tokenizer)
+        return _hubert_cache[key]
+
+
+def extract_semantic_tokens(audio: np.ndarray, model_dir: str, device: str) -> Optional[np.ndarray]:
+    """
+    Extrait les tokens sémantiques d'un signal à 24 kHz avec HuBERT.
+
+    Returns:
+        Les tokens sémantiques, ou None si le quantificateur n'est pas disponible.
+    """
+    hubert = _load_hubert(model_dir, device)
+    if hubert is None:
+        return None
+
+    import torch
+
+    hubert_model, tokenizer = hubert
+    wav = torch.from_numpy(np.asarray(audio, dtype=np.float32))[None].to(device)
+    with torch.inference_mode():
+        semantic_vectors = hubert_model.forward(wav, input_sample_hz=CODEC_SAMPLE_RATE)
+        semantic_tokens = tokenizer.get_token(semantic_vectors)
+    return semantic_tokens.cpu().numpy().astype(np.int64)
+
+
+def trim_prompt(semantic: np.ndarray, codes: np.ndarray, max_semantic_tokens: int = MAX_SEMANTIC_PROMPT_TOKENS) -> Dict[str, np.ndarray]:
+    """
+    Aligne et réduit un prompt à la longueur de contexte utile de Bark.
+
+    Les deux séquences sont alignées sur la fin de l'enregistrement, dont Bark
+    se sert comme historique, et leur rapport de longueurs est celui attendu
+    par generate_coarse (75 / 49.9).
+
+    Args:
+        semantic: Tokens sémantiques.
+        codes: Codes EnCodec (8, T).
+        max_semantic_tokens: Nombre maximal de tokens sémantiques conservés.
+
+    Returns:
+        Le prompt sous forme de dictionnaire.
+    """
+    ratio = COARSE_RATE_HZ / SEMANTIC_RATE_HZ
+    n_semantic = int(min(len(semantic), max_semantic_tokens, np.floor(codes.shape[1] / ratio)))
+    if n_semantic <= 0:
+        raise ValueError("Enregistrement de référence trop court pour extraire une identité vocale")
+    n_frames = int(round(n_semantic * ratio))
+    return {
+        "semantic_prompt": semantic[-n_semantic:],
+        "coarse_prompt": codes[:2, -n_frames:],
+        "fine_prompt": codes[:, -n_frames:],
+    }
+
+
+def save_speaker_prompt(path: str, prompt: Dict[str, np.ndarray]):
+    """Enregistre un prompt vocal au format npz de Bark (tokens en int16)."""
+    # Tous les tokens sont < 10 000 : int16 suffit et divise la taille par quatre
+    arrays = {key: np.asarray(prompt[key]).astype(np.int16) for key in PROMPT_KEYS}
+    # Fichier temporaire puis remplacement atomique : une écriture interrompue
+    # ne laisse jamais de prompt tronqué à la place d'une voix valide
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+def load_speaker_prompt(path: str) -> Dict[str, np.ndarray]:
+    """Charge un prompt vocal npz et le convertit dans les types attendus par Bark."""
+    with np.load(path) as data:
+        return {key: data[key].astype(np.int64) for key in PROMPT_KEYS}
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stockage compact des prompts vocaux dans des fichiers projetés en mémoire.
+
+Les prompts sont concaténés dans des fichiers de données (« shards ») et un
+unique fichier d'index JSON donne, pour chaque voix, le shard, la position,
+la forme et le type de chaque tableau, ainsi que ses métadonnées, sa date
+de création et sa date de dernière utilisation (touch()). Lister les voix ne lit que l'index ; charger une voix retourne
+des vues sans copie sur le shard projeté en mémoire.
+
+Les suppressions et remplacements laissent des octets inutilisés dans les
+shards, récupérés par compact(). Les modifications sont sérialisées entre
+processus par un verrou de fichier (POSIX ; sous Windows, seul le processus
+courant est protégé).
+"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+import contextlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.speaker_prompt import PROMPT_KEYS, load_speaker_prompt, save_speaker_prompt
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Formats de stockage des voix : un fichier npz par voix, ou magasin compact
+SPEAKER_STORES = ("files", "packed")
+
+# Sous-répertoire de speaker_embeddings/ contenant le magasin compact
+PACKED_SUBDIR = "packed"
+
+INDEX_FILE = "index.json"
+LOCK_FILE = "index.lock"
+INDEX_VERSION = 1
+
+# Taille au-delà de laquelle un nouveau shard est commencé
+DEFAULT_SHARD_MAX_BYTES = 64 * 2**20
+
+# Alignement des tableaux dans les shards
+_ALIGNMENT = 64
+
+# Intervalle minimal entre deux enregistrements de l'utilisation d'une même voix
+TOUCH_INTERVAL_S = 3600
+
+
+def _entry_bytes(entry: Dict[str, Any]) -> int:
+    """Taille des tableaux d'une entrée d'index."""
+    return sum(
+        int(np.prod(spec["shape"], dtype=np.int64)) * np.dtype(spec["dtype"]).itemsize
+        for spec in entry["arrays"].values()
+    )
+
+
+def _shard_name(number: int) -> str:
+    return f"shard_{number:05d}.bin"
+
+
+class PackedSpeakerStore:
+    """Magasin de prompts vocaux : shards projetés en mémoire et index unique."""
+
+    def __init__(self, root_dir: str, shard_max_bytes: int = DEFAULT_SHARD_MAX_BYTES):
+        """
+        Args:
+            root_dir: Répertoire du magasin (créé si nécessaire).
+            shard_max_bytes: Taille maximale d'un shard avant d'en commencer un nouveau.
+        """
+        self.root_dir = root_dir
+        self.shard_max_bytes = shard_max_bytes
+        os.makedirs(root_dir, exist_ok=True)
+        self._index_path = os.path.join(root_dir, INDEX_FILE)
+        self._lock = threading.RLock()
+        self._index: Dict[str, Any] = {"version": INDEX_VERSION, "next_shard": 0, "speakers": {}}
+        self._index_stat: Optional[Tuple[int, int]] = None
+        self._maps: Dict[str, np.memmap] = {}
+        self._refresh()
+
+    # Index
+
+    def _refresh(self):
+        """Relit l'index s'il a été modifié (par ce processus ou un autre)."""
+        try:
+            stat = os.stat(self._index_path)
+        except FileNotFoundError:
+            return
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._index_stat:
+            return
+        with open(self._index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != INDEX_VERSION:
+            raise ValueError(f"Version d'index non supportée: {index.get('version')} ({self._index_path})")
+        self._index = index
+        self._index_stat = signature
+
+    def _write_index(self):
+        """Écrit l'index de façon atomique."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.root_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._index, f, separators=(",", ":"))
+            os.replace(tmp_path, self._index_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        stat = os.stat(self._index_path)
+        self._index_stat = (stat.st_mtime_ns, stat.st_size)
+
+    @contextlib.contextmanager
+    def _writing(self):
+        """Verrou exclusif des modifications, l'index étant relu sous le verrou."""
+        with self._lock:
+            with open(os.path.join(self.root_dir, LOCK_FILE), "a+") as lock_file:
+                try:
+                    import fcntl
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                except ImportError:
+                    fcntl = None
+                try:
+                    self._refresh()
+                    yield self._index
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # Lecture
+
+    def _map(self, shard: str, end: int) -> np.memmap:
+        """Projection en mémoire d'un shard couvrant au moins les end premiers octets."""
+        mm = self._maps.get(shard)
+        if mm is None or len(mm) < end:
+            mm = np.memmap(os.path.join(self.root_dir, shard), dtype=np.uint8, mode="r")
+            self._maps[shard] = mm
+        return mm
+
+    def __contains__(self, speaker_id: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return speaker_id in self._index["speakers"]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._index["speakers"])
+
+    def ids(self) -> List[str]:
+        """Identifiants des voix du magasin, triés."""
+        with self._lock:
+            self._refresh()
+            return sorted(self._index["speakers"])
+
+    def info(self, speaker_id: str) -> Dict[str, Any]:
+        """
+        Retourne l'entrée d'index d'une voix (shard, tableaux, métadonnées, date de création).
+
+        Raises:
+            KeyError: Si la voix n'existe pas.
+        """
+        with self._lock:
+            self._refresh()
+            entry = self._index["speakers"][speaker_id]
+            return json.loads(json.dumps(entry))
+
+    def get(self, speaker_id: str) -> Dict[str, np.ndarray]:
+        """
+        Charge le prompt d'une voix sans copie.
+
+        Returns:
+            Les tableaux du prompt : vues en lecture seule sur le shard projeté.
+
+        Raises:
+            KeyError: Si la voix n'existe pas.
+        """
+        with self._lock:
+            self._refresh()
+            entry = self._index["speakers"][speaker_id]
+            arrays = {}
+            for key, spec in entry["arrays"].items():
+                dtype = np.dtype(spec["dtype"])
+                count = int(np.prod(spec["shape"], dtype=np.int64))
+                mm = self._map(entry["shard"], spec["offset"] + count * dtype.itemsize)
+                arrays[key] = np.frombuffer(mm, dtype=dtype, count=count, offset=spec["offset"]).reshape(spec["shape"])
+            return arrays
+
+    def entry_bytes(self, speaker_id: str) -> int:
+        """Taille des tableaux d'une voix dans son shard."""
+        return _entry_bytes(self.info(speaker_id))
+
+    def last_used(self, speaker_id: str) -> float:
+        """Date de dernière utilisation enregistrée d'une voix (sa date de création à défaut)."""
+        entry = self.info(speaker_id)
+        return entry.get("last_used", entry["created"])
+
+    # Écriture
+
+    def _append(self, index: Dict[str, Any], items: Iterable[Tuple[str, Dict[str, np.ndarray], Dict[str, Any], float]]) -> int:
+        """Ajoute des prompts au shard courant et les inscrit dans l'index (sans l'écrire)."""
+        items = list(items)
+        if not items:
+            return 0
+        count = 0
+        shard = _shard_name(max(index["next_shard"] - 1, 0))
+        path = os.path.join(self.root_dir, shard)
+        f = open(path, "ab")
+        try:
+            for speaker_id, prompt, metadata, created in items:
+                if f.tell() >= self.shard_max_bytes:
+                    f.close()
+                    shard = _shard_name(index["next_shard"])
+                    path = os.path.join(self.root_dir, shard)
+                    f = open(path, "ab")
+                index["next_shard"] = max(index["next_shard"], int(shard[6:11]) + 1)
+
+                arrays = {}
+                for key in PROMPT_KEYS:
+                    # Même format compact que save_speaker_prompt
+                    array = np.ascontiguousarray(np.asarray(prompt[key]).astype(np.int16))
+                    f.write(b"\0" * (-f.tell() % _ALIGNMENT))
+                    arrays[key] = {"offset": f.tell(), "shape": list(array.shape), "dtype": array.dtype.str}
+                    f.write(array.tobytes())
+                index["speakers"][speaker_id] = {
+                    "shard": shard,
+                    "arrays": arrays,
+                    "metadata": dict(metadata or {}),
+                    "created": created,
+                }
+                count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            f.close()
+        return count
+
+    def put(self, speaker_id: str, prompt: Dict[str, np.ndarray], metadata: Optional[Dict[str, Any]] = None):
+        """
+        Ajoute ou remplace le prompt d'une voix.
+
+        Args:
+            speaker_id: Identifiant de la voix.
+            prompt: Tableaux semantic_prompt, coarse_prompt et fine_prompt.
+            metadata: Métadonnées sérialisables en JSON.
+        """
+        if not speaker_id:
+            raise ValueError("Identifiant de voix vide")
+        with self._writing() as index:
+            self._append(index, [(speaker_id, prompt, metadata, time.time())])
+            self._write_index()
+
+    def touch(self, speaker_id: str, min_interval_s: float = TOUCH_INTERVAL_S) -> bool:
+        """
+        Enregistre l'utilisation d'une voix (voir speaker_library.collect_store_garbage).
+
+        L'index n'est réécrit que si la dernière utilisation enregistrée date
+        de plus de min_interval_s.
+
+        Returns:
+            True si l'index a été mis à jour.
+        """
+        now = time.time()
+        with self._lock:
+            self._refresh()
+            entry = self._index["speakers"].get(speaker_id)
+            if entry is None or now - entry.get("last_used", entry["created"]) < min_interval_s:
+                return False
+        with self._writing() as index:
+            entry = index["speakers"].get(speaker_id)
+            if entry is None:
+                return False
+            entry["last_used"] = now
+            self._write_index()
+            return True
+
+    def delete(self, speaker_id: str) -> bool:
+        """
+        Supprime une voix de l'index (l'espace est récupéré par compact()).
+
+        Returns:
+            True si la voix existait.
+        """
+        with self._writing() as index:
+            if index["speakers"].pop(speaker_id, None) is None:
+                return False
+            self._write_index()
+            return True
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Réécrit les voix dans de nouveaux shards et supprime les anciens.
+
+        Returns:
+            Les tailles totales des shards avant et après compactage.
+        """
+        with self._writing() as index:
+            old_shards = self._shard_files()
+            before = sum(os.path.getsize(os.path.join(self.root_dir, s)) for s in old_shards)
+            speakers = index["speakers"]
+            items = [
+                (speaker_id, self.get(speaker_id), entry["metadata"], entry["created"])
+                for speaker_id, entry in sorted(speakers.items(), key=lambda kv: (kv[1]["shard"], kv[0]))
+            ]
+            new_index = {"version": INDEX_VERSION, "next_shard": index["next_shard"] + 1, "speakers": {}}
+            self._append(new_index, items)
+            for speaker_id, entry in speakers.items():
+                if "last_used" in entry:
+                    new_index["speakers"][speaker_id]["last_used"] = entry["last_used"]
+            self._index = new_index
+            self._write_index()
+
+            del items
+            self._maps.clear()
+            for shard in old_shards:
+                try:
+                    os.remove(os.path.join(self.root_dir, shard))
+                except OSError as e:
+                    # Sous Windows, un shard encore projeté ne peut pas être supprimé
+                    logger.warning(f"Impossible de supprimer l'ancien shard {shard}: {e}")
+            after = sum(os.path.getsize(os.path.join(self.root_dir, s)) for s in self._shard_files())
+
+        logger.info(f"Magasin de voix compacté: {before / 2**20:.1f} Mo -> {after / 2**20:.1f} Mo")
+        return {"bytes_before": before, "bytes_after": after}
+
+    def _shard_files(self) -> List[str]:
+        return sorted(name for name in os.listdir(self.root_dir) if name.startswith("shard_") and name.endswith(".bin"))
+
+    # Import / export du format un fichier par voix
+
+    def import_directory(self, speaker_dir: str, overwrite: bool = False) -> List[str]:
+        """
+        Importe les prompts npz d'un répertoire (format un fichier par voix).
+
+        Args:
+            speaker_dir: Répertoire contenant les fichiers {speaker_id}.npz.
+            overwrite: Remplacer les voix déjà présentes dans le magasin.
+
+        Returns:
+            Les identifiants importés.
+        """
+        candidates = []
+        with os.scandir(speaker_dir) as entries:
+            for entry in entries:
+                speaker_id, ext = os.path.splitext(entry.name)
+                if ext == ".npz" and entry.is_file():
+                    candidates.append((speaker_id, entry.path, entry.stat().st_mtime))
+
+        with self._writing() as index:
+            items = []
+            for speaker_id, path, mtime in sorted(candidates):
+                if speaker_id in index["speakers"] and not overwrite:
+                    continue
+                try:
+                    prompt = load_speaker_prompt(path)
+                except (OSError, KeyError, ValueError) as e:
+                    logger.warning(f"Prompt ignoré ({path}): {e}")
+                    continue
+                items.append((speaker_id, prompt, {"imported_from": os.path.basename(path)}, mtime))
+            self._append(index, items)
+            self._write_index()
+
+        imported = [item[0] for item in items]
+        logger.info(f"{len(imported)} voix importée(s) depuis {speaker_dir}")
+        return imported
+
+    def export_directory(self, speaker_dir: str, speaker_ids: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Exporte des voix au format un fichier npz par voix.
+
+        Args:
+            speaker_dir: Répertoire de destination.
+            speaker_ids: Voix à exporter (toutes par défaut).
+
+        Returns:
+            Les chemins des fichiers écrits.
+        """
+        os.makedirs(speaker_dir, exist_ok=True)
+        written = []
+        for speaker_id in (self.ids() if speaker_ids is None else speaker_ids):
+            path = os.path.join(speaker_dir, f"{speaker_id}.npz")
+            save_speaker_prompt(path, self.get(speaker_id))
+            written.append(path)
+        logger.info(f"{len(written)} voix exportée(s) vers {speaker_dir}")
+        return written
+
+    def stats(self) -> Dict[str, int]:
+        """Nombre de voix, taille des shards et octets récupérables par compactage."""
+        with self._lock:
+            self._refresh()
+            shard_bytes = sum(os.path.getsize(os.path.join(self.root_dir, s)) for s in self._shard_files())
+            live_bytes = sum(_entry_bytes(entry) for entry in self._index["speakers"].values())
+            return {
+                "speakers": len(self._index["speakers"]),
+                "shards": len(self._shard_files()),
+                "shard_bytes": shard_bytes,
+                "reclaimable_bytes": max(0, shard_bytes - live_bytes),
+            }
@@ -4,27 +4,140 @@
 import os
 import sys
 import logging
+import functools
+import contextlib
+import inspect
 import numpy as np
-import torch
+import time
 import uuid
 import datetime
 import tempfile
 from pathlib import Path
-from typing import Optional, Dict, List, Tuple, Union, Any
+from typing import Optional, Dict, List, Tuple, Union, Any, Iterator, Callable
+
+from src.audio_loader import load_audio
+from src.backends import GenerationBackend, create_backend
+from src.audio_output import (
+    OUTPUT_FORMATS,
+    OutputEncoder,
+    OutputOptions,
+    Sink,
+    check_options,
+    encode_audio,
+    resolve_format,
+    write_audio,
+)
+from src.generation_limits import (
+    DEFAULT_MIN_EOS_P,
+    GenerationLimits,
+    check_limits,
+    silence_codes,
+    trim_semantic,
+    trim_trailing_silence,
+)
+from src.model_registry import get_registry
+from src.output_cache import OutputCache
+from src.profiling import MetricsCollector, RequestProfile, current_profile, profile_request, profile_stage
+from src.model_sizes import choose_model_sizes, format_model_sizes, parse_model_size
+from src.semantic_cache import SemanticTokenCache
+from src.speaker_cache import CachedPrompt, SpeakerPromptCache
+from src.speaker_library import content_speaker_id
+from src.speaker_store import PACKED_SUBDIR, SPEAKER_STORES, PackedSpeakerStore
+from src.speaker_prompt import (
+    COARSE_RATE_HZ,
+    CODEC_SAMPLE_RATE,
+    HUBERT_CHECKPOINT,
+    HUBERT_SUBDIR,
+    HUBERT_TOKENIZER,
+    MAX_SEMANTIC_PROMPT_TOKENS,
+    SEMANTIC_RATE_HZ,
+    encode_audio_codes,
+    extract_semantic_tokens,
+    load_speaker_prompt,
+    save_speaker_prompt,
+    trim_prompt,
+)
+from src.streaming import DEFAULT_MAX_CHUNK_CHARS, StreamChunk, StreamingWavWriter, split_text_into_chunks
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def _profiled(kind: str):
+    """Profile chaque appel d'une méthode publique de StandaloneBark (voir StandaloneBark.profile)."""
+    def decorator(method):
+        if inspect.isgeneratorfunction(method):
+            @functools.wraps(method)
+            def generator_wrapper(self, *args, **kwargs):
+                with self.profile(kind):
+                    yield from method(self, *args, **kwargs)
+            return generator_wrapper
+            
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profile(kind):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+    
 class StandaloneBark:
     """Classe principale pour le clonage vocal avec Bark."""
     
-    def __init__(self, model_dir: Optional[str] = None):
+    def __init__(
+        self,
+        model_dir: Optional[str] = None,
+        precision: str = "fp32",
+        prompt_cache: Optional[SpeakerPromptCache] = None,
+        semantic_cache_dir: Optional[str] = None,
+        model_size: Union[str, Dict[str, str]] = "large",
+        max_real_time_factor: Optional[float] = None,
+        idle_offload_s: Optional[float] = None,
+        offload_mode: str = "unload",
+        speaker_store: str = "files",
+        output_format: Optional[str] = None,
+        output_sample_rate: Optional[int] = None,
+        output_lufs: Optional[float] = None,
+        output_cache_dir: Optional[str] = None,
+        output_cache_max_bytes: Optional[int] = None,
+        backend: Union[str, GenerationBackend] = "reference",
+        max_duration_s: Optional[float] = None,
+        min_eos_p: float = DEFAULT_MIN_EOS_P,
+        trim_silence: bool = True,
+    ):
         """
         Initialisation de l'instance Bark pour le clonage vocal.
         
         Args:
             model_dir: Répertoire des modèles pré-entraînés.
+            precision: Précision d'inférence des modèles ("fp32", "bf16" ou "int8").
+            prompt_cache: Cache des prompts vocaux (un cache LRU par défaut est créé).
+            semantic_cache_dir: Répertoire du cache des tokens sémantiques (désactivé si None).
+            model_size: Taille des modèles : "large", "small", "auto", ou par étape
+                ("text=large,coarse=small,fine=small" ou dictionnaire étape -> taille).
+            max_real_time_factor: Budget de latence de la politique "auto" (secondes
+                de calcul par seconde d'audio).
+            idle_offload_s: Durée d'inactivité (en secondes) après laquelle un
+                modèle est libéré (jamais si None). Le réglage est global au processus.
+            offload_mode: "unload" pour décharger les modèles inactifs, "mmap" pour
+                les remplacer par une copie CPU projetée depuis le checkpoint.
+            speaker_store: Stockage des voix : "files" (un fichier npz par voix) ou
+                "packed" (magasin compact projeté en mémoire, speaker_embeddings/packed/).
+            output_format: Format des fichiers générés ("wav", "wav16", "flac", "ogg",
+                "opus") ; déduit de l'extension du fichier de sortie si None, WAV
+                float32 à défaut.
+            output_sample_rate: Fréquence des fichiers générés (celle de Bark si None).
+            output_lufs: Sonie visée des fichiers générés (pas de normalisation si None).
+            output_cache_dir: Répertoire du cache de l'audio généré avec graine (désactivé si None).
+            output_cache_max_bytes: Taille maximale du cache de l'audio généré (illimitée si None).
+            backend: Exécution des étapes de génération : "reference" (bark.generation),
+                "compiled" (torch.compile), "onnx" (ONNX Runtime sur CPU, précision
+                fp32), ou instance de GenerationBackend (voir src.backends).
+            max_duration_s: Durée maximale générée par texte, en secondes (limite de
+                Bark, environ 15 s, si None) ; modifiable à chaque requête.
+            min_eos_p: Probabilité de fin de séquence qui arrête l'étape sémantique ;
+                modifiable à chaque requête.
+            trim_silence: Couper le silence final avant les étapes fine et EnCodec
+                (voir src.generation_limits).
         """
         self.model_dir = model_dir or os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
         self.speaker_embeddings_dir = os.path.join(self.model_dir, "speaker_embeddings")
@@ -33,50 +146,153 @@ class StandaloneBark:
         os.makedirs(self.model_dir, exist_ok=True)
         os.makedirs(self.speaker_embeddings_dir, exist_ok=True)
         
-        self.bark = None
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.models = None
+        self.precision = precision
+        self.backend = create_backend(backend, self.model_dir)
+        if self.backend.name == "onnx" and precision != "fp32":
+            raise ValueError(f"Le backend onnx n'accepte que la précision fp32 (demandée: {precision})")
+        self.prompt_cache = prompt_cache or SpeakerPromptCache(load_speaker_prompt)
+        if speaker_store not in SPEAKER_STORES:
+            raise ValueError(
+                f"Stockage des voix inconnu: {speaker_store} (valeurs possibles: {', '.join(SPEAKER_STORES)})"
+            )
+        self.speaker_store = PackedSpeakerStore(
+            os.path.join(self.speaker_embeddings_dir, PACKED_SUBDIR)
+        ) if speaker_store == "packed" else None
+        self.output_options = OutputOptions(output_format, output_sample_rate, output_lufs)
+        check_options(self.output_options)
+        self.generation_limits = GenerationLimits(max_duration_s, min_eos_p, trim_silence)
+        check_limits(self.generation_limits)
+        # Appareil détecté à la première utilisation (la détection importe torch)
+        self._device: Optional[str] = None
+        
+        # Seule la politique "auto" a besoin de connaître l'appareil dès maintenant
+        sizes = parse_model_size(model_size)
+        if sizes == "auto":
+            sizes = choose_model_sizes(self.device, precision, max_real_time_factor=max_real_time_factor)
+        self.model_sizes = sizes
+        
+        # Les tokens sémantiques dépendent du modèle texte utilisé
+        namespace = f"text_{self.model_sizes[0]}_{precision}"
+        if self.backend.name != "reference":
+            namespace += f"_{self.backend.name}"
+        self.semantic_cache = SemanticTokenCache(
+            semantic_cache_dir,
+            namespace=namespace
+        ) if semantic_cache_dir else None
+        self.output_cache = OutputCache(
+            output_cache_dir,
+            max_bytes=output_cache_max_bytes
+        ) if output_cache_dir else None
+        
+        if idle_offload_s is not None:
+            get_registry().configure_offload(idle_offload_s, offload_mode)
         
-        logger.info(f"Initialisation de Bark (appareil: {self.device})")
+        # Mesures des requêtes (voir profile)
+        self.metrics = MetricsCollector()
+        self.last_profile: Optional[RequestProfile] = None
+        
+        logger.info(f"Initialisation de Bark (modèles: {format_model_sizes(self.model_sizes)})")
         logger.info(f"Répertoire des modèles: {self.model_dir}")
         
+    @property
+    def device(self) -> str:
+        """Appareil d'inférence, détecté au premier accès."""
+        if self._device is None:
+            if self.precision == "int8" or self.backend.name == "onnx":
+                # La quantification dynamique int8 de torch et ONNX Runtime s'exécutent sur CPU
+                self._device = "cpu"
+            else:
+                import torch
+                self._device = "cuda" if torch.cuda.is_available() else "cpu"
+            logger.info(f"Appareil d'inférence: {self._device}")
+        return self._device
+        
+    @device.setter
+    def device(self, device: str):
+        self._device = device
+        
     def _load_models(self):
-        """Charge les modèles Bark si ce n'est pas déjà fait."""
-        if self.bark is not None:
+        """Prépare l'accès aux modèles Bark si ce n'est pas déjà fait.
+
+        Les poids sont partagés par toutes les instances du processus via le
+        registre de modèles ; chaque étape (texte, coarse, fine, codec) n'est
+        chargée qu'à sa première utilisation.
+        """
+        if self.models is not None:
             return
 
         try:
-            logger.info("Chargement des modèles Bark...")
-            
-            from bark import SAMPLE_RATE, generate_audio, preload_models
-            from bark.generation import (
-                generate_text_semantic,
-                preload_models,
-            )
-            from bark.api import semantic_to_waveform
-            from bark import generate_audio, SAMPLE_RATE
-            from scipy.io.wavfile import write as write_wav
-            
-            preload_models()
+            from bark import SAMPLE_RATE
             
+            self.models = get_registry().get(self.model_dir, self.device, self.precision, self.model_sizes)
             self.bark_sr = SAMPLE_RATE
-            self.generate_audio = generate_audio
-            self.generate_text_semantic = generate_text_semantic
-            self.semantic_to_waveform = semantic_to_waveform
-            self.write_wav = write_wav
-            
-            logger.info("Modèles Bark chargés avec succès")
             
         except Exception as e:
             logger.error(f"Erreur lors du chargement des modèles Bark: {e}")
             raise
             
-    def extract_speaker(self, audio_file: str, speaker_id: Optional[str] = None) -> str:
+    @contextlib.contextmanager
+    def profile(self, kind: str = "request") -> Iterator[RequestProfile]:
+        """
+        Profile une requête : durée de chaque étape, débit en tokens, facteur
+        temps réel et mémoire (voir src.profiling).
+        
+        Les méthodes publiques sont déjà profilées ; ce contexte permet de
+        regrouper plusieurs appels dans un même profil. Le profil terminé est
+        ajouté à self.metrics et conservé dans self.last_profile.
+        
+        Yields:
+            Le profil de la requête, complété à la sortie du contexte.
+        """
+        outer = current_profile() is not None
+        profile = None
+        try:
+            with profile_request(kind, self.metrics) as profile:
+                yield profile
+        finally:
+            if not outer and profile is not None:
+                self.last_profile = profile
+                
+    def _record_audio(self, audio: np.ndarray):
+        """Ajoute la durée d'un signal généré au profil de la requête en cours."""
+        profile = current_profile()
+        if profile is not None:
+            profile.add_audio(len(audio) / self.bark_sr)
+            
+    def residency(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Retourne l'état de chargement de chaque modèle.
+        
+        Returns:
+            Par étape : "state" ("resident", "mmap" ou "unloaded"), "bytes",
+            "idle_s" et "in_use".
+        """
+        self._load_models()
+        return self.models.residency()
+            
+    @_profiled("extract_speaker")
+    def extract_speaker(
+        self,
+        audio_file: str,
+        speaker_id: Optional[str] = None,
+        transcript: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> str:
         """
         Extrait l'identité vocale à partir d'un fichier audio.
         
+        L'audio est rééchantillonné à 24 kHz puis encodé avec EnCodec pour
+        obtenir les codes coarse et fine ; les tokens sémantiques viennent du
+        quantificateur HuBERT (bark_hubert_quantizer, checkpoints dans
+        models/hubert/) ou, à défaut, de la transcription fournie. Le résultat
+        est un prompt Bark compact ({speaker_id}.npz).
+        
         Args:
             audio_file: Chemin vers le fichier audio.
             speaker_id: Identifiant du locuteur (généré automatiquement si non fourni).
+            transcript: Transcription de l'audio, utilisée si HuBERT n'est pas disponible.
+            metadata: Métadonnées supplémentaires (conservées par le magasin compact).
             
         Returns:
             Identifiant du locuteur.
@@ -94,17 +310,38 @@ class StandaloneBark:
         try:
             logger.info(f"Extraction de l'identité vocale depuis {audio_file}...")
             
-            from bark.generation import generate_text_semantic
-            import scipy
+            # Charger l'audio à la fréquence du codec de Bark
+            with profile_stage("load_audio"):
+                audio, sr = load_audio(audio_file, sr=CODEC_SAMPLE_RATE)
             
-            # Charger l'audio
-            audio, sr = load_audio(audio_file)
+            # Codes acoustiques (coarse et fine) : seul le codec est nécessaire
+            with self.models.use("codec") as models, profile_stage("codec_encode"):
+                codes = encode_audio_codes(models["codec"], audio)
             
-            # Enregistrer l'embedding
-            np.save(
-                os.path.join(self.speaker_embeddings_dir, f"{speaker_id}.npy"),
-                audio
-            )
+            # Tokens sémantiques
+            with profile_stage("semantic_extract"):
+                semantic = extract_semantic_tokens(audio, self.model_dir, self.device)
+            if semantic is None:
+                if not transcript:
+                    raise RuntimeError(
+                        "Impossible d'extraire les tokens sémantiques : installez bark_hubert_quantizer "
+                        f"et placez {HUBERT_CHECKPOINT} et {HUBERT_TOKENIZER} dans "
+                        f"{os.path.join(self.model_dir, HUBERT_SUBDIR)}, ou fournissez une transcription"
+                    )
+                logger.warning("Tokens sémantiques dérivés de la transcription (approximation)")
+                with self.models.activate("text") as models, profile_stage("text") as timer:
+                    semantic = self.backend.text_to_semantic(models.models, transcript)
+                    timer.tokens = len(semantic)
+            
+            prompt = trim_prompt(semantic, codes)
+            
+            # Enregistrer le prompt vocal
+            if self.speaker_store is not None:
+                self.speaker_store.put(speaker_id, prompt, {"source": os.path.basename(audio_file), **(metadata or {})})
+            else:
+                prompt_path = self._speaker_prompt_path(speaker_id)
+                save_speaker_prompt(prompt_path, prompt)
+                self.prompt_cache.invalidate(prompt_path)
             
             logger.info(f"Identité vocale extraite et enregistrée sous l'ID: {speaker_id}")
             return speaker_id
@@ -113,15 +350,377 @@ class StandaloneBark:
             logger.error(f"Erreur lors de l'extraction de l'identité vocale: {e}")
             raise
             
+    def _speaker_prompt_path(self, speaker_id: str) -> str:
+        """Chemin du prompt vocal d'un locuteur."""
+        return os.path.join(self.speaker_embeddings_dir, f"{speaker_id}.npz")
+        
+    def has_speaker(self, speaker_id: str) -> bool:
+        """Indique si une voix existe dans la bibliothèque."""
+        if self.speaker_store is not None:
+            return speaker_id in self.speaker_store
+        return os.path.exists(self._speaker_prompt_path(speaker_id))
+        
+    def list_speakers(self) -> List[Dict[str, Any]]:
+        """
+        Liste les voix de la bibliothèque.
+        
+        Returns:
+            Une entrée par voix : "speaker_id", "bytes", "created" (horodatage)
+            et "metadata".
+        """
+        speakers = []
+        if self.speaker_store is not None:
+            for speaker_id in self.speaker_store.ids():
+                info = self.speaker_store.info(speaker_id)
+                speakers.append({
+                    "speaker_id": speaker_id,
+                    "bytes": sum(
+                        int(np.prod(spec["shape"])) * np.dtype(spec["dtype"]).itemsize
+                        for spec in info["arrays"].values()
+                    ),
+                    "created": info["created"],
+                    "metadata": info["metadata"],
+                })
+            return speakers
+            
+        with os.scandir(self.speaker_embeddings_dir) as entries:
+            for entry in entries:
+                speaker_id, ext = os.path.splitext(entry.name)
+                if ext == ".npz" and entry.is_file():
+                    stat = entry.stat()
+                    speakers.append({
+                        "speaker_id": speaker_id,
+                        "bytes": stat.st_size,
+                        "created": stat.st_mtime,
+                        "metadata": {},
+                    })
+        return sorted(speakers, key=lambda s: s["speaker_id"])
+        
+    def speaker_info(self, speaker_id: str) -> Dict[str, Any]:
+        """
+        Décrit le prompt vocal d'une voix.
+        
+        Returns:
+            L'emplacement, la forme et le type des tableaux, la durée couverte
+            par le prompt et les métadonnées.
+            
+        Raises:
+            FileNotFoundError: Si la voix n'existe pas.
+        """
+        prompt = self._load_speaker_prompt(speaker_id)
+        if self.speaker_store is not None:
+            info = self.speaker_store.info(speaker_id)
+            location = os.path.join(self.speaker_store.root_dir, info["shard"])
+            created, metadata = info["created"], info["metadata"]
+        else:
+            location = self._speaker_prompt_path(speaker_id)
+            created, metadata = os.stat(location).st_mtime, {}
+        return {
+            "speaker_id": speaker_id,
+            "location": location,
+            "created": created,
+            "arrays": {key: {"shape": list(value.shape), "dtype": str(value.dtype)} for key, value in prompt.items()},
+            "semantic_duration_s": round(len(prompt["semantic_prompt"]) / SEMANTIC_RATE_HZ, 2),
+            "acoustic_duration_s": round(prompt["fine_prompt"].shape[-1] / COARSE_RATE_HZ, 2),
+            "metadata": metadata,
+        }
+        
+    def delete_speaker(self, speaker_id: str) -> bool:
+        """
+        Supprime une voix de la bibliothèque.
+        
+        Returns:
+            True si la voix existait.
+        """
+        if self.speaker_store is not None:
+            deleted = self.speaker_store.delete(speaker_id)
+        else:
+            path = self._speaker_prompt_path(speaker_id)
+            self.prompt_cache.invalidate(path)
+            try:
+                os.remove(path)
+                deleted = True
+            except FileNotFoundError:
+                deleted = False
+        if deleted:
+            logger.info(f"Identité vocale supprimée: {speaker_id}")
+        return deleted
+        
+    def _prepare_speaker(self, speaker_id: Optional[str], audio_file: Optional[str]) -> str:
+        """Extrait l'identité vocale de audio_file si besoin et retourne l'identifiant à utiliser."""
+        if not speaker_id and not audio_file:
+            raise ValueError("Vous devez fournir soit un speaker_id, soit un audio_file")
+            
+        # Si audio_file est fourni, extraire d'abord l'identité vocale
+        if audio_file:
+            if speaker_id:
+                return self.extract_speaker(audio_file, speaker_id)
+                
+            # Identifiant adressé par le contenu : un même clip n'est extrait qu'une fois
+            if not os.path.exists(audio_file):
+                raise FileNotFoundError(f"Fichier audio non trouvé: {audio_file}")
+            speaker_id = content_speaker_id(audio_file, self._extraction_params())
+            if self.speaker_store is not None and speaker_id in self.speaker_store:
+                logger.info(f"Identité vocale déjà extraite pour {audio_file}: {speaker_id}")
+                self.speaker_store.touch(speaker_id)
+                return speaker_id
+            prompt_path = self._speaker_prompt_path(speaker_id)
+            if self.speaker_store is None and os.path.exists(prompt_path):
+                logger.info(f"Identité vocale déjà extraite pour {audio_file}: {speaker_id}")
+                # Marquer le prompt comme utilisé pour le nettoyage des prompts inutilisés
+                # (date d'accès seulement : le cache des prompts dépend de la date de modification)
+                stat = os.stat(prompt_path)
+                os.utime(prompt_path, ns=(time.time_ns(), stat.st_mtime_ns))
+                return speaker_id
+            return self.extract_speaker(audio_file, speaker_id)
+            
+        return speaker_id
+        
+    def _extraction_params(self) -> Dict[str, Any]:
+        """Paramètres d'extraction pris en compte dans l'empreinte des clips."""
+        return {
+            "sample_rate": CODEC_SAMPLE_RATE,
+            "max_semantic_tokens": MAX_SEMANTIC_PROMPT_TOKENS,
+        }
+        
+    def _cached_speaker_prompt(self, speaker_id: str) -> CachedPrompt:
+        """Retourne le prompt vocal d'un locuteur depuis le cache LRU ou le magasin compact."""
+        if self.speaker_store is not None:
+            # Vues sans copie sur le magasin projeté : pas besoin du cache LRU
+            try:
+                arrays = self.speaker_store.get(speaker_id)
+            except KeyError:
+                raise FileNotFoundError(f"Identité vocale non trouvée: {speaker_id}")
+            return CachedPrompt(arrays, 0, sum(a.nbytes for a in arrays.values()))
+        try:
+            return self.prompt_cache.get(self._speaker_prompt_path(speaker_id))
+        except FileNotFoundError:
+            legacy_path = os.path.join(self.speaker_embeddings_dir, f"{speaker_id}.npy")
+            if os.path.exists(legacy_path):
+                raise FileNotFoundError(
+                    f"L'identité vocale {speaker_id} est au format .npy (audio brut) qui n'est pas "
+                    "un prompt Bark valide : extrayez-la à nouveau depuis l'audio de référence"
+                )
+            raise FileNotFoundError(f"Identité vocale non trouvée: {speaker_id}")
+            
+    def _load_speaker_prompt(self, speaker_id: str) -> Dict[str, np.ndarray]:
+        """Charge le prompt vocal d'un locuteur."""
+        with profile_stage("prompt_load"):
+            return self._cached_speaker_prompt(speaker_id).arrays
+        
+    def _default_output_file(self, speaker_id: str) -> str:
+        """Construit un chemin de sortie horodaté pour un locuteur."""
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        return os.path.join(self.model_dir, f"generated_{speaker_id}_{timestamp}{self.output_extension}")
+        
+    @property
+    def output_extension(self) -> str:
+        """Extension des fichiers générés sans chemin explicite."""
+        return OUTPUT_FORMATS[resolve_format(self.output_options.format)].extension
+        
+    def write_output(self, sink: Sink, audio: np.ndarray):
+        """
+        Encode un signal généré vers un fichier ou un flux, selon les options de sortie.
+        
+        Args:
+            sink: Chemin du fichier (format déduit de l'extension si aucun format
+                n'est imposé) ou objet binaire muni d'une méthode write.
+            audio: Signal à la fréquence de Bark.
+        """
+        with profile_stage("encode"):
+            write_audio(sink, audio, self.bark_sr, **self.output_options._asdict())
+        
+    @_profiled("synthesize")
+    def synthesize(
+        self,
+        text: str,
+        speaker_id: Optional[str] = None,
+        audio_file: Optional[str] = None,
+        temperature: float = 0.7,
+        emotion: Optional[str] = None,
+        seed: Optional[int] = None,
+        language: str = "en",
+        max_duration_s: Optional[float] = None,
+        min_eos_p: Optional[float] = None,
+    ) -> np.ndarray:
+        """
+        Génère l'audio d'un texte en mémoire, sans l'écrire sur disque.
+        
+        Args:
+            text: Texte à prononcer.
+            speaker_id: Identifiant d'une voix précédemment extraite.
+            audio_file: Fichier audio de référence (alternative à speaker_id).
+            temperature: Contrôle de la créativité (0.5-1.0).
+            emotion: Émotion (neutral, happy, sad, angry, surprised), optionnelle.
+            seed: Graine rendant la génération reproductible (aléatoire si None) ;
+                les générations avec graine sont servies par le cache de sortie.
+            language: Code de langue (fait partie de la clé du cache de sortie).
+            max_duration_s: Durée maximale générée (celle de l'instance si None).
+            min_eos_p: Seuil de fin de séquence (celui de l'instance si None).
+            
+        Returns:
+            Le signal audio à la fréquence de Bark (self.bark_sr).
+        """
+        limits = self.generation_limits.override(max_duration_s, min_eos_p)
+        
+        # Charger les modèles si nécessaire
+        self._load_models()
+        
+        speaker_id = self._prepare_speaker(speaker_id, audio_file)
+        if emotion:
+            text = apply_emotion(text, emotion)
+            
+        # Charger l'embedding
+        history_prompt = self._load_speaker_prompt(speaker_id)
+        
+        cache_key = None
+        if self.output_cache is not None and seed is not None:
+            cache_key = self.output_cache.make_key(
+                text, history_prompt, temperature, seed,
+                emotion=emotion, language=language, model_config=self._model_config(),
+                limits=limits.output_key()
+            )
+            audio_array = self.output_cache.get(cache_key)
+            if audio_array is not None:
+                logger.info(f"Audio trouvé dans le cache pour le texte: '{text}'")
+                self._record_audio(audio_array)
+                return audio_array
+                
+        logger.info(f"Génération d'audio pour le texte: '{text}'")
+        
+        # Générer l'audio : texte -> sémantique (éventuellement en cache), puis étapes acoustiques
+        with self.models.activate("coarse", "fine", "codec"):
+            semantic_tokens = self._text_to_semantic(text, history_prompt, temperature, seed, limits)
+            audio_array = self._semantic_to_waveform(semantic_tokens, history_prompt, temperature, seed, limits=limits)
+        if cache_key is not None:
+            self.output_cache.put(cache_key, audio_array)
+        self._record_audio(audio_array)
+        return audio_array
+        
+    def _model_config(self) -> str:
+        """Configuration des modèles qui détermine le résultat d'une génération avec graine."""
+        config = f"{format_model_sizes(self.model_sizes)}|{self.precision}|{self.device}"
+        if self.backend.name != "reference":
+            config += f"|{self.backend.name}"
+        return config
+        
+    def _semantic_to_waveform(
+        self,
+        semantic_tokens: np.ndarray,
+        history_prompt: Optional[Dict[str, np.ndarray]],
+        temperature: float,
+        seed: Optional[int] = None,
+        silent: bool = False,
+        output_full: bool = False,
+        limits: Optional[GenerationLimits] = None,
+    ):
+        """
+        Étapes acoustiques (coarse, fine, décodage EnCodec) du backend, comme
+        bark.api.semantic_to_waveform, chacune mesurée séparément.
+        
+        Avec une graine, chaque étape est initialisée avec sa propre graine
+        dérivée (voir src.seeding). Le silence final est coupé des codes coarse
+        si limits.trim_silence. Les modèles doivent être activés.
+        """
+        limits = limits or self.generation_limits
+        from src.output_cache import FINE_TEMPERATURE
+        from src.seeding import seed_stage
+        
+        if seed is not None:
+            seed_stage(seed, "coarse")
+        models = self.models.models
+        with profile_stage("coarse") as timer:
+            coarse_tokens = self.backend.semantic_to_coarse(
+                models,
+                semantic_tokens,
+                history_prompt=history_prompt,
+                temp=temperature,
+                silent=silent
+            )
+            timer.tokens = coarse_tokens.size
+        codes = self._silence_codes(limits, models)
+        if codes is not None:
+            trimmed = trim_trailing_silence(coarse_tokens, codes)
+            if trimmed.shape[1] < coarse_tokens.shape[1]:
+                coarse_tokens = trimmed
+                semantic_tokens = trim_semantic(semantic_tokens, coarse_tokens)
+        if seed is not None:
+            seed_stage(seed, "fine")
+        with profile_stage("fine") as timer:
+            fine_tokens = self.backend.coarse_to_fine(models, coarse_tokens, history_prompt=history_prompt, temp=FINE_TEMPERATURE)
+            timer.tokens = fine_tokens.size - coarse_tokens.size
+        with profile_stage("codec"):
+            audio_array = self.backend.decode(models, fine_tokens)
+        if output_full:
+            full_generation = {
+                "semantic_prompt": semantic_tokens,
+                "coarse_prompt": coarse_tokens,
+                "fine_prompt": fine_tokens,
+            }
+            return full_generation, audio_array
+        return audio_array
+            
+    def _silence_codes(self, limits: GenerationLimits, models) -> Optional[np.ndarray]:
+        """Codes EnCodec du silence si la coupe du silence final est active (codec chargé)."""
+        if not limits.trim_silence:
+            return None
+        return silence_codes(models["codec"])
+            
+    @_profiled("synthesize_bytes")
+    def synthesize_bytes(
+        self,
+        text: str,
+        speaker_id: Optional[str] = None,
+        audio_file: Optional[str] = None,
+        temperature: float = 0.7,
+        emotion: Optional[str] = None,
+        format: Optional[str] = None,
+        seed: Optional[int] = None,
+        max_duration_s: Optional[float] = None,
+        min_eos_p: Optional[float] = None,
+    ) -> bytes:
+        """
+        Génère l'audio d'un texte et le retourne encodé, sans passer par le disque.
+        
+        Args:
+            text: Texte à prononcer.
+            speaker_id: Identifiant d'une voix précédemment extraite.
+            audio_file: Fichier audio de référence (alternative à speaker_id).
+            temperature: Contrôle de la créativité (0.5-1.0).
+            emotion: Émotion (neutral, happy, sad, angry, surprised), optionnelle.
+            format: Format de sortie (celui des options de sortie, WAV float32 à défaut).
+            seed: Graine rendant la génération reproductible (aléatoire si None).
+            max_duration_s: Durée maximale générée (celle de l'instance si None).
+            min_eos_p: Seuil de fin de séquence (celui de l'instance si None).
+            
+        Returns:
+            Le fichier audio encodé.
+        """
+        audio = self.synthesize(text, speaker_id=speaker_id, audio_file=audio_file,
+                                temperature=temperature, emotion=emotion, seed=seed,
+                                max_duration_s=max_duration_s, min_eos_p=min_eos_p)
+        with profile_stage("encode"):
+            return encode_audio(
+                audio,
+                self.bark_sr,
+                resolve_format(format or self.output_options.format),
+                self.output_options.sample_rate,
+                self.output_options.target_lufs,
+            )
+        
+    @_profiled("clone_voice")
     def clone_voice(
         self,
         text: str,
         speaker_id: Optional[str] = None,
         audio_file: Optional[str] = None,
-        output_file: Optional[str] = None,
+        output_file: Optional[Sink] = None,
         language: str = "en",
         temperature: float = 0.7,
-    ) -> str:
+        seed: Optional[int] = None,
+        max_duration_s: Optional[float] = None,
+        min_eos_p: Optional[float] = None,
+    ) -> Sink:
         """
         Clone une voix et génère de l'audio avec le texte fourni.
         
@@ -129,55 +728,39 @@ class StandaloneBark:
             text: Texte à prononcer.
             speaker_id: Identifiant d'une voix précédemment extraite.
             audio_file: Fichier audio de référence (alternative à speaker_id).
-            output_file: Chemin de sortie pour l'audio généré.
+            output_file: Chemin de sortie pour l'audio généré, ou objet binaire
+                muni d'une méthode write (voir write_output).
             language: Code de langue (en, fr, de, es, etc.).
             temperature: Contrôle de la créativité (0.5-1.0).
+            seed: Graine rendant la génération reproductible (aléatoire si None).
+            max_duration_s: Durée maximale générée (celle de l'instance si None).
+            min_eos_p: Seuil de fin de séquence (celui de l'instance si None).
             
         Returns:
-            Chemin vers le fichier audio généré.
+            Chemin vers le fichier audio généré (ou le flux fourni).
         """
-        if not speaker_id and not audio_file:
-            raise ValueError("Vous devez fournir soit un speaker_id, soit un audio_file")
-            
         # Charger les modèles si nécessaire
         self._load_models()
         
-        # Si audio_file est fourni, extraire d'abord l'identité vocale
-        if audio_file:
-            if not speaker_id:
-                speaker_id = f"temp_{uuid.uuid4().hex[:8]}"
-            speaker_id = self.extract_speaker(audio_file, speaker_id)
-            
-        # Vérifier que l'embedding existe
-        embedding_path = os.path.join(self.speaker_embeddings_dir, f"{speaker_id}.npy")
-        if not os.path.exists(embedding_path):
-            raise FileNotFoundError(f"Identité vocale non trouvée: {speaker_id}")
+        speaker_id = self._prepare_speaker(speaker_id, audio_file)
             
         # Créer le chemin de sortie si non fourni
         if not output_file:
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = os.path.join(
-                self.model_dir, 
-                f"generated_{speaker_id}_{timestamp}.wav"
-            )
+            output_file = self._default_output_file(speaker_id)
             
         try:
-            logger.info(f"Génération d'audio pour le texte: '{text}'")
-            
-            # Charger l'embedding
-            history_prompt = np.load(embedding_path)
-            
-            # Générer l'audio
-            audio_array = self.generate_audio(
-                text, 
-                history_prompt=history_prompt,
-                text_temp=temperature,
-                waveform_temp=temperature,
-                output_full=True
+            audio_array = self.synthesize(
+                text,
+                speaker_id=speaker_id,
+                temperature=temperature,
+                seed=seed,
+                language=language,
+                max_duration_s=max_duration_s,
+                min_eos_p=min_eos_p
             )
             
             # Enregistrer l'audio
-            self.write_wav(output_file, self.bark_sr, audio_array)
+            self.write_output(output_file, audio_array)
             
             logger.info(f"Audio généré et enregistré: {output_file}")
             return output_file
@@ -186,16 +769,290 @@ class StandaloneBark:
             logger.error(f"Erreur lors de la génération audio: {e}")
             raise
             
-    def generate_voice_with_emotion(
+    def _text_to_semantic(
+        self,
+        text: str,
+        history_prompt: Optional[Dict[str, np.ndarray]],
+        temperature: float,
+        seed: Optional[int] = None,
+        limits: Optional[GenerationLimits] = None,
+    ) -> np.ndarray:
+        """Étape texte -> sémantique, servie par le cache sémantique si possible."""
+        limits = limits or self.generation_limits
+        key = None
+        if self.semantic_cache is not None:
+            key = self.semantic_cache.make_key(text, history_prompt, temperature, seed, limits=limits.semantic_key())
+            semantic_tokens = self.semantic_cache.get(key)
+            if semantic_tokens is not None:
+                logger.info("Tokens sémantiques trouvés dans le cache")
+                return semantic_tokens
+                
+        # Le modèle texte n'est chargé qu'en cas d'absence du cache
+        with self.models.activate("text") as models:
+            if seed is not None:
+                from src.seeding import seed_stage
+                seed_stage(seed, "text")
+            with profile_stage("text") as timer:
+                semantic_tokens = self.backend.text_to_semantic(
+                    models.models,
+                    text,
+                    history_prompt=history_prompt,
+                    temp=temperature,
+                    min_eos_p=limits.min_eos_p,
+                    max_duration_s=limits.max_duration_s
+                )
+                timer.tokens = len(semantic_tokens)
+        if key is not None:
+            self.semantic_cache.put(key, semantic_tokens)
+        return semantic_tokens
+        
+    @_profiled("clone_voice_batch")
+    def clone_voice_batch(
+        self,
+        texts: List[str],
+        speaker_id: Optional[str] = None,
+        audio_file: Optional[str] = None,
+        output_dir: Optional[str] = None,
+        output_files: Optional[List[str]] = None,
+        temperature: float = 0.7,
+        batch_size: int = 8,
+        max_duration_s: Optional[float] = None,
+        min_eos_p: Optional[float] = None,
+    ) -> List[str]:
+        """
+        Clone une voix sur plusieurs textes en générant par lots.
+        
+        Chaque étape de Bark (sémantique, coarse, fine, décodage EnCodec) traite
+        jusqu'à batch_size textes par passe de modèle. Les textes sont regroupés
+        par longueur pour limiter le remplissage.
+        
+        Args:
+            texts: Textes à prononcer.
+            speaker_id: Identifiant d'une voix précédemment extraite.
+            audio_file: Fichier audio de référence (alternative à speaker_id).
+            output_dir: Répertoire de sortie (ignoré si output_files est fourni).
+            output_files: Chemins de sortie, un par texte.
+            temperature: Contrôle de la créativité (0.5-1.0).
+            batch_size: Nombre maximal de textes par lot.
+            max_duration_s: Durée maximale générée par texte (celle de l'instance si None).
+            min_eos_p: Seuil de fin de séquence (celui de l'instance si None).
+            
+        Returns:
+            Chemins vers les fichiers audio générés, dans l'ordre des textes.
+        """
+        if output_files is not None and len(output_files) != len(texts):
+            raise ValueError("output_files doit contenir un chemin par texte")
+        limits = self.generation_limits.override(max_duration_s, min_eos_p)
+            
+        # Charger les modèles si nécessaire
+        self._load_models()
+        
+        speaker_id = self._prepare_speaker(speaker_id, audio_file)
+        
+        if output_files is None:
+            output_dir = output_dir or self.model_dir
+            os.makedirs(output_dir, exist_ok=True)
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_files = [
+                os.path.join(output_dir, f"generated_{speaker_id}_{timestamp}_{i:04d}{self.output_extension}")
+                for i in range(len(texts))
+            ]
+            
+        try:
+            history_prompt = self._load_speaker_prompt(speaker_id)
+            
+            # Chaque lot est encodé en arrière-plan pendant la génération du suivant
+            with OutputEncoder(self.output_options) as encoder:
+                pending = []
+                self._generate_batch(
+                    texts, history_prompt, temperature, batch_size,
+                    on_audio=lambda i, audio: pending.append(
+                        encoder.submit(output_files[i], audio, self.bark_sr)
+                    ),
+                    limits=limits
+                )
+                for future in pending:
+                    future.result()
+                
+            logger.info(f"{len(texts)} fichier(s) audio générés par lots")
+            return list(output_files)
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de la génération audio par lots: {e}")
+            raise
+            
+    def _generate_batch(
+        self,
+        texts: List[str],
+        history_prompt,
+        temperature: float,
+        batch_size: int,
+        on_audio: Optional[Callable[[int, np.ndarray], None]] = None,
+        limits: Optional[GenerationLimits] = None,
+    ) -> List[np.ndarray]:
+        """
+        Génère les signaux audio de plusieurs textes, lot par lot.
+        
+        on_audio(indice du texte, signal) est appelé dès qu'un lot est décodé,
+        avant la génération du lot suivant. limits s'applique à chaque texte
+        (bornes de l'instance si None).
+        """
+        limits = limits or self.generation_limits
+        from src.batched_generation import generate_text_semantic_batch, semantic_to_waveform_batch
+        
+        # Trier par longueur pour que les textes d'un même lot aient des tailles proches
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        audio_arrays: List[Optional[np.ndarray]] = [None] * len(texts)
+        
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            logger.info(f"Génération du lot {start // batch_size + 1} ({len(indices)} texte(s))")
+            batch_texts = [texts[i] for i in indices]
+            
+            # Étape sémantique par lots pour les textes absents du cache
+            semantic_tokens: List[Optional[np.ndarray]] = [None] * len(batch_texts)
+            keys = [None] * len(batch_texts)
+            if self.semantic_cache is not None:
+                for j, text in enumerate(batch_texts):
+                    keys[j] = self.semantic_cache.make_key(text, history_prompt, temperature, limits=limits.semantic_key())
+                    semantic_tokens[j] = self.semantic_cache.get(keys[j])
+            missing = [j for j, tokens in enumerate(semantic_tokens) if tokens is None]
+            if missing:
+                # activate (et non use) : l'échantillonnage tire dans le générateur
+                # aléatoire global de torch, que les générations avec graine
+                # concurrentes réservent le temps de leur génération
+                with self.models.activate("text") as loaded, profile_stage("text") as timer:
+                    generated = generate_text_semantic_batch(
+                        self.backend.batch_models(loaded.models),
+                        [batch_texts[j] for j in missing],
+                        history_prompt=history_prompt,
+                        temp=temperature,
+                        min_eos_p=limits.min_eos_p,
+                        max_gen_duration_s=limits.max_duration_s,
+                    )
+                    timer.tokens = sum(len(tokens) for tokens in generated)
+                for j, tokens in zip(missing, generated):
+                    semantic_tokens[j] = tokens
+                    if keys[j] is not None:
+                        self.semantic_cache.put(keys[j], tokens)
+                        
+            with self.models.activate("coarse", "fine", "codec") as loaded:
+                batch_audio = semantic_to_waveform_batch(
+                    self.backend.batch_models(loaded.models),
+                    semantic_tokens,
+                    history_prompt=history_prompt,
+                    temp=temperature,
+                    silence_codes=self._silence_codes(limits, loaded.models),
+                )
+            for i, audio_array in zip(indices, batch_audio):
+                audio_arrays[i] = audio_array
+                self._record_audio(audio_array)
+                if on_audio is not None:
+                    on_audio(i, audio_array)
+        return audio_arrays
+        
+    @_profiled("clone_voice_stream")
+    def clone_voice_stream(
         self,
         text: str,
         speaker_id: Optional[str] = None,
         audio_file: Optional[str] = None,
         output_file: Optional[str] = None,
         language: str = "en",
+        temperature: float = 0.7,
+        max_chunk_chars: int = DEFAULT_MAX_CHUNK_CHARS,
+        silence_s: float = 0.25,
+        seed: Optional[int] = None,
+        max_duration_s: Optional[float] = None,
+        min_eos_p: Optional[float] = None,
+    ) -> Iterator[StreamChunk]:
+        """
+        Clone une voix sur un texte long, phrase par phrase.
+        
+        Le texte est découpé en morceaux de la taille d'une phrase ; chaque
+        morceau est généré avec la génération précédente comme prompt vocal,
+        puis ajouté au fichier WAV dès qu'il est décodé. Le premier morceau est
+        donc disponible après la génération de la première phrase seulement.
+        
+        Args:
+            text: Texte à prononcer.
+            speaker_id: Identifiant d'une voix précédemment extraite.
+            audio_file: Fichier audio de référence (alternative à speaker_id).
+            output_file: Chemin de sortie pour l'audio généré (None pour ne rien écrire).
+            language: Code de langue (en, fr, de, es, etc.).
+            temperature: Contrôle de la créativité (0.5-1.0).
+            max_chunk_chars: Longueur maximale d'un morceau de texte.
+            silence_s: Durée du silence inséré entre deux morceaux.
+            seed: Graine rendant la génération reproductible (aléatoire si None) ;
+                le morceau i utilise la graine seed + i.
+            max_duration_s: Durée maximale générée par morceau (celle de l'instance si None).
+            min_eos_p: Seuil de fin de séquence (celui de l'instance si None).
+            
+        Yields:
+            Un StreamChunk par morceau généré.
+        """
+        chunks = split_text_into_chunks(text, max_chars=max_chunk_chars, language=language)
+        if not chunks:
+            raise ValueError("Le texte à prononcer est vide")
+        limits = self.generation_limits.override(max_duration_s, min_eos_p)
+            
+        # Charger les modèles si nécessaire
+        self._load_models()
+        
+        speaker_id = self._prepare_speaker(speaker_id, audio_file)
+        history_prompt = self._load_speaker_prompt(speaker_id)
+        silence = np.zeros(int(silence_s * self.bark_sr), dtype=np.float32)
+        
+        logger.info(f"Génération en flux de {len(chunks)} morceau(x) de texte")
+        writer = StreamingWavWriter(output_file, self.bark_sr) if output_file else None
+        try:
+            for index, chunk_text in enumerate(chunks):
+                with self.models.activate("coarse", "fine", "codec"):
+                    chunk_seed = seed + index if seed is not None else None
+                    semantic_tokens = self._text_to_semantic(chunk_text, history_prompt, temperature, chunk_seed, limits)
+                    full_generation, audio_array = self._semantic_to_waveform(
+                        semantic_tokens,
+                        history_prompt,
+                        temperature,
+                        chunk_seed,
+                        silent=True,
+                        output_full=True,
+                        limits=limits
+                    )
+                # La génération précédente sert de prompt pour garder la même voix
+                history_prompt = full_generation
+                self._record_audio(audio_array)
+                
+                if writer is not None:
+                    with profile_stage("encode"):
+                        if index > 0:
+                            writer.append(silence)
+                        writer.append(audio_array)
+                    
+                logger.info(f"Morceau {index + 1}/{len(chunks)} généré: '{chunk_text}'")
+                yield StreamChunk(index, chunk_text, audio_array, output_file)
+                
+        except Exception as e:
+            logger.error(f"Erreur lors de la génération audio en flux: {e}")
+            raise
+        finally:
+            if writer is not None:
+                writer.close()
+            
+    @_profiled("generate_voice_with_emotion")
+    def generate_voice_with_emotion(
+        self,
+        text: str,
+        speaker_id: Optional[str] = None,
+        audio_file: Optional[str] = None,
+        output_file: Optional[Sink] = None,
+        language: str = "en",
         emotion: str = "neutral",
         temperature: float = 0.7,
-    ) -> str:
+        seed: Optional[int] = None,
+        max_duration_s: Optional[float] = None,
+        min_eos_p: Optional[float] = None,
+    ) -> Sink:
         """
         Génère de l'audio avec émotion spécifiée.
         
@@ -203,28 +1060,19 @@ class StandaloneBark:
             text: Texte à prononcer.
             speaker_id: Identifiant d'une voix précédemment extraite.
             audio_file: Fichier audio de référence (alternative à speaker_id).
-            output_file: Chemin de sortie pour l'audio généré.
+            output_file: Chemin de sortie pour l'audio généré, ou flux binaire.
             language: Code de langue (en, fr, de, es, etc.).
             emotion: Émotion (neutral, happy, sad, angry, surprised).
             temperature: Contrôle de la créativité (0.5-1.0).
+            seed: Graine rendant la génération reproductible (aléatoire si None).
+            max_duration_s: Durée maximale générée (celle de l'instance si None).
+            min_eos_p: Seuil de fin de séquence (celui de l'instance si None).
             
         Returns:
             Chemin vers le fichier audio généré.
         """
         # Ajouter des modificateurs d'émotion au texte
-        emotion_prefixes = {
-            "neutral": "",
-            "happy": "[RIRE] [JOYEUX] ",
-            "sad": "[TRISTE] [SOLENNEL] ",
-            "angry": "[COLÈRE] [INTENSE] ",
-            "surprised": "[SURPRISE] [EXCITÉ] "
-        }
-        
-        if emotion not in emotion_prefixes:
-            logger.warning(f"Émotion '{emotion}' non reconnue, utilisation de 'neutral'")
-            emotion = "neutral"
-            
-        modified_text = emotion_prefixes[emotion] + text
+        modified_text = apply_emotion(text, emotion)
         
         # Utiliser la méthode clone_voice standard avec le texte modifié
         return self.clone_voice(
@@ -233,41 +1081,26 @@ class StandaloneBark:
             audio_file=audio_file,
             output_file=output_file,
             language=language,
-            temperature=temperature
+            temperature=temperature,
+            seed=seed,
+            max_duration_s=max_duration_s,
+            min_eos_p=min_eos_p
         )
             
+# Modificateurs d'émotion ajoutés au début du texte
+EMOTION_PREFIXES = {
+    "neutral": "",
+    "happy": "[RIRE] [JOYEUX] ",
+    "sad": "[TRISTE] [SOLENNEL] ",
+    "angry": "[COLÈRE] [INTENSE] ",
+    "surprised": "[SURPRISE] [EXCITÉ] "
+}
+
 # Fonctions utilitaires
-def load_audio(file_path, sr=None):
-    """Charge un fichier audio avec le bon format pour Bark."""
-    try:
-        import scipy
-        
-        # Détecter le format de fichier
-        if file_path.endswith('.mp3') or file_path.endswith('.ogg') or file_path.endswith('.flac'):
-            try:
-                import librosa
-                audio, file_sr = librosa.load(file_path, sr=sr)
-                return audio, file_sr
-            except ImportError:
-                logger.warning("librosa non installé, certains formats audio peuvent ne pas être pris en charge")
-                
-        # Lire le fichier WAV
-        file_sr, audio = scipy.io.wavfile.read(file_path)
-        audio = audio.astype(np.float32)
-        
-        # Normaliser
-        if audio.ndim > 1:
-            audio = audio.mean(axis=1)
-        audio = audio / np.max(np.abs(audio))
-        
-        # Rééchantillonner si nécessaire
-        if sr is not None and file_sr != sr:
-            from scipy import signal
-            audio = signal.resample(audio, int(len(audio) * sr / file_sr))
-            file_sr = sr
-            
-        return audio, file_sr
-        
-    except Exception as e:
-        logger.error(f"Erreur lors du chargement de l'audio: {e}")
-        raise 
\ No newline at end of file
+def apply_emotion(text: str, emotion: Optional[str]) -> str:
+    """Ajoute au texte le modificateur correspondant à une émotion."""
+    emotion = emotion or "neutral"
+    if emotion not in EMOTION_PREFIXES:
+        logger.warning(f"Émotion '{emotion}' non reconnue, utilisation de 'neutral'")
+        emotion = "neutral"
+    return EMOTION_PREFIXES[emotion] + text
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Outils pour la synthèse en flux : découpage du texte en phrases et écriture
+incrémentale d'un fichier WAV.
+"""
+
+import re
+import struct
+import logging
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Le modèle sémantique de Bark couvre environ 13 secondes de parole : au-delà
+# de ~220 caractères le texte est tronqué ou la qualité se dégrade.
+DEFAULT_MAX_CHUNK_CHARS = 220
+
+# Langues dont le modèle punkt de NLTK est disponible
+_PUNKT_LANGUAGES = {
+    "cs": "czech", "da": "danish", "de": "german", "el": "greek", "en": "english",
+    "es": "spanish", "et": "estonian", "fi": "finnish", "fr": "french", "it": "italian",
+    "nl": "dutch", "no": "norwegian", "pl": "polish", "pt": "portuguese", "ru": "russian",
+    "sl": "slovene", "sv": "swedish", "tr": "turkish",
+}
+
+
+class StreamChunk(NamedTuple):
+    """Morceau d'audio produit par la synthèse en flux."""
+    index: int
+    text: str
+    audio: np.ndarray
+    output_file: Optional[str]
+
+
+def _split_sentences(text: str, language: str = "en") -> List[str]:
+    """Découpe un texte en phrases avec punkt (NLTK), ou une regex à défaut."""
+    try:
+        import nltk
+        return nltk.sent_tokenize(text, language=_PUNKT_LANGUAGES.get(language, "english"))
+    except ImportError:
+        logger.warning("nltk non installé, découpage des phrases simplifié")
+    except LookupError:
+        logger.warning("Données punkt de NLTK absentes (voir download_nltk_data), découpage des phrases simplifié")
+    return [s for s in re.split(r"(?<=[.!?。！？])\s+", text) if s]
+
+
+def _split_long_sentence(sentence: str, max_chars: int) -> List[str]:
+    """Découpe une phrase trop longue aux virgules, puis aux espaces."""
+    parts = []
+    current = ""
+    for piece in re.split(r"(?<=[,;:])\s+|\s+", sentence):
+        candidate = f"{current} {piece}".strip()
+        if current and len(candidate) > max_chars:
+            parts.append(current)
+            current = piece
+        else:
+            current = candidate
+    if current:
+        parts.append(current)
+    return parts
+
+
+def split_text_into_chunks(
+    text: str,
+    max_chars: int = DEFAULT_MAX_CHUNK_CHARS,
+    language: str = "en",
+) -> List[str]:
+    """
+    Découpe un texte en morceaux de la taille d'une phrase pour Bark.
+
+    Les phrases courtes consécutives sont regroupées tant que le morceau reste
+    sous max_chars ; les phrases plus longues sont redécoupées.
+
+    Args:
+        text: Texte à découper.
+        max_chars: Longueur maximale d'un morceau en caractères.
+        language: Code de langue (en, fr, de, es, etc.).
+
+    Returns:
+        Liste des morceaux de texte, dans l'ordre.
+    """
+    text = re.sub(r"\s+", " ", text).strip()
+    if not text:
+        return []
+
+    chunks = []
+    current = ""
+    for sentence in _split_sentences(text, language):
+        pieces = [sentence] if len(sentence) <= max_chars else _split_long_sentence(sentence, max_chars)
+        for piece in pieces:
+            candidate = f"{current} {piece}".strip()
+            if current and len(candidate) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class StreamingWavWriter:
+    """
+    Écrit un fichier WAV float32 morceau par morceau.
+
+    L'en-tête est mis à jour après chaque ajout, si bien que le fichier reste
+    lisible pendant la génération.
+    """
+
+    _HEADER_SIZE = 44
+
+    def __init__(self, path: str, sample_rate: int):
+        """
+        Args:
+            path: Chemin du fichier WAV à créer.
+            sample_rate: Fréquence d'échantillonnage.
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.n_samples = 0
+        self._file = open(path, "wb")
+        self._write_header()
+
+    def _write_header(self):
+        data_size = self.n_samples * 4
+        self._file.seek(0)
+        self._file.write(b"RIFF")
+        self._file.write(struct.pack("<I", 36 + data_size))
+        self._file.write(b"WAVE")
+        # Format 3 = IEEE float, mono, 32 bits
+        self._file.write(b"fmt ")
+        self._file.write(struct.pack("<IHHIIHH", 16, 3, 1, self.sample_rate, self.sample_rate * 4, 4, 32))
+        self._file.write(b"data")
+        self._file.write(struct.pack("<I", data_size))
+
+    def append(self, audio: np.ndarray):
+        """Ajoute des échantillons à la fin du fichier."""
+        samples = np.asarray(audio, dtype="<f4").ravel()
+        self._file.seek(self._HEADER_SIZE + self.n_samples * 4)
+        self._file.write(samples.tobytes())
+        self.n_samples += len(samples)
+        self._write_header()
+        self._file.flush()
+
+    def close(self):
+        """Ferme le fichier."""
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -4,9 +4,12 @@
 import os
 import sys
 import unittest
+import unittest.mock
 import tempfile
 import shutil
 import logging
+import importlib.util
+import numpy as np
 from pathlib import Path
 
 # Configuration du logging
@@ -19,6 +22,39 @@ sys.path.append(str(Path(__file__).parent.parent))
 # Importer nos modules
 from src.standalone_bark import StandaloneBark
 from src.download_models import download_bark_models, ensure_bark_installed
+from src.model_registry import ModelRegistry, LoadedModels
+from src.streaming import StreamingWavWriter, split_text_into_chunks
+from src.speaker_prompt import encode_audio_codes, load_speaker_prompt, save_speaker_prompt, trim_prompt
+from src.speaker_cache import SpeakerPromptCache
+from src.speaker_library import collect_garbage, content_speaker_id
+from src.semantic_cache import SemanticTokenCache
+from src.server import StubEngine, create_server
+from src.scheduler import MicroBatchScheduler
+
+BENCHMARKS_DIR = str(Path(__file__).parent.parent / "benchmarks")
+
+_worker_state = {}
+
+def _stub_worker_initializer(model_dir, barrier):
+    """
+    Initialisation des processus de travail des tests : modèles factices
+    (benchmarks/stub_backend.py) et premier lot de chaque processus
+    synchronisé, pour vérifier que les lots sont répartis entre les processus.
+    """
+    sys.path.insert(0, BENCHMARKS_DIR)
+    from stub_backend import stub_backend
+    
+    _worker_state["stub"] = stub_backend(model_dir)
+    _worker_state["stub"].__enter__()
+    clone_voice_batch = StandaloneBark.clone_voice_batch
+    
+    def synchronized_clone_voice_batch(self, *args, **kwargs):
+        if not _worker_state.get("synchronized"):
+            _worker_state["synchronized"] = True
+            barrier.wait()
+        return clone_voice_batch(self, *args, **kwargs)
+    
+    StandaloneBark.clone_voice_batch = synchronized_clone_voice_batch
 
 class TestBarkVoiceCloning(unittest.TestCase):
     """Tests pour le projet Bark Voice Cloning."""
@@ -91,9 +127,12 @@ class TestBarkVoiceCloning(unittest.TestCase):
             # Vérifier que l'ID est correct
             self.assertEqual(speaker_id, "test_speaker")
             
-            # Vérifier que le fichier d'embedding existe
-            embedding_path = os.path.join(self.model_dir, "speaker_embeddings", f"{speaker_id}.npy")
+            # Vérifier que le prompt vocal existe et contient les trois séquences de tokens
+            embedding_path = os.path.join(self.model_dir, "speaker_embeddings", f"{speaker_id}.npz")
             self.assertTrue(os.path.exists(embedding_path))
+            with np.load(embedding_path) as prompt:
+                self.assertEqual(set(prompt.files), {"semantic_prompt", "coarse_prompt", "fine_prompt"})
+                self.assertEqual(prompt["fine_prompt"].shape[0], 8)
         except Exception as e:
             self.fail(f"L'extraction de l'identité vocale a échoué: {e}")
     
@@ -163,5 +202,1476 @@ class TestBarkVoiceCloning(unittest.TestCase):
         except Exception as e:
             self.fail(f"La génération vocale avec émotion a échoué: {e}")
 
+class TestModelRegistry(unittest.TestCase):
+    """Tests du registre de modèles (sans téléchargement)."""
+    
+    class CountingRegistry(ModelRegistry):
+        """Registre qui compte les chargements au lieu de charger Bark."""
+        
+        def __init__(self):
+            super().__init__()
+            self.load_count = 0
+        
+        def _load(self, key):
+            import time
+            time.sleep(0.05)
+            self.load_count += 1
+            return LoadedModels(key, {}, 0.05, 0)
+    
+    def test_models_loaded_once_across_threads(self):
+        """Plusieurs threads demandant la même clé ne déclenchent qu'un chargement."""
+        import threading
+        
+        registry = self.CountingRegistry()
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(registry.get("models", "cpu")))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        self.assertEqual(registry.load_count, 1)
+        self.assertTrue(all(entry is results[0] for entry in results))
+        
+        # Une autre clé déclenche un nouveau chargement
+        registry.get("other_models", "cpu")
+        self.assertEqual(registry.load_count, 2)
+        self.assertEqual(len(registry.stats()["entries"]), 2)
+    
+    def test_mmap_loading_matches_bark(self):
+        """Les poids projetés en mémoire sont identiques à ceux chargés par Bark."""
+        try:
+            import torch
+            from bark import generation
+            from bark.model import GPT, GPTConfig
+        except ImportError:
+            self.skipTest("bark n'est pas installé")
+        from src.model_registry import _load_gpt_model
+        
+        cfg = dict(input_vocab_size=64, output_vocab_size=64, n_layer=1, n_head=2, n_embd=16, block_size=32)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "coarse_2.pt")
+            torch.save({"model_args": dict(cfg), "model": GPT(GPTConfig(**cfg)).state_dict(),
+                        "best_val_loss": torch.tensor(1.0)}, path)
+            reference = generation._load_model(path, "cpu", model_type="coarse")
+            mapped = _load_gpt_model(path, "cpu", "coarse", mmap=True)
+            for (name, a), (_, b) in zip(reference.state_dict().items(), mapped.state_dict().items()):
+                self.assertTrue(torch.equal(a, b), name)
+    
+    def test_unsupported_precision(self):
+        """Une précision inconnue est refusée."""
+        with self.assertRaises(ValueError):
+            ModelRegistry().get("models", "cpu", precision="fp8")
+        with self.assertRaises(ValueError):
+            ModelRegistry().get("models", "cuda", precision="int8")
+    
+    def test_converted_models_are_cached(self):
+        """Les modèles int8 sont quantifiés une fois puis relus depuis le cache."""
+        try:
+            import torch
+            from bark.model import GPT, GPTConfig
+        except ImportError:
+            self.skipTest("bark n'est pas installé")
+        from src.model_registry import QUANTIZED_DIR, _load_converted_model
+        
+        cfg = dict(input_vocab_size=64, output_vocab_size=64, n_layer=1, n_head=2, n_embd=16, block_size=32)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "coarse_2.pt")
+            torch.save({"model_args": dict(cfg), "model": GPT(GPTConfig(**cfg)).state_dict(),
+                        "best_val_loss": torch.tensor(1.0)}, path)
+            x = torch.randint(0, 64, (1, 8))
+            
+            first = _load_converted_model(tmp, path, "cpu", "coarse", "int8")
+            self.assertTrue(os.path.exists(os.path.join(tmp, QUANTIZED_DIR, "coarse_int8.pt")))
+            with unittest.mock.patch("src.model_registry._convert_precision") as convert:
+                second = _load_converted_model(tmp, path, "cpu", "coarse", "int8")
+                convert.assert_not_called()
+            with torch.no_grad():
+                self.assertTrue(torch.equal(first(x)[0], second(x)[0]))
+
+    def test_stages_loaded_on_demand_and_offloaded(self):
+        """Chaque étape est chargée à sa première utilisation et libérée après inactivité."""
+        import time
+
+        loaded = []
+        def loader(stage, mmap):
+            loaded.append((stage, mmap))
+            return None if mmap else object()
+
+        entry = LoadedModels(ModelRegistry.make_key("models", "cpu"), loader=loader)
+        self.assertEqual(entry.residency()["codec"]["state"], "unloaded")
+
+        with entry.use("codec") as models:
+            models["codec"]
+        self.assertEqual(loaded, [("codec", False)])
+        self.assertEqual(entry.residency()["codec"]["state"], "resident")
+        self.assertEqual(entry.residency()["text"]["state"], "unloaded")
+
+        # Une étape utilisée n'est pas libérée ; sans copie projetée, elle est déchargée
+        now = time.monotonic() + 60
+        with entry.use("codec"):
+            self.assertEqual(entry.offload_idle(30, mode="mmap", now=now), [])
+        self.assertEqual(entry.offload_idle(30, mode="mmap", now=now + 60), ["codec"])
+        self.assertEqual(entry.residency()["codec"]["state"], "unloaded")
+
+        # Une nouvelle utilisation recharge l'étape
+        entry.models["codec"]
+        self.assertEqual(loaded[-1], ("codec", False))
+
+class TestModelSizes(unittest.TestCase):
+    """Tests de la configuration des tailles de modèles par étape."""
+    
+    def test_parse_model_size(self):
+        """Tailles globales, par étape et invalides."""
+        from src.model_sizes import parse_model_size
+        
+        self.assertEqual(parse_model_size("small"), ("small", "small", "small"))
+        self.assertEqual(parse_model_size("coarse=small,fine=small"), ("large", "small", "small"))
+        self.assertEqual(parse_model_size({"text": "small"}), ("small", "large", "large"))
+        self.assertEqual(parse_model_size("auto"), "auto")
+        for invalid in ("medium", "codec=small", "text=tiny"):
+            with self.assertRaises(ValueError):
+                parse_model_size(invalid)
+    
+    def test_auto_policy_downgrades_fine_first(self):
+        """La politique auto réduit d'abord fine, puis coarse, puis texte."""
+        from src.model_sizes import choose_model_sizes, estimate_memory_bytes
+        
+        plenty = 64 * 2**30
+        self.assertEqual(choose_model_sizes("cpu", available_bytes=plenty), ("large", "large", "large"))
+        
+        budget = estimate_memory_bytes(("large", "large", "small")) / 0.8
+        self.assertEqual(choose_model_sizes("cpu", available_bytes=int(budget)), ("large", "large", "small"))
+        self.assertEqual(choose_model_sizes("cpu", available_bytes=2**20), ("small", "small", "small"))
+        
+        # Un budget de latence serré impose aussi les petits modèles
+        self.assertEqual(
+            choose_model_sizes("cpu", available_bytes=plenty, max_real_time_factor=4.0),
+            ("large", "small", "small")
+        )
+    
+    def test_registry_key_includes_sizes(self):
+        """Des tailles différentes donnent des entrées distinctes du registre."""
+        self.assertNotEqual(
+            ModelRegistry.make_key("models", "cpu", "fp32", "large"),
+            ModelRegistry.make_key("models", "cpu", "fp32", "coarse=small")
+        )
+        with self.assertRaises(ValueError):
+            ModelRegistry.make_key("models", "cpu", "fp32", "auto")
+
+class TestStreaming(unittest.TestCase):
+    """Tests du découpage de texte et de l'écriture WAV incrémentale."""
+    
+    def test_split_text_into_chunks(self):
+        """Les phrases sont regroupées sans dépasser la taille maximale."""
+        text = "Bonjour. Ceci est un test. " + "Une phrase beaucoup plus longue, avec des virgules, " * 6 + "fin."
+        chunks = split_text_into_chunks(text, max_chars=80, language="fr")
+        
+        self.assertEqual(chunks[0], "Bonjour. Ceci est un test.")
+        self.assertTrue(all(len(chunk) <= 80 for chunk in chunks))
+        self.assertEqual(" ".join(chunks).split(), text.split())
+        self.assertEqual(split_text_into_chunks("   "), [])
+    
+    def test_streaming_wav_writer(self):
+        """Le fichier WAV est lisible après chaque ajout."""
+        import numpy as np
+        from scipy.io import wavfile
+        
+        test_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(test_dir, "stream.wav")
+            with StreamingWavWriter(path, 24000) as writer:
+                writer.append(np.full(100, 0.5, dtype=np.float32))
+                sr, audio = wavfile.read(path)
+                self.assertEqual((sr, len(audio)), (24000, 100))
+                writer.append(np.full(50, -0.5, dtype=np.float32))
+            
+            sr, audio = wavfile.read(path)
+            self.assertEqual(len(audio), 150)
+            self.assertEqual(audio.dtype, np.float32)
+            self.assertAlmostEqual(float(audio[-1]), -0.5)
+        finally:
+            shutil.rmtree(test_dir)
+
+class TestSpeakerPrompt(unittest.TestCase):
+    """Tests du format des prompts vocaux."""
+    
+    def test_trim_prompt_alignment(self):
+        """Le prompt est réduit au contexte utile et garde le rapport 75 / 49.9."""
+        semantic = np.arange(1000) % 10000
+        codes = np.random.randint(0, 1024, size=(8, 1500))
+        prompt = trim_prompt(semantic, codes)
+        
+        self.assertEqual(len(prompt["semantic_prompt"]), 256)
+        self.assertEqual(prompt["coarse_prompt"].shape, (2, 385))
+        self.assertEqual(prompt["fine_prompt"].shape, (8, 385))
+        self.assertEqual(round(385 / 256, 1), round(75 / 49.9, 1))
+        np.testing.assert_array_equal(prompt["fine_prompt"], codes[:, -385:])
+    
+    def test_save_and_load_prompt(self):
+        """Un prompt enregistré se recharge à l'identique en int64."""
+        prompt = trim_prompt(np.arange(100), np.random.randint(0, 1024, size=(8, 200)))
+        test_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(test_dir, "speaker.npz")
+            save_speaker_prompt(path, prompt)
+            loaded = load_speaker_prompt(path)
+            for key, value in prompt.items():
+                np.testing.assert_array_equal(loaded[key], value)
+                self.assertEqual(loaded[key].dtype, np.int64)
+        finally:
+            shutil.rmtree(test_dir)
+    
+    def test_interrupted_save_keeps_previous_prompt(self):
+        """Une écriture interrompue ne laisse ni prompt tronqué ni fichier temporaire."""
+        prompt = trim_prompt(np.arange(100), np.full((8, 200), 3))
+        test_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(test_dir, "speaker.npz")
+            save_speaker_prompt(path, prompt)
+            
+            def partial_savez(f, **arrays):
+                f.write(b"PK\x03\x04")
+                raise OSError("disque plein")
+            
+            with unittest.mock.patch("src.speaker_prompt.np.savez", side_effect=partial_savez):
+                with self.assertRaises(OSError):
+                    save_speaker_prompt(path, trim_prompt(np.arange(100), np.full((8, 200), 5)))
+            
+            self.assertEqual(os.listdir(test_dir), ["speaker.npz"])
+            np.testing.assert_array_equal(load_speaker_prompt(path)["fine_prompt"], prompt["fine_prompt"])
+        finally:
+            shutil.rmtree(test_dir)
+
+class TestSpeakerPromptCache(unittest.TestCase):
+    """Tests du cache LRU des prompts vocaux."""
+    
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(3):
+            path = os.path.join(self.test_dir, f"speaker_{i}.npz")
+            save_speaker_prompt(path, trim_prompt(np.arange(100), np.full((8, 200), i)))
+            self.paths.append(path)
+    
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+    
+    def test_hits_misses_and_eviction(self):
+        """Les prompts sont servis depuis le cache et le plus ancien est évincé."""
+        cache = SpeakerPromptCache(load_speaker_prompt, max_entries=2)
+        cache.get(self.paths[0])
+        cache.get(self.paths[0])
+        cache.get(self.paths[1])
+        cache.get(self.paths[2])
+        
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (1, 3, 1))
+        self.assertEqual(stats["entries"], 2)
+        
+        # speaker_0 a été évincé : nouvel accès = échec de cache
+        cache.get(self.paths[0])
+        self.assertEqual(cache.stats()["misses"], 4)
+    
+    def test_invalidation_on_file_change(self):
+        """Un fichier modifié est rechargé."""
+        cache = SpeakerPromptCache(load_speaker_prompt)
+        self.assertEqual(cache.get(self.paths[0]).arrays["fine_prompt"][0, 0], 0)
+        
+        save_speaker_prompt(self.paths[0], trim_prompt(np.arange(120), np.full((8, 250), 7)))
+        self.assertEqual(cache.get(self.paths[0]).arrays["fine_prompt"][0, 0], 7)
+        self.assertEqual(cache.stats()["invalidations"], 1)
+    
+    def test_byte_limit(self):
+        """La taille totale du cache reste sous la limite en octets."""
+        one_entry = SpeakerPromptCache(load_speaker_prompt).get(self.paths[0]).nbytes
+        cache = SpeakerPromptCache(load_speaker_prompt, max_bytes=int(one_entry * 1.5))
+        for path in self.paths:
+            cache.get(path)
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertLessEqual(cache.stats()["bytes"], one_entry * 1.5)
+
+class TestSpeakerLibrary(unittest.TestCase):
+    """Tests des identifiants adressés par contenu et du nettoyage."""
+    
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+    
+    def _write(self, name, data=b"x" * 100, age_s=0):
+        import time
+        path = os.path.join(self.test_dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        t = time.time() - age_s
+        os.utime(path, (t, t))
+        return path
+    
+    def test_content_speaker_id(self):
+        """L'identifiant dépend du contenu et des paramètres, pas du nom du fichier."""
+        a = self._write("a.wav", b"RIFF-same-bytes")
+        b = self._write("b.wav", b"RIFF-same-bytes")
+        c = self._write("c.wav", b"RIFF-other-bytes")
+        
+        self.assertEqual(content_speaker_id(a), content_speaker_id(b))
+        self.assertNotEqual(content_speaker_id(a), content_speaker_id(c))
+        self.assertNotEqual(content_speaker_id(a, {"sample_rate": 24000}), content_speaker_id(a, {"sample_rate": 16000}))
+        self.assertTrue(content_speaker_id(a).startswith("clip_"))
+    
+    def test_collect_garbage(self):
+        """Seuls les prompts automatiques anciens ou en excès sont supprimés."""
+        named = self._write("alice.npz", age_s=10 * 86400)
+        old_clip = self._write("clip_0001.npz", age_s=3 * 86400)
+        old_temp = self._write("temp_0002.npy", age_s=2 * 86400)
+        recent_1 = self._write("clip_0003.npz", age_s=60)
+        recent_2 = self._write("clip_0004.npz", age_s=30)
+        
+        removed = collect_garbage(self.test_dir, max_age_s=86400, max_total_bytes=150)
+        
+        self.assertEqual(set(removed), {old_clip, old_temp, recent_1})
+        self.assertTrue(os.path.exists(named))
+        self.assertTrue(os.path.exists(recent_2))
+    
+    def test_reused_clip_hits_prompt_cache(self):
+        """Réutiliser un clip marque son prompt comme utilisé sans invalider le cache des prompts."""
+        import time
+        clip = self._write("ref.wav", b"RIFF-clip-bytes")
+        bark = StandaloneBark(model_dir=self.test_dir)
+        speaker_id = content_speaker_id(clip, bark._extraction_params())
+        prompt_path = bark._speaker_prompt_path(speaker_id)
+        save_speaker_prompt(prompt_path, trim_prompt(np.arange(100), np.full((8, 200), 3)))
+        old = time.time() - 3 * 86400
+        os.utime(prompt_path, (old, old))
+        mtime_ns = os.stat(prompt_path).st_mtime_ns
+        
+        for _ in range(3):
+            self.assertEqual(bark._prepare_speaker(None, clip), speaker_id)
+            bark._load_speaker_prompt(speaker_id)
+        
+        stats = bark.prompt_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["invalidations"]), (2, 1, 0))
+        self.assertEqual(os.stat(prompt_path).st_mtime_ns, mtime_ns)
+        self.assertEqual(collect_garbage(bark.speaker_embeddings_dir, max_age_s=86400), [])
+
+class TestSpeakerStore(unittest.TestCase):
+    """Tests du magasin compact des voix."""
+    
+    def _prompt(self, seed):
+        rng = np.random.RandomState(seed)
+        return {
+            "semantic_prompt": rng.randint(0, 10_000, 256),
+            "coarse_prompt": rng.randint(0, 1024, (2, 385)),
+            "fine_prompt": rng.randint(0, 1024, (8, 385)),
+        }
+    
+    def test_put_get_delete_compact(self):
+        """Les voix sont relues sans copie et l'espace supprimé est récupéré."""
+        from src.speaker_store import PackedSpeakerStore
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            store = PackedSpeakerStore(tmp, shard_max_bytes=16_000)
+            prompts = {f"voice_{i}": self._prompt(i) for i in range(6)}
+            for speaker_id, prompt in prompts.items():
+                store.put(speaker_id, prompt, {"source": f"{speaker_id}.wav"})
+            
+            loaded = store.get("voice_3")
+            self.assertFalse(loaded["fine_prompt"].flags.writeable)
+            self.assertTrue(np.array_equal(loaded["fine_prompt"], prompts["voice_3"]["fine_prompt"]))
+            self.assertEqual(store.info("voice_3")["metadata"], {"source": "voice_3.wav"})
+            
+            for i in range(4):
+                self.assertTrue(store.delete(f"voice_{i}"))
+            self.assertFalse(store.delete("voice_0"))
+            before = store.stats()
+            self.assertGreater(before["reclaimable_bytes"], 0)
+            store.compact()
+            
+            # Un autre lecteur voit l'index compacté
+            reader = PackedSpeakerStore(tmp)
+            self.assertEqual(reader.ids(), ["voice_4", "voice_5"])
+            self.assertLess(reader.stats()["shard_bytes"], before["shard_bytes"])
+            for speaker_id in reader.ids():
+                for key, value in prompts[speaker_id].items():
+                    self.assertTrue(np.array_equal(reader.get(speaker_id)[key], value))
+    
+    def test_import_export_per_file_layout(self):
+        """Les voix passent du format un fichier par voix au magasin, et inversement."""
+        from src.speaker_store import PackedSpeakerStore
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            files_dir = os.path.join(tmp, "files")
+            os.makedirs(files_dir)
+            save_speaker_prompt(os.path.join(files_dir, "alice.npz"), self._prompt(1))
+            save_speaker_prompt(os.path.join(files_dir, "bob.npz"), self._prompt(2))
+            
+            store = PackedSpeakerStore(os.path.join(tmp, "store"))
+            self.assertEqual(store.import_directory(files_dir), ["alice", "bob"])
+            self.assertEqual(store.import_directory(files_dir), [])
+            
+            export_dir = os.path.join(tmp, "export")
+            store.export_directory(export_dir, ["bob"])
+            exported = load_speaker_prompt(os.path.join(export_dir, "bob.npz"))
+            original = load_speaker_prompt(os.path.join(files_dir, "bob.npz"))
+            for key in original:
+                self.assertTrue(np.array_equal(exported[key], original[key]))
+    
+    def test_collect_store_garbage(self):
+        """Le nettoyage retire du magasin compact les clips inutilisés, puis récupère leur place."""
+        import time
+        from src.speaker_library import collect_store_garbage
+        from src.speaker_store import PackedSpeakerStore
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            store = PackedSpeakerStore(tmp)
+            old = time.time() - 3 * 86400
+            with unittest.mock.patch("src.speaker_store.time.time", return_value=old):
+                for i, speaker_id in enumerate(["alice", "clip_old", "clip_reused"]):
+                    store.put(speaker_id, self._prompt(i))
+            store.put("clip_recent", self._prompt(3))
+            self.assertTrue(store.touch("clip_reused"))
+            self.assertFalse(store.touch("clip_reused"))
+            
+            self.assertEqual(collect_store_garbage(store, max_age_s=86400, dry_run=True), ["clip_old"])
+            self.assertEqual(len(store), 4)
+            before = store.stats()["shard_bytes"]
+            self.assertEqual(collect_store_garbage(store, max_age_s=86400), ["clip_old"])
+            
+            reader = PackedSpeakerStore(tmp)
+            self.assertEqual(reader.ids(), ["alice", "clip_recent", "clip_reused"])
+            self.assertLess(reader.stats()["shard_bytes"], before)
+            # La dernière utilisation survit au compactage
+            self.assertGreater(reader.last_used("clip_reused"), old + 86400)
+            self.assertEqual(
+                collect_store_garbage(reader, max_age_s=None, max_total_bytes=reader.entry_bytes("clip_reused") - 1),
+                ["clip_recent", "clip_reused"]
+            )
+            self.assertEqual(reader.ids(), ["alice"])
+            self.assertGreater(reader.entry_bytes("alice"), 0)
+
+class TestBulkExtract(unittest.TestCase):
+    """Tests de l'extraction en masse (extraction simulée, sans modèles)."""
+    
+    class _FakeBark:
+        def __init__(self, speaker_dir):
+            self.speaker_embeddings_dir = speaker_dir
+            self.extracted = []
+        
+        def _extraction_params(self):
+            return {}
+        
+        def _load_models(self):
+            pass
+        
+        def has_speaker(self, speaker_id):
+            return speaker_id in self.extracted
+        
+        def extract_speaker(self, audio_file, speaker_id=None, transcript=None, metadata=None):
+            if transcript == "échec":
+                raise RuntimeError("extraction impossible")
+            self.extracted.append(speaker_id)
+            return speaker_id
+    
+    def test_manifest_skip_and_summary(self):
+        """Les clips déjà extraits sont ignorés et le manifeste de synthèse est complet."""
+        import json
+        from src.bulk_extract import extract_bulk, load_items
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("a", "b", "c"):
+                with open(os.path.join(tmp, f"{name}.wav"), "wb") as f:
+                    f.write(name.encode() * 100)
+            manifest = os.path.join(tmp, "clips.jsonl")
+            with open(manifest, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"audio": "a.wav", "speaker_id": "alice"}) + "\n")
+                f.write(json.dumps({"audio": "b.wav"}) + "\n")
+                f.write(json.dumps({"audio": "c.wav", "transcript": "échec"}) + "\n")
+                f.write(json.dumps({"audio": "absent.wav"}) + "\n")
+            
+            bark = self._FakeBark(os.path.join(tmp, "speakers"))
+            items = load_items(manifest)
+            summary = extract_bulk(bark, items, workers=2)
+            self.assertEqual((summary["clips"], summary["extracted"], summary["skipped"], summary["failed"]), (4, 2, 0, 2))
+            self.assertIn("alice", bark.extracted)
+            self.assertIn(content_speaker_id(os.path.join(tmp, "b.wav"), {}), bark.extracted)
+            
+            # Deuxième passage : rien à réextraire, sauf si le clip a changé
+            with open(os.path.join(tmp, "a.wav"), "wb") as f:
+                f.write(b"nouveau contenu")
+            summary = extract_bulk(bark, items, workers=2)
+            self.assertEqual((summary["extracted"], summary["skipped"]), (1, 1))
+            
+            with open(summary["summary_path"], "r", encoding="utf-8") as f:
+                records = {r["speaker_id"]: r for r in map(json.loads, f)}
+            self.assertEqual(records["alice"]["content_id"], content_speaker_id(os.path.join(tmp, "a.wav"), {}))
+            self.assertEqual(records["alice"]["status"], "extracted")
+    
+    def test_duplicate_id_with_missing_clip(self):
+        """Un identifiant répété garde le premier clip, même si le suivant est absent."""
+        import json
+        from src.bulk_extract import extract_bulk, load_items
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "a.wav"), "wb") as f:
+                f.write(b"a" * 100)
+            manifest = os.path.join(tmp, "clips.jsonl")
+            with open(manifest, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"audio": "a.wav", "speaker_id": "alice"}) + "\n")
+                f.write(json.dumps({"audio": "absent.wav", "speaker_id": "alice"}) + "\n")
+            
+            bark = self._FakeBark(os.path.join(tmp, "speakers"))
+            summary = extract_bulk(bark, load_items(manifest), workers=2)
+            self.assertEqual((summary["extracted"], summary["failed"]), (1, 0))
+            
+            with open(summary["summary_path"], "r", encoding="utf-8") as f:
+                records = {r["speaker_id"]: r for r in map(json.loads, f)}
+            self.assertEqual(records["alice"]["audio_file"], os.path.join(tmp, "a.wav"))
+            self.assertEqual(records["alice"]["status"], "extracted")
+            self.assertNotIn("error", records["alice"])
+
+class TestSemanticTokenCache(unittest.TestCase):
+    """Tests du cache disque des tokens sémantiques."""
+    
+    def test_key_and_roundtrip(self):
+        """La clé ignore les différences d'espaces et dépend de la voix et de la température."""
+        prompt_a = {"semantic_prompt": np.arange(10)}
+        prompt_b = {"semantic_prompt": np.arange(1, 11)}
+        key = SemanticTokenCache.make_key("Bonjour  le\nmonde", prompt_a, 0.7)
+        
+        self.assertEqual(key, SemanticTokenCache.make_key(" Bonjour le monde ", prompt_a, 0.7))
+        self.assertNotEqual(key, SemanticTokenCache.make_key("Bonjour le monde", prompt_b, 0.7))
+        self.assertNotEqual(key, SemanticTokenCache.make_key("Bonjour le monde", prompt_a, 0.8))
+        self.assertNotEqual(key, SemanticTokenCache.make_key("Bonjour le monde", prompt_a, 0.7, seed=1))
+        
+        test_dir = tempfile.mkdtemp()
+        try:
+            cache = SemanticTokenCache(test_dir)
+            self.assertIsNone(cache.get(key))
+            cache.put(key, np.array([1, 2, 9999]))
+            np.testing.assert_array_equal(cache.get(key), [1, 2, 9999])
+            self.assertEqual(cache.stats(), {"hits": 1, "misses": 1})
+        finally:
+            shutil.rmtree(test_dir)
+
+class TestOutputCache(unittest.TestCase):
+    """Tests du cache de l'audio généré et des graines par étape."""
+    
+    def _prompt(self, seed):
+        rng = np.random.RandomState(seed)
+        return {
+            "semantic_prompt": rng.randint(0, 10_000, 64),
+            "coarse_prompt": rng.randint(0, 1024, (2, 96)),
+            "fine_prompt": rng.randint(0, 1024, (8, 96)),
+        }
+    
+    def test_key_components(self):
+        """Chaque élément de la requête change la clé ; les espaces du texte non."""
+        from src.output_cache import OutputCache
+        
+        prompt = self._prompt(0)
+        base = dict(text="Bonjour  à tous", history_prompt=prompt, temperature=0.7, seed=1,
+                    emotion=None, language="fr", model_config="large|fp32|cpu")
+        key = OutputCache.make_key(**base)
+        self.assertEqual(key, OutputCache.make_key(**{**base, "text": " Bonjour à tous "}))
+        fine_changed = {k: v.copy() for k, v in prompt.items()}
+        fine_changed["fine_prompt"][7, 0] += 1
+        for change in ({"seed": 2}, {"temperature": 0.8}, {"emotion": "happy"}, {"language": "en"},
+                       {"model_config": "small|fp32|cpu"}, {"history_prompt": fine_changed}):
+            self.assertNotEqual(key, OutputCache.make_key(**{**base, **change}), change)
+    
+    def test_put_get_and_eviction(self):
+        """Les entrées lues le moins récemment sont supprimées au-delà de la taille maximale."""
+        import time
+        from src.output_cache import OutputCache
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            audio = np.linspace(-1, 1, 10_000, dtype=np.float32)
+            cache = OutputCache(tmp, max_bytes=int(2.5 * audio.nbytes))
+            keys = [OutputCache.make_key(f"texte {i}", None, 0.7, 0) for i in range(3)]
+            self.assertIsNone(cache.get(keys[0]))
+            cache.put(keys[0], audio)
+            cache.put(keys[1], audio)
+            time.sleep(0.01)
+            self.assertTrue(np.array_equal(cache.get(keys[0]), audio))
+            time.sleep(0.01)
+            cache.put(keys[2], audio)
+            self.assertIsNone(cache.get(keys[1]))
+            self.assertIsNotNone(cache.get(keys[0]))
+            self.assertEqual(cache.stats(), {"hits": 2, "misses": 2, "evictions": 1})
+    
+    def test_stage_seeds(self):
+        """Les graines par étape sont stables et distinctes."""
+        from src.seeding import SEEDED_STAGES, seed_stage, stage_seed
+        
+        seeds = {stage: stage_seed(42, stage) for stage in SEEDED_STAGES}
+        self.assertEqual(len(set(seeds.values())), len(SEEDED_STAGES))
+        self.assertEqual(seeds["coarse"], stage_seed(42, "coarse"))
+        self.assertNotEqual(seeds["coarse"], stage_seed(43, "coarse"))
+        seed_stage(42, "fine")
+        first = np.random.rand(3)
+        seed_stage(42, "fine")
+        self.assertTrue(np.array_equal(first, np.random.rand(3)))
+
+class TestProfiling(unittest.TestCase):
+    """Tests des mesures par étape et de leur export."""
+    
+    def test_stages_and_nesting(self):
+        """Les étapes s'enregistrent dans le profil courant ; un profil imbriqué réutilise le premier."""
+        import time
+        from src.profiling import MetricsCollector, current_profile, profile_request, profile_stage
+        
+        with profile_stage("text") as timer:
+            timer.tokens = 10
+        self.assertIsNone(current_profile())
+        
+        collector = MetricsCollector()
+        with profile_request("clone_voice", collector) as profile:
+            with profile_stage("text") as timer:
+                time.sleep(0.01)
+                timer.tokens = 50
+            with profile_request("synthesize", collector) as inner:
+                self.assertIs(inner, profile)
+                with profile_stage("text") as timer:
+                    timer.tokens = 25
+            profile.add_audio(2.0)
+        self.assertIsNone(current_profile())
+        
+        record = profile.stages["text"]
+        self.assertEqual((record.calls, record.tokens), (2, 75))
+        self.assertGreaterEqual(record.seconds, 0.01)
+        self.assertGreaterEqual(profile.total_s, record.seconds)
+        self.assertAlmostEqual(profile.real_time_factor, profile.total_s / 2.0)
+        self.assertGreater(profile.peak_rss_bytes, 0)
+        self.assertEqual(profile.to_dict()["stages"]["text"]["tokens"], 75)
+        self.assertIn("text", profile.format())
+        self.assertEqual(collector.requests, {"clone_voice": 1})
+    
+    def test_metrics_export(self):
+        """Les totaux s'exportent au format Prometheus et en JSON."""
+        import json
+        from src.profiling import MetricsCollector, profile_request, profile_stage
+        
+        collector = MetricsCollector()
+        for _ in range(2):
+            with profile_request("synthesize", collector) as profile:
+                with profile_stage("coarse") as timer:
+                    timer.tokens = 100
+                with profile_stage("codec"):
+                    pass
+                profile.add_audio(1.5)
+        text = collector.prometheus(prefix="test")
+        self.assertIn('test_requests_total{kind="synthesize"} 2', text)
+        self.assertIn('test_stage_calls_total{stage="codec"} 2', text)
+        self.assertIn('test_stage_tokens_total{stage="coarse"} 200', text)
+        self.assertNotIn('test_stage_tokens_total{stage="codec"}', text)
+        self.assertIn("test_audio_seconds_total 3.000000", text)
+        payload = json.loads(collector.to_json())
+        self.assertEqual(payload["stages"]["coarse"]["tokens"], 200)
+        self.assertEqual(payload["audio_seconds"], 3.0)
+    
+    def test_profiled_methods(self):
+        """Les méthodes publiques (générateurs compris) produisent un profil par appel."""
+        from src.profiling import profile_stage
+        from src.standalone_bark import _profiled
+        
+        class _Bark(StandaloneBark):
+            @_profiled("stream")
+            def stream(self, n):
+                for i in range(n):
+                    with profile_stage("text"):
+                        yield i
+            
+            @_profiled("outer")
+            def outer(self):
+                return list(self.stream(3))
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            bark = _Bark(model_dir=tmp)
+            self.assertEqual(list(bark.stream(2)), [0, 1])
+            self.assertEqual((bark.last_profile.kind, bark.last_profile.stages["text"].calls), ("stream", 2))
+            bark.outer()
+            self.assertEqual((bark.last_profile.kind, bark.last_profile.stages["text"].calls), ("outer", 3))
+            self.assertEqual(bark.metrics.requests, {"stream": 1, "outer": 1})
+
+class TestSynthesisServer(unittest.TestCase):
+    """Tests du serveur de synthèse avec un moteur factice."""
+    
+    def _start(self, engine, **kwargs):
+        import threading
+        server = create_server(engine, port=0, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.service.shutdown)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+    
+    def _request(self, url, payload=None):
+        import json
+        import urllib.error
+        import urllib.request
+        data = json.dumps(payload).encode() if payload is not None else None
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=10) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+    
+    def test_sync_async_and_metrics(self):
+        """Requêtes synchrones, asynchrones, santé et métriques."""
+        import json
+        import time
+        base = self._start(StubEngine())
+        
+        status, body = self._request(f"{base}/synthesize", {"text": "bonjour", "speaker_id": "alice"})
+        self.assertEqual(status, 200)
+        self.assertEqual(body[:4], b"RIFF")
+        
+        status, body = self._request(f"{base}/synthesize", {"text": "salut", "speaker_id": "alice", "async": True})
+        self.assertEqual(status, 202)
+        job_id = json.loads(body)["job_id"]
+        for _ in range(100):
+            status, body = self._request(f"{base}/jobs/{job_id}")
+            if json.loads(body)["status"] == "done":
+                break
+            time.sleep(0.01)
+        status, body = self._request(f"{base}/jobs/{job_id}/audio")
+        self.assertEqual((status, body[:4]), (200, b"RIFF"))
+        
+        status, body = self._request(f"{base}/synthesize", {"text": "flac", "speaker_id": "alice", "format": "flac"})
+        self.assertEqual((status, body[:4]), (200, b"fLaC"))
+        
+        status, _ = self._request(f"{base}/synthesize", {"speaker_id": "alice"})
+        self.assertEqual(status, 400)
+        status, _ = self._request(f"{base}/synthesize", {"text": "x", "speaker_id": "alice", "format": "mp4"})
+        self.assertEqual(status, 400)
+        
+        status, body = self._request(f"{base}/health")
+        self.assertEqual(json.loads(body)["status"], "ok")
+        status, body = self._request(f"{base}/metrics")
+        self.assertIn(b"bark_completed_total 3", body)
+        status, body = self._request(f"{base}/metrics.json")
+        self.assertEqual((status, json.loads(body)["completed_total"]), (200, 3))
+    
+    def test_generation_limits(self):
+        """max_duration_s borne la durée renvoyée ; des bornes invalides sont refusées (400)."""
+        import io
+        import soundfile as sf
+        base = self._start(StubEngine())
+        
+        status, body = self._request(f"{base}/synthesize", {"text": "x" * 40, "speaker_id": "alice", "max_duration_s": 0.5})
+        self.assertEqual(status, 200)
+        self.assertAlmostEqual(sf.info(io.BytesIO(body)).duration, 0.5, places=2)
+        status, _ = self._request(f"{base}/synthesize", {"text": "x", "speaker_id": "alice", "min_eos_p": 1.5})
+        self.assertEqual(status, 400)
+        status, _ = self._request(f"{base}/synthesize", {"text": "x", "speaker_id": "alice", "max_duration_s": -1})
+        self.assertEqual(status, 400)
+    
+    def test_backpressure(self):
+        """Au-delà de la capacité de la file, les requêtes sont refusées (503)."""
+        base = self._start(StubEngine(delay_s=0.5), max_queue=1)
+        statuses = [
+            self._request(f"{base}/synthesize", {"text": "x", "speaker_id": "a", "async": True})[0]
+            for _ in range(4)
+        ]
+        self.assertIn(202, statuses)
+        self.assertIn(503, statuses)
+
+class TestMicroBatchScheduler(unittest.TestCase):
+    """Tests de l'ordonnanceur de micro-lots avec un faux StandaloneBark."""
+    
+    class FakeBark:
+        def __init__(self):
+            from src.generation_limits import GenerationLimits
+            
+            self.batches = []
+            self.limits = []
+            self.generation_limits = GenerationLimits()
+        
+        def _load_models(self):
+            pass
+        
+        def _prepare_speaker(self, speaker_id, audio_file):
+            if speaker_id == "missing":
+                raise FileNotFoundError(speaker_id)
+            return speaker_id
+        
+        def _load_speaker_prompt(self, speaker_id):
+            return {"speaker": speaker_id}
+        
+        def _generate_batch(self, texts, history_prompt, temperature, batch_size, limits=None):
+            self.batches.append((history_prompt["speaker"], temperature, list(texts)))
+            self.limits.append(limits)
+            return [np.full(len(text), temperature) for text in texts]
+    
+    def test_concurrent_requests_are_batched(self):
+        """Les requêtes d'une même fenêtre sont regroupées par voix et température."""
+        bark = self.FakeBark()
+        with MicroBatchScheduler(bark, max_batch_size=4, max_wait_ms=200) as scheduler:
+            futures = [scheduler.submit("x" * n, speaker_id="alice") for n in range(1, 4)]
+            futures.append(scheduler.submit("bob", speaker_id="bob", temperature=0.5))
+            results = [f.result(timeout=5) for f in futures]
+        
+        self.assertEqual([len(r) for r in results], [1, 2, 3, 3])
+        self.assertEqual(results[3][0], 0.5)
+        self.assertEqual(sorted(len(texts) for _, _, texts in bark.batches), [1, 3])
+        self.assertEqual(scheduler.stats()["batches"], 1)
+    
+    def test_errors_reach_the_right_futures(self):
+        """Une erreur dans un groupe n'affecte pas les autres requêtes."""
+        bark = self.FakeBark()
+        with MicroBatchScheduler(bark, max_batch_size=4, max_wait_ms=200) as scheduler:
+            bad = scheduler.submit("a", speaker_id="missing")
+            good = scheduler.submit("ab", speaker_id="alice")
+            self.assertEqual(len(good.result(timeout=5)), 2)
+            with self.assertRaises(FileNotFoundError):
+                bad.result(timeout=5)
+    
+    def test_requests_with_different_limits_are_not_batched(self):
+        """Les bornes de génération font partie du regroupement et sont transmises au lot."""
+        bark = self.FakeBark()
+        with MicroBatchScheduler(bark, max_batch_size=4, max_wait_ms=200) as scheduler:
+            futures = [
+                scheduler.submit("a", speaker_id="alice"),
+                scheduler.submit("b", speaker_id="alice", max_duration_s=2.0),
+                scheduler.submit("c", speaker_id="alice", max_duration_s=2.0),
+            ]
+            for future in futures:
+                future.result(timeout=5)
+            with self.assertRaises(ValueError):
+                scheduler.submit("d", speaker_id="alice", min_eos_p=0)
+        
+        self.assertEqual(sorted(len(texts) for _, _, texts in bark.batches), [1, 2])
+        self.assertEqual(sorted(limits.max_duration_s or 0 for limits in bark.limits), [0, 2.0])
+
+class TestBarkWorkerPool(unittest.TestCase):
+    """Tests du pool de processus avec les modèles factices des benchmarks."""
+    
+    def test_batches_are_spread_over_workers(self):
+        """Les lots sont répartis entre deux processus, l'ordre des sorties est conservé et les échecs remontent."""
+        import functools
+        import multiprocessing
+        from src.worker_pool import BarkWorkerPool
+        
+        sys.path.insert(0, BENCHMARKS_DIR)
+        from stub_backend import make_stub_checkpoints
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            model_dir = os.path.join(tmp, "models")
+            make_stub_checkpoints(model_dir)
+            speaker_dir = os.path.join(model_dir, "speaker_embeddings")
+            os.makedirs(speaker_dir)
+            save_speaker_prompt(os.path.join(speaker_dir, "spk.npz"), trim_prompt(np.arange(100) % 50, np.full((8, 200), 3)))
+            
+            # Chaque processus attend l'autre avant son premier lot : le lot
+            # n'aboutit que si deux processus distincts en prennent chacun une part
+            barrier = multiprocessing.get_context("spawn").Barrier(2, timeout=120)
+            texts = ["A much longer first sentence.", "Hi.", "Medium text here.", "Ok."]
+            with BarkWorkerPool(
+                workers=2, model_dir=model_dir, threads_per_worker=1, max_duration_s=0.3,
+                initializer=functools.partial(_stub_worker_initializer, model_dir, barrier)
+            ) as pool:
+                output_files = pool.clone_voice_batch(texts, speaker_id="spk", output_dir=tmp, batch_size=8)
+                self.assertEqual(len(output_files), 4)
+                for i, path in enumerate(output_files):
+                    self.assertTrue(path.endswith(f"_{i:04d}.wav"))
+                    self.assertTrue(os.path.getsize(path) > 0)
+                
+                explicit = [os.path.join(tmp, f"out_{i}.wav") for i in range(len(texts))]
+                self.assertEqual(pool.clone_voice_batch(texts, speaker_id="spk", output_files=explicit), explicit)
+                self.assertTrue(all(os.path.exists(path) for path in explicit))
+                
+                with self.assertRaises(RuntimeError) as context:
+                    pool.clone_voice_batch(["Hello."], speaker_id="missing", output_dir=tmp)
+                self.assertIn("FileNotFoundError", str(context.exception))
+    
+    def test_default_output_files_use_format_extension(self):
+        """Les chemins de sortie par défaut ont l'extension du format de sortie."""
+        from src.worker_pool import BarkWorkerPool
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            for output_format, extension in ((None, ".wav"), ("flac", ".flac"), ("opus", ".opus")):
+                pool = BarkWorkerPool(workers=2, model_dir=tmp, output_format=output_format)
+                pool._run_jobs = lambda jobs: [None] * len(jobs)
+                output_files = pool.clone_voice_batch(["a", "b"], speaker_id="spk", output_dir=tmp)
+                self.assertTrue(all(path.endswith(extension) for path in output_files))
+
+class TestAudioLoader(unittest.TestCase):
+    """Tests du chargement audio par blocs."""
+    
+    def _write_wav(self, path, sr, data):
+        from scipy.io.wavfile import write
+        write(path, sr, data)
+    
+    def test_streaming_resampler_matches_resample_poly(self):
+        """Le rééchantillonnage par blocs est identique au rééchantillonnage complet."""
+        from scipy.signal import resample_poly
+        from src.audio_loader import StreamingResampler
+        
+        rng = np.random.RandomState(0)
+        x = rng.randn(50_000)
+        for orig_sr, up, down in ((44100, 80, 147), (16000, 3, 2)):
+            resampler = StreamingResampler(orig_sr, orig_sr * up // down)
+            out = [resampler.process(x[i:i + 3001]) for i in range(0, len(x), 3001)]
+            out.append(resampler.flush())
+            np.testing.assert_allclose(np.concatenate(out), resample_poly(x, up, down), atol=1e-5)
+    
+    def test_load_audio_downmixes_resamples_and_normalizes(self):
+        """Un WAV stéréo 44,1 kHz devient un signal mono 24 kHz de crête 1."""
+        from src.audio_loader import load_audio
+        
+        t = np.arange(44100) / 44100
+        tone = (0.25 * np.sin(2 * np.pi * 220 * t) * 32767).astype(np.int16)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "stereo.wav")
+            self._write_wav(path, 44100, np.stack([tone, tone], axis=1))
+            audio, sr = load_audio(path, sr=24000, block_frames=4096)
+            self.assertEqual(sr, 24000)
+            self.assertEqual(audio.shape, (24000,))
+            self.assertAlmostEqual(float(np.max(np.abs(audio))), 1.0, places=5)
+            
+            loud, _ = load_audio(path, sr=24000, normalize="loudness", target_lufs=-30.0)
+            self.assertLess(float(np.max(np.abs(loud))), 0.25)
+    
+    def test_silent_input_is_not_divided_by_zero(self):
+        """Un fichier silencieux ne produit pas de NaN."""
+        from src.audio_loader import load_audio
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "silence.wav")
+            self._write_wav(path, 16000, np.zeros(16000, dtype=np.int16))
+            audio, _ = load_audio(path, sr=24000)
+            self.assertFalse(np.isnan(audio).any())
+            self.assertEqual(float(np.max(np.abs(audio))), 0.0)
+
+class TestAudioOutput(unittest.TestCase):
+    """Tests de l'encodage des fichiers générés."""
+    
+    def _speech_like(self, sr=24000, seconds=2.0):
+        t = np.arange(int(sr * seconds)) / sr
+        return (0.3 * np.sin(2 * np.pi * 220 * t) * (1 + np.sin(2 * np.pi * 3 * t)) / 2).astype(np.float32)
+    
+    def test_formats_round_trip(self):
+        """Chaque format se relit ; les formats compressés sont plus petits que le WAV float32."""
+        import io
+        import soundfile as sf
+        from src.audio_output import OUTPUT_FORMATS, encode_audio
+        
+        audio = self._speech_like()
+        sizes = {}
+        for name in OUTPUT_FORMATS:
+            data = encode_audio(audio, 24000, name)
+            sizes[name] = len(data)
+            decoded, sr = sf.read(io.BytesIO(data), dtype="float32")
+            self.assertEqual(sr, 24000)
+            if name in ("wav", "wav16", "flac"):
+                self.assertEqual(len(decoded), len(audio))
+                self.assertLess(np.max(np.abs(decoded - audio)), 1e-4)
+        self.assertLess(sizes["wav16"], sizes["wav"] * 0.51)
+        self.assertLess(sizes["flac"], sizes["wav16"])
+        self.assertLess(sizes["opus"], sizes["flac"])
+    
+    def test_resample_loudness_and_sinks(self):
+        """Rééchantillonnage, normalisation de la sonie, flux non positionnable et encodeur en arrière-plan."""
+        import io
+        import soundfile as sf
+        from src.audio_loader import LoudnessMeter
+        from src.audio_output import OutputEncoder, OutputOptions, check_options, write_audio
+        
+        audio = self._speech_like()
+        
+        class _Sink:
+            def __init__(self):
+                self.chunks = []
+            
+            def write(self, data):
+                self.chunks.append(bytes(data))
+        
+        sink = _Sink()
+        write_audio(sink, audio, 24000, format="wav", sample_rate=48000, target_lufs=-20.0)
+        decoded, sr = sf.read(io.BytesIO(b"".join(sink.chunks)), dtype="float32")
+        self.assertEqual((sr, len(decoded)), (48000, 2 * len(audio)))
+        meter = LoudnessMeter(sr)
+        meter.process(decoded)
+        self.assertAlmostEqual(meter.integrated(), -20.0, delta=0.1)
+        
+        with self.assertRaises(ValueError):
+            check_options(OutputOptions("opus", 44100))
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, f"out_{i}.flac") for i in range(3)]
+            with OutputEncoder(OutputOptions(sample_rate=16000), max_pending=1) as encoder:
+                futures = [encoder.submit(path, audio, 24000) for path in paths]
+            self.assertEqual([f.result() for f in futures], paths)
+            for path in paths:
+                info = sf.info(path)
+                self.assertEqual((info.format, info.samplerate), ("FLAC", 16000))
+
+class TestBackends(unittest.TestCase):
+    """Tests des backends de génération."""
+    
+    def test_create_backend(self):
+        """Les backends sont choisis par nom ; une instance est acceptée telle quelle."""
+        from src.backends import CompiledBackend, ReferenceBackend, create_backend
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIsInstance(create_backend("reference", tmp), ReferenceBackend)
+            backend = CompiledBackend()
+            self.assertIs(create_backend(backend, tmp), backend)
+            with self.assertRaises(ValueError):
+                create_backend("tensorrt", tmp)
+            with self.assertRaises(ValueError):
+                StandaloneBark(model_dir=tmp, backend="tensorrt")
+    
+    def test_replaced_modules_are_shared(self):
+        """Les modules remplacés sont créés une fois par module d'origine."""
+        import torch
+        from src.backends import _BatchedBackend
+        
+        class CountingBackend(_BatchedBackend):
+            name = "counting"
+            created = 0
+            
+            def _replace_module(self, stage, module):
+                CountingBackend.created += 1
+                return ("replaced", stage)
+        
+        text_model = torch.nn.Linear(2, 2)
+        models = {"text": {"model": text_model, "tokenizer": "tok"}, "fine": torch.nn.Linear(2, 2)}
+        view = CountingBackend().batch_models(models)
+        self.assertEqual(view["text"], {"model": ("replaced", "text"), "tokenizer": "tok"})
+        self.assertEqual(view["fine"], ("replaced", "fine"))
+        self.assertEqual(CountingBackend().batch_models(models)["fine"], ("replaced", "fine"))
+        self.assertEqual(CountingBackend.created, 2)
+        self.assertEqual(sorted(view), ["fine", "text"])
+    
+    @unittest.skipUnless(importlib.util.find_spec("onnxruntime"), "onnxruntime non installé")
+    def test_onnx_codec_decoder_buckets(self):
+        """Le décodeur ONNX (causal, par tranches de longueur fixe) reproduit le décodeur torch."""
+        import torch
+        from src.backends import CODEC_BUCKET_FRAMES, _OnnxCodecDecoder, _OnnxExporter
+        
+        class CausalDecoder(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.conv = torch.nn.Conv1d(4, 2, kernel_size=3)
+            
+            def forward(self, emb):
+                out = self.conv(torch.nn.functional.pad(emb, (2, 0)))
+                return out.repeat_interleave(4, dim=-1)[:, :1]
+        
+        torch.manual_seed(0)
+        decoder = CausalDecoder().eval()
+        with tempfile.TemporaryDirectory() as tmp:
+            onnx_decoder = _OnnxCodecDecoder(decoder, _OnnxExporter(tmp))
+            for n_frames in (10, CODEC_BUCKET_FRAMES + 5):
+                emb = torch.randn(1, 4, n_frames)
+                with torch.no_grad():
+                    expected = decoder(emb)
+                audio = onnx_decoder(emb)
+                self.assertEqual(tuple(audio.shape), tuple(expected.shape))
+                self.assertTrue(torch.allclose(audio, expected, atol=1e-5))
+            self.assertEqual(len(os.listdir(tmp)), 2)
+    
+    def test_module_fingerprint_covers_all_weights(self):
+        """L'empreinte des exports ONNX change avec n'importe quel poids, y compris en bf16."""
+        import torch
+        from src.backends import _module_fingerprint
+        
+        module = torch.nn.Linear(32, 32)
+        patched = torch.nn.Linear(32, 32)
+        patched.load_state_dict(module.state_dict())
+        self.assertEqual(_module_fingerprint(module), _module_fingerprint(patched))
+        
+        with torch.no_grad():
+            patched.weight[-1, -1] += 1.0
+        self.assertNotEqual(_module_fingerprint(module), _module_fingerprint(patched))
+        self.assertNotEqual(
+            _module_fingerprint(module.to(torch.bfloat16)),
+            _module_fingerprint(patched.to(torch.bfloat16)),
+        )
+
+class TestBatchedGeneration(unittest.TestCase):
+    """Tests de la génération par lots."""
+    
+    def test_matches_bark_generation(self):
+        """Avec un lot d'un élément et la même graine, les tokens sont ceux de bark.generation."""
+        import torch
+        from bark import generation
+        from src.batched_generation import generate_coarse_batch, generate_fine_batch, generate_text_semantic_batch
+        
+        sys.path.insert(0, BENCHMARKS_DIR)
+        from stub_backend import stub_backend
+        
+        rng = np.random.RandomState(0)
+        history_prompt = {
+            "semantic_prompt": rng.randint(0, 10_000, 200),
+            "coarse_prompt": rng.randint(0, 1024, (2, 300)),
+            "fine_prompt": rng.randint(0, 1024, (8, 300)),
+        }
+        with tempfile.TemporaryDirectory() as tmp, stub_backend(os.path.join(tmp, "models")) as model_dir:
+            loaded = ModelRegistry().get(model_dir, "cpu")
+            with loaded.activate("text", "coarse", "fine") as models:
+                for prompt in (None, history_prompt):
+                    torch.manual_seed(0)
+                    semantic = generation.generate_text_semantic(
+                        "hello world", history_prompt=prompt, silent=True, max_gen_duration_s=2.0
+                    )
+                    torch.manual_seed(0)
+                    batched = generate_text_semantic_batch(
+                        models.models, ["hello world"], history_prompt=prompt, max_gen_duration_s=2.0
+                    )[0]
+                    self.assertGreater(len(semantic), 0)
+                    self.assertTrue(np.array_equal(batched, semantic))
+                    
+                    torch.manual_seed(1)
+                    coarse = generation.generate_coarse(semantic, history_prompt=prompt, silent=True)
+                    torch.manual_seed(1)
+                    batched = generate_coarse_batch(models.models, [semantic], history_prompt=prompt)[0]
+                    self.assertTrue(np.array_equal(batched, coarse))
+                    
+                    torch.manual_seed(2)
+                    fine = generation.generate_fine(coarse, history_prompt=prompt, temp=0.5, silent=True)
+                    torch.manual_seed(2)
+                    batched = generate_fine_batch(models.models, [coarse], history_prompt=prompt, temp=0.5)[0]
+                    self.assertTrue(np.array_equal(batched, fine))
+
+class TestSeededConcurrency(unittest.TestCase):
+    """Reproductibilité des générations avec graine pendant des générations par lots concurrentes."""
+    
+    def test_seeded_synthesis_during_batches(self):
+        """Une génération avec graine donne les mêmes codes pendant qu'un autre thread génère par lots."""
+        import threading
+        
+        sys.path.insert(0, BENCHMARKS_DIR)
+        from stub_backend import stub_backend
+        
+        with tempfile.TemporaryDirectory() as tmp, stub_backend(os.path.join(tmp, "models")) as model_dir:
+            bark = StandaloneBark(model_dir=model_dir, max_duration_s=0.3)
+            os.makedirs(bark.speaker_embeddings_dir, exist_ok=True)
+            save_speaker_prompt(bark._speaker_prompt_path("spk"), trim_prompt(np.arange(100) % 50, np.full((8, 200), 3)))
+            
+            # L'EnCodec factice (sans poids) décode tous les codes en un même
+            # signal : les codes fine décodés sont comparés plutôt que l'audio
+            decoded = []
+            decode = bark.backend.decode
+            
+            def recording_decode(models, fine_tokens):
+                decoded.append(np.array(fine_tokens))
+                return decode(models, fine_tokens)
+            
+            bark.backend.decode = recording_decode
+            bark.synthesize("Hello there.", "spk", seed=7)
+            history_prompt = bark._load_speaker_prompt("spk")
+            
+            stop = threading.Event()
+            batches = []
+            
+            def generate_batches():
+                while not stop.is_set():
+                    batches.append(bark._generate_batch(["One.", "Two words."], history_prompt, 0.7, 2))
+            
+            thread = threading.Thread(target=generate_batches)
+            thread.start()
+            try:
+                for _ in range(3):
+                    bark.synthesize("Hello there.", "spk", seed=7)
+            finally:
+                stop.set()
+                thread.join()
+            self.assertGreater(len(batches), 0)
+            self.assertEqual(len(decoded), 4)
+            for fine_tokens in decoded[1:]:
+                self.assertTrue(np.array_equal(fine_tokens, decoded[0]))
+
+class TestKVCache(unittest.TestCase):
+    """Tests du cache clés/valeurs préalloué."""
+    
+    def _gpt(self, **config):
+        import torch
+        from bark.model import GPT, GPTConfig
+        
+        torch.manual_seed(0)
+        return GPT(GPTConfig(**dict(dict(input_vocab_size=50, output_vocab_size=50, n_layer=2, n_head=2, n_embd=16, block_size=64), **config))).eval()
+    
+    def test_matches_bark_forward(self):
+        """Les logits pas à pas sont ceux du modèle sans cache, y compris au-delà d'une tranche d'allocation."""
+        import torch
+        from src.kv_cache import StaticKVCache, cached_forward
+        
+        model = self._gpt()
+        x = torch.randint(0, 50, (2, 40))
+        cache = StaticKVCache.for_model(model, 100, chunk=16)
+        self.assertEqual(cache.max_len, 64)
+        with torch.no_grad():
+            for sequence in range(2):
+                cache.reset()
+                logits = cached_forward(model, x[:, :10], cache)
+                self.assertTrue(torch.allclose(logits, model(x[:, :10])[0], atol=1e-5))
+                for t in range(10, 40):
+                    logits = cached_forward(model, x[:, t:t + 1], cache)
+                    self.assertTrue(torch.allclose(logits, model(x[:, :t + 1])[0], atol=1e-5))
+            self.assertEqual((cache.length, cache.capacity), (40, 48))
+            with self.assertRaises(ValueError):
+                cached_forward(model, x[:, :2], cache)
+    
+    def test_cache_modes_match(self):
+        """Les trois modes de cache donnent les mêmes tokens (préfixe sémantique fusionné compris)."""
+        import torch
+        from src.kv_cache import CachedDecoder
+        
+        model = self._gpt(block_size=300)
+        prefix = torch.randint(0, 50, (1, 513))
+        tokens = {}
+        for mode in ("static", "dynamic", "off"):
+            decoder = CachedDecoder(model, mode, max_len=300, merge_context=True)
+            x = prefix
+            with torch.no_grad():
+                for _ in range(20):
+                    x = torch.cat((x, decoder(x)[:, -1].argmax(-1, keepdim=True)), dim=1)
+            tokens[mode] = x[0, 513:].tolist()
+        self.assertEqual(tokens["static"], tokens["off"])
+        self.assertEqual(tokens["dynamic"], tokens["off"])
+        # Un module remplacé par un backend utilise le cache de Bark
+        self.assertEqual(CachedDecoder(lambda *a, **k: None, "static").mode, "dynamic")
+        with self.assertRaises(ValueError):
+            CachedDecoder(model, "paged")
+
+class TestGenerationLimits(unittest.TestCase):
+    """Tests des bornes de durée des générations."""
+    
+    def test_limits_and_cache_keys(self):
+        """Les bornes d'une requête remplacent celles de l'instance et distinguent les entrées des caches."""
+        from src.generation_limits import GenerationLimits
+        
+        defaults = GenerationLimits()
+        self.assertEqual(defaults.semantic_key(), "")
+        limits = defaults.override(max_duration_s=3.0)
+        self.assertEqual((limits.max_duration_s, limits.min_eos_p), (3.0, 0.2))
+        self.assertNotEqual(limits.semantic_key(), "")
+        self.assertNotEqual(defaults.output_key(), defaults._replace(trim_silence=False).output_key())
+        self.assertNotEqual(
+            SemanticTokenCache.make_key("a", None, 0.7, limits=limits.semantic_key()),
+            SemanticTokenCache.make_key("a", None, 0.7)
+        )
+        for bad in ({"max_duration_s": 0}, {"min_eos_p": 0}, {"min_eos_p": 1.5}):
+            with self.assertRaises(ValueError):
+                defaults.override(**bad)
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(ValueError):
+                StandaloneBark(model_dir=tmp, max_duration_s=-1)
+    
+    def test_trim_trailing_silence(self):
+        """Seul un silence final assez long est coupé, en gardant une courte fin."""
+        from src.generation_limits import (
+            TRAILING_SILENCE_KEEP_S, trailing_silence_frames, trim_semantic, trim_trailing_silence
+        )
+        
+        codes = np.array([7, 9])
+        voiced = np.random.RandomState(0).randint(10, 1024, (2, 100))
+        silence = np.tile([[7], [3]], 150)
+        coarse = np.hstack([voiced, silence])
+        self.assertEqual(trailing_silence_frames(coarse, codes), 150)
+        trimmed = trim_trailing_silence(coarse, codes)
+        self.assertEqual(trimmed.shape[1], 100 + int(TRAILING_SILENCE_KEEP_S * 75))
+        self.assertTrue(np.array_equal(trimmed[:, :100], voiced))
+        short = np.hstack([voiced, silence[:, :20]])
+        self.assertIs(trim_trailing_silence(short, codes), short)
+        self.assertEqual(len(trim_semantic(np.arange(200), trimmed)), int(np.ceil(trimmed.shape[1] * 49.9 / 75)))
+    
+    def test_silence_codes_from_codec(self):
+        """Les codes du silence viennent d'EnCodec et reconnaissent un signal silencieux."""
+        import torch
+        from encodec import EncodecModel
+        from src.generation_limits import silence_codes, trailing_silence_frames
+        
+        torch.manual_seed(0)
+        codec = EncodecModel.encodec_model_24khz(pretrained=False)
+        codec.set_target_bandwidth(6.0)
+        codec.eval()
+        codes = silence_codes(codec)
+        self.assertIs(silence_codes(codec), codes)
+        silent = encode_audio_codes(codec, np.zeros(24000, dtype=np.float32))
+        self.assertEqual(trailing_silence_frames(silent[:2], codes), silent.shape[1])
+    
+    def test_semantic_stage_stops_early(self):
+        """L'étape sémantique s'arrête à la durée maximale ou dès que le seuil de fin est atteint."""
+        import torch
+        from bark.model import GPT, GPTConfig
+        from src.batched_generation import generate_text_semantic_batch
+        
+        class Tokenizer:
+            def encode(self, text, add_special_tokens=False):
+                return [ord(c) for c in text]
+        
+        torch.manual_seed(0)
+        model = GPT(GPTConfig(input_vocab_size=129_600, output_vocab_size=10_048, n_layer=1, n_head=1,
+                              n_embd=8, block_size=1024)).eval()
+        models = {"text": {"model": model, "tokenizer": Tokenizer()}}
+        tokens = generate_text_semantic_batch(models, ["hello", "world"], min_eos_p=None, max_gen_duration_s=0.5)
+        self.assertTrue(all(len(t) <= int(0.5 * 49.9) + 1 for t in tokens))
+        tokens = generate_text_semantic_batch(models, ["hello"], min_eos_p=1e-12)
+        self.assertEqual(len(tokens[0]), 0)
+
+class TestAsyncBark(unittest.TestCase):
+    """Tests de l'interface asyncio (annulation, délai, progression)."""
+    
+    class SlowBark:
+        """Simule une génération en plusieurs étapes et pas de décodage."""
+        
+        def __init__(self):
+            import threading
+            self.steps = 0
+            self.stopped = threading.Event()
+            
+        def synthesize(self, text, n_steps=None):
+            import time
+            from src.generation_control import generation_step
+            from src.profiling import profile_stage
+            
+            try:
+                with profile_stage("text") as timer:
+                    step = 0
+                    while n_steps is None or step < n_steps:
+                        generation_step("text", step, n_steps)
+                        self.steps += 1
+                        step += 1
+                        time.sleep(0.002)
+                    timer.tokens = step
+                with profile_stage("codec"):
+                    return np.zeros(len(text), dtype=np.float32)
+            finally:
+                self.stopped.set()
+    
+    def test_result_and_progress(self):
+        """Le résultat est retourné et la progression suit les étapes et les pas."""
+        import asyncio
+        from src.async_bark import AsyncStandaloneBark
+        
+        async def run():
+            bark = AsyncStandaloneBark(self.SlowBark(), progress_interval_s=0)
+            received = []
+            task = bark.submit("synthesize", "abc", n_steps=5, on_progress=received.append)
+            events = [event async for event in task.events()]
+            audio = await task
+            bark.close()
+            return audio, events, received
+        
+        audio, events, received = asyncio.run(run())
+        self.assertEqual(len(audio), 3)
+        self.assertEqual(events, received)
+        self.assertEqual(
+            [(e.stage, e.event, e.step) for e in events],
+            [("text", "start", 0)] + [("text", "step", i) for i in range(5)]
+            + [("text", "end", 5), ("codec", "start", 0), ("codec", "end", 0)]
+        )
+        self.assertEqual(events[1].total, 5)
+    
+    def test_cancellation_stops_generation(self):
+        """Annuler la tâche interrompt la génération au pas de décodage suivant."""
+        import asyncio
+        from src.async_bark import AsyncStandaloneBark
+        
+        slow = self.SlowBark()
+        
+        async def run():
+            bark = AsyncStandaloneBark(slow)
+            task = asyncio.ensure_future(bark.synthesize("abc"))
+            while slow.steps < 3:
+                await asyncio.sleep(0.005)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            bark.close()
+        
+        asyncio.run(run())
+        self.assertTrue(slow.stopped.wait(5))
+        steps = slow.steps
+        import time
+        time.sleep(0.05)
+        self.assertEqual(slow.steps, steps)
+    
+    def test_timeout(self):
+        """Un délai dépassé interrompt la génération ; une requête en attente ne démarre pas."""
+        import asyncio
+        from src.async_bark import AsyncStandaloneBark
+        
+        slow, queued = self.SlowBark(), self.SlowBark()
+        
+        async def run():
+            bark = AsyncStandaloneBark(slow, timeout_s=0.1)
+            running = bark.submit("synthesize", "abc")
+            with self.assertRaises(asyncio.TimeoutError):
+                await running
+            other = AsyncStandaloneBark(queued, timeout_s=0.05)
+            other._executor = bark._executor
+            busy = bark.submit("synthesize", "abc", timeout_s=1.0, n_steps=100)
+            with self.assertRaises(asyncio.TimeoutError):
+                await other.synthesize("abc")
+            await busy
+            bark.close()
+        
+        asyncio.run(run())
+        self.assertTrue(slow.stopped.wait(5))
+        self.assertEqual(queued.steps, 0)
+    
+    def test_decoding_loop_checkpoints(self):
+        """Les boucles de décodage de Bark s'interrompent sous un contrôle annulé."""
+        import torch
+        from bark.model import GPT, GPTConfig
+        from src.batched_generation import generate_text_semantic_batch
+        from src.generation_control import (
+            GenerationCancelled, GenerationControl, GenerationTimeout, generation_control
+        )
+        
+        class Tokenizer:
+            def encode(self, text, add_special_tokens=False):
+                return [ord(c) for c in text]
+        
+        torch.manual_seed(0)
+        model = GPT(GPTConfig(input_vocab_size=129_600, output_vocab_size=10_048, n_layer=1, n_head=1,
+                              n_embd=8, block_size=1024)).eval()
+        models = {"text": {"model": model, "tokenizer": Tokenizer()}}
+        
+        events = []
+        with generation_control(GenerationControl(on_progress=events.append, progress_interval_s=0)):
+            tokens = generate_text_semantic_batch(models, ["hello"], min_eos_p=None, max_gen_duration_s=0.2)[0]
+        self.assertEqual([(e.stage, e.step) for e in events], [("text", n) for n in range(len(tokens))])
+        
+        control = GenerationControl()
+        control.cancel()
+        with generation_control(control), self.assertRaises(GenerationCancelled):
+            generate_text_semantic_batch(models, ["hello"])
+        control = GenerationControl(timeout_s=1e-6)
+        with generation_control(control), self.assertRaises(GenerationTimeout):
+            generate_text_semantic_batch(models, ["hello"])
+
+class TestStartup(unittest.TestCase):
+    """Tests du démarrage sans dépendances lourdes."""
+    
+    def test_cli_import_does_not_load_torch(self):
+        """La CLI et StandaloneBark s'importent sans torch ni Bark."""
+        import subprocess
+        
+        code = (
+            "import sys\n"
+            "import src.bark_cli\n"
+            "from src.standalone_bark import StandaloneBark\n"
+            "StandaloneBark(model_dir=sys.argv[1])\n"
+            "print(','.join(m for m in ('torch', 'bark', 'scipy', 'librosa') if m in sys.modules))"
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            result = subprocess.run(
+                [sys.executable, "-c", code, tmp],
+                cwd=str(Path(__file__).parent.parent),
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+        self.assertEqual(result.stdout.strip(), "")
+
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file
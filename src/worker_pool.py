@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pool de processus pour l'inférence sur CPU.
+
+Chaque processus de travail charge ses propres modèles avec une part des
+threads torch du processus parent et récupère ses tâches dans une file
+partagée. Les poids sont projetés en mémoire depuis les checkpoints (mmap) :
+les pages en lecture seule sont partagées par tous les processus, la mémoire
+ne croît donc pas N fois. Les résultats sont renvoyés au parent dans l'ordre
+des textes.
+"""
+
+import os
+import queue
+import logging
+import multiprocessing
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from src.generation_limits import DEFAULT_MIN_EOS_P
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(
+    worker_index: int,
+    bark_kwargs: Dict[str, Any],
+    num_threads: int,
+    initializer: Optional[Callable[[], None]],
+    jobs,
+    results,
+):
+    """Boucle d'un processus de travail."""
+    if initializer is not None:
+        initializer()
+
+    import torch
+    torch.set_num_threads(num_threads)
+
+    from src.model_registry import get_registry
+    from src.standalone_bark import StandaloneBark
+
+    get_registry().mmap_weights = True
+    bark = StandaloneBark(**bark_kwargs)
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, kind, payload = job
+        try:
+            if kind == "prepare":
+                bark._load_models()
+                result = bark._prepare_speaker(None, payload["audio_file"])
+            elif kind == "extract":
+                result = bark.extract_speaker(**payload)
+            else:
+                result = bark.clone_voice_batch(**payload)
+            results.put((job_id, result, None))
+        except Exception as e:
+            logger.error(f"Erreur dans le processus de travail {worker_index}: {e}")
+            results.put((job_id, None, f"{type(e).__name__}: {e}"))
+
+
+class BarkWorkerPool:
+    """Pool de processus StandaloneBark alimenté par une file de tâches partagée."""
+
+    def __init__(
+        self,
+        workers: int = 2,
+        model_dir: Optional[str] = None,
+        threads_per_worker: Optional[int] = None,
+        semantic_cache_dir: Optional[str] = None,
+        precision: str = "fp32",
+        initializer: Optional[Callable[[], None]] = None,
+        model_size: Union[str, Dict[str, str]] = "large",
+        max_real_time_factor: Optional[float] = None,
+        speaker_store: str = "files",
+        output_format: Optional[str] = None,
+        output_sample_rate: Optional[int] = None,
+        output_lufs: Optional[float] = None,
+        backend: str = "reference",
+        max_duration_s: Optional[float] = None,
+        min_eos_p: float = DEFAULT_MIN_EOS_P,
+        trim_silence: bool = True,
+    ):
+        """
+        Args:
+            workers: Nombre de processus de travail.
+            model_dir: Répertoire des modèles.
+            threads_per_worker: Threads torch par processus (par défaut : cœurs / workers).
+            semantic_cache_dir: Répertoire du cache des tokens sémantiques (optionnel).
+            precision: Précision d'inférence des modèles.
+            initializer: Fonction (importable) appelée au démarrage de chaque processus.
+            model_size: Taille des modèles (voir StandaloneBark).
+            max_real_time_factor: Budget de latence de la politique "auto".
+            speaker_store: Stockage des voix ("files" ou "packed", voir StandaloneBark).
+            output_format: Format des fichiers générés (voir StandaloneBark).
+            output_sample_rate: Fréquence des fichiers générés (celle de Bark si None).
+            output_lufs: Sonie visée des fichiers générés (pas de normalisation si None).
+            backend: Backend de génération des processus, par nom (voir src.backends).
+            max_duration_s: Durée maximale générée par texte (voir StandaloneBark).
+            min_eos_p: Seuil de fin de séquence (voir StandaloneBark).
+            trim_silence: Couper le silence final des générations.
+        """
+        if workers < 1:
+            raise ValueError("workers doit être au moins 1")
+        self.workers = workers
+        self.model_dir = model_dir or os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        self.bark_kwargs = {
+            "model_dir": self.model_dir,
+            "semantic_cache_dir": semantic_cache_dir,
+            "precision": precision,
+            "model_size": self._resolve_model_size(model_size, precision, max_real_time_factor),
+            "speaker_store": speaker_store,
+            "output_format": output_format,
+            "output_sample_rate": output_sample_rate,
+            "output_lufs": output_lufs,
+            "backend": backend,
+            "max_duration_s": max_duration_s,
+            "min_eos_p": min_eos_p,
+            "trim_silence": trim_silence,
+        }
+        self.initializer = initializer
+        # spawn : pas de fork d'un processus ayant déjà initialisé torch
+        self._context = multiprocessing.get_context("spawn")
+        self._jobs = None
+        self._results = None
+        self._processes: List[Any] = []
+        self._next_job_id = 0
+
+    def _resolve_model_size(
+        self,
+        model_size: Union[str, Dict[str, str]],
+        precision: str,
+        max_real_time_factor: Optional[float],
+    ) -> Union[str, Dict[str, str]]:
+        """
+        Résout la politique "auto" une seule fois, pour tous les processus.
+
+        Les poids fp32 projetés en mémoire sont partagés entre processus ; les
+        modèles convertis (bf16, int8) sont en revanche dupliqués, la mémoire
+        disponible est alors répartie entre les processus.
+        """
+        from src.model_sizes import GPT_STAGES, available_memory_bytes, choose_model_sizes, parse_model_size
+
+        if parse_model_size(model_size) != "auto":
+            return model_size
+        available = available_memory_bytes("cpu")
+        if available is not None and precision != "fp32":
+            available //= self.workers
+        sizes = choose_model_sizes("cpu", precision, available, max_real_time_factor)
+        return dict(zip(GPT_STAGES, sizes))
+
+    def start(self):
+        """Démarre les processus de travail (appelé automatiquement au premier lot)."""
+        if self._processes:
+            return
+        self._jobs = self._context.Queue()
+        self._results = self._context.Queue()
+        logger.info(
+            f"Démarrage de {self.workers} processus de travail "
+            f"({self.threads_per_worker} thread(s) torch chacun)"
+        )
+        for i in range(self.workers):
+            process = self._context.Process(
+                target=_worker_main,
+                args=(i, self.bark_kwargs, self.threads_per_worker, self.initializer, self._jobs, self._results),
+                name=f"bark-worker-{i}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+    def _iter_jobs(self, jobs: List[Tuple[str, Dict[str, Any]]]) -> Iterator[Tuple[int, Any, Optional[str]]]:
+        """
+        Soumet des tâches et produit leurs résultats au fur et à mesure.
+
+        Yields:
+            (position de la tâche, résultat, message d'erreur ou None).
+        """
+        self.start()
+        job_ids = {}
+        for position, (kind, payload) in enumerate(jobs):
+            job_ids[self._next_job_id] = position
+            self._jobs.put((self._next_job_id, kind, payload))
+            self._next_job_id += 1
+
+        pending = set(job_ids)
+        while pending:
+            try:
+                job_id, result, error = self._results.get(timeout=1.0)
+            except queue.Empty:
+                dead = [p.name for p in self._processes if not p.is_alive()]
+                if dead:
+                    raise RuntimeError(f"Processus de travail arrêté(s) de manière inattendue: {', '.join(dead)}")
+                continue
+            if job_id not in pending:
+                continue
+            pending.discard(job_id)
+            yield job_ids[job_id], result, error
+
+    def _run_jobs(self, jobs: List[Tuple[str, Dict[str, Any]]]) -> List[Any]:
+        """Soumet des tâches et retourne leurs résultats dans l'ordre de soumission."""
+        results: List[Any] = [None] * len(jobs)
+        errors = []
+        for position, result, error in self._iter_jobs(jobs):
+            if error is not None:
+                errors.append(error)
+            results[position] = result
+        if errors:
+            raise RuntimeError(f"{len(errors)} tâche(s) en échec: {errors[0]}")
+        return results
+
+    def extract_speakers(self, requests: List[Dict[str, Any]]) -> Iterator[Tuple[int, Optional[str], Optional[str]]]:
+        """
+        Extrait plusieurs voix en parallèle.
+
+        Args:
+            requests: Arguments de StandaloneBark.extract_speaker, un dictionnaire par voix.
+
+        Yields:
+            (position de la demande, identifiant extrait, message d'erreur ou None),
+            dans l'ordre de fin des extractions.
+        """
+        return self._iter_jobs([("extract", dict(request)) for request in requests])
+
+    def clone_voice_batch(
+        self,
+        texts: List[str],
+        speaker_id: Optional[str] = None,
+        audio_file: Optional[str] = None,
+        output_dir: Optional[str] = None,
+        output_files: Optional[List[str]] = None,
+        temperature: float = 0.7,
+        batch_size: int = 8,
+    ) -> List[str]:
+        """
+        Clone une voix sur plusieurs textes en répartissant les lots entre les processus.
+
+        Mêmes arguments et même résultat que StandaloneBark.clone_voice_batch.
+        """
+        if output_files is not None and len(output_files) != len(texts):
+            raise ValueError("output_files doit contenir un chemin par texte")
+        if not speaker_id and not audio_file:
+            raise ValueError("Vous devez fournir soit un speaker_id, soit un fichier audio")
+
+        if not speaker_id:
+            # Extraction unique, avant de répartir les textes
+            speaker_id = self._run_jobs([("prepare", {"audio_file": audio_file})])[0]
+
+        if output_files is None:
+            import datetime
+            from src.audio_output import OUTPUT_FORMATS, resolve_format
+            output_dir = output_dir or self.model_dir
+            os.makedirs(output_dir, exist_ok=True)
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            # Même extension que StandaloneBark.output_extension
+            extension = OUTPUT_FORMATS[resolve_format(self.bark_kwargs["output_format"])].extension
+            output_files = [
+                os.path.join(output_dir, f"generated_{speaker_id}_{timestamp}_{i:04d}{extension}")
+                for i in range(len(texts))
+            ]
+
+        # Des lots de textes de longueurs voisines, distribués aux processus à la demande
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        chunk_size = max(1, min(batch_size, -(-len(texts) // self.workers)))
+        jobs = []
+        for start in range(0, len(order), chunk_size):
+            indices = order[start:start + chunk_size]
+            jobs.append(("batch", {
+                "texts": [texts[i] for i in indices],
+                "speaker_id": speaker_id,
+                "output_files": [output_files[i] for i in indices],
+                "temperature": temperature,
+                "batch_size": batch_size,
+            }))
+        self._run_jobs(jobs)
+        logger.info(f"{len(texts)} fichier(s) audio générés par {self.workers} processus")
+        return list(output_files)
+
+    def close(self):
+        """Arrête les processus de travail."""
+        if not self._processes:
+            return
+        for _ in self._processes:
+            self._jobs.put(None)
+        for process in self._processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()